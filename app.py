@@ -1,34 +1,66 @@
 """
 Aplicação Flask refatorada com arquitetura modular
 """
+import io
 import os
+import json
+import hashlib
+import hmac
+import uuid
+import queue
+import shutil
+import socket
 import logging
+import threading
 from datetime import datetime
-from flask import Flask, render_template, request, jsonify, url_for
+from flask import (
+    Flask, Response, render_template, request, jsonify, url_for, send_file,
+    make_response, abort
+)
+from werkzeug.datastructures import FileStorage
 from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.middleware.proxy_fix import ProxyFix
 from dotenv import load_dotenv
 
 # Configurações e módulos locais
 from config.config import config
-from exceptions.errors import AppError, ValidationError, ProcessingError
+from exceptions.errors import (
+    AppError, ValidationError, ProcessingError, QueueFullError, JobCancelledError,
+    RateLimitError, ForbiddenError
+)
 from services.file_processing_service import FileProcessingService
-from services.celery_tasks import process_file_async, CELERY_AVAILABLE
-from utils.validators import FileValidator
+from services.job_store import JobStore
+from services.upload_sessions import UploadSessionStore
+from services.rate_limiter import create_upload_limiter, estimate_rows
+from services.processing_governor import ProcessingGovernor
+from services.storage_manager import StorageManager
+from services.pipeline_store import create_pipeline_store
+from services.health_registry import HeartbeatPublisher, create_health_registry, summarize
+from services.readiness import ReadinessMonitor
+from services.profiler import Profiler, profile_run
+from services.celery_tasks import (
+    process_file_async, start_pipeline, sync_pipeline_job, revoke_task, CELERY_AVAILABLE, TASK_BACKEND
+)
+from utils.validators import FileValidator, InputValidator
+from utils.upload_stream import UploadRequest, decoded_filename
+from utils.assets import AssetManifest
+from utils.log_pipeline import install_log_pipeline, get_log_pipeline
 
 # Carregar variáveis de ambiente
 load_dotenv()
 
-# Configurar logging estruturado
+# Configurar logging estruturado: o structlog só monta o evento; a
+# renderização em JSON e a escrita acontecem na thread do pipeline de logging
 try:
     import structlog
     structlog.configure(
         processors=[
             structlog.processors.TimeStamper(fmt="iso"),
             structlog.processors.add_log_level,
-            structlog.processors.JSONRenderer()
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter
         ],
         wrapper_class=structlog.make_filtering_bound_logger(logging.INFO),
-        logger_factory=structlog.PrintLoggerFactory(),
+        logger_factory=structlog.stdlib.LoggerFactory(),
         context_class=dict,
         cache_logger_on_first_use=True,
     )
@@ -36,24 +68,56 @@ try:
     STRUCTLOG_AVAILABLE = True
 except ImportError:
     # Fallback para logging padrão se structlog não estiver disponível
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
     logger = logging.getLogger(__name__)
     STRUCTLOG_AVAILABLE = False
 
 
+
+def log_formatter(log_format=None):
+    """
+    Formatador aplicado na thread de escrita do pipeline de logging
+
+    Com structlog, eventos do structlog e registros do logging padrão saem
+    como JSON; sem ele, no formato ``log_format``.
+    """
+    if STRUCTLOG_AVAILABLE:
+        return structlog.stdlib.ProcessorFormatter(
+            processor=structlog.processors.JSONRenderer(),
+            foreign_pre_chain=[
+                structlog.stdlib.add_logger_name,
+                structlog.processors.TimeStamper(fmt="iso"),
+                structlog.processors.add_log_level
+            ]
+        )
+    return logging.Formatter(log_format or '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+
+# Pipeline provisório até o setup_logging da aplicação, já com o mesmo
+# formatador: os logs de init_extensions também saem em JSON
+install_log_pipeline(formatter=log_formatter())
+
+
+# Marcador do token CSRF no HTML da página principal em cache
+CSRF_PLACEHOLDER = '__csrf_token_placeholder__'
+
+
 def create_app(config_name='default'):
     """Factory function para criar a aplicação Flask"""
     
     app = Flask(__name__)
+    app.request_class = UploadRequest
     
     # Carregar configuração
     config_class = config.get(config_name, config['default'])
     app.config.from_object(config_class)
     config_class.init_app(app)
     
+    # Atrás de proxies, remote_addr (balde de envio por cliente, Flask-Limiter,
+    # logs) vem do X-Forwarded-For, confiando só nos saltos configurados
+    proxy_hops = app.config.get('PROXY_FIX_X_FOR', 0)
+    if proxy_hops:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_hops, x_proto=proxy_hops)
+    
     # Inicializar extensões
     init_extensions(app)
     
@@ -80,9 +144,10 @@ def init_extensions(app):
         from flask_limiter.util import get_remote_address
         
         limiter = Limiter(
-            app,
-            key_func=get_remote_address,
-            default_limits=[app.config.get('RATELIMIT_DEFAULT', "100 per hour")]
+            get_remote_address,
+            app=app,
+            default_limits=[app.config.get('RATELIMIT_DEFAULT', "100 per hour")],
+            storage_uri=app.config.get('RATELIMIT_STORAGE_URL', 'memory://')
         )
         app.limiter = limiter
         logger.info("Rate limiting configurado")
@@ -101,46 +166,271 @@ def init_extensions(app):
         logger.warning("Flask-WTF não disponível, CSRF protection desabilitado")
         app.csrf = None
     
-    # Celery para background tasks
+    # Background tasks: Celery ou executor local com a mesma interface
+    from services.celery_tasks import celery
+    celery.conf.update(app.config)
+    app.celery = celery
+    app.task_backend = TASK_BACKEND
     if CELERY_AVAILABLE:
-        from services.celery_tasks import celery
-        celery.conf.update(app.config)
-        app.celery = celery
         logger.info("Celery configurado para background tasks")
     else:
-        logger.warning("Celery não disponível, tasks executarão sincronamente")
-        app.celery = None
+        logger.warning("Celery não disponível, usando executor local para background tasks")
     
     # Criar pasta de uploads
     upload_folder = app.config.get('UPLOAD_FOLDER', 'uploads')
     os.makedirs(upload_folder, exist_ok=True)
     
+    # Registro de jobs
+    app.job_store = JobStore(app.config.get('JOB_STORE_PATH', 'jobs.db'))
+    
+    # Vagas de processamento: parses simultâneos e orçamento de memória
+    app.processing_governor = ProcessingGovernor(
+        slots=app.config.get('PROCESSING_SLOTS', 2),
+        memory_budget_mb=app.config.get('PROCESSING_MEMORY_BUDGET_MB', 1024),
+        max_waiting=app.config.get('PROCESSING_MAX_WAITING', 8),
+        max_wait=app.config.get('PROCESSING_MAX_WAIT', 120)
+    )
+    
+    # Workspaces por job na pasta de uploads (índice no banco do registro de jobs)
+    quota_mb = app.config.get('UPLOAD_QUOTA_MB')
+    app.storage = StorageManager(
+        upload_folder, app.config.get('JOB_STORE_PATH', 'jobs.db'),
+        quota_bytes=quota_mb * 1024 * 1024 if quota_mb else None,
+        max_age=app.config.get('UPLOAD_WORKSPACE_MAX_AGE', 3600)
+    )
+    
+    # Resultados intermediários do pipeline em tasks (Redis com o Celery)
+    app.pipeline_store = create_pipeline_store(app.config, app.storage, TASK_BACKEND)
+    
+    if not CELERY_AVAILABLE:
+        # Tasks locais rodam neste processo e compartilham registro, vagas e
+        # workspaces da aplicação
+        from services.celery_tasks import (
+            set_job_store, set_processing_governor, set_storage, set_pipeline_store
+        )
+        set_job_store(app.job_store)
+        set_processing_governor(app.processing_governor)
+        set_storage(app.storage)
+        set_pipeline_store(app.pipeline_store)
+    
+    # Backend falso do Google Sheets (testes, benchmarks, desenvolvimento offline)
+    sheets_backend = app.config.get('SHEETS_BACKEND', 'google')
+    if sheets_backend == 'fake':
+        from services.fake_sheets import configure_shared_backend
+        configure_shared_backend(
+            latency=app.config.get('FAKE_SHEETS_LATENCY', 0.0),
+            requests_per_minute=app.config.get('FAKE_SHEETS_REQUESTS_PER_MINUTE'),
+            quota_error_rate=app.config.get('FAKE_SHEETS_QUOTA_ERROR_RATE', 0.0)
+        )
+        logger.warning("Usando backend falso do Google Sheets")
+    
     # Inicializar serviços
     app.file_service = FileProcessingService(
         upload_folder=upload_folder,
-        credentials_file=app.config.get('CREDENTIALS_FILE', 'credentials.json')
+        credentials_file=app.config.get('CREDENTIALS_FILE', 'credentials.json'),
+        job_store=app.job_store,
+        sheets_backend=sheets_backend,
+        processing_mode=app.config.get('PROCESSING_MODE', 'copy'),
+        dashboard={
+            'sheet': app.config.get('DASHBOARD_SHEET_NAME'),
+            'tab': app.config.get('DASHBOARD_SHEET_TAB')
+        },
+        change_log_folder=app.config.get('CHANGE_LOG_FOLDER', 'change_logs'),
+        change_log_sample_size=app.config.get('CHANGE_LOG_SAMPLE_SIZE', 50),
+        change_log_max_age=app.config.get('CHANGE_LOG_MAX_AGE'),
+        write_batch_size=app.config.get('SHEETS_WRITE_BATCH_SIZE', 5000),
+        governor=app.processing_governor,
+        pipeline_folder=app.config.get('PIPELINE_FOLDER', 'pipeline'),
+        storage=app.storage,
+        pipeline_store=app.pipeline_store
+    )
+    
+    # Sessões de upload em blocos (mesmo banco do registro de jobs)
+    app.upload_sessions = UploadSessionStore(
+        app.config.get('JOB_STORE_PATH', 'jobs.db'),
+        staging_folder=app.config.get('UPLOAD_SESSION_FOLDER', 'upload_sessions'),
+        chunk_size=app.config.get('UPLOAD_CHUNK_SIZE', 8 * 1024 * 1024),
+        max_chunk_size=app.config.get('MAX_UPLOAD_CHUNK_SIZE', 32 * 1024 * 1024),
+        ttl=app.config.get('UPLOAD_SESSION_TTL', 24 * 3600),
+        quota_bytes=(app.config.get('UPLOAD_SESSION_QUOTA_MB') or 0) * 1024 * 1024 or None
     )
     
     app.file_validator = FileValidator(app.config)
+    
+    # Heartbeats e saúde das dependências: no Redis com workers Celery (em
+    # outras máquinas), no banco do registro de jobs com o executor local
+    app.health_registry = create_health_registry(app.config, TASK_BACKEND)
+    app.heartbeat = None
+    if not CELERY_AVAILABLE and app.config.get('HEALTH_PUBLISHER_ENABLED', True):
+        # Sem workers Celery, o executor local é o worker: cada processo da
+        # aplicação publica o próprio heartbeat e verifica o Google Sheets
+        from services.celery_tasks import set_health_registry
+        set_health_registry(app.health_registry)
+        app.heartbeat = HeartbeatPublisher(
+            app.health_registry, f"executor:{socket.gethostname()}",
+            interval=app.config.get('HEALTH_HEARTBEAT_INTERVAL', 15),
+            probes={'google_sheets': lambda: app.file_service.sheets_service.test_connection()},
+            probe_interval=app.config.get('HEALTH_CHECK_INTERVAL', 60),
+            details={'hostname': socket.gethostname()}
+        )
+    
+    # Prontidão: verificações em segundo plano com timeout próprio; o
+    # /readyz e o /health servem o último veredito
+    app.readiness = ReadinessMonitor(interval=app.config.get('READINESS_INTERVAL', 10))
+    register_readiness_probes(app)
+    
+    if app.config.get('BACKGROUND_CHECKS_ON_STARTUP', True):
+        # O primeiro /readyz já encontra verificações em andamento
+        start_background_checks(app)
+    
+    @app.before_request
+    def ensure_background_checks():
+        # Garantia para servidores que não chamam wsgi.after_fork
+        start_background_checks(app)
+    
+    # Admissão de uploads por custo (bytes e linhas), estado no Redis ou SQLite
+    app.upload_limiter = create_upload_limiter(app.config)
+    
+    # Profiling sob demanda (desligado: nenhum profiler, instrumentação vazia)
+    app.profiler = None
+    if app.config.get('PROFILING_ENABLED', False):
+        app.profiler = Profiler(
+            app.config.get('JOB_STORE_PATH', 'jobs.db'),
+            app.config.get('PROFILING_FOLDER', 'profiles')
+        )
+        if not CELERY_AVAILABLE:
+            from services.celery_tasks import set_profiler
+            set_profiler(app.profiler)
+    
+    # Estáticos com hash (python -m utils.assets); sem build, cai no /static
+    app.assets = AssetManifest(app.static_folder)
+    app.index_cache = {}
+    
+    @app.template_global()
+    def asset_url(filename):
+        hashed = app.assets.resolve(filename)
+        if hashed is None:
+            return url_for('static', filename=filename)
+        return url_for('asset_file', filename=hashed)
+
+
+def start_background_checks(app):
+    """
+    Inicia heartbeat e verificações de prontidão no processo atual
+
+    Idempotente por processo: chamado na criação da aplicação, em cada worker
+    do gunicorn (``wsgi.after_fork``) e, por garantia, antes das requisições.
+    """
+    if app.heartbeat is not None:
+        app.heartbeat.ensure_started()
+    if app.config.get('READINESS_BACKGROUND', True):
+        app.readiness.ensure_started()
+
+
+def register_readiness_probes(app):
+    """Registra as verificações de prontidão da aplicação"""
+    timeout = app.config.get('READINESS_PROBE_TIMEOUT', 3.0)
+    heartbeat_interval = app.config.get('HEALTH_HEARTBEAT_INTERVAL', 15)
+    check_interval = app.config.get('HEALTH_CHECK_INTERVAL', 60)
+    
+    def database():
+        app.job_store.ping()
+    
+    def storage():
+        folder = app.config.get('UPLOAD_FOLDER', 'uploads')
+        if not os.access(folder, os.W_OK):
+            return {'status': 'unhealthy', 'error': 'pasta de uploads sem permissão de escrita'}
+        return {'free_mb': round(shutil.disk_usage(folder).free / (1024 * 1024), 1)}
+    
+    def published():
+        return summarize(
+            app.health_registry.records(),
+            heartbeat_ttl=3 * heartbeat_interval,
+            dependency_ttl=3 * max(check_interval, heartbeat_interval)
+        )
+    
+    def google_sheets():
+        # Resultado publicado pelos workers; nenhuma chamada à API aqui
+        sheets = published()['dependencies'].get('google_sheets')
+        return sheets or {'status': 'unknown'}
+    
+    def workers():
+        alive = published()['workers']
+        if app.task_backend == 'local' and app.heartbeat is None:
+            return {'workers': alive}
+        return {'status': 'healthy' if alive else 'no_workers', 'workers': alive}
+    
+    app.readiness.add_probe('database', database, timeout=timeout)
+    app.readiness.add_probe('storage', storage, timeout=timeout)
+    app.readiness.add_probe('google_sheets', google_sheets, timeout=timeout, critical=False)
+    app.readiness.add_probe('workers', workers, timeout=timeout, critical=False)
+    
+    if CELERY_AVAILABLE:
+        def broker():
+            with app.celery.connection_for_write() as conn:
+                conn.ensure_connection(max_retries=1)
+        
+        # Crítico só com TASK_BACKEND=celery explícito: no modo 'auto' os
+        # uploads síncronos continuam atendendo sem o Redis
+        app.readiness.add_probe('broker', broker, timeout=timeout,
+                                critical=app.config.get('TASK_BACKEND') == 'celery')
 
 
 def register_routes(app):
     """Registra rotas da aplicação"""
     
+    def get_job_state(job_id):
+        """Job do registro, com o estado do pipeline Celery atualizado pelo result backend"""
+        return sync_pipeline_job(app.job_store, app.job_store.get_job(job_id))
+    
     @app.route('/')
     def index():
-        """Página principal"""
-        return render_template('index.html')
+        """Página principal (renderizada uma vez por build dos estáticos)"""
+        cached = app.index_cache.get(app.assets.version)
+        if cached is None or app.debug:
+            # O token CSRF é por sessão: entra no HTML em cache a cada requisição
+            html = render_template(
+                'index.html',
+                csrf_token=(lambda: CSRF_PLACEHOLDER) if getattr(app, 'csrf', None) else None
+            )
+            cached = (html, hashlib.sha256(html.encode('utf-8')).hexdigest()[:32])
+            app.index_cache = {app.assets.version: cached}
+        
+        html, etag = cached
+        if getattr(app, 'csrf', None):
+            from flask_wtf.csrf import generate_csrf
+            response = make_response(html.replace(CSRF_PLACEHOLDER, generate_csrf()))
+        else:
+            response = make_response(html)
+            response.set_etag(etag)
+            response.make_conditional(request)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    
+    @app.route('/assets/<path:filename>')
+    def asset_file(filename):
+        """Estático com hash no nome: cache permanente e variante pré-comprimida"""
+        selected = app.assets.select(filename, request.headers.get('Accept-Encoding', ''))
+        if selected is None:
+            abort(404)
+        
+        path, encoding, mimetype, etag = selected
+        response = send_file(path, mimetype=mimetype, etag=etag, conditional=True)
+        response.headers['Cache-Control'] = (
+            f"public, max-age={app.config.get('STATIC_ASSET_MAX_AGE', 31536000)}, immutable"
+        )
+        response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        return response
+    
+    if app.limiter:
+        app.limiter.exempt(asset_file)
     
     @app.route('/upload', methods=['POST'])
     def upload_file():
         """Upload e processamento de arquivo"""
         try:
-            # Rate limiting específico para upload
-            if app.limiter:
-                from flask_limiter.util import get_remote_address
-                rate_limit = app.config.get('RATELIMIT_UPLOAD', "10 per minute")
-                
             # Verificar se arquivo foi enviado
             if 'file' not in request.files:
                 raise ValidationError("Nenhum arquivo foi enviado")
@@ -150,61 +440,228 @@ def register_routes(app):
             if file.filename == '':
                 raise ValidationError("Nenhum arquivo foi selecionado")
             
-            # Validar arquivo
-            app.file_validator.validate_file(file)
+            # base.csv.gz chega descomprimido; o nome acompanha o conteúdo
+            file.filename = decoded_filename(file.filename)
             
-            # Obter metadados
-            metadata = {
-                'uploaded_at': datetime.now().isoformat(),
-                'user_ip': request.remote_addr,
-                'user_agent': request.user_agent.string,
-                'file_info': app.file_validator.get_file_info(file)
-            }
+            return dispatch_upload(
+                file,
+                is_async=request.form.get('async', 'false').lower() == 'true',
+                stream=wants_stream()
+            )
+        
+        except Exception as e:
+            return upload_error_response(e)
+    
+    def charge_upload(size, rows=0, prepaid_size=None):
+        """
+        Consome do balde do cliente o custo de um upload
+        
+        ``prepaid_size``: tamanho já cobrado na criação da sessão de upload em
+        blocos; só a diferença é consumida.
+        
+        Returns:
+            Unidades consumidas (None sem limite ou sem custo adicional)
+        """
+        if app.upload_limiter is None:
+            return None
+        cost = app.upload_limiter.cost(size, rows)
+        if prepaid_size is not None:
+            cost = round(cost - app.upload_limiter.cost(prepaid_size), 2)
+        if cost <= 0:
+            return None
+        app.upload_limiter.acquire(request.remote_addr or 'unknown', cost)
+        return cost
+    
+    def refund_upload(cost, error=None):
+        """
+        Devolve unidades consumidas quando o upload não chegou a ser processado
+        por causa do servidor: fila ou disco cheios, falha ao registrar o job
+        ou ao enfileirar a task, erros inesperados (qualquer erro 5xx). Erros
+        do cliente (4xx) mantêm o custo.
+        """
+        if cost is None:
+            return
+        if isinstance(error, AppError) and error.status_code < 500:
+            return
+        app.upload_limiter.refund(request.remote_addr or 'unknown', cost)
+    
+    def dispatch_upload(file, is_async, stream, expected_hash=None, on_job_created=None,
+                        prepaid_size=None, job_id=None):
+        """
+        Valida o arquivo, registra o job e processa (assíncrono, NDJSON ou síncrono)
+        
+        Usado pelo upload direto e pela finalização de uploads em blocos
+        (``prepaid_size``: tamanho já cobrado na criação da sessão; ``job_id``:
+        ID já reservado para o job).
+        """
+        # Validar arquivo
+        app.file_validator.validate_file(file)
+        
+        # Obter metadados
+        file_info = app.file_validator.get_file_info(file)
+        metadata = {
+            'uploaded_at': datetime.now().isoformat(),
+            'user_ip': request.remote_addr,
+            'user_agent': request.user_agent.string,
+            'file_info': file_info
+        }
+        
+        # Chave de idempotência opcional (retries de browsers e proxies)
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if idempotency_key is not None:
+            idempotency_key = InputValidator.validate_string(idempotency_key, max_length=255)
+        
+        # Processamento síncrono com a fila de espera cheia: 503 antes de registrar o job
+        if not is_async:
+            app.processing_governor.ensure_capacity()
+        
+        # Admissão: o custo cresce com o tamanho e as linhas do arquivo
+        upload_cost = None
+        if app.upload_limiter is not None:
+            upload_cost = charge_upload(file_info['size'], estimate_rows(file, file_info['size']),
+                                        prepaid_size=prepaid_size)
+        
+        try:
+            # Registrar job (o ID do job é também o ID da task assíncrona)
+            job_id = job_id or str(uuid.uuid4())
+            metadata['job_id'] = job_id
+            content_hash = app.file_validator.compute_file_hash(file)
+            if expected_hash and expected_hash.lower() != content_hash:
+                # Sem processamento (envio corrompido no caminho): o custo volta
+                refund_upload(upload_cost)
+                upload_cost = None
+                raise ValidationError("SHA-256 do arquivo não confere com o informado", status_code=422)
+            
+            existing_job_id = app.job_store.create_job(
+                job_id,
+                filename=file.filename,
+                content_hash=content_hash,
+                size=file_info['size'],
+                backend=app.task_backend if is_async else 'sync',
+                idempotency_key=idempotency_key,
+                key_ttl=app.config.get('IDEMPOTENCY_KEY_TTL', 86400)
+            )
+            
+            if existing_job_id is not None:
+                # Repetição de um upload já aceito não consome capacidade
+                refund_upload(upload_cost)
+                return idempotent_replay(existing_job_id, content_hash)
+            
+            if on_job_created is not None:
+                on_job_created(job_id)
             
             # Processar baseado na disponibilidade do Celery
-            if app.celery and request.form.get('async', 'false').lower() == 'true':
+            if app.celery and is_async:
                 # Processamento assíncrono
-                file_data = file.read()
-                file.seek(0)
-                
-                task = process_file_async.delay(
-                    file_data=file_data,
-                    filename=file.filename,
-                    metadata=metadata
-                )
-                
+                try:
+                    if app.task_backend == 'celery':
+                        # Etapas parse -> diff -> write em filas separadas; as tasks
+                        # recebem o nome do arquivo no armazenamento do pipeline
+                        source_name = app.file_service.stage_source(file, job_id)
+                        start_pipeline(job_id, source_name, source_name, metadata)
+                    else:
+                        file_data = file.read()
+                        file.seek(0)
+                        process_file_async.apply_async(
+                            kwargs={
+                                'file_data': file_data,
+                                'filename': file.filename,
+                                'metadata': metadata
+                            },
+                            task_id=job_id
+                        )
+                except Exception as e:
+                    app.file_service.discard_pipeline(job_id)
+                    app.job_store.finish_job(job_id, 'FAILURE', error=str(e))
+                    raise
+            
                 logger.info("Arquivo enviado para processamento assíncrono", 
-                           task_id=task.id, filename=file.filename)
-                
+                           task_id=job_id, filename=file.filename)
+            
                 return jsonify({
                     'success': True,
                     'message': 'Arquivo enviado para processamento',
-                    'task_id': task.id,
+                    'task_id': job_id,
                     'async': True
                 })
+            elif stream:
+                # Processamento síncrono com eventos NDJSON a cada etapa
+                return stream_sync_processing(job_id, file, metadata)
             else:
-                # Processamento síncrono
-                result = app.file_service.process_file(file, metadata)
-                
+                # Processamento síncrono: a partir daqui o custo foi usado
+                upload_cost = None
+                app.job_store.mark_started(job_id)
+                try:
+                    with profile_run(app.profiler, 'upload', job_id) as profiled:
+                        result = app.file_service.process_file(
+                            file, metadata, progress=app.job_store.stage_recorder(job_id),
+                            cancel_check=lambda: app.job_store.is_cancel_requested(job_id)
+                        )
+                        profiled.record(result.get('timings'))
+                except JobCancelledError as e:
+                    app.job_store.finish_job(job_id, 'CANCELLED', error=str(e))
+                    logger.info("Processamento cancelado", job_id=job_id, error=str(e))
+                    return jsonify({
+                        'success': False,
+                        'error': str(e),
+                        'error_type': 'cancelled',
+                        'job_id': job_id
+                    }), 409
+                except Exception as e:
+                    app.job_store.finish_job(job_id, 'FAILURE', error=str(e))
+                    raise
+                app.job_store.finish_job(job_id, 'SUCCESS', result=result)
+            
                 logger.info("Arquivo processado com sucesso", 
                            filename=file.filename, result=result)
-                
+            
                 return jsonify({
                     'success': True,
                     'message': 'Arquivo processado com sucesso',
                     'result': result,
+                    'job_id': job_id,
                     'async': False
                 })
+    
+        except Exception as e:
+            refund_upload(upload_cost, e)
+            raise
+    
+    def upload_error_response(e):
+        """Resposta JSON para erros do upload (direto ou finalização em blocos)"""
+        if isinstance(e, RateLimitError):
+            logger.warning("Upload limitado", error=str(e), client=request.remote_addr)
+            response = jsonify({
+                'success': False,
+                'error': str(e),
+                'error_type': 'rate_limited',
+                'retry_after': e.retry_after
+            })
+            if e.retry_after:
+                response.headers['Retry-After'] = str(e.retry_after)
+            return response, 429
+        
+        if isinstance(e, QueueFullError):
+            logger.warning("Fila de processamento cheia", error=str(e))
+            response = jsonify({
+                'success': False,
+                'error': str(e),
+                'error_type': 'queue_full',
+                'retry_after': e.retry_after
+            })
+            if e.retry_after:
+                response.headers['Retry-After'] = str(e.retry_after)
+            return response, 503
         
-        except ValidationError as e:
+        if isinstance(e, ValidationError):
             logger.warning("Erro de validação no upload", error=str(e))
             return jsonify({
                 'success': False,
                 'error': str(e),
                 'error_type': 'validation'
-            }), 400
+            }), e.status_code
         
-        except ProcessingError as e:
+        if isinstance(e, ProcessingError):
             logger.error("Erro de processamento", error=str(e))
             return jsonify({
                 'success': False,
@@ -212,13 +669,118 @@ def register_routes(app):
                 'error_type': 'processing'
             }), 500
         
+        logger.error("Erro inesperado no upload", error=str(e), exc_info=True)
+        return jsonify({
+            'success': False,
+            'error': 'Erro interno do servidor',
+            'error_type': 'internal'
+        }), 500
+    
+    @app.route('/uploads', methods=['POST'])
+    def create_upload_session():
+        """
+        Cria uma sessão de upload em blocos
+        
+        Corpo JSON: ``filename``, ``size`` e, opcionais, ``chunk_size`` e ``sha256``.
+        """
+        data = request.get_json(silent=True) or {}
+        filename = InputValidator.validate_string(str(data.get('filename', '')), max_length=255)
+        try:
+            size = int(data.get('size', 0))
+            chunk_size = int(data['chunk_size']) if data.get('chunk_size') else None
+        except (TypeError, ValueError):
+            raise ValidationError("size e chunk_size devem ser inteiros")
+        
+        app.file_validator.validate_declared(filename, size)
+        
+        # O staging é pré-alocado aqui: a criação consome o custo do tamanho declarado
+        session_cost = charge_upload(size)
+        try:
+            session = app.upload_sessions.create(filename, size, chunk_size=chunk_size,
+                                                 sha256=data.get('sha256'))
         except Exception as e:
-            logger.error("Erro inesperado no upload", error=str(e), exc_info=True)
-            return jsonify({
-                'success': False,
-                'error': 'Erro interno do servidor',
-                'error_type': 'internal'
-            }), 500
+            refund_upload(session_cost, e)
+            raise
+        logger.info("Sessão de upload criada", upload_id=session['upload_id'], size=size)
+        return jsonify(session), 201
+    
+    @app.route('/uploads/<upload_id>', methods=['GET'])
+    def get_upload_session(upload_id):
+        """Offsets recebidos e pendentes (para retomar um upload interrompido)"""
+        return jsonify(app.upload_sessions.get(upload_id))
+    
+    @app.route('/uploads/<upload_id>/chunks/<int:offset>', methods=['PUT'])
+    def put_upload_chunk(upload_id, offset):
+        """Recebe um bloco (corpo bruto) na posição ``offset`` do arquivo"""
+        # Com Content-Encoding o tamanho só é conhecido depois de descomprimir
+        length = request.content_length if request.content_encoding is None else None
+        chunk = app.upload_sessions.write_chunk(upload_id, offset, request.stream, length)
+        return jsonify(chunk)
+    
+    @app.route('/uploads/<upload_id>/complete', methods=['POST'])
+    def complete_upload_session(upload_id):
+        """
+        Finaliza a sessão e inicia o processamento
+        
+        Aceita as mesmas opções do ``/upload`` (``async``, ``stream`` ou
+        ``Accept: application/x-ndjson``) no corpo JSON ou de formulário.
+        Repetir a finalização devolve o job já criado.
+        """
+        options = request.get_json(silent=True) or request.form
+        is_async = str(options.get('async', 'false')).lower() == 'true'
+        stream = (str(options.get('stream', 'false')).lower() == 'true'
+                  or 'application/x-ndjson' in request.headers.get('Accept', ''))
+        
+        session = app.upload_sessions.get(upload_id)
+        if session['job_id']:
+            return finalized_upload(session['job_id'])
+        
+        staged = app.upload_sessions.open_completed(upload_id)
+        file = FileStorage(stream=staged, filename=session['filename'])
+        
+        # Uma única finalização cria o job: as concorrentes perdem a reserva
+        job_id = str(uuid.uuid4())
+        claimed_by = app.upload_sessions.claim(upload_id, job_id)
+        if claimed_by is not None:
+            file.close()
+            return finalized_upload(claimed_by)
+        
+        created = []
+        
+        def on_job_created(job_id):
+            created.append(job_id)
+            app.upload_sessions.mark_finalized(upload_id, job_id)
+        
+        try:
+            try:
+                return dispatch_upload(
+                    file, is_async=is_async, stream=stream, expected_hash=session['sha256'],
+                    on_job_created=on_job_created, prepaid_size=session['size'], job_id=job_id
+                )
+            finally:
+                # No modo NDJSON a thread de processamento ficou com o stream
+                file.close()
+        except Exception as e:
+            if not created:
+                # Sem job (validação, limite, fila cheia): a finalização pode ser repetida
+                app.upload_sessions.unclaim(upload_id, job_id)
+            return upload_error_response(e)
+    
+    def finalized_upload(job_id):
+        """Resposta para a finalização repetida de uma sessão já reservada"""
+        job = app.job_store.get_job(job_id)
+        if job is None:
+            # A outra finalização ainda não registrou o job (ou vai desistir dele)
+            return upload_error_response(ValidationError(
+                "Finalização deste upload em andamento, tente novamente em instantes", status_code=409
+            ))
+        return idempotent_replay(job_id, job['content_hash'])
+    
+    @app.route('/uploads/<upload_id>', methods=['DELETE'])
+    def delete_upload_session(upload_id):
+        """Aborta a sessão e descarta os blocos recebidos"""
+        app.upload_sessions.delete(upload_id)
+        return jsonify({'success': True, 'upload_id': upload_id})
     
     @app.route('/status/<task_id>')
     def get_task_status(task_id):
@@ -228,6 +790,33 @@ def register_routes(app):
                 'error': 'Background tasks não disponíveis'
             }), 404
         
+        # Jobs síncronos (ex.: acompanhados via Idempotency-Key) só existem no
+        # registro; jobs do pipeline Celery passam por várias tasks, e o
+        # registro (atualizado pelo result backend) é a visão do job inteiro
+        job = get_job_state(task_id)
+        if job is not None and job['backend'] in ('sync', 'celery'):
+            ready = job['state'] in ('SUCCESS', 'FAILURE', 'CANCELLED')
+            state = job['state'] if ready or job['state'] == 'PENDING' else 'PROGRESS'
+            response = {
+                'task_id': task_id,
+                'state': state,
+                'ready': ready,
+                'status': 'Concluído' if job['state'] == 'SUCCESS' else (
+                    'Aguardando processamento...' if state == 'PENDING' else 'Processando...'
+                )
+            }
+            if state == 'PROGRESS':
+                response['progress'] = {'stages': job['stages']}
+            if job['state'] == 'SUCCESS':
+                response['result'] = job['result']
+            elif job['state'] == 'FAILURE':
+                response['status'] = 'Erro no processamento'
+                response['error'] = job['error']
+            elif job['state'] == 'CANCELLED':
+                response['status'] = 'Cancelado'
+                response['error'] = job['error']
+            return jsonify(response)
+        
         try:
             from services.celery_tasks import celery
             task = celery.AsyncResult(task_id)
@@ -246,6 +835,8 @@ def register_routes(app):
             elif task.state == 'SUCCESS':
                 response['status'] = 'Concluído'
                 response['result'] = task.result
+            elif task.state == 'REVOKED':
+                response['status'] = 'Cancelado'
             else:  # FAILURE
                 response['status'] = 'Erro no processamento'
                 response['error'] = str(task.info)
@@ -258,6 +849,270 @@ def register_routes(app):
                 'error': 'Erro ao obter status'
             }), 500
     
+    def wants_stream():
+        """Cliente pediu resposta NDJSON (campo stream=true ou Accept)"""
+        return (request.form.get('stream', 'false').lower() == 'true'
+                or 'application/x-ndjson' in request.headers.get('Accept', ''))
+    
+    def stream_sync_processing(job_id, file, metadata):
+        """
+        Processa o arquivo em uma thread e transmite os eventos como NDJSON
+        
+        Cada linha é um objeto com ``event`` ('accepted', 'stage_started',
+        'validated', 'parsed', 'diff_computed', 'batch_written', 'stage_finished',
+        'completed', 'cancelled' ou 'failed'). Sem eventos por ``STREAM_HEARTBEAT_INTERVAL``
+        segundos é enviado um 'heartbeat', para que proxies não encerrem a conexão.
+        """
+        events = queue.Queue()
+        record_stage = app.job_store.stage_recorder(job_id)
+        heartbeat = app.config.get('STREAM_HEARTBEAT_INTERVAL', 10)
+        
+        def progress(event, data):
+            record_stage(event, data)
+            events.put(dict(data, event=event))
+        
+        # O request fecha os arquivos enviados ao terminar; a thread passa a ser
+        # dona do stream original para continuar lendo depois da resposta começar
+        owned_file = FileStorage(stream=file.stream, filename=file.filename,
+                                 name=file.name, headers=file.headers)
+        file.stream = io.BytesIO()
+        
+        def run():
+            try:
+                with profile_run(app.profiler, 'upload', job_id) as profiled:
+                    result = app.file_service.process_file(
+                        owned_file, metadata, progress=progress,
+                        cancel_check=lambda: app.job_store.is_cancel_requested(job_id)
+                    )
+                    profiled.record(result.get('timings'))
+                app.job_store.finish_job(job_id, 'SUCCESS', result=result)
+                logger.info("Arquivo processado com sucesso", filename=owned_file.filename, job_id=job_id)
+                events.put({'event': 'completed', 'job_id': job_id, 'result': result})
+            except JobCancelledError as e:
+                app.job_store.finish_job(job_id, 'CANCELLED', error=str(e))
+                logger.info("Processamento cancelado", job_id=job_id, error=str(e))
+                events.put({'event': 'cancelled', 'job_id': job_id, 'error': str(e)})
+            except Exception as e:
+                app.job_store.finish_job(job_id, 'FAILURE', error=str(e))
+                logger.error("Erro de processamento", error=str(e), job_id=job_id)
+                if isinstance(e, QueueFullError):
+                    events.put({'event': 'failed', 'job_id': job_id, 'error': str(e),
+                                'error_type': 'queue_full', 'retry_after': e.retry_after})
+                    return
+                events.put({
+                    'event': 'failed',
+                    'job_id': job_id,
+                    'error': str(e),
+                    'error_type': 'processing' if isinstance(e, ProcessingError) else 'internal'
+                })
+            finally:
+                owned_file.close()
+                events.put(None)
+        
+        app.job_store.mark_started(job_id)
+        threading.Thread(target=run, name=f"upload-stream-{job_id}", daemon=True).start()
+        
+        def generate():
+            yield json.dumps({'event': 'accepted', 'job_id': job_id}) + '\n'
+            while True:
+                try:
+                    event = events.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield json.dumps({'event': 'heartbeat'}) + '\n'
+                    continue
+                if event is None:
+                    break
+                yield json.dumps(event, ensure_ascii=False, default=str) + '\n'
+        
+        return Response(
+            generate(),
+            mimetype='application/x-ndjson',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    
+    def idempotent_replay(job_id, content_hash):
+        """Resposta para uma chave de idempotência já usada"""
+        job = get_job_state(job_id)
+        
+        if job is None or job['content_hash'] != content_hash:
+            return jsonify({
+                'success': False,
+                'error': 'Idempotency-Key já usada com outro arquivo',
+                'error_type': 'idempotency_conflict'
+            }), 422
+        
+        logger.info("Requisição repetida com Idempotency-Key", job_id=job_id, state=job['state'])
+        
+        if job['state'] == 'SUCCESS':
+            return jsonify({
+                'success': True,
+                'message': 'Arquivo processado com sucesso',
+                'result': job['result'],
+                'job_id': job_id,
+                'async': False,
+                'replayed': True
+            })
+        
+        # Job ainda em andamento: o cliente acompanha o mesmo job
+        return jsonify({
+            'success': True,
+            'message': 'Arquivo já está em processamento',
+            'task_id': job_id,
+            'job_id': job_id,
+            'async': True,
+            'replayed': True
+        }), 202
+    
+    @app.route('/jobs')
+    def list_jobs():
+        """Histórico de jobs com paginação por cursor"""
+        try:
+            limit = int(request.args.get('limit', 50))
+        except ValueError:
+            raise ValidationError("Parâmetro 'limit' deve ser um número inteiro")
+        
+        jobs, next_cursor = app.job_store.list_jobs(
+            limit=limit,
+            cursor=request.args.get('cursor'),
+            state=request.args.get('state'),
+            filename=request.args.get('filename'),
+            content_hash=request.args.get('content_hash')
+        )
+        
+        jobs = [sync_pipeline_job(app.job_store, job) for job in jobs]
+        
+        return jsonify({
+            'jobs': jobs,
+            'count': len(jobs),
+            'next_cursor': next_cursor
+        })
+    
+    @app.route('/jobs/<job_id>')
+    def get_job(job_id):
+        """Detalhes de um job"""
+        job = get_job_state(job_id)
+        if job is None:
+            return jsonify({
+                'success': False,
+                'error': 'Job não encontrado',
+                'error_type': 'not_found'
+            }), 404
+        return jsonify(job)
+    
+    @app.route('/jobs/<job_id>/cancel', methods=['POST'])
+    def cancel_job(job_id):
+        """
+        Cancela um job
+        
+        Jobs na fila são cancelados na hora (e a task revogada); jobs em
+        execução param no próximo ponto de cancelamento, entre blocos ou lotes,
+        deixando a planilha com um número inteiro de lotes gravados.
+        """
+        job = get_job_state(job_id)
+        if job is None:
+            return jsonify({
+                'success': False,
+                'error': 'Job não encontrado',
+                'error_type': 'not_found'
+            }), 404
+        
+        if job['state'] in ('SUCCESS', 'FAILURE', 'CANCELLED'):
+            return jsonify({
+                'success': False,
+                'error': 'Job já finalizado',
+                'error_type': 'already_finished',
+                'state': job['state']
+            }), 409
+        
+        job = app.job_store.request_cancel(job_id)
+        if job['backend'] != 'sync' and app.celery:
+            revoke_task(job_id)
+        
+        logger.info("Cancelamento solicitado", job_id=job_id, state=job['state'])
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'state': job['state'],
+            'cancel_requested': True
+        }), 202
+    
+    @app.route('/jobs/<job_id>/changes')
+    def get_job_changes(job_id):
+        """Detalhe completo das alterações de um job (NDJSON, um registro por linha)"""
+        job = app.job_store.get_job(job_id)
+        details_path = app.file_service.change_log_path(job_id) if job else None
+        if details_path is None or not os.path.exists(details_path):
+            return jsonify({
+                'success': False,
+                'error': 'Alterações não encontradas para este job',
+                'error_type': 'not_found'
+            }), 404
+        
+        # send_file transmite o arquivo em blocos, sem carregá-lo na memória
+        return send_file(
+            os.path.abspath(details_path),
+            mimetype='application/x-ndjson',
+            as_attachment=request.args.get('download', 'false').lower() == 'true',
+            download_name=f"alteracoes_{job_id}.ndjson"
+        )
+    
+    def require_admin():
+        """Rotas /admin: exigem ADMIN_TOKEN configurado e enviado em X-Admin-Token"""
+        token = app.config.get('ADMIN_TOKEN')
+        if not token:
+            abort(404)
+        if not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token):
+            raise ForbiddenError("Token de administrador inválido")
+        if app.profiler is None:
+            raise ValidationError("Profiling desativado (PROFILING_ENABLED)")
+    
+    @app.route('/admin/profiling', methods=['GET', 'POST', 'DELETE'])
+    def admin_profiling():
+        """
+        Arma, consulta ou desarma o profiling sob demanda
+        
+        POST com JSON ``{"target": "upload"|"task", "count": N, "threshold": s,
+        "mode": "cprofile"|"sample"}`` perfila as próximas N execuções do alvo
+        e/ou guarda as que levarem mais que ``threshold`` segundos.
+        """
+        require_admin()
+        if request.method == 'POST':
+            data = request.get_json(silent=True) or {}
+            try:
+                threshold = data.get('threshold')
+                app.profiler.arm(
+                    data.get('target', 'upload'),
+                    count=int(data.get('count', 0)),
+                    threshold=float(threshold) if threshold is not None else None,
+                    mode=data.get('mode')
+                )
+            except (TypeError, ValueError) as e:
+                raise ValidationError(str(e))
+        elif request.method == 'DELETE':
+            app.profiler.disarm(request.args.get('target'))
+        
+        return jsonify({
+            'switches': app.profiler.state(),
+            'captures': app.profiler.captures(),
+            'folder': os.path.abspath(app.profiler.output_dir)
+        })
+    
+    if getattr(app, 'csrf', None):
+        # Autenticado por header, não por cookie de sessão
+        app.csrf.exempt(admin_profiling)
+    
+    @app.route('/livez')
+    def livez():
+        """Liveness: o processo responde (sem I/O nem dependências)"""
+        return jsonify({'status': 'alive'})
+    
+    @app.route('/readyz')
+    def readyz():
+        """Readiness: último veredito das verificações, com a idade de cada uma"""
+        readiness = app.readiness.snapshot()
+        readiness['status'] = 'ready' if readiness['ready'] else 'not_ready'
+        return jsonify(readiness), 200 if readiness['ready'] else 503
+    
     @app.route('/health')
     def health_check():
         """Health check da aplicação"""
@@ -274,40 +1129,26 @@ def register_routes(app):
             try:
                 import psutil
                 health_info['system'] = {
-                    'cpu_percent': psutil.cpu_percent(interval=1),
+                    # Sem intervalo: uso desde a chamada anterior, sem bloquear
+                    'cpu_percent': psutil.cpu_percent(interval=None),
                     'memory_percent': psutil.virtual_memory().percent,
                     'disk_percent': psutil.disk_usage('/').percent if os.name != 'nt' else psutil.disk_usage('C:').percent
                 }
             except ImportError:
                 health_info['system'] = {'status': 'metrics_unavailable'}
             
-            # Verificar serviços
-            services = {}
-            
-            # Verificar Google Sheets
-            try:
-                sheets_ok = app.file_service.sheets_service.test_connection()
-                services['google_sheets'] = 'healthy' if sheets_ok else 'unhealthy'
-            except Exception:
-                services['google_sheets'] = 'error'
-            
-            # Verificar Celery
-            if app.celery:
-                try:
-                    # Tentar inspecionar workers
-                    from services.celery_tasks import celery
-                    inspect = celery.control.inspect()
-                    active_workers = inspect.active()
-                    services['celery'] = 'healthy' if active_workers else 'no_workers'
-                except Exception:
-                    services['celery'] = 'error'
-            else:
+            # Serviços: último veredito das verificações em segundo plano
+            readiness = app.readiness.snapshot()
+            services = {name: check['status'] for name, check in readiness['checks'].items()}
+            if app.task_backend == 'local':
                 services['celery'] = 'disabled'
             
+            health_info['ready'] = readiness['ready']
+            health_info['checks'] = readiness['checks']
             health_info['services'] = services
             
             # Determinar status geral
-            unhealthy_services = [k for k, v in services.items() if v in ['unhealthy', 'error']]
+            unhealthy_services = [k for k, v in services.items() if v in ['unhealthy', 'error', 'stale', 'timeout']]
             if unhealthy_services:
                 health_info['status'] = 'degraded'
                 health_info['issues'] = unhealthy_services
@@ -326,10 +1167,13 @@ def register_routes(app):
     def metrics():
         """Métricas básicas da aplicação"""
         try:
+            # Tamanho registrado no índice de workspaces (sem percorrer a pasta)
+            storage_usage = app.storage.usage()
             metrics_data = {
                 'timestamp': datetime.now().isoformat(),
                 'application': {
-                    'upload_folder_size': get_folder_size(app.config.get('UPLOAD_FOLDER', 'uploads')),
+                    'upload_folder_size': round(storage_usage['used_bytes'] / (1024 * 1024), 2),
+                    'upload_storage': storage_usage,
                     'config_name': app.config.get('ENV', 'unknown')
                 }
             }
@@ -352,8 +1196,18 @@ def register_routes(app):
             except ImportError:
                 metrics_data['system'] = {'status': 'psutil_not_available'}
             
+            # Vagas e fila de processamento (profundidade e espera, para autoscaling)
+            metrics_data['processing'] = app.processing_governor.stats()
+            
+            # Registros descartados pelo limite por evento ou pela fila cheia
+            log_pipeline = get_log_pipeline()
+            if log_pipeline is not None:
+                metrics_data['logging'] = log_pipeline.stats()
+            
             # Métricas do Celery se disponível
-            if app.celery:
+            if app.task_backend == 'local':
+                metrics_data['executor'] = app.celery.stats()
+            elif app.celery:
                 try:
                     from services.celery_tasks import celery
                     inspect = celery.control.inspect()
@@ -415,43 +1269,22 @@ def register_error_handlers(app):
 
 
 def setup_logging(app):
-    """Configura logging da aplicação"""
-    if not app.debug:
-        # Em produção, log para arquivo
-        import logging
-        from logging.handlers import RotatingFileHandler
-        
-        file_handler = RotatingFileHandler(
-            app.config.get('LOG_FILE', 'app.log'),
-            maxBytes=10485760,  # 10MB
-            backupCount=10
-        )
-        file_handler.setFormatter(logging.Formatter(
-            '%(asctime)s %(levelname)s: %(message)s [in %(pathname)s:%(lineno)d]'
-        ))
-        file_handler.setLevel(logging.INFO)
-        app.logger.addHandler(file_handler)
-        
-        app.logger.setLevel(logging.INFO)
-        app.logger.info('Aplicação iniciada')
-
-
-def get_folder_size(folder_path):
-    """Calcula tamanho de uma pasta em MB"""
-    try:
-        if not os.path.exists(folder_path):
-            return 0
-        
-        total_size = 0
-        for dirpath, dirnames, filenames in os.walk(folder_path):
-            for filename in filenames:
-                filepath = os.path.join(dirpath, filename)
-                if os.path.exists(filepath):
-                    total_size += os.path.getsize(filepath)
-        
-        return round(total_size / (1024 * 1024), 2)  # MB
-    except Exception:
-        return 0
+    """
+    Configura logging da aplicação
+    
+    Todos os registros (structlog, Flask e módulos) vão para a fila do
+    pipeline de logging; stdout e, fora do modo debug, o arquivo rotativo são
+    escritos por uma thread de fundo.
+    """
+    install_log_pipeline(
+        level=app.config.get('LOG_LEVEL', 'INFO'),
+        log_file=None if app.debug else app.config.get('LOG_FILE', 'app.log'),
+        formatter=log_formatter(app.config.get('LOG_FORMAT')),
+        queue_size=app.config.get('LOG_QUEUE_SIZE', 10000),
+        rate=app.config.get('LOG_RATE_LIMIT', 50),
+        window=app.config.get('LOG_RATE_WINDOW', 10)
+    )
+    app.logger.info('Aplicação iniciada')
 
 
 # Criar aplicação
@@ -0,0 +1,202 @@
+"""
+Micro-benchmarks do diff entre a base e o dashboard
+
+Gera pares base/dashboard sintéticos (de 1 mil a 1 milhão de linhas) variando
+a proporção de registros alterados, de chaves duplicadas na base e de
+imobiliárias novas, e mede separadamente as etapas de
+``iniciar_processo.py``: normalização, casamento, diff e montagem do payload.
+
+Uso:
+    python -m benchmarks.bench_diff --rows 1000,10000,100000,1000000 \\
+        --change-ratios 0.01,0.1 --duplicate-ratios 0,0.01 --new-ratios 0.05
+
+    # Comparar com uma execução anterior (sai com código 1 se houver regressão)
+    python -m benchmarks.bench_diff --compare benchmarks/results/bench_diff_baseline.json
+"""
+import os
+import sys
+import random
+import argparse
+import statistics
+from itertools import product
+from typing import Dict, Any, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from benchmarks.common import (
+    BASE_COLUMNS, ESTADOS, CIDADES, STATUS, Timer, run_metadata,
+    write_results, load_results, compare_results, print_comparisons
+)
+from utils.change_log import ChangeLog
+from iniciar_processo import (
+    normalizar_base, casar_registros, calcular_diferencas, montar_payload, contrato_para_status
+)
+
+
+DASHBOARD_HEADER = ['Imobiliária', 'Quantidade de Corretores', 'Estado', 'Cidade',
+                    'Ativa em sistema', 'Contrato assinado']
+
+STAGES = ['normalize', 'match', 'diff', 'payload']
+
+# Mediana de cada etapa e do total; menor é melhor
+COMPARED_METRICS = {f'stages.{stage}.median': 'lower' for stage in STAGES + ['total']}
+
+
+def generate_pair(rows: int, change_ratio: float, duplicate_ratio: float,
+                  new_ratio: float, seed: int = 42) -> Tuple[pd.DataFrame, List[List[str]]]:
+    """
+    Gera um par (base, valores do dashboard) com ``rows`` linhas no dashboard
+
+    - ``change_ratio``: fração das linhas com algum valor diferente na base
+    - ``duplicate_ratio``: fração das linhas repetidas na base com outros valores
+    - ``new_ratio``: fração de linhas extras na base que ainda não estão no dashboard
+
+    A base chega como sairia de ``read_csv(...).fillna('')``; parte dos nomes
+    tem caixa e espaços diferentes para exercitar a normalização.
+    """
+    rng = random.Random(seed)
+    dashboard = [DASHBOARD_HEADER]
+    base = []
+
+    for i in range(rows):
+        cidade = rng.choice(CIDADES)
+        nome = f"IMOBILIARIA {i:08d} ({cidade})"
+        corretores = rng.randint(0, 250)
+        estado = rng.choice(ESTADOS)
+        status = rng.choice(STATUS)
+        dashboard.append([nome, str(corretores), estado, cidade, status,
+                          contrato_para_status(status)])
+
+        if rng.random() < change_ratio:
+            corretores += 1
+            status = rng.choice(STATUS)
+        nome_base = f" {nome.lower()} " if rng.random() < 0.1 else nome
+        base.append([nome_base, corretores, estado, cidade, status])
+
+        if rng.random() < duplicate_ratio:
+            base.append([nome, rng.randint(0, 250), estado, cidade, rng.choice(STATUS)])
+
+    for i in range(int(rows * new_ratio)):
+        cidade = rng.choice(CIDADES)
+        base.append([f"NOVA IMOBILIARIA {i:08d} ({cidade})", rng.randint(0, 250),
+                     rng.choice(ESTADOS), cidade, rng.choice(STATUS)])
+
+    rng.shuffle(base)
+    return pd.DataFrame(base, columns=BASE_COLUMNS), dashboard
+
+
+def run_once(df_raw: pd.DataFrame, dashboard: List[List[str]]) -> Tuple[Dict[str, float], Dict[str, int]]:
+    """Executa as quatro etapas uma vez; devolve tempos e contagens"""
+    timings = {}
+    cabecalhos, linhas_de_dados = dashboard[0], dashboard[1:]
+    indices_dashboard = {nome: cabecalhos.index(nome) for nome in cabecalhos}
+
+    with Timer() as t:
+        df_base = normalizar_base(df_raw)
+    timings['normalize'] = t.elapsed
+
+    with Timer() as t:
+        pares = casar_registros(df_base, linhas_de_dados, indices_dashboard)
+    timings['match'] = t.elapsed
+
+    with Timer() as t:
+        alteracoes, novas_linhas = calcular_diferencas(
+            pares, df_base, linhas_de_dados, cabecalhos, indices_dashboard, ChangeLog()
+        )
+    timings['diff'] = t.elapsed
+
+    with Timer() as t:
+        payload = montar_payload(alteracoes)
+    timings['payload'] = t.elapsed
+
+    timings['total'] = sum(timings.values())
+    counts = {'matched': len(pares), 'cells': len(payload), 'new_rows': len(novas_linhas)}
+    return timings, counts
+
+
+def run_scenario(rows: int, change_ratio: float, duplicate_ratio: float,
+                 new_ratio: float, repeat: int, seed: int) -> Dict[str, Any]:
+    df_raw, dashboard = generate_pair(rows, change_ratio, duplicate_ratio, new_ratio, seed)
+
+    samples: Dict[str, List[float]] = {stage: [] for stage in STAGES + ['total']}
+    counts = {}
+    for _ in range(repeat):
+        timings, counts = run_once(df_raw, dashboard)
+        for stage, elapsed in timings.items():
+            samples[stage].append(elapsed)
+
+    return {
+        'name': f"rows={rows}-change={change_ratio}-dup={duplicate_ratio}-new={new_ratio}",
+        'rows': rows,
+        'base_rows': len(df_raw),
+        'change_ratio': change_ratio,
+        'duplicate_ratio': duplicate_ratio,
+        'new_ratio': new_ratio,
+        'repeat': repeat,
+        'counts': counts,
+        'stages': {
+            stage: {
+                'median': round(statistics.median(values), 6),
+                'min': round(min(values), 6),
+                'max': round(max(values), 6),
+            }
+            for stage, values in samples.items()
+        },
+    }
+
+
+def _floats(value: str) -> List[float]:
+    return [float(item) for item in value.split(',')]
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Micro-benchmarks do diff base/dashboard')
+    parser.add_argument('--rows', default='1000,10000,100000,1000000',
+                        help='Linhas do dashboard por cenário')
+    parser.add_argument('--change-ratios', default='0.1', help='Frações de linhas alteradas')
+    parser.add_argument('--duplicate-ratios', default='0.01', help='Frações de chaves duplicadas')
+    parser.add_argument('--new-ratios', default='0.05', help='Frações de imobiliárias novas')
+    parser.add_argument('--repeat', type=int, default=3, help='Repetições por cenário')
+    parser.add_argument('--seed', type=int, default=42, help='Semente dos dados gerados')
+    parser.add_argument('--output', default='benchmarks/results/bench_diff.json',
+                        help='Arquivo JSON de saída')
+    parser.add_argument('--compare', help='Resultado anterior para comparação')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Variação tolerada na comparação (0.2 = 20%%)')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    grid = product(
+        [int(rows) for rows in args.rows.split(',')],
+        _floats(args.change_ratios), _floats(args.duplicate_ratios), _floats(args.new_ratios)
+    )
+
+    scenarios = []
+    for rows, change_ratio, duplicate_ratio, new_ratio in grid:
+        result = run_scenario(rows, change_ratio, duplicate_ratio, new_ratio, args.repeat, args.seed)
+        scenarios.append(result)
+        stages = result['stages']
+        print(f"{result['name']}: " + ' '.join(
+            f"{stage}={stages[stage]['median']:.4f}s" for stage in STAGES + ['total']
+        ) + f" células={result['counts']['cells']} novas={result['counts']['new_rows']}")
+
+    results = {'meta': run_metadata(vars(args)), 'scenarios': scenarios}
+    write_results(args.output, results)
+    print(f"\nResultados gravados em {args.output}")
+
+    if args.compare:
+        print(f"\nComparação com {args.compare}:")
+        baseline = load_results(args.compare)
+        comparisons = compare_results(scenarios, baseline['scenarios'], COMPARED_METRICS, args.threshold)
+        if print_comparisons(comparisons):
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
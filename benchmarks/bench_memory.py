@@ -0,0 +1,94 @@
+"""
+Benchmark de memória da leitura da base
+
+Compara a leitura antiga (blocos ``object`` concatenados e ``fillna``) com a
+de ``iniciar_processo.ler_base`` (cada bloco compactado com
+utils/dataframes.py) em CSVs sintéticos de tamanhos crescentes. Mede o pico de
+alocações durante a leitura (tracemalloc, inclui os buffers do numpy), a
+memória final do DataFrame e o tempo (numa execução separada, sem tracemalloc).
+
+Uso:
+    python -m benchmarks.bench_memory --sizes 10MB,50MB,200MB
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from benchmarks.common import (
+    BASE_COLUMNS, format_size, generate_base_csv, parse_size, run_metadata, write_results
+)
+from iniciar_processo import LINHAS_POR_BLOCO, ler_base
+from utils.dataframes import memory_bytes
+
+
+def read_object(path: str) -> pd.DataFrame:
+    """Leitura anterior: todas as colunas de texto como objetos Python"""
+    with pd.read_csv(path, usecols=BASE_COLUMNS, sep=';', encoding='utf-8-sig',
+                     chunksize=LINHAS_POR_BLOCO) as reader:
+        return pd.concat(list(reader), ignore_index=True).fillna('')
+
+
+READERS: Dict[str, Callable[[str], pd.DataFrame]] = {
+    'object': read_object,
+    'lean': ler_base,
+}
+
+
+def measure(reader: Callable[[str], pd.DataFrame], path: str) -> Dict[str, Any]:
+    start = time.perf_counter()
+    reader(path)
+    seconds = time.perf_counter() - start
+
+    tracemalloc.start()
+    df = reader(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'seconds': round(seconds, 3),
+        'peak_mb': round(peak / (1024 * 1024), 1),
+        'result_mb': round(memory_bytes(df) / (1024 * 1024), 1),
+        'dtypes': {str(name): str(dtype) for name, dtype in df.dtypes.items()},
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Memória da leitura da base')
+    parser.add_argument('--sizes', default='10MB,50MB', help='Tamanhos dos CSVs gerados')
+    parser.add_argument('--seed', type=int, default=42, help='Semente dos dados gerados')
+    parser.add_argument('--output', default='benchmarks/results/bench_memory.json',
+                        help='Arquivo JSON de saída')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    scenarios = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for size in [parse_size(value) for value in args.sizes.split(',')]:
+            path = os.path.join(temp_dir, f"base_{format_size(size)}.csv")
+            rows = generate_base_csv(path, size, seed=args.seed)
+            readers = {name: measure(reader, path) for name, reader in READERS.items()}
+            scenarios.append({'name': format_size(size), 'rows': rows, 'readers': readers})
+
+            old, new = readers['object'], readers['lean']
+            print(f"{format_size(size)} ({rows} linhas): "
+                  f"pico {old['peak_mb']} -> {new['peak_mb']} MB, "
+                  f"DataFrame {old['result_mb']} -> {new['result_mb']} MB "
+                  f"({old['result_mb'] / max(new['result_mb'], 0.1):.1f}x), "
+                  f"tempo {old['seconds']} -> {new['seconds']} s")
+
+    write_results(args.output, {'meta': run_metadata(vars(args)), 'scenarios': scenarios})
+    print(f"\nResultados gravados em {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Benchmark da conversão de DataFrames nos valores enviados ao Sheets
+
+Compara, em DataFrames sintéticos no formato da base (mais uma coluna de data
+e uma de float com vazios), as conversões anteriores com as de
+utils/sheets_values.py:
+
+- linhas: ``df.values.tolist()`` (write_dataframe) contra ``sheets_rows``;
+- texto: ``str()`` em cada célula (diff do dashboard) contra ``sheets_text``.
+
+Para cada uma mede o tempo (melhor de ``--repeat``, sem tracemalloc), o pico de
+alocações e o número de blocos de memória que continuam alocados no resultado
+(tracemalloc). Nas linhas também conta os valores que não vão para o JSON da
+API (NaN, escalares do numpy, Timestamps).
+
+Uso:
+    python -m benchmarks.bench_serializer --rows 10000,100000,1000000
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.common import BASE_COLUMNS, base_row, run_metadata, write_results
+from utils.dataframes import shrink_dataframe
+from utils.sheets_values import sheets_rows, sheets_text
+
+
+def make_frame(rows: int, seed: int) -> pd.DataFrame:
+    """Base sintética com Corretores em float (vazios) e uma coluna de data"""
+    rng = random.Random(seed)
+    df = pd.DataFrame([base_row(i, rng) for i in range(rows)], columns=BASE_COLUMNS)
+    values = df['Corretores'].astype('float64')
+    values[::17] = np.nan
+    df['Corretores'] = values
+    df['Cadastro'] = pd.Timestamp('2025-01-01') + pd.to_timedelta(np.arange(rows) % 900, unit='D')
+    return shrink_dataframe(df)
+
+
+def rows_legacy(df: pd.DataFrame) -> List[List[Any]]:
+    return df.values.tolist()
+
+
+def text_legacy(df: pd.DataFrame) -> Dict[str, List[str]]:
+    return {name: [str(value) for value in df[name]] for name in df.columns}
+
+
+def text_vectorized(df: pd.DataFrame) -> Dict[str, pd.Series]:
+    return {name: sheets_text(df[name]) for name in df.columns}
+
+
+CONVERTERS: Dict[str, Dict[str, Callable[[pd.DataFrame], Any]]] = {
+    'rows': {'legacy': rows_legacy, 'vectorized': sheets_rows},
+    'text': {'legacy': text_legacy, 'vectorized': text_vectorized},
+}
+
+
+def unsafe_values(rows: List[List[Any]]) -> int:
+    """Valores que a API não recebe como estão: fora de str/int/float/bool ou NaN"""
+    count = 0
+    for row in rows:
+        for value in row:
+            if type(value) not in (str, int, float, bool) or value != value:
+                count += 1
+    return count
+
+
+def measure(converter: Callable[[pd.DataFrame], Any], df: pd.DataFrame, repeat: int) -> Dict[str, Any]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        converter(df)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = converter(df)
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    retained = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+    del result
+    return {
+        'seconds': round(min(timings), 4),
+        'peak_mb': round(peak / (1024 * 1024), 1),
+        'allocations': retained,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Conversão de DataFrames para o Sheets')
+    parser.add_argument('--rows', default='10000,100000', help='Linhas dos DataFrames gerados')
+    parser.add_argument('--repeat', type=int, default=3, help='Execuções cronometradas por conversão')
+    parser.add_argument('--seed', type=int, default=42, help='Semente dos dados gerados')
+    parser.add_argument('--output', default='benchmarks/results/bench_serializer.json',
+                        help='Arquivo JSON de saída')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    scenarios = []
+    for rows in [int(value) for value in args.rows.split(',')]:
+        df = make_frame(rows, args.seed)
+        results = {
+            kind: {name: measure(converter, df, args.repeat) for name, converter in converters.items()}
+            for kind, converters in CONVERTERS.items()
+        }
+        results['rows']['legacy']['unsafe_values'] = unsafe_values(rows_legacy(df))
+        results['rows']['vectorized']['unsafe_values'] = unsafe_values(sheets_rows(df))
+        json.dumps(sheets_rows(df), allow_nan=False)
+        scenarios.append({'name': str(rows), 'rows': rows, 'results': results})
+
+        for kind, result in results.items():
+            old, new = result['legacy'], result['vectorized']
+            print(f"{rows} linhas, {kind}: tempo {old['seconds']} -> {new['seconds']} s "
+                  f"({old['seconds'] / max(new['seconds'], 1e-4):.1f}x), "
+                  f"pico {old['peak_mb']} -> {new['peak_mb']} MB, "
+                  f"alocações {old['allocations']} -> {new['allocations']}"
+                  + (f", valores fora do JSON {old['unsafe_values']} -> {new['unsafe_values']}"
+                     if kind == 'rows' else ''))
+
+    write_results(args.output, {'meta': run_metadata(vars(args)), 'scenarios': scenarios})
+    print(f"\nResultados gravados em {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+Utilitários compartilhados pelos benchmarks
+
+Geração de dados sintéticos no formato da base de imobiliárias, estatísticas
+de latência e gravação/comparação de resultados em JSON.
+"""
+import os
+import sys
+import json
+import time
+import random
+import platform
+import subprocess
+from datetime import datetime
+from typing import Dict, Any, List, Iterable, Optional
+
+
+# Colunas lidas da base por iniciar_processo.py
+BASE_COLUMNS = ['Nome fantasia', 'Corretores', 'Estado', 'Cidade', 'Ativa no painel']
+
+ESTADOS = ['PE', 'PB', 'AL', 'BA', 'CE', 'RN', 'SE']
+CIDADES = ['CARUARU', 'RECIFE', 'OLINDA', 'GARANHUNS', 'PETROLINA', 'JOÃO PESSOA', 'MACEIÓ']
+STATUS = ['ATIVO', 'INATIVO', 'PENDENTE']
+
+MAX_SPREADSHEET_ROWS = 1048575
+
+
+def parse_size(value: str) -> int:
+    """Converte tamanhos como '10KB', '5MB' ou '200MB' em bytes"""
+    value = value.strip().upper()
+    for suffix, factor in (('GB', 1024 ** 3), ('MB', 1024 ** 2), ('KB', 1024), ('B', 1)):
+        if value.endswith(suffix):
+            return int(float(value[:-len(suffix)]) * factor)
+    return int(value)
+
+
+def format_size(size: int) -> str:
+    """Formata bytes como '10KB', '5MB'..."""
+    for suffix, factor in (('GB', 1024 ** 3), ('MB', 1024 ** 2), ('KB', 1024)):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{suffix}"
+    return f"{size}B"
+
+
+def base_row(i: int, rng: random.Random) -> List[Any]:
+    """Gera uma linha da base de imobiliárias"""
+    cidade = rng.choice(CIDADES)
+    return [
+        f"IMOBILIARIA {i:08d} ({cidade})",
+        rng.randint(0, 250),
+        rng.choice(ESTADOS),
+        cidade,
+        rng.choice(STATUS),
+    ]
+
+
+def generate_base_csv(path: str, target_bytes: int, seed: int = 42, sep: str = ';') -> int:
+    """
+    Gera um CSV da base com aproximadamente ``target_bytes``
+
+    Returns:
+        Número de linhas de dados gravadas
+    """
+    rng = random.Random(seed)
+    header = sep.join(BASE_COLUMNS) + '\n'
+    written = len(header.encode('utf-8'))
+    rows = 0
+
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        f.write(header)
+        buffer = []
+        while written < target_bytes:
+            line = sep.join(str(value) for value in base_row(rows, rng)) + '\n'
+            line_size = len(line.encode('utf-8'))
+            if written + line_size > target_bytes and rows > 0:
+                break
+            buffer.append(line)
+            written += line_size
+            rows += 1
+            if len(buffer) >= 10000:
+                f.write(''.join(buffer))
+                buffer.clear()
+        f.write(''.join(buffer))
+
+    return rows
+
+
+def generate_base_file(path: str, target_bytes: int, seed: int = 42) -> int:
+    """
+    Gera a base no formato indicado pela extensão (.csv, .xlsx ou .ods)
+
+    Planilhas binárias são comprimidas, então o número de linhas é estimado a
+    partir do CSV equivalente e o tamanho final é apenas aproximado.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return generate_base_csv(path, target_bytes, seed)
+
+    import pandas as pd
+
+    # ~40 bytes por linha em CSV; planilhas zipadas ocupam cerca de 1/3 disso.
+    # Limitado ao máximo de linhas de uma planilha do Excel.
+    estimated_rows = max(1, min(int(target_bytes / 40 * 3), MAX_SPREADSHEET_ROWS))
+    rng = random.Random(seed)
+    df = pd.DataFrame([base_row(i, rng) for i in range(estimated_rows)], columns=BASE_COLUMNS)
+
+    engine = 'odf' if extension == '.ods' else 'openpyxl'
+    df.to_excel(path, index=False, engine=engine)
+    return len(df)
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Percentil com interpolação linear (None para lista vazia)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lower = int(k)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (k - lower)
+
+
+def latency_summary(values: List[float]) -> Dict[str, Optional[float]]:
+    """p50/p95/p99, média e máximo em segundos"""
+    def rounded(value):
+        return round(value, 4) if value is not None else None
+
+    return {
+        'p50': rounded(percentile(values, 50)),
+        'p95': rounded(percentile(values, 95)),
+        'p99': rounded(percentile(values, 99)),
+        'mean': rounded(sum(values) / len(values)) if values else None,
+        'max': rounded(max(values)) if values else None,
+    }
+
+
+def run_metadata(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Metadados do ambiente para comparar execuções"""
+    try:
+        revision = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except Exception:
+        revision = None
+
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'git_revision': revision,
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'params': params,
+    }
+
+
+def write_results(path: str, results: Dict[str, Any]) -> None:
+    """Grava os resultados em JSON"""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+def compare_results(current: Iterable[Dict[str, Any]], baseline: Iterable[Dict[str, Any]],
+                    metrics: Dict[str, str], threshold: float) -> List[Dict[str, Any]]:
+    """
+    Compara cenários com o mesmo ``name`` entre duas execuções
+
+    Args:
+        current: Cenários da execução atual
+        baseline: Cenários da execução de referência
+        metrics: Caminho da métrica (ex.: 'latency.p95') -> 'lower' ou 'higher'
+            indicando qual direção é melhor
+        threshold: Variação relativa tolerada (0.2 = 20%)
+
+    Returns:
+        Uma entrada por métrica comparada, com ``regression`` indicando piora
+    """
+    baseline_by_name = {scenario['name']: scenario for scenario in baseline}
+    comparisons = []
+
+    for scenario in current:
+        reference = baseline_by_name.get(scenario['name'])
+        if reference is None:
+            continue
+
+        for metric, better in metrics.items():
+            new_value = _lookup(scenario, metric)
+            old_value = _lookup(reference, metric)
+            if not new_value or not old_value:
+                continue
+
+            change = (new_value - old_value) / old_value
+            worse = change > threshold if better == 'lower' else change < -threshold
+            comparisons.append({
+                'scenario': scenario['name'],
+                'metric': metric,
+                'baseline': old_value,
+                'current': new_value,
+                'change_pct': round(change * 100, 1),
+                'regression': worse,
+            })
+
+    return comparisons
+
+
+def _lookup(data: Dict[str, Any], path: str) -> Optional[float]:
+    for key in path.split('.'):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def print_comparisons(comparisons: List[Dict[str, Any]]) -> bool:
+    """Imprime a comparação; devolve True se houve regressão"""
+    regressions = [c for c in comparisons if c['regression']]
+    for c in comparisons:
+        flag = 'REGRESSÃO' if c['regression'] else 'ok'
+        print(f"  {c['scenario']:<40} {c['metric']:<22} "
+              f"{c['baseline']:>12.4f} -> {c['current']:>12.4f} ({c['change_pct']:+.1f}%) {flag}")
+    print(f"\n{len(regressions)} regressão(ões) em {len(comparisons)} métricas comparadas")
+    return bool(regressions)
+
+
+class Timer:
+    """Cronômetro simples para uso com ``with``"""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+        return False
@@ -0,0 +1,361 @@
+"""
+Teste de carga ponta a ponta do pipeline de upload
+
+Sobe a aplicação (``create_app('testing')``) em um servidor HTTP local, com o
+Google Sheets substituído pelo backend falso (services/fake_sheets.py) com
+latência configurável, e envia
+planilhas geradas (.csv/.xlsx/.ods) pelos caminhos síncrono e assíncrono.
+Para cada cenário registra vazão, latência p50/p95/p99 e pico de RSS.
+
+Uso:
+    python -m benchmarks.load_test --sizes 10KB,1MB,10MB --formats csv,xlsx \\
+        --modes sync,async --requests 20 --concurrency 4 --sheets-latency 0.2
+
+    # Comparar com uma execução anterior (sai com código 1 se houver regressão)
+    python -m benchmarks.load_test --compare benchmarks/results/baseline.json
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import tempfile
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import (
+    parse_size, format_size, generate_base_file, latency_summary, run_metadata,
+    write_results, load_results, compare_results, print_comparisons
+)
+
+
+# Métricas comparadas entre execuções e a direção considerada melhor
+COMPARED_METRICS = {
+    'throughput_per_min': 'higher',
+    'latency.p50': 'lower',
+    'latency.p95': 'lower',
+    'latency.p99': 'lower',
+    'peak_rss_mb': 'lower',
+}
+
+FORMAT_ENGINES = {'csv': None, 'xlsx': 'openpyxl', 'ods': 'odf'}
+
+
+class RSSSampler:
+    """Amostra o RSS do processo em background e guarda o pico"""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+        try:
+            import psutil
+            self._process = psutil.Process()
+        except ImportError:
+            self._process = None
+
+    def _rss(self) -> int:
+        if self._process is not None:
+            return self._process.memory_info().rss
+        import resource
+        # ru_maxrss é o pico desde o início do processo (KB no Linux)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._rss())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = self._rss()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, self._rss())
+        return False
+
+
+class LoadTestServer:
+    """Aplicação real servida por um servidor HTTP werkzeug em thread"""
+
+    def __init__(self, sheets_options: Dict[str, Any]):
+        self.workdir = tempfile.mkdtemp(prefix='load_test_')
+        self.sheets_options = sheets_options
+
+    def __enter__(self):
+        import logging
+        from werkzeug.serving import make_server
+
+        # Sem log de acesso por requisição (polui a saída e custa tempo)
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+        # O caminho assíncrono precisa do executor local (sem Redis); as tasks
+        # criam o próprio serviço a partir de Config, daí as variáveis de ambiente
+        os.environ['TASK_BACKEND'] = 'local'
+        os.environ['SHEETS_BACKEND'] = 'fake'
+        os.environ.setdefault('FLASK_ENV', 'testing')
+
+        # Todas as pastas no diretório temporário antes de importar a aplicação:
+        # create_app('testing') lê TestingConfig e as tasks montam o serviço a
+        # partir de Config (celery_tasks._build_service)
+        from config.config import Config, TestingConfig
+        for name, folder in (('UPLOAD_FOLDER', 'uploads'), ('UPLOAD_SESSION_FOLDER', 'upload_sessions'),
+                             ('PIPELINE_FOLDER', 'pipeline'), ('CHANGE_LOG_FOLDER', 'change_logs')):
+            path = os.path.join(self.workdir, folder)
+            os.makedirs(path, exist_ok=True)
+            os.environ[name] = path
+            for config_class in (Config, TestingConfig):
+                setattr(config_class, name, path)
+
+        from app import create_app
+        from services.fake_sheets import configure_shared_backend
+        self.app = create_app('testing')
+        # Sem guardar os valores: o pico de RSS deve refletir só a aplicação
+        self.sheets = configure_shared_backend(store_values=False, **self.sheets_options)
+
+        self.server = make_server('127.0.0.1', 0, self.app, threaded=True)
+        self.port = self.server.server_port
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        import shutil
+        shutil.rmtree(self.workdir, ignore_errors=True)
+        return False
+
+
+def post_file(port: int, filepath: str, fields: Dict[str, str],
+              timeout: float) -> Tuple[int, Dict[str, Any]]:
+    """Envia o arquivo em multipart/form-data, em streaming a partir do disco"""
+    boundary = uuid.uuid4().hex
+    filename = os.path.basename(filepath)
+
+    head = ''.join(
+        f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'
+        for name, value in fields.items()
+    )
+    head += (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; '
+             f'filename="{filename}"\r\nContent-Type: application/octet-stream\r\n\r\n')
+    head = head.encode('utf-8')
+    tail = f'\r\n--{boundary}--\r\n'.encode('utf-8')
+
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        conn.putrequest('POST', '/upload')
+        conn.putheader('Content-Type', f'multipart/form-data; boundary={boundary}')
+        conn.putheader('Content-Length', str(len(head) + os.path.getsize(filepath) + len(tail)))
+        conn.endheaders()
+        conn.send(head)
+        with open(filepath, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                conn.send(chunk)
+        conn.send(tail)
+
+        response = conn.getresponse()
+        return response.status, _json_body(response.read())
+    finally:
+        conn.close()
+
+
+def get_json(port: int, path: str, timeout: float) -> Tuple[int, Dict[str, Any]]:
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        conn.request('GET', path)
+        response = conn.getresponse()
+        return response.status, _json_body(response.read())
+    finally:
+        conn.close()
+
+
+def _json_body(raw: bytes) -> Dict[str, Any]:
+    try:
+        return json.loads(raw)
+    except ValueError:
+        return {}
+
+
+def run_upload(port: int, filepath: str, mode: str, timeout: float,
+               poll_interval: float) -> Tuple[bool, float, str]:
+    """
+    Executa um upload completo
+
+    Returns:
+        (sucesso, latência em segundos, descrição do erro)
+    """
+    start = time.perf_counter()
+    fields = {'async': 'true'} if mode == 'async' else {}
+
+    try:
+        status, body = post_file(port, filepath, fields, timeout)
+        if status != 200 or not body.get('success'):
+            return False, time.perf_counter() - start, f"HTTP {status}: {body.get('error_type', '')}"
+
+        if mode == 'async':
+            task_id = body['task_id']
+            deadline = start + timeout
+            while time.perf_counter() < deadline:
+                _, task = get_json(port, f'/status/{task_id}', timeout)
+                if task.get('ready'):
+                    ok = task.get('state') == 'SUCCESS'
+                    return ok, time.perf_counter() - start, '' if ok else task.get('state', '')
+                time.sleep(poll_interval)
+            return False, time.perf_counter() - start, 'timeout'
+
+        return True, time.perf_counter() - start, ''
+
+    except Exception as e:
+        return False, time.perf_counter() - start, type(e).__name__
+
+
+def run_scenario(port: int, filepath: str, mode: str, requests: int, concurrency: int,
+                 timeout: float, poll_interval: float) -> Dict[str, Any]:
+    """Executa ``requests`` uploads com ``concurrency`` clientes simultâneos"""
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+
+    with RSSSampler() as rss:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            futures = [
+                pool.submit(run_upload, port, filepath, mode, timeout, poll_interval)
+                for _ in range(requests)
+            ]
+            for future in futures:
+                ok, latency, error = future.result()
+                if ok:
+                    latencies.append(latency)
+                else:
+                    errors[error] = errors.get(error, 0) + 1
+        elapsed = time.perf_counter() - start
+
+    return {
+        'requests': requests,
+        'concurrency': concurrency,
+        'ok': len(latencies),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_per_min': round(len(latencies) / elapsed * 60, 2) if elapsed else None,
+        'latency': latency_summary(latencies),
+        'peak_rss_mb': round(rss.peak / (1024 * 1024), 1),
+    }
+
+
+def engine_available(fmt: str) -> bool:
+    engine = FORMAT_ENGINES[fmt]
+    if engine is None:
+        return True
+    try:
+        __import__(engine)
+        return True
+    except ImportError:
+        return False
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Teste de carga do pipeline de upload')
+    parser.add_argument('--sizes', default='10KB,1MB,10MB',
+                        help='Tamanhos dos arquivos gerados (ex.: 10KB,1MB,50MB,200MB)')
+    parser.add_argument('--formats', default='csv,xlsx,ods', help='Formatos: csv, xlsx, ods')
+    parser.add_argument('--modes', default='sync,async', help='Caminhos: sync, async')
+    parser.add_argument('--requests', type=int, default=10, help='Uploads por cenário')
+    parser.add_argument('--concurrency', type=int, default=2, help='Clientes simultâneos')
+    parser.add_argument('--sheets-latency', type=float, default=0.1,
+                        help='Latência simulada por chamada ao Sheets (s)')
+    parser.add_argument('--sheets-cell-latency', type=float, default=0.0,
+                        help='Latência adicional por célula gravada (s)')
+    parser.add_argument('--sheets-quota', type=int, default=None,
+                        help='Cota de chamadas por minuto ao Sheets (429 acima dela)')
+    parser.add_argument('--sheets-error-rate', type=float, default=0.0,
+                        help='Probabilidade de 429 injetado por chamada')
+    parser.add_argument('--sheets-max-cells', type=int, default=10_000_000,
+                        help='Limite de células por planilha (10 milhões no Sheets)')
+    parser.add_argument('--timeout', type=float, default=600.0, help='Timeout por upload (s)')
+    parser.add_argument('--poll-interval', type=float, default=0.1,
+                        help='Intervalo de consulta de /status no modo assíncrono (s)')
+    parser.add_argument('--output', default='benchmarks/results/load_test.json',
+                        help='Arquivo JSON de saída')
+    parser.add_argument('--compare', help='Resultado anterior para comparação')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='Variação tolerada na comparação (0.2 = 20%%)')
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    sizes = [parse_size(size) for size in args.sizes.split(',')]
+    formats = [fmt.strip() for fmt in args.formats.split(',')]
+    modes = [mode.strip() for mode in args.modes.split(',')]
+
+    scenarios = []
+    files_dir = tempfile.mkdtemp(prefix='load_test_files_')
+
+    sheets_options = {
+        'latency': args.sheets_latency,
+        'latency_per_cell': args.sheets_cell_latency,
+        'requests_per_minute': args.sheets_quota,
+        'quota_error_rate': args.sheets_error_rate,
+        'max_cells': args.sheets_max_cells,
+    }
+
+    with LoadTestServer(sheets_options) as server:
+        for fmt in formats:
+            if not engine_available(fmt):
+                print(f"[pulado] formato {fmt}: engine {FORMAT_ENGINES[fmt]} não instalada")
+                continue
+
+            for size in sizes:
+                filepath = os.path.join(files_dir, f"base_{format_size(size)}.{fmt}")
+                rows = generate_base_file(filepath, size)
+                actual_size = os.path.getsize(filepath)
+
+                for mode in modes:
+                    name = f"{mode}-{fmt}-{format_size(size)}"
+                    print(f"Executando {name} ({rows} linhas, {actual_size} bytes)...")
+                    result = run_scenario(
+                        server.port, filepath, mode, args.requests, args.concurrency,
+                        args.timeout, args.poll_interval
+                    )
+                    result.update({
+                        'name': name, 'mode': mode, 'format': fmt,
+                        'target_size': size, 'file_size': actual_size, 'rows': rows,
+                    })
+                    scenarios.append(result)
+                    print(f"  ok={result['ok']}/{result['requests']} "
+                          f"vazão={result['throughput_per_min']}/min "
+                          f"p50={result['latency']['p50']}s p95={result['latency']['p95']}s "
+                          f"p99={result['latency']['p99']}s rss={result['peak_rss_mb']}MB")
+
+                os.remove(filepath)
+
+        sheets_stats = server.sheets.stats()
+
+    os.rmdir(files_dir)
+
+    results = {'meta': run_metadata(vars(args)), 'sheets': sheets_stats, 'scenarios': scenarios}
+    write_results(args.output, results)
+    print(f"\nResultados gravados em {args.output}")
+
+    if args.compare:
+        print(f"\nComparação com {args.compare}:")
+        baseline = load_results(args.compare)
+        comparisons = compare_results(scenarios, baseline['scenarios'], COMPARED_METRICS, args.threshold)
+        if print_comparisons(comparisons):
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
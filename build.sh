@@ -29,6 +29,10 @@ for file in static/*; do
     fi
 done
 
+# Estáticos com hash no nome e versões pré-comprimidas (static/dist)
+echo "🗜️ Gerando arquivos estáticos versionados..."
+python -m utils.assets
+
 # Verificar instalações críticas
 echo "✅ Verificando instalações..."
 python -c "import flask; print(f'Flask: {flask.__version__}')"
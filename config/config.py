@@ -15,10 +15,15 @@ class Config:
     
     # Upload settings
     MAX_CONTENT_LENGTH = 500 * 1024 * 1024  # 500MB
-    UPLOAD_FOLDER = 'uploads'
+    UPLOAD_FOLDER = os.environ.get('UPLOAD_FOLDER', 'uploads')
     ALLOWED_EXTENSIONS = {'.xlsx', '.xls', '.csv', '.ods'}
     MAX_FILE_SIZE = 200 * 1024 * 1024  # 200MB per file
     
+    # Workspaces por job em UPLOAD_FOLDER: quota de disco (remoção imediata dos
+    # livres mais antigos ao exceder; 0 desativa) e idade máxima dos livres
+    UPLOAD_QUOTA_MB = int(os.environ.get('UPLOAD_QUOTA_MB', 2048))
+    UPLOAD_WORKSPACE_MAX_AGE = 3600  # 1 hora
+    
     # Security settings
     WTF_CSRF_ENABLED = True
     WTF_CSRF_TIME_LIMIT = 7200  # 2 hours
@@ -26,23 +31,139 @@ class Config:
     SESSION_COOKIE_HTTPONLY = True
     SESSION_COOKIE_SAMESITE = 'Lax'
     
-    # Rate limiting
-    RATELIMIT_STORAGE_URL = "memory://"
+    # Proxies reversos confiáveis na frente da aplicação (Render: 1). O IP do
+    # cliente (limites de envio, logs) sai do X-Forwarded-For com esse número
+    # de saltos; 0 ignora o cabeçalho, que o cliente poderia forjar
+    PROXY_FIX_X_FOR = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+    
+    # Rate limiting (redis://... compartilha os contadores entre workers)
+    RATELIMIT_STORAGE_URL = os.environ.get('RATELIMIT_STORAGE_URL', 'memory://')
     RATELIMIT_DEFAULT = "100 per hour"
-    RATELIMIT_UPLOAD = "10 per minute"
+    
+    # Admissão de uploads: token bucket por cliente, custo em unidades de
+    # 1MB + 10 mil linhas estimadas. Estado em 'redis', 'local' (SQLite do
+    # registro de jobs) ou 'auto' (Redis se disponível)
+    UPLOAD_RATE_LIMIT_ENABLED = os.environ.get('UPLOAD_RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    UPLOAD_RATE_LIMIT_STORAGE = os.environ.get('UPLOAD_RATE_LIMIT_STORAGE', 'auto')
+    UPLOAD_RATE_LIMIT_REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    UPLOAD_RATE_CAPACITY = int(os.environ.get('UPLOAD_RATE_CAPACITY', 200))
+    UPLOAD_RATE_REFILL_PER_MINUTE = int(os.environ.get('UPLOAD_RATE_REFILL_PER_MINUTE', 100))
+    UPLOAD_COST_BYTES_PER_UNIT = 1024 * 1024
+    UPLOAD_COST_ROWS_PER_UNIT = 10000
     
     # Logging
     LOG_LEVEL = 'INFO'
     LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
     LOG_FILE = 'app.log'
+    # Pipeline de logging: registros aguardando escrita e limite por evento
+    # (abaixo de WARNING) a cada janela; descartes aparecem em /metrics
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+    LOG_RATE_LIMIT = int(os.environ.get('LOG_RATE_LIMIT', 50))
+    LOG_RATE_WINDOW = 10  # segundos
     
     # Celery (Background tasks)
     CELERY_BROKER_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
     CELERY_RESULT_BACKEND = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
     
+    # Backend de tasks: 'auto' (Celery se instalado), 'celery' ou 'local'.
+    # Com 'celery' o processamento assíncrono é obrigatório e o broker fora do
+    # ar deixa o /readyz em 503; com 'auto' ele só aparece como degradado
+    TASK_BACKEND = os.environ.get('TASK_BACKEND', 'auto')
+    
+    # Filas do pipeline Celery (parse/diff em CPU, escrita no Sheets em I/O)
+    CELERY_CPU_QUEUE = os.environ.get('CELERY_CPU_QUEUE', 'cpu')
+    CELERY_IO_QUEUE = os.environ.get('CELERY_IO_QUEUE', 'io')
+    # Resultados intermediários de cada etapa: 'auto' (Redis com o Celery, pasta
+    # local com o executor local), 'redis' ou 'local'
+    PIPELINE_STORAGE = os.environ.get('PIPELINE_STORAGE', 'auto')
+    PIPELINE_REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    PIPELINE_TTL = 6 * 3600  # cadeias perdidas expiram
+    PIPELINE_FOLDER = os.environ.get('PIPELINE_FOLDER', 'pipeline')
+    
+    # Executor local (usado quando o Celery não está disponível)
+    LOCAL_EXECUTOR_WORKERS = int(os.environ.get('LOCAL_EXECUTOR_WORKERS', 2))
+    LOCAL_EXECUTOR_MAX_QUEUE = int(os.environ.get('LOCAL_EXECUTOR_MAX_QUEUE', 16))
+    LOCAL_EXECUTOR_RESULT_TTL = 3600  # 1 hora
+    
+    # Vagas de processamento por processo: parses simultâneos e memória estimada
+    # somada (DataFrames); o excedente espera numa fila limitada e, cheia, 503
+    PROCESSING_SLOTS = int(os.environ.get('PROCESSING_SLOTS', 2))
+    PROCESSING_MEMORY_BUDGET_MB = int(os.environ.get('PROCESSING_MEMORY_BUDGET_MB', 1024))
+    PROCESSING_MAX_WAITING = int(os.environ.get('PROCESSING_MAX_WAITING', 8))
+    PROCESSING_MAX_WAIT = 120  # segundos na fila antes de desistir
+    
+    # Health: workers (ou, no executor local, a própria aplicação) publicam
+    # heartbeat e verificação das dependências; o /health só lê os registros.
+    # Registros mais velhos que 3 intervalos são considerados vencidos.
+    HEALTH_PUBLISHER_ENABLED = os.environ.get('HEALTH_PUBLISHER_ENABLED', 'true').lower() == 'true'
+    HEALTH_HEARTBEAT_INTERVAL = int(os.environ.get('HEALTH_HEARTBEAT_INTERVAL', 15))
+    HEALTH_CHECK_INTERVAL = int(os.environ.get('HEALTH_CHECK_INTERVAL', 60))
+    # Onde os registros ficam: 'auto' (Redis com o Celery, SQLite com o executor
+    # local), 'redis' ou 'local'
+    HEALTH_STORAGE = os.environ.get('HEALTH_STORAGE', 'auto')
+    HEALTH_REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
+    
+    # Prontidão (/readyz): verificações em segundo plano a cada intervalo, com
+    # timeout por verificação; o veredito vence após 3 intervalos
+    READINESS_BACKGROUND = True
+    # Inicia heartbeat e verificações já na criação da aplicação (o wsgi.py
+    # desliga: sob o gunicorn elas nascem em cada worker, depois do fork)
+    BACKGROUND_CHECKS_ON_STARTUP = os.environ.get('BACKGROUND_CHECKS_ON_STARTUP', 'true').lower() == 'true'
+    READINESS_INTERVAL = int(os.environ.get('READINESS_INTERVAL', 10))
+    READINESS_PROBE_TIMEOUT = float(os.environ.get('READINESS_PROBE_TIMEOUT', 3))
+    
+    # Profiling sob demanda (/admin/profiling): desligado, nenhuma
+    # instrumentação é instalada. As rotas /admin exigem o header X-Admin-Token
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'false').lower() == 'true'
+    PROFILING_FOLDER = os.environ.get('PROFILING_FOLDER', 'profiles')
+    ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+    
+    # Registro de jobs (histórico de uploads)
+    JOB_STORE_PATH = os.environ.get('JOB_STORE_PATH', 'jobs.db')
+    IDEMPOTENCY_KEY_TTL = 24 * 3600  # 24 horas
+    
     # Google Sheets API
     CREDENTIALS_FILE = 'credentials.json'
     
+    # 'google' (API real) ou 'fake' (backend em memória, ver services/fake_sheets.py)
+    SHEETS_BACKEND = os.environ.get('SHEETS_BACKEND', 'google')
+    FAKE_SHEETS_LATENCY = float(os.environ.get('FAKE_SHEETS_LATENCY', 0))
+    FAKE_SHEETS_REQUESTS_PER_MINUTE = None
+    FAKE_SHEETS_QUOTA_ERROR_RATE = 0.0
+    
+    # Linhas (ou células alteradas) por chamada de escrita ao Sheets
+    SHEETS_WRITE_BATCH_SIZE = int(os.environ.get('SHEETS_WRITE_BATCH_SIZE', 5000))
+    
+    # 'copy' grava o arquivo em uma planilha própria; 'dashboard' sincroniza
+    # a base com o dashboard (mesma lógica de iniciar_processo.py)
+    PROCESSING_MODE = os.environ.get('PROCESSING_MODE', 'copy')
+    DASHBOARD_SHEET_NAME = os.environ.get('GOOGLE_SHEET_NAME', 'IMOBILIARIAS CARUARU 03.06.2025')
+    DASHBOARD_SHEET_TAB = os.environ.get('GOOGLE_SHEET_TAB', 'BaseDeDados')
+    
+    # Detalhe completo das alterações (NDJSON por job); respostas levam só o resumo
+    CHANGE_LOG_FOLDER = os.environ.get('CHANGE_LOG_FOLDER', 'change_logs')
+    CHANGE_LOG_SAMPLE_SIZE = 50
+    # Validade do detalhe para download (s); depois a limpeza periódica o remove
+    CHANGE_LOG_MAX_AGE = int(os.environ.get('CHANGE_LOG_MAX_AGE', 7 * 24 * 3600))  # 7 dias
+    
+    # Upload síncrono com resposta NDJSON: intervalo dos eventos de heartbeat (s)
+    STREAM_HEARTBEAT_INTERVAL = 10
+    
+    # Uploads retomáveis em blocos (POST /uploads)
+    UPLOAD_SESSION_FOLDER = os.environ.get('UPLOAD_SESSION_FOLDER', 'upload_sessions')
+    UPLOAD_SESSION_TTL = 24 * 3600  # 24 horas
+    # Soma máxima dos tamanhos declarados das sessões abertas (staging pré-alocado; 0 desativa)
+    UPLOAD_SESSION_QUOTA_MB = int(os.environ.get('UPLOAD_SESSION_QUOTA_MB', 2048))
+    UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024  # 8MB
+    MAX_UPLOAD_CHUNK_SIZE = 32 * 1024 * 1024  # 32MB
+    
+    # Uploads comprimidos (Content-Encoding gzip/zstd ou .csv.gz): taxa máxima
+    # descomprimido/comprimido antes de abortar (proteção contra zip bombs)
+    MAX_DECOMPRESSION_RATIO = 100
+    
+    # Cache dos estáticos com hash no nome (/assets, gerados por python -m utils.assets)
+    STATIC_ASSET_MAX_AGE = 365 * 24 * 3600  # 1 ano
+    
     @staticmethod
     def init_app(app):
         """Initialize app with config"""
@@ -66,13 +187,7 @@ class ProductionConfig(Config):
     @staticmethod
     def init_app(app):
         Config.init_app(app)
-        
-        # Log to stderr in production
-        import logging
-        from logging import StreamHandler
-        handler = StreamHandler()
-        handler.setLevel(logging.WARNING)
-        app.logger.addHandler(handler)
+        # Logs vão para o pipeline com fila configurado em setup_logging
 
 
 class TestingConfig(Config):
@@ -80,6 +195,14 @@ class TestingConfig(Config):
     TESTING = True
     WTF_CSRF_ENABLED = False
     UPLOAD_FOLDER = 'test_uploads'
+    CHANGE_LOG_FOLDER = 'test_uploads/change_logs'
+    UPLOAD_SESSION_FOLDER = 'test_uploads/sessions'
+    PIPELINE_FOLDER = 'test_uploads/pipeline'
+    JOB_STORE_PATH = ':memory:'
+    RATELIMIT_ENABLED = False
+    UPLOAD_RATE_LIMIT_ENABLED = False
+    HEALTH_PUBLISHER_ENABLED = False
+    READINESS_BACKGROUND = False
 
 
 # Configurações disponíveis
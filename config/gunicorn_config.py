@@ -0,0 +1,185 @@
+"""
+Configuração do gunicorn para produção
+
+Uso:
+    gunicorn -c python:config.gunicorn_config wsgi:app
+
+A carga é em sua maior parte espera pela API do Google Sheets (I/O), com
+picos de CPU e memória no parse com pandas. Por isso:
+
+- ``gthread`` (padrão) ou ``gevent`` atendem várias requisições por worker
+  enquanto elas esperam a API (``GUNICORN_WORKER_CLASS``)
+- o número de workers sai dos núcleos disponíveis, limitado pela memória
+  (``GUNICORN_WORKER_MEMORY_MB`` por worker); ``WEB_CONCURRENCY`` ou
+  ``GUNICORN_WORKERS`` fixam o valor
+- a aplicação é carregada no master (``preload_app``) e compartilhada por
+  copy-on-write; conexões SQLite são reabertas em cada worker (``post_fork``)
+- workers são reciclados de forma graciosa após ``GUNICORN_MAX_REQUESTS``
+  requisições ou quando passam de ``GUNICORN_MAX_WORKER_MEMORY_MB`` de RSS,
+  já que o heap de um worker que fez parse com pandas não volta a diminuir
+"""
+import os
+import importlib.util
+from typing import Optional
+
+
+# Defaults por worker, ajustáveis por variável de ambiente
+WORKER_MEMORY_MB = 400
+THREADS_PER_WORKER = 4
+GEVENT_CONNECTIONS = 200
+
+
+def _env_int(name: str, default: Optional[int] = None) -> Optional[int]:
+    value = os.environ.get(name)
+    return int(value) if value not in (None, '') else default
+
+
+def _read_file(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def available_cpus() -> int:
+    """Núcleos utilizáveis: afinidade do processo e quota de CPU do cgroup"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    # cgroup v2 ("max 100000" ou "200000 100000") e v1
+    quota = period = None
+    cpu_max = _read_file('/sys/fs/cgroup/cpu.max')
+    if cpu_max:
+        parts = cpu_max.split()
+        if parts[0] != 'max' and len(parts) == 2:
+            quota, period = int(parts[0]), int(parts[1])
+    else:
+        v1_quota = _read_file('/sys/fs/cgroup/cpu/cpu.cfs_quota_us')
+        v1_period = _read_file('/sys/fs/cgroup/cpu/cpu.cfs_period_us')
+        if v1_quota and v1_period and int(v1_quota) > 0:
+            quota, period = int(v1_quota), int(v1_period)
+
+    if quota and period:
+        cpus = min(cpus, max(1, quota // period))
+    return max(1, cpus)
+
+
+def available_memory_mb() -> Optional[int]:
+    """Memória disponível para o serviço: limite do cgroup ou memória física"""
+    limits = []
+    for path in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        value = _read_file(path)
+        if value and value.isdigit():
+            limits.append(int(value) // (1024 * 1024))
+
+    try:
+        limits.append(os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') // (1024 * 1024))
+    except (AttributeError, ValueError, OSError):
+        pass
+
+    return min(limits) if limits else None
+
+
+def worker_count(cpus: int, memory_mb: Optional[int], worker_class: str = 'gthread',
+                 worker_memory_mb: int = WORKER_MEMORY_MB) -> int:
+    """
+    Workers para os núcleos e a memória disponíveis
+
+    gthread segue a regra ``2 * núcleos + 1``; com gevent a concorrência vem
+    das greenlets, então basta um worker por núcleo. Em ambos os casos o total
+    não passa do que cabe na memória.
+    """
+    workers = cpus if worker_class == 'gevent' else 2 * cpus + 1
+    if memory_mb:
+        workers = min(workers, memory_mb // worker_memory_mb)
+    return max(1, workers)
+
+
+def current_rss_mb() -> Optional[float]:
+    """RSS atual do processo (psutil, se instalado, ou /proc)"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+
+    statm = _read_file('/proc/self/statm')
+    if statm:
+        return int(statm.split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    return None
+
+
+# --- Servidor ---------------------------------------------------------------
+
+bind = os.environ.get('GUNICORN_BIND', f"0.0.0.0:{os.environ.get('PORT', '5000')}")
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+# Sem gevent instalado cai para gthread; o aviso sai no log do gunicorn (when_ready)
+gevent_missing = worker_class == 'gevent' and importlib.util.find_spec('gevent') is None
+if gevent_missing:
+    worker_class = 'gthread'
+
+if worker_class == 'gevent':
+    # Com preload a aplicação é importada no master: o monkey patching
+    # precisa acontecer antes disso, não só no worker
+    from gevent import monkey
+    monkey.patch_all()
+    worker_connections = _env_int('GUNICORN_WORKER_CONNECTIONS', GEVENT_CONNECTIONS)
+else:
+    threads = _env_int('GUNICORN_THREADS', THREADS_PER_WORKER)
+
+_worker_memory_mb = _env_int('GUNICORN_WORKER_MEMORY_MB', WORKER_MEMORY_MB)
+workers = _env_int('GUNICORN_WORKERS') or _env_int('WEB_CONCURRENCY') or worker_count(
+    available_cpus(), available_memory_mb(), worker_class, _worker_memory_mb
+)
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+# Reciclagem graciosa (jitter evita que todos reiniciem juntos)
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', max(1, max_requests // 10))
+max_worker_memory_mb = _env_int('GUNICORN_MAX_WORKER_MEMORY_MB', int(_worker_memory_mb * 1.5))
+
+# Com gthread/gevent o timeout vale para o heartbeat do worker, não para a
+# duração de uma requisição (uploads síncronos podem passar disso)
+timeout = _env_int('GUNICORN_TIMEOUT', 120)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 60)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+# Heartbeat em memória: evita travar em disco lento de containers
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+# --- Hooks ------------------------------------------------------------------
+
+def when_ready(server):
+    if gevent_missing:
+        server.log.warning("GUNICORN_WORKER_CLASS=gevent, mas o gevent não está instalado; usando gthread")
+    server.log.info(
+        f"gunicorn pronto: {workers} workers {worker_class}"
+        + (f" x {threads} threads" if worker_class != 'gevent' else '')
+        + f", preload={preload_app}, reciclagem a cada ~{max_requests} requisições"
+        + f" ou {max_worker_memory_mb}MB"
+    )
+
+
+def post_fork(server, worker):
+    # Conexões abertas no master não podem ser usadas depois do fork
+    import wsgi
+    wsgi.after_fork()
+
+
+def post_request(worker, req, environ, resp):
+    if not max_worker_memory_mb:
+        return
+    rss = current_rss_mb()
+    if rss is not None and rss > max_worker_memory_mb:
+        worker.log.info(f"Worker {worker.pid} com {rss:.0f}MB de RSS; reciclando após as requisições atuais")
+        worker.alive = False
@@ -182,7 +182,7 @@ echo    - Ou use: flask run
 echo.
 echo 4. Para produção:
 echo    - Use gunicorn: pip install gunicorn
-echo    - Execute: gunicorn app:app
+echo    - Execute: gunicorn -c python:config.gunicorn_config wsgi:app
 echo.
 echo 5. Acesse: http://localhost:5000
 echo.
@@ -256,7 +256,7 @@ def main():
         logger.info("   1. Configure o credentials.json com suas credenciais do Google")
         logger.info("   2. Ajuste as variáveis no arquivo .env")
         logger.info("   3. Para iniciar: python app.py")
-        logger.info("   4. Para produção: considere usar gunicorn")
+        logger.info("   4. Para produção: gunicorn -c python:config.gunicorn_config wsgi:app")
         logger.info("   5. Configure um proxy reverso (nginx) se necessário")
         
     except Exception as e:
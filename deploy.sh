@@ -180,7 +180,7 @@ if [ "$1" = "production" ]; then
 #!/bin/bash
 source venv/bin/activate
 export FLASK_ENV=production
-gunicorn --bind 0.0.0.0:5000 --workers 4 app:app
+gunicorn -c python:config.gunicorn_config wsgi:app
 EOF
     chmod +x start_production.sh
     log_success "Script de produção criado: start_production.sh"
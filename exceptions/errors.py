@@ -19,6 +19,16 @@ class ValidationError(AppError):
     status_code = 400
 
 
+class NotFoundError(AppError):
+    """Recurso não encontrado"""
+    status_code = 404
+
+
+class ForbiddenError(AppError):
+    """Acesso não autorizado"""
+    status_code = 403
+
+
 class FileValidationError(ValidationError):
     """Erro de validação de arquivo"""
     pass
@@ -52,3 +62,21 @@ class GoogleSheetsError(ProcessingError):
 class RateLimitError(AppError):
     """Limite de taxa excedido"""
     status_code = 429
+    
+    def __init__(self, message: str, retry_after: int = None, status_code: int = None):
+        super().__init__(message, status_code)
+        self.retry_after = retry_after
+
+
+class QueueFullError(AppError):
+    """Fila de processamento cheia"""
+    status_code = 503
+    
+    def __init__(self, message: str, retry_after: int = None, status_code: int = None):
+        super().__init__(message, status_code)
+        self.retry_after = retry_after
+
+
+class JobCancelledError(AppError):
+    """Job cancelado a pedido do usuário"""
+    status_code = 409
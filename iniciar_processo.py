@@ -7,8 +7,209 @@ import json
 import base64
 import tempfile
 
-def iniciar_processo_de_atualizacao(caminho_planilha_base):
+from utils.change_log import ChangeLog
+from utils.dataframes import shrink_dataframe, concat_shrunk, fill_missing, describe_report
+from utils.sheets_values import sheets_text
+
+COLUNAS_PARA_LER_DA_BASE = ['Nome fantasia', 'Corretores', 'Estado', 'Cidade', 'Ativa no painel']
+MAPA_COLUNAS_DIRETAS = {'Nome fantasia': 'Imobiliária', 'Corretores': 'Quantidade de Corretores', 'Estado': 'Estado', 'Cidade': 'Cidade'}
+COLUNA_STATUS_BASE = 'Ativa no painel'
+COLUNA_STATUS_DASH = 'Ativa em sistema'
+COLUNA_CONTRATO_DASH = 'Contrato assinado'
+CHAVE_IMOB_DASH = MAPA_COLUNAS_DIRETAS['Nome fantasia']
+
+# Separador decimal da localidade do dashboard (ex.: ',' em pt_BR), usado no
+# texto dos números comparados e enviados com USER_ENTERED
+SEPARADOR_DECIMAL = os.getenv('SHEETS_DECIMAL_SEPARATOR', '.')
+
+# Linhas por bloco na leitura de CSV e entre pontos de cancelamento no diff
+LINHAS_POR_BLOCO = 50000
+
+# Etapas separadas para que possam ser medidas isoladamente (benchmarks/bench_diff.py)
+
+def ler_base(caminho_planilha_base, checkpoint=None, memoria=None):
+    """
+    Lê as colunas usadas da base (.xlsx, .xls ou .csv com ';' ou ',')
+
+    CSVs são lidos em blocos; ``checkpoint`` (se informado) é chamado entre eles.
+    Cada bloco é compactado logo após a leitura (utils/dataframes.py: Estado,
+    Cidade e Ativa no painel como categorias, inteiros no menor tipo);
+    ``memoria`` (dicionário, opcional) acumula o tamanho antes e depois.
+    """
+    file_ext = os.path.splitext(caminho_planilha_base)[1].lower()
+
+    if file_ext in ['.xlsx', '.xls']:
+        df = pd.read_excel(caminho_planilha_base, usecols=COLUNAS_PARA_LER_DA_BASE)
+        return fill_missing(shrink_dataframe(df, memoria))
+    elif file_ext == '.csv':
+        try:
+            return _ler_csv_em_blocos(caminho_planilha_base, ';', checkpoint, memoria)
+        except (ValueError, UnicodeDecodeError):
+            if memoria is not None: memoria.clear()
+            return _ler_csv_em_blocos(caminho_planilha_base, ',', checkpoint, memoria)
+    else:
+        raise ValueError("Formato de arquivo não suportado. Por favor, use .xlsx, .xls ou .csv.")
+
+
+def _ler_csv_em_blocos(caminho, sep, checkpoint, memoria=None):
+    blocos = []
+    with pd.read_csv(caminho, usecols=COLUNAS_PARA_LER_DA_BASE, sep=sep, encoding='utf-8-sig',
+                     chunksize=LINHAS_POR_BLOCO) as leitor:
+        for bloco in leitor:
+            blocos.append(shrink_dataframe(bloco, memoria))
+            if checkpoint: checkpoint()
+    # fillna depois de juntar, como antes: um bloco com vazios numa coluna
+    # numérica a torna float em todos os blocos
+    return fill_missing(concat_shrunk(blocos))
+
+
+def indexar_cabecalhos(cabecalhos):
+    """Valida as colunas obrigatórias do dashboard e devolve nome -> índice"""
+    colunas_necessarias_dash = list(MAPA_COLUNAS_DIRETAS.values()) + [COLUNA_STATUS_DASH, COLUNA_CONTRATO_DASH]
+    for col in colunas_necessarias_dash:
+        if col not in cabecalhos:
+            raise ValueError(f"Coluna '{col}' não encontrada no cabeçalho do Google Sheets.")
+    return {nome: cabecalhos.index(nome) for nome in cabecalhos}
+
+
+def normalizar_base(df_base, separador_decimal=None):
+    """
+    Indexa a base pelo nome fantasia normalizado, descartando nomes vazios
+
+    As colunas lidas viram o texto que o Sheets exibe (utils/sheets_values.py),
+    convertido uma vez por coluna: o diff compara e envia esses valores sem
+    ``str()`` a cada célula, e floats inteiros (7.0) não diferem de '7'.
+    """
+    separador_decimal = separador_decimal or SEPARADOR_DECIMAL
+    colunas = [nome for nome in COLUNAS_PARA_LER_DA_BASE if nome in df_base.columns]
+    df_base = df_base.assign(**{nome: sheets_text(df_base[nome], separador_decimal) for nome in colunas})
+    df_base = df_base.assign(chave_normalizada=df_base['Nome fantasia'].astype(str).str.strip().str.upper())
+    df_base = df_base[df_base['chave_normalizada'] != '']
+    return df_base.set_index('chave_normalizada')
+
+
+def contrato_para_status(status_base):
+    """Valor da coluna de contrato correspondente ao status da base"""
+    if status_base == 'INATIVO':
+        return 'Não Assinado'
+    if status_base == 'ATIVO':
+        return 'Assinado'
+    return 'Pendente'
+
+
+def casar_registros(df_base, linhas_de_dados, indices_dashboard, checkpoint=None):
+    """
+    Casa cada linha do dashboard com o registro da base de mesma chave
+
+    Returns:
+        Lista de (número da linha na planilha, linha do dashboard, registro da base)
+    """
+    coluna_chave = indices_dashboard[CHAVE_IMOB_DASH]
+    # Chave duplicada na base: vale o primeiro registro. Com o índice único o
+    # ``loc`` é uma busca em hash; no índice com duplicatas ele varre a base
+    # inteira a cada linha do dashboard.
+    df_unico = df_base[~df_base.index.duplicated(keep='first')]
+    pares = []
+    for i, linha in enumerate(linhas_de_dados, start=2):
+        if checkpoint and i % LINHAS_POR_BLOCO == 0: checkpoint()
+        if len(linha) <= coluna_chave or not linha[coluna_chave]: continue
+
+        chave_normalizada = str(linha[coluna_chave]).strip().upper()
+        if chave_normalizada in df_unico.index:
+            pares.append((i, linha, df_unico.loc[chave_normalizada]))
+    return pares
+
+
+def calcular_diferencas(pares, df_base, linhas_de_dados, cabecalhos, indices_dashboard, change_log,
+                        checkpoint=None):
+    """
+    Calcula as células alteradas e as novas linhas do dashboard
+
+    Cada alteração é registrada em ``change_log`` (utils/change_log.py);
+    ``checkpoint`` é chamado a cada ``LINHAS_POR_BLOCO`` registros.
+
+    Returns:
+        (alterações como (linha, coluna, valor), novas linhas)
+    """
+    alteracoes = []
+    novas_linhas = []
+
+    # --- PASSO 1: ATUALIZAR REGISTROS EXISTENTES ---
+    for n, (i, linha, dados_base_linha) in enumerate(pares, start=1):
+        if checkpoint and n % LINHAS_POR_BLOCO == 0: checkpoint()
+        nome_original = linha[indices_dashboard[CHAVE_IMOB_DASH]]
+
+        # 1.1 - Atualizações diretas
+        for nome_base, nome_dash in MAPA_COLUNAS_DIRETAS.items():
+            if nome_base == 'Nome fantasia': continue
+            valor_novo, valor_antigo = dados_base_linha[nome_base], linha[indices_dashboard[nome_dash]]
+            if valor_novo != valor_antigo:
+                change_log.record_update(i, nome_original, nome_dash, valor_antigo, valor_novo)
+                alteracoes.append((i, indices_dashboard[nome_dash] + 1, valor_novo))
+
+        # 1.2 - Lógica condicional de status e contrato
+        valor_status = dados_base_linha[COLUNA_STATUS_BASE]
+        status_base = valor_status.strip().upper()
+        valor_antigo_status = linha[indices_dashboard[COLUNA_STATUS_DASH]]
+        if valor_status != valor_antigo_status:
+            change_log.record_update(i, nome_original, COLUNA_STATUS_DASH, valor_antigo_status, valor_status)
+            alteracoes.append((i, indices_dashboard[COLUNA_STATUS_DASH] + 1, valor_status))
+
+        valor_antigo_contrato = linha[indices_dashboard[COLUNA_CONTRATO_DASH]]
+        contrato = contrato_para_status(status_base)
+        if valor_antigo_contrato != contrato:
+            change_log.record_update(i, nome_original, COLUNA_CONTRATO_DASH, valor_antigo_contrato, contrato)
+            alteracoes.append((i, indices_dashboard[COLUNA_CONTRATO_DASH] + 1, contrato))
+
+    # --- PASSO 2: ADICIONAR NOVOS REGISTROS ---
+    coluna_chave = indices_dashboard[CHAVE_IMOB_DASH]
+    set_imobiliarias_dashboard = {str(linha[coluna_chave]).strip().upper() for linha in linhas_de_dados if len(linha) > coluna_chave and linha[coluna_chave]}
+    chaves_ja_processadas = set()
+    for n, (chave_base, dados_base_linha) in enumerate(df_base.iterrows(), start=1):
+        if checkpoint and n % LINHAS_POR_BLOCO == 0: checkpoint()
+        if chave_base in chaves_ja_processadas: continue
+        chaves_ja_processadas.add(chave_base)
+
+        if chave_base not in set_imobiliarias_dashboard:
+            if "(CARUARU)" in chave_base:
+                nova_linha = [''] * len(cabecalhos)
+                for nome_base, nome_dash in MAPA_COLUNAS_DIRETAS.items():
+                    nova_linha[indices_dashboard[nome_dash]] = dados_base_linha[nome_base]
+
+                status_base = dados_base_linha[COLUNA_STATUS_BASE].strip().upper()
+                nova_linha[indices_dashboard[COLUNA_STATUS_DASH]] = dados_base_linha[COLUNA_STATUS_BASE]
+                nova_linha[indices_dashboard[COLUNA_CONTRATO_DASH]] = contrato_para_status(status_base)
+
+                change_log.record_new(dados_base_linha['Nome fantasia'], {
+                    nome: valor for nome, valor in zip(cabecalhos, nova_linha) if valor != ''
+                })
+                novas_linhas.append(nova_linha)
+
+    return alteracoes, novas_linhas
+
+
+def resumir_alteracoes(change_log):
+    """Linhas do log com contagens por coluna e a amostra das alterações"""
+    resumo = change_log.summary()
+    por_coluna = ', '.join(f"{coluna}: {total}" for coluna, total in resumo['by_column'].items())
+    linhas = [f"  {resumo['updated_cells']} células alteradas" + (f" ({por_coluna})" if por_coluna else '') + ".",
+              f"  {resumo['new_rows']} novas imobiliárias."]
+    linhas.extend(change_log.describe(registro) for registro in change_log.sample)
+    if resumo['truncated']:
+        linhas.append(f"  ... e mais {change_log.total - len(change_log.sample)} alterações.")
+    if change_log.path:
+        linhas.append(f"  Detalhes completos em: {change_log.path}")
+    return linhas
+
+
+def montar_payload(alteracoes):
+    """Converte as alterações nas células enviadas ao ``update_cells``"""
+    return [gspread.Cell(linha, coluna, valor) for linha, coluna, valor in alteracoes]
+
+
+def iniciar_processo_de_atualizacao(caminho_planilha_base, client=None, caminho_detalhes=None):
     log_messages = []
+    change_log = ChangeLog(caminho_detalhes)
     
     try:
         log_messages.append("Iniciando processo de sincronização...")
@@ -17,64 +218,52 @@ def iniciar_processo_de_atualizacao(caminho_planilha_base):
         NOME_PLANILHA_GOOGLE = os.getenv('GOOGLE_SHEET_NAME', 'IMOBILIARIAS CARUARU 03.06.2025')
         NOME_ABA_GOOGLE = os.getenv('GOOGLE_SHEET_TAB', 'BaseDeDados')
         ARQUIVO_CREDENCIAIS = 'credentials.json'
-        COLUNAS_PARA_LER_DA_BASE = ['Nome fantasia', 'Corretores', 'Estado', 'Cidade', 'Ativa no painel']
-        MAPA_COLUNAS_DIRETAS = {'Nome fantasia': 'Imobiliária', 'Corretores': 'Quantidade de Corretores', 'Estado': 'Estado', 'Cidade': 'Cidade'}
-        COLUNA_STATUS_BASE = 'Ativa no painel'
-        COLUNA_STATUS_DASH = 'Ativa em sistema'
-        COLUNA_CONTRATO_DASH = 'Contrato assinado'
 
         # <<< NOVA LÓGICA DE LEITURA DE ARQUIVO >>>
         log_messages.append(f"Lendo dados de: {os.path.basename(caminho_planilha_base)}")
         
-        file_ext = os.path.splitext(caminho_planilha_base)[1].lower()
-
-        if file_ext in ['.xlsx', '.xls']:
-            df_base = pd.read_excel(caminho_planilha_base, usecols=COLUNAS_PARA_LER_DA_BASE).fillna('')
-        elif file_ext == '.csv':
-            try:
-                df_base = pd.read_csv(caminho_planilha_base, usecols=COLUNAS_PARA_LER_DA_BASE, sep=';', encoding='utf-8-sig').fillna('')
-            except (ValueError, UnicodeDecodeError):
-                df_base = pd.read_csv(caminho_planilha_base, usecols=COLUNAS_PARA_LER_DA_BASE, sep=',', encoding='utf-8-sig').fillna('')
-        else:
-            raise ValueError("Formato de arquivo não suportado. Por favor, use .xlsx, .xls ou .csv.")
-        
-        df_base['chave_normalizada'] = df_base['Nome fantasia'].astype(str).str.strip().str.upper()
-        df_base = df_base[df_base['chave_normalizada'] != '']
-        df_base = df_base.set_index('chave_normalizada')
-        log_messages.append("Dados locais carregados e normalizados com sucesso.")
+        memoria = {}
+        df_base = normalizar_base(ler_base(caminho_planilha_base, memoria=memoria))
+        uso = describe_report(memoria)
+        log_messages.append("Dados locais carregados e normalizados com sucesso "
+                            f"({uso['memory_before_mb']} MB -> {uso['memory_mb']} MB em memória).")
         
         # ETAPA 2: Conectar ao Google Sheets
         log_messages.append("Autenticando com a API do Google...")
         
-        # Verificar se estamos em produção (Render) ou desenvolvimento
-        credentials_base64 = os.getenv('GOOGLE_CREDENTIALS_BASE64')
+        if client is not None:
+            # Cliente já autenticado (ou o backend falso de services/fake_sheets.py)
+            gc = client
+        else:
+            # Verificar se estamos em produção (Render) ou desenvolvimento
+            credentials_base64 = os.getenv('GOOGLE_CREDENTIALS_BASE64')
         
-        if credentials_base64:
-            # Produção: usar credenciais do Base64
-            log_messages.append("Usando credenciais do ambiente de produção...")
+            if credentials_base64:
+                # Produção: usar credenciais do Base64
+                log_messages.append("Usando credenciais do ambiente de produção...")
             
-            try:
-                # Decodificar Base64 e criar arquivo temporário
-                credentials_data = base64.b64decode(credentials_base64)
+                try:
+                    # Decodificar Base64 e criar arquivo temporário
+                    credentials_data = base64.b64decode(credentials_base64)
                 
-                # Criar arquivo temporário para as credenciais
-                with tempfile.NamedTemporaryFile(mode='w+b', suffix='.json', delete=False) as temp_file:
-                    temp_file.write(credentials_data)
-                    temp_credentials_path = temp_file.name
+                    # Criar arquivo temporário para as credenciais
+                    with tempfile.NamedTemporaryFile(mode='w+b', suffix='.json', delete=False) as temp_file:
+                        temp_file.write(credentials_data)
+                        temp_credentials_path = temp_file.name
                 
-                # Usar arquivo temporário
-                gc = gspread.service_account(filename=temp_credentials_path)
+                    # Usar arquivo temporário
+                    gc = gspread.service_account(filename=temp_credentials_path)
                 
-                # Limpar arquivo temporário
-                os.unlink(temp_credentials_path)
+                    # Limpar arquivo temporário
+                    os.unlink(temp_credentials_path)
                 
-            except Exception as e:
-                log_messages.append(f"❌ Erro ao processar credenciais Base64: {str(e)}")
-                raise
-        else:
-            # Desenvolvimento: usar arquivo local
-            log_messages.append("Usando credenciais do arquivo local...")
-            gc = gspread.service_account(filename=ARQUIVO_CREDENCIAIS)
+                except Exception as e:
+                    log_messages.append(f"❌ Erro ao processar credenciais Base64: {str(e)}")
+                    raise
+            else:
+                # Desenvolvimento: usar arquivo local
+                log_messages.append("Usando credenciais do arquivo local...")
+                gc = gspread.service_account(filename=ARQUIVO_CREDENCIAIS)
         
         sh = gc.open(NOME_PLANILHA_GOOGLE)
         worksheet = sh.worksheet(NOME_ABA_GOOGLE)
@@ -86,92 +275,17 @@ def iniciar_processo_de_atualizacao(caminho_planilha_base):
         cabecalhos = dados_dashboard[0]
         linhas_de_dados = dados_dashboard[1:]
         
-        colunas_necessarias_dash = list(MAPA_COLUNAS_DIRETAS.values()) + [COLUNA_STATUS_DASH, COLUNA_CONTRATO_DASH]
-        for col in colunas_necessarias_dash:
-            if col not in cabecalhos:
-                raise ValueError(f"Coluna '{col}' não encontrada no cabeçalho do Google Sheets.")
-        
-        indices_dashboard = {nome: cabecalhos.index(nome) for nome in cabecalhos}
-        chave_imob_dash = MAPA_COLUNAS_DIRETAS['Nome fantasia']
-        set_imobiliarias_dashboard = {str(linha[indices_dashboard[chave_imob_dash]]).strip().upper() for linha in linhas_de_dados if len(linha) > indices_dashboard[chave_imob_dash] and linha[indices_dashboard[chave_imob_dash]]}
-        
-        celulas_para_atualizar = []
-        novas_linhas_para_adicionar = []
-
-        # --- PASSO 1: ATUALIZAR REGISTROS EXISTENTES ---
-        log_messages.append("\nIniciando Passo 1: Verificando atualizações...")
-        for i, linha in enumerate(linhas_de_dados, start=2):
-            if len(linha) <= indices_dashboard[chave_imob_dash] or not linha[indices_dashboard[chave_imob_dash]]: continue
-            
-            nome_original = linha[indices_dashboard[chave_imob_dash]]
-            chave_normalizada = str(nome_original).strip().upper()
-            
-            if chave_normalizada in df_base.index:
-                dados_base_linha = df_base.loc[chave_normalizada]
-                if isinstance(dados_base_linha, pd.DataFrame): dados_base_linha = dados_base_linha.iloc[0]
+        indices_dashboard = indexar_cabecalhos(cabecalhos)
 
-                # 1.1 - Atualizações diretas
-                for nome_base, nome_dash in MAPA_COLUNAS_DIRETAS.items():
-                    if nome_base == 'Nome fantasia': continue
-                    valor_novo, valor_antigo = dados_base_linha[nome_base], linha[indices_dashboard[nome_dash]]
-                    if str(valor_novo) != str(valor_antigo):
-                        # <--- MUDANÇA: Log detalhado da alteração de célula
-                        log_messages.append(f"  [ATUALIZAÇÃO] '{nome_original}': Coluna '{nome_dash}' de '{valor_antigo}' para '{valor_novo}'.")
-                        celulas_para_atualizar.append(gspread.Cell(i, indices_dashboard[nome_dash] + 1, str(valor_novo)))
-                
-                # 1.2 - Lógica condicional de status e contrato
-                status_base = str(dados_base_linha[COLUNA_STATUS_BASE]).strip().upper()
-                valor_antigo_status = linha[indices_dashboard[COLUNA_STATUS_DASH]]
-                if str(dados_base_linha[COLUNA_STATUS_BASE]) != valor_antigo_status:
-                    # <--- MUDANÇA: Log detalhado da alteração de status
-                    log_messages.append(f"  [ATUALIZAÇÃO] '{nome_original}': Coluna '{COLUNA_STATUS_DASH}' de '{valor_antigo_status}' para '{dados_base_linha[COLUNA_STATUS_BASE]}'.")
-                    celulas_para_atualizar.append(gspread.Cell(i, indices_dashboard[COLUNA_STATUS_DASH] + 1, str(dados_base_linha[COLUNA_STATUS_BASE])))
-
-                valor_antigo_contrato = linha[indices_dashboard[COLUNA_CONTRATO_DASH]]
-                if status_base == 'INATIVO':
-                    if valor_antigo_contrato != 'Não Assinado':
-                        # <--- MUDANÇA: Log detalhado da alteração de contrato
-                        log_messages.append(f"  [ATUALIZAÇÃO] '{nome_original}': Coluna '{COLUNA_CONTRATO_DASH}' de '{valor_antigo_contrato}' para 'Não Assinado' (status INATIVO).")
-                        celulas_para_atualizar.append(gspread.Cell(i, indices_dashboard[COLUNA_CONTRATO_DASH] + 1, 'Não Assinado'))
-                elif status_base == 'ATIVO':
-                    if valor_antigo_contrato != 'Assinado':
-                        # <--- MUDANÇA: Log detalhado da alteração de contrato
-                        log_messages.append(f"  [ATUALIZAÇÃO] '{nome_original}': Coluna '{COLUNA_CONTRATO_DASH}' de '{valor_antigo_contrato}' para 'Assinado' (status ATIVO).")
-                        celulas_para_atualizar.append(gspread.Cell(i, indices_dashboard[COLUNA_CONTRATO_DASH] + 1, 'Assinado'))
-                else:
-                    if valor_antigo_contrato != 'Pendente':
-                        # <--- MUDANÇA: Log detalhado da alteração de contrato
-                        log_messages.append(f"  [ATUALIZAÇÃO] '{nome_original}': Coluna '{COLUNA_CONTRATO_DASH}' de '{valor_antigo_contrato}' para 'Pendente'.")
-                        celulas_para_atualizar.append(gspread.Cell(i, indices_dashboard[COLUNA_CONTRATO_DASH] + 1, 'Pendente'))
-
-        # --- PASSO 2: ADICIONAR NOVOS REGISTROS ---
-        log_messages.append("\nIniciando Passo 2: Procurando novas imobiliárias...")
-        chaves_ja_processadas = set()
-        for chave_base, dados_base_linha in df_base.iterrows():
-            if chave_base in chaves_ja_processadas: continue
-            chaves_ja_processadas.add(chave_base)
-
-            if chave_base not in set_imobiliarias_dashboard:
-                if "(CARUARU)" in chave_base:
-                    if isinstance(dados_base_linha, pd.DataFrame): dados_base_linha = dados_base_linha.iloc[0]
-                    # <--- MUDANÇA: Log detalhado da nova adição
-                    log_messages.append(f"  [NOVO] Imobiliária a ser adicionada: {dados_base_linha['Nome fantasia']} (Status: {dados_base_linha[COLUNA_STATUS_BASE]})")
-                    
-                    nova_linha = [''] * len(cabecalhos)
-                    for nome_base, nome_dash in MAPA_COLUNAS_DIRETAS.items():
-                        nova_linha[indices_dashboard[nome_dash]] = dados_base_linha[nome_base]
-                    
-                    status_base = str(dados_base_linha[COLUNA_STATUS_BASE]).strip().upper()
-                    nova_linha[indices_dashboard[COLUNA_STATUS_DASH]] = dados_base_linha[COLUNA_STATUS_BASE]
-                    
-                    if status_base == 'INATIVO':
-                        nova_linha[indices_dashboard[COLUNA_CONTRATO_DASH]] = 'Não Assinado'
-                    elif status_base == 'ATIVO':
-                        nova_linha[indices_dashboard[COLUNA_CONTRATO_DASH]] = 'Assinado'
-                    else:
-                        nova_linha[indices_dashboard[COLUNA_CONTRATO_DASH]] = 'Pendente'
-                    
-                    novas_linhas_para_adicionar.append(nova_linha)
+        # --- PASSOS 1 E 2: CASAR REGISTROS E CALCULAR DIFERENÇAS ---
+        log_messages.append("\nIniciando Passos 1 e 2: Verificando atualizações e novas imobiliárias...")
+        pares = casar_registros(df_base, linhas_de_dados, indices_dashboard)
+        alteracoes, novas_linhas_para_adicionar = calcular_diferencas(
+            pares, df_base, linhas_de_dados, cabecalhos, indices_dashboard, change_log
+        )
+        celulas_para_atualizar = montar_payload(alteracoes)
+        # Só o resumo e uma amostra entram no log; o detalhe fica no arquivo
+        log_messages.extend(resumir_alteracoes(change_log))
 
         # --- PASSO 3: EXECUTAR ALTERAÇÕES ---
         if celulas_para_atualizar:
@@ -192,6 +306,7 @@ def iniciar_processo_de_atualizacao(caminho_planilha_base):
         log_messages.append(f"\n❌ ERRO no processo: {e}")
         return "\n".join(log_messages)
     finally:
+        change_log.close()
         log_messages.append("\nProcesso de sincronização finalizado.")
 
     return "\n".join(log_messages)
\ No newline at end of file
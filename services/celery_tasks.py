@@ -3,45 +3,192 @@ Tasks assíncronas usando Celery
 """
 import os
 import time
+import socket
 import logging
 from typing import Dict, Any
+from werkzeug.datastructures import FileStorage
+
+from services.file_processing_service import FileProcessingService
+from exceptions.errors import JobCancelledError
+from config.config import Config
+from utils.progress import StageTracker
+from services.profiler import profile_run
+from services.job_store import FINAL_STATES
 
 try:
-    from celery import Celery
+    from celery import Celery, chain
     from celery.schedules import crontab
-    CELERY_AVAILABLE = True
+    from celery.exceptions import Ignore
+    from celery.signals import worker_ready, worker_shutdown
+    CELERY_INSTALLED = True
 except ImportError:
-    CELERY_AVAILABLE = False
-    # Mock para quando Celery não estiver disponível
-    class Celery:
-        def __init__(self, *args, **kwargs):
-            pass
-        def task(self, *args, **kwargs):
-            def decorator(func):
-                return func
-            return decorator
-        @property
-        def conf(self):
-            return type('conf', (), {'update': lambda x: None, 'beat_schedule': {}})()
+    CELERY_INSTALLED = False
 
-from services.file_processing_service import FileProcessingService
-from config.config import Config
+# Celery é usado quando instalado, a menos que TASK_BACKEND force o executor local
+CELERY_AVAILABLE = CELERY_INSTALLED and Config.TASK_BACKEND != 'local'
+TASK_BACKEND = 'celery' if CELERY_AVAILABLE else 'local'
 
 
-# Configurar Celery
-celery = Celery('atualizador_web')
-celery.conf.update(
-    broker_url=Config.CELERY_BROKER_URL,
-    result_backend=Config.CELERY_RESULT_BACKEND,
-    task_serializer='json',
-    accept_content=['json'],
-    result_serializer='json',
-    timezone='America/Sao_Paulo',
-    enable_utc=True,
-)
+if CELERY_AVAILABLE:
+    # Configurar Celery
+    celery = Celery('atualizador_web')
+    celery.conf.update(
+        broker_url=Config.CELERY_BROKER_URL,
+        result_backend=Config.CELERY_RESULT_BACKEND,
+        task_serializer='json',
+        accept_content=['json'],
+        result_serializer='json',
+        timezone='America/Sao_Paulo',
+        enable_utc=True,
+        # Etapas do pipeline em filas separadas: parse/diff (CPU, prefork com um
+        # processo por núcleo) e escrita no Sheets (I/O, pool gevent)
+        task_routes={
+            'services.celery_tasks.parse_stage_task': {'queue': Config.CELERY_CPU_QUEUE},
+            'services.celery_tasks.diff_stage_task': {'queue': Config.CELERY_CPU_QUEUE},
+            'services.celery_tasks.write_stage_task': {'queue': Config.CELERY_IO_QUEUE},
+        },
+        # Tasks de CPU longas: cada processo reserva uma por vez
+        worker_prefetch_multiplier=1,
+        # STARTED no result backend: a aplicação acompanha o pipeline por ele
+        task_track_started=True,
+    )
+else:
+    # Sem Celery: pool de threads em processo com a mesma interface
+    from services.local_executor import LocalExecutor
+    celery = LocalExecutor(
+        max_workers=Config.LOCAL_EXECUTOR_WORKERS,
+        max_queue=Config.LOCAL_EXECUTOR_MAX_QUEUE,
+        result_ttl=Config.LOCAL_EXECUTOR_RESULT_TTL,
+    )
 
 logger = logging.getLogger(__name__)
 
+_job_store = None
+_governor = None
+_storage = None
+_pipeline_store = None
+_health_registry = None
+_heartbeat = None
+_sheets_probe_service = None
+_profiler = None
+
+
+def get_job_store():
+    """Registro de jobs compartilhado pelas tasks deste processo"""
+    global _job_store
+    if _job_store is None:
+        from services.job_store import JobStore
+        _job_store = JobStore(Config.JOB_STORE_PATH)
+    return _job_store
+
+
+def get_storage():
+    """Workspaces de upload deste processo (índice no banco do registro de jobs)"""
+    global _storage
+    if _storage is None:
+        from services.storage_manager import StorageManager
+        _storage = StorageManager(
+            Config.UPLOAD_FOLDER, Config.JOB_STORE_PATH,
+            quota_bytes=Config.UPLOAD_QUOTA_MB * 1024 * 1024 if Config.UPLOAD_QUOTA_MB else None,
+            max_age=Config.UPLOAD_WORKSPACE_MAX_AGE
+        )
+    return _storage
+
+
+def revoke_task(task_id: str) -> None:
+    """
+    Revoga uma task: se ainda estiver na fila, não chega a executar
+    
+    Sem ``terminate``: tasks em execução param sozinhas no próximo ponto de
+    cancelamento, sem interromper a gravação de um lote no meio. No Celery as
+    etapas seguintes do pipeline do job também são revogadas.
+    """
+    if CELERY_AVAILABLE:
+        celery.control.revoke([pipeline_task_id(task_id, stage) for stage in PIPELINE_STAGES])
+    else:
+        celery.revoke(task_id)
+
+
+def is_task_revoked(task_id: str) -> bool:
+    """Indica se a task foi revogada (consultado pela própria task)"""
+    if CELERY_AVAILABLE:
+        # Conjunto de revogações mantido por cada worker a partir do broadcast
+        from celery.worker import state as worker_state
+        return task_id in worker_state.revoked
+    return celery.is_revoked(task_id)
+
+
+def set_job_store(job_store) -> None:
+    """Define o registro usado pelas tasks (ex.: o da aplicação, no executor local)"""
+    global _job_store
+    _job_store = job_store
+
+
+def get_pipeline_store():
+    """Resultados intermediários do pipeline (Redis com o Celery; ver ``create_pipeline_store``)"""
+    global _pipeline_store
+    if _pipeline_store is None:
+        from services.pipeline_store import create_pipeline_store
+        _pipeline_store = create_pipeline_store(_settings(), get_storage(), TASK_BACKEND)
+    return _pipeline_store
+
+
+def set_pipeline_store(store) -> None:
+    """Define o armazenamento do pipeline usado pelas tasks (ex.: o da aplicação)"""
+    global _pipeline_store
+    _pipeline_store = store
+
+
+def set_storage(storage) -> None:
+    """Define os workspaces usados pelas tasks (ex.: os da aplicação, no executor local)"""
+    global _storage
+    _storage = storage
+
+
+def _build_service(job_store) -> FileProcessingService:
+    return FileProcessingService(
+        upload_folder=Config.UPLOAD_FOLDER,
+        credentials_file=Config.CREDENTIALS_FILE,
+        job_store=job_store,
+        sheets_backend=Config.SHEETS_BACKEND,
+        processing_mode=Config.PROCESSING_MODE,
+        dashboard={'sheet': Config.DASHBOARD_SHEET_NAME, 'tab': Config.DASHBOARD_SHEET_TAB},
+        change_log_folder=Config.CHANGE_LOG_FOLDER,
+        change_log_sample_size=Config.CHANGE_LOG_SAMPLE_SIZE,
+        change_log_max_age=Config.CHANGE_LOG_MAX_AGE,
+        write_batch_size=Config.SHEETS_WRITE_BATCH_SIZE,
+        governor=_governor,
+        pipeline_folder=Config.PIPELINE_FOLDER,
+        storage=get_storage(),
+        pipeline_store=get_pipeline_store()
+    )
+
+
+def get_profiler():
+    """Profiling sob demanda deste processo (None com PROFILING_ENABLED desligado)"""
+    global _profiler
+    if _profiler is None and Config.PROFILING_ENABLED:
+        from services.profiler import Profiler
+        _profiler = Profiler(Config.JOB_STORE_PATH, Config.PROFILING_FOLDER)
+    return _profiler
+
+
+def set_profiler(profiler) -> None:
+    """Define o profiler usado pelas tasks (ex.: o da aplicação, no executor local)"""
+    global _profiler
+    _profiler = profiler
+
+
+def set_processing_governor(governor) -> None:
+    """
+    Define o governor usado pelas tasks
+    
+    No executor local as tasks rodam no processo da aplicação e disputam a
+    mesma memória que os uploads síncronos; workers Celery dispensam.
+    """
+    global _governor
+    _governor = governor
+
 
 @celery.task(bind=True)
 def process_file_async(self, file_data: bytes, filename: str, metadata: Dict[str, Any] = None):
@@ -60,46 +207,66 @@ def process_file_async(self, file_data: bytes, filename: str, metadata: Dict[str
         # Atualizar status da task
         self.update_state(state='PROGRESS', meta={'status': 'Iniciando processamento...'})
         
-        # Criar serviço de processamento
-        service = FileProcessingService(
-            upload_folder=Config.UPLOAD_FOLDER,
-            credentials_file=Config.CREDENTIALS_FILE
-        )
+        job_store = get_job_store()
+        job_store.mark_started(self.request.id)
+        record_stage = job_store.stage_recorder(self.request.id)
         
-        # Salvar arquivo temporário
-        temp_filepath = os.path.join(Config.UPLOAD_FOLDER, f"temp_{self.request.id}_{filename}")
+        def progress(event, data):
+            record_stage(event, data)
+            if event == 'stage_started':
+                self.update_state(state='PROGRESS', meta={
+                    'status': f"Etapa: {data['stage']}",
+                    'stage': data['stage']
+                })
         
-        with open(temp_filepath, 'wb') as f:
-            f.write(file_data)
+        def cancel_check():
+            return job_store.is_cancel_requested(self.request.id) or is_task_revoked(self.request.id)
         
-        self.update_state(state='PROGRESS', meta={'status': 'Arquivo salvo, iniciando processamento...'})
+        # Criar serviço de processamento
+        service = _build_service(job_store)
         
-        # Simular FileStorage para o serviço
-        class TempFile:
-            def __init__(self, filepath, filename):
-                self.filepath = filepath
-                self.filename = filename
+        # Salvar arquivo temporário no workspace do job (removido ao final,
+        # inclusive em falhas e cancelamentos)
+        with service.storage.workspace(self.request.id) as workspace:
+            temp_filepath = os.path.join(workspace, 'source' + os.path.splitext(filename)[1].lower())
+            service.storage.reserve(self.request.id, len(file_data))
+            with open(temp_filepath, 'wb') as f:
+                f.write(file_data)
             
-            def save(self, destination):
-                import shutil
-                shutil.move(self.filepath, destination)
-        
-        temp_file = TempFile(temp_filepath, filename)
-        
-        # Processar arquivo
-        result = service.process_file(temp_file, metadata)
+            self.update_state(state='PROGRESS', meta={'status': 'Arquivo salvo, iniciando processamento...'})
+            
+            # Reabrir como FileStorage: o serviço valida (seek/read) antes de salvar
+            with open(temp_filepath, 'rb') as stream, \
+                    profile_run(get_profiler(), 'task', self.request.id) as profiled:
+                temp_file = FileStorage(stream=stream, filename=filename)
+                
+                # Processar arquivo
+                result = service.process_file(temp_file, dict(metadata or {}, job_id=self.request.id),
+                                              progress=progress, cancel_check=cancel_check,
+                                              background=True)
+                profiled.record(result.get('timings'))
         
+        job_store.finish_job(self.request.id, 'SUCCESS', result=result)
         self.update_state(state='PROGRESS', meta={'status': 'Processamento concluído!'})
         
         logger.info(f"Task {self.request.id} concluída com sucesso")
         return result
         
+    except JobCancelledError as e:
+        logger.info(f"Task {self.request.id} cancelada: {str(e)}")
+        
+        job_store.finish_job(self.request.id, 'CANCELLED', error=str(e))
+        self.update_state(state='REVOKED', meta={'status': 'Cancelado', 'error': str(e)})
+        if CELERY_AVAILABLE:
+            # Mantém o estado REVOKED em vez de registrar falha
+            raise Ignore()
+        raise
+        
     except Exception as e:
         logger.error(f"Erro na task {self.request.id}: {str(e)}")
         
-        # Limpar arquivo temporário em caso de erro
-        if 'temp_filepath' in locals() and os.path.exists(temp_filepath):
-            os.remove(temp_filepath)
+        if 'job_store' in locals():
+            job_store.finish_job(self.request.id, 'FAILURE', error=str(e))
         
         self.update_state(
             state='FAILURE',
@@ -108,38 +275,172 @@ def process_file_async(self, file_data: bytes, filename: str, metadata: Dict[str
         raise
 
 
+# --- Pipeline em etapas (Celery) ---------------------------------------------
+#
+# parse -> diff -> write, cada etapa numa task roteada para a sua fila. As tasks
+# recebem e devolvem ``ref``: um dicionário pequeno com o job e o nome do
+# resultado da etapa anterior no armazenamento do pipeline (Redis, ver
+# services/pipeline_store.py), nunca os dados em si. O registro de jobs dos
+# workers pode ser outro banco (outra máquina): a aplicação acompanha o job pelo
+# estado das tasks no result backend (ver ``sync_pipeline_job``).
+
+PIPELINE_STAGES = ('parse', 'diff', 'write')
+
+
+def pipeline_task_id(job_id: str, stage: str) -> str:
+    """ID da task de uma etapa (a primeira usa o próprio ID do job)"""
+    return job_id if stage == 'parse' else f"{job_id}:{stage}"
+
+
+def start_pipeline(job_id: str, source_name: str, filename: str, metadata: Dict[str, Any]):
+    """Enfileira as etapas do job a partir do arquivo já gravado (``stage_source``)"""
+    ref = {'job_id': job_id, 'filename': filename, 'metadata': metadata,
+           'name': source_name, 'timings': {}}
+    workflow = chain(
+        parse_stage_task.s(ref).set(task_id=pipeline_task_id(job_id, 'parse')),
+        diff_stage_task.s().set(task_id=pipeline_task_id(job_id, 'diff')),
+        write_stage_task.s().set(task_id=pipeline_task_id(job_id, 'write')),
+    )
+    return workflow.apply_async()
+
+
+def sync_pipeline_job(job_store, job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Atualiza um job do pipeline com o estado das suas tasks no result backend
+    
+    Os workers finalizam o job no próprio registro, que a aplicação não
+    enxerga; aqui o registro local passa a STARTED, SUCCESS (com o resultado
+    e a duração das etapas), FAILURE ou CANCELLED conforme as tasks. Sem
+    acesso ao backend o job é devolvido como está.
+    """
+    if not CELERY_AVAILABLE or job is None or job['backend'] != 'celery':
+        return job
+    if job['state'] in FINAL_STATES:
+        return job
+    job_id = job['id']
+    try:
+        tasks = [celery.AsyncResult(pipeline_task_id(job_id, stage)) for stage in PIPELINE_STAGES]
+        states = [task.state for task in tasks]
+        for task, state in zip(tasks, states):
+            if state == 'FAILURE':
+                job_store.finish_job(job_id, 'FAILURE', error=str(task.info))
+                return job_store.get_job(job_id)
+            if state == 'REVOKED':
+                error = task.info.get('error') if isinstance(task.info, dict) else None
+                job_store.finish_job(job_id, 'CANCELLED', error=error or 'Job cancelado')
+                return job_store.get_job(job_id)
+        if states[-1] == 'SUCCESS':
+            result = tasks[-1].result
+            for stage, duration in result.get('timings', {}).items():
+                job_store.record_stage(job_id, stage, duration)
+            job_store.finish_job(job_id, 'SUCCESS', result=result)
+        elif any(state != 'PENDING' for state in states):
+            job_store.mark_started(job_id)
+        else:
+            return job
+    except Exception as e:
+        logger.warning(f"Estado do job {job_id} indisponível no result backend: {str(e)}")
+        return job
+    return job_store.get_job(job_id)
+
+
+def _run_stage(task, ref: Dict[str, Any], run) -> Dict[str, Any]:
+    """
+    Executa uma etapa do pipeline com registro de progresso e cancelamento
+    
+    Falhas e cancelamentos finalizam o job, removem os arquivos intermediários
+    e interrompem a cadeia.
+    """
+    job_id = ref['job_id']
+    job_store = get_job_store()
+    service = _build_service(job_store)
+    tracker = StageTracker(
+        job_store.stage_recorder(job_id),
+        lambda: job_store.is_cancel_requested(job_id) or is_task_revoked(task.request.id)
+    )
+    stage = task.name.rsplit('.', 1)[-1].replace('_stage_task', '')
+    try:
+        job_store.mark_started(job_id)
+        tracker.checkpoint()
+        with profile_run(get_profiler(), 'task', f"{job_id}-{stage}") as profiled:
+            ref = run(service, ref, tracker)
+            profiled.record(tracker.timings)
+        ref['timings'] = dict(ref['timings'], **tracker.timings)
+        return ref
+    except JobCancelledError as e:
+        logger.info(f"Job {job_id} cancelado: {str(e)}")
+        service.discard_pipeline(job_id)
+        job_store.finish_job(job_id, 'CANCELLED', error=str(e))
+        if CELERY_AVAILABLE:
+            # Interrompe a cadeia sem registrar falha; REVOKED no backend
+            # finaliza o job também para a aplicação
+            task.update_state(state='REVOKED', meta={'status': 'Cancelado', 'error': str(e)})
+            raise Ignore()
+        raise
+    except Exception as e:
+        logger.error(f"Erro no job {job_id} ({task.name}): {str(e)}")
+        service.discard_pipeline(job_id)
+        job_store.finish_job(job_id, 'FAILURE', error=str(e))
+        raise
+
+
+@celery.task(bind=True)
+def parse_stage_task(self, ref: Dict[str, Any]):
+    """Etapa de parse (fila de CPU)"""
+    def run(service, ref, tracker):
+        return dict(ref, name=service.parse_stage(ref['name'], ref['job_id'], tracker))
+    return _run_stage(self, ref, run)
+
+
+@celery.task(bind=True)
+def diff_stage_task(self, ref: Dict[str, Any]):
+    """Etapa de diff com o dashboard (fila de CPU)"""
+    def run(service, ref, tracker):
+        return dict(ref, name=service.diff_stage(ref['name'], ref['job_id'], tracker))
+    return _run_stage(self, ref, run)
+
+
+@celery.task(bind=True)
+def write_stage_task(self, ref: Dict[str, Any]):
+    """Etapa de escrita no Google Sheets (fila de I/O); finaliza o job"""
+    def run(service, ref, tracker):
+        result = service.write_stage(ref['name'], ref['filename'], ref['metadata'],
+                                     ref['job_id'], tracker)
+        return dict(ref, name=None, result=result)
+    
+    ref = _run_stage(self, ref, run)
+    result = {
+        'status': 'success',
+        'filename': ref['filename'],
+        'result': ref['result'],
+        'timings': ref['timings'],
+        'message': 'Arquivo processado com sucesso'
+    }
+    get_job_store().finish_job(ref['job_id'], 'SUCCESS', result=result)
+    logger.info(f"Job {ref['job_id']} concluído")
+    return result
+
+
 @celery.task
 def cleanup_old_files():
     """
     Task periódica para limpeza de arquivos antigos
+    
+    Remove os workspaces livres há mais de ``UPLOAD_WORKSPACE_MAX_AGE`` a
+    partir do índice (sem listar a pasta); workspaces de jobs em andamento
+    nunca são removidos. As pastas do pipeline de cadeias perdidas (worker
+    morto) entram como referências abandonadas, e o detalhe das alterações
+    sai ao vencer ``CHANGE_LOG_MAX_AGE``. A quota é aplicada na hora, a cada
+    upload.
     """
     try:
-        upload_folder = Config.UPLOAD_FOLDER
-        if not os.path.exists(upload_folder):
-            return {'status': 'success', 'message': 'Pasta de upload não existe'}
-        
-        import time
-        current_time = time.time()
-        cleaned_count = 0
+        cleaned_count = get_storage().evict_expired()
         
-        # Remover arquivos com mais de 1 hora
-        for filename in os.listdir(upload_folder):
-            filepath = os.path.join(upload_folder, filename)
-            
-            if os.path.isfile(filepath):
-                file_age = current_time - os.path.getctime(filepath)
-                
-                # Se arquivo tem mais de 1 hora (3600 segundos)
-                if file_age > 3600:
-                    os.remove(filepath)
-                    cleaned_count += 1
-                    logger.info(f"Arquivo removido: {filename}")
-        
-        logger.info(f"Limpeza concluída: {cleaned_count} arquivos removidos")
+        logger.info(f"Limpeza concluída: {cleaned_count} workspaces removidos")
         return {
             'status': 'success',
             'cleaned_files': cleaned_count,
-            'message': f'{cleaned_count} arquivos antigos removidos'
+            'message': f'{cleaned_count} workspaces antigos removidos'
         }
         
     except Exception as e:
@@ -147,32 +448,49 @@ def cleanup_old_files():
         return {'status': 'error', 'error': str(e)}
 
 
+def _settings() -> Dict[str, Any]:
+    """Configuração como dicionário, para as fábricas que recebem ``app.config``"""
+    return {name: getattr(Config, name) for name in dir(Config) if name.isupper()}
+
+
+def get_health_registry():
+    """Registro de heartbeats e saúde das dependências (Redis com o Celery)"""
+    global _health_registry
+    if _health_registry is None:
+        from services.health_registry import create_health_registry
+        _health_registry = create_health_registry(_settings(), TASK_BACKEND)
+    return _health_registry
+
+
+def set_health_registry(registry) -> None:
+    """Define o registro de saúde usado pelas tasks (ex.: o da aplicação)"""
+    global _health_registry
+    _health_registry = registry
+
+
+def _sheets_probe() -> bool:
+    """Testa a conexão com o Google Sheets reaproveitando o cliente autorizado"""
+    global _sheets_probe_service
+    if _sheets_probe_service is None:
+        from services.google_sheets_service import GoogleSheetsService
+        _sheets_probe_service = GoogleSheetsService(Config.CREDENTIALS_FILE)
+    return _sheets_probe_service.test_connection()
+
+
 @celery.task
 def health_check():
     """
-    Task de health check para Celery
+    Task periódica de verificação das dependências
+    
+    O resultado é publicado no registro de saúde, de onde o ``/health`` o lê;
+    o cliente do Sheets é autorizado uma vez por processo.
     """
-    try:
-        from services.google_sheets_service import GoogleSheetsService
-        
-        # Testar conexão com Google Sheets
-        sheets_service = GoogleSheetsService(Config.CREDENTIALS_FILE)
-        sheets_ok = sheets_service.test_connection()
-        
-        return {
-            'status': 'healthy',
-            'timestamp': time.time(),
-            'google_sheets': 'ok' if sheets_ok else 'error',
-            'worker_id': 'celery_worker'
-        }
-        
-    except Exception as e:
-        logger.error(f"Health check falhou: {str(e)}")
-        return {
-            'status': 'unhealthy',
-            'error': str(e),
-            'timestamp': time.time()
-        }
+    from services.health_registry import run_probe
+    
+    status = run_probe(get_health_registry(), 'google_sheets', _sheets_probe)
+    if status != 'healthy':
+        logger.warning(f"Health check do Google Sheets: {status}")
+    return {'status': status, 'timestamp': time.time()}
 
 
 # Configurar tasks periódicas
@@ -186,6 +504,30 @@ if CELERY_AVAILABLE:
         },
         'health-check': {
             'task': 'services.celery_tasks.health_check',
-            'schedule': 30.0,  # A cada 30 segundos
+            'schedule': float(Config.HEALTH_CHECK_INTERVAL),
         },
     }
+    
+    @worker_ready.connect
+    def start_worker_heartbeat(sender=None, **kwargs):
+        """Publica o heartbeat do worker enquanto ele estiver no ar"""
+        global _heartbeat
+        from services.health_registry import HeartbeatPublisher, create_health_registry
+        
+        hostname = getattr(sender, 'hostname', None) or socket.gethostname()
+        try:
+            queues = sorted(q.name for q in sender.task_consumer.queues)
+        except Exception:
+            queues = []
+        # Registro próprio: o processo principal do worker não executa tasks
+        _heartbeat = HeartbeatPublisher(
+            create_health_registry(_settings(), TASK_BACKEND), f"worker:{hostname}",
+            interval=Config.HEALTH_HEARTBEAT_INTERVAL,
+            details={'hostname': hostname, 'queues': queues}
+        )
+        _heartbeat.ensure_started()
+    
+    @worker_shutdown.connect
+    def stop_worker_heartbeat(sender=None, **kwargs):
+        if _heartbeat is not None:
+            _heartbeat.stop()
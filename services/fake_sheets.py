@@ -0,0 +1,362 @@
+"""
+Backend falso do Google Sheets, em memória
+
+Implementa o subconjunto da API do gspread usado pela aplicação e por
+``iniciar_processo.py`` (open, create, get_all_values, update, update_cells,
+append_rows, clear, list_permissions), com latência por chamada, limites de
+payload e injeção de erros 429 configuráveis. Permite medir vazão e o
+comportamento sob cota sem acessar a API real (CI, desenvolvimento offline).
+
+Uso:
+    backend = FakeSheetsBackend(latency=0.2, requests_per_minute=60)
+    client = backend.client()
+    worksheet = client.create('Dashboard').sheet1
+"""
+import json
+import time
+import uuid
+import random
+import threading
+from collections import Counter, deque
+from typing import Dict, Any, List, Optional
+
+import requests
+from gspread.exceptions import APIError, SpreadsheetNotFound, WorksheetNotFound
+from gspread.utils import a1_to_rowcol
+
+
+DEFAULT_ROWS = 1000
+DEFAULT_COLS = 26
+
+
+def _api_error(code: int, message: str, status: str) -> APIError:
+    """Cria um APIError idêntico ao que o gspread levanta para respostas de erro"""
+    response = requests.Response()
+    response.status_code = code
+    response._content = json.dumps({
+        'error': {'code': code, 'message': message, 'status': status}
+    }).encode('utf-8')
+    return APIError(response)
+
+
+def _cell_text(value: Any) -> str:
+    """Converte um valor no texto exibido pelo Sheets (USER_ENTERED)"""
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+class FakeSheetsBackend:
+    """
+    Estado compartilhado das planilhas falsas e parâmetros de simulação
+
+    Args:
+        latency: Atraso fixo por chamada à API (segundos)
+        latency_per_cell: Atraso adicional por célula enviada ou lida
+        max_payload_bytes: Tamanho máximo do corpo JSON de uma escrita
+        max_cells: Limite de células por planilha (10 milhões no Sheets)
+        requests_per_minute: Cota de chamadas por minuto; acima dela, erro 429
+        quota_error_rate: Probabilidade de um 429 aleatório em cada chamada
+        strict_grid: Se True, ``update`` fora da grade falha como na API real;
+            se False, a grade cresce automaticamente
+        store_values: Se False, escritas só são contabilizadas (sem guardar os
+            valores), para testes de carga não medirem a memória do próprio fake
+        seed: Semente do gerador de erros aleatórios
+    """
+
+    def __init__(self, latency: float = 0.0, latency_per_cell: float = 0.0,
+                 max_payload_bytes: Optional[int] = None, max_cells: int = 10_000_000,
+                 requests_per_minute: Optional[int] = None, quota_error_rate: float = 0.0,
+                 strict_grid: bool = False, store_values: bool = True,
+                 seed: Optional[int] = None):
+        self.latency = latency
+        self.latency_per_cell = latency_per_cell
+        self.max_payload_bytes = max_payload_bytes
+        self.max_cells = max_cells
+        self.requests_per_minute = requests_per_minute
+        self.quota_error_rate = quota_error_rate
+        self.strict_grid = strict_grid
+        self.store_values = store_values
+
+        self.spreadsheets: Dict[str, 'FakeSpreadsheet'] = {}
+        self.calls: Counter = Counter()
+        self.errors: Counter = Counter()
+
+        self._random = random.Random(seed)
+        self._recent_calls: deque = deque()
+        self._lock = threading.RLock()
+
+    def client(self) -> 'FakeClient':
+        return FakeClient(self)
+
+    def stats(self) -> Dict[str, Any]:
+        """Contagem de chamadas e erros por método"""
+        with self._lock:
+            return {
+                'calls': dict(self.calls),
+                'errors': dict(self.errors),
+                'spreadsheets': len(self.spreadsheets),
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.spreadsheets.clear()
+            self.calls.clear()
+            self.errors.clear()
+            self._recent_calls.clear()
+
+    def api_call(self, method: str, cells: int = 0, payload: Any = None) -> None:
+        """
+        Simula uma chamada à API: cota, tamanho do payload e latência
+
+        Raises:
+            APIError: 429 (cota) ou 400 (payload grande demais)
+            TypeError/ValueError: payload não serializável em JSON, como
+                acontece no gspread real com NaN ou tipos do numpy
+        """
+        with self._lock:
+            self.calls[method] += 1
+            now = time.monotonic()
+
+            if self.requests_per_minute is not None:
+                while self._recent_calls and now - self._recent_calls[0] > 60:
+                    self._recent_calls.popleft()
+                if len(self._recent_calls) >= self.requests_per_minute:
+                    self.errors['429'] += 1
+                    raise _api_error(429, 'Quota exceeded for quota metric "Write requests" '
+                                          'and limit "Write requests per minute per user"',
+                                     'RESOURCE_EXHAUSTED')
+                self._recent_calls.append(now)
+
+            if self.quota_error_rate and self._random.random() < self.quota_error_rate:
+                self.errors['429'] += 1
+                raise _api_error(429, 'Quota exceeded (injected)', 'RESOURCE_EXHAUSTED')
+
+        if payload is not None:
+            body = json.dumps({'values': payload}, allow_nan=False)
+            if self.max_payload_bytes is not None and len(body) > self.max_payload_bytes:
+                with self._lock:
+                    self.errors['400'] += 1
+                raise _api_error(400, f'Request payload size exceeds the limit: '
+                                      f'{self.max_payload_bytes} bytes.', 'INVALID_ARGUMENT')
+
+        delay = self.latency + cells * self.latency_per_cell
+        if delay > 0:
+            time.sleep(delay)
+
+
+class FakeClient:
+    """Equivalente a ``gspread.Client``"""
+
+    def __init__(self, backend: FakeSheetsBackend):
+        self.backend = backend
+
+    def open(self, title: str) -> 'FakeSpreadsheet':
+        self.backend.api_call('open')
+        with self.backend._lock:
+            for spreadsheet in self.backend.spreadsheets.values():
+                if spreadsheet.title == title:
+                    return spreadsheet
+        raise SpreadsheetNotFound(title)
+
+    def open_by_key(self, key: str) -> 'FakeSpreadsheet':
+        self.backend.api_call('open_by_key')
+        with self.backend._lock:
+            if key in self.backend.spreadsheets:
+                return self.backend.spreadsheets[key]
+        raise SpreadsheetNotFound(key)
+
+    def create(self, title: str, folder_id: Optional[str] = None) -> 'FakeSpreadsheet':
+        self.backend.api_call('create')
+        spreadsheet = FakeSpreadsheet(self.backend, title)
+        with self.backend._lock:
+            self.backend.spreadsheets[spreadsheet.id] = spreadsheet
+        return spreadsheet
+
+    def openall(self, title: Optional[str] = None) -> List['FakeSpreadsheet']:
+        self.backend.api_call('openall')
+        with self.backend._lock:
+            return [s for s in self.backend.spreadsheets.values() if title in (None, s.title)]
+
+    def list_permissions(self, file_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        self.backend.api_call('list_permissions')
+        return [{'id': 'fake-owner', 'type': 'user', 'role': 'owner'}]
+
+
+class FakeSpreadsheet:
+    """Equivalente a ``gspread.Spreadsheet``"""
+
+    def __init__(self, backend: FakeSheetsBackend, title: str):
+        self.backend = backend
+        self.id = uuid.uuid4().hex
+        self.title = title
+        self._worksheets: List[FakeWorksheet] = [FakeWorksheet(self, 'Sheet1', 0)]
+
+    @property
+    def url(self) -> str:
+        return f"https://docs.google.com/spreadsheets/d/{self.id}"
+
+    @property
+    def sheet1(self) -> 'FakeWorksheet':
+        return self._worksheets[0]
+
+    def worksheets(self) -> List['FakeWorksheet']:
+        self.backend.api_call('worksheets')
+        return list(self._worksheets)
+
+    def worksheet(self, title: str) -> 'FakeWorksheet':
+        self.backend.api_call('worksheet')
+        for worksheet in self._worksheets:
+            if worksheet.title == title:
+                return worksheet
+        raise WorksheetNotFound(title)
+
+    def add_worksheet(self, title: str, rows: int = DEFAULT_ROWS, cols: int = DEFAULT_COLS,
+                      index: Optional[int] = None) -> 'FakeWorksheet':
+        self.backend.api_call('add_worksheet')
+        worksheet = FakeWorksheet(self, title, len(self._worksheets), rows, cols)
+        self._worksheets.append(worksheet)
+        return worksheet
+
+    def total_cells(self) -> int:
+        return sum(ws.row_count * ws.col_count for ws in self._worksheets)
+
+
+class FakeWorksheet:
+    """Equivalente a ``gspread.Worksheet``, com os valores em uma grade de strings"""
+
+    def __init__(self, spreadsheet: FakeSpreadsheet, title: str, index: int,
+                 rows: int = DEFAULT_ROWS, cols: int = DEFAULT_COLS):
+        self.spreadsheet = spreadsheet
+        self.backend = spreadsheet.backend
+        self.title = title
+        self.index = index
+        self.id = index
+        self.row_count = rows
+        self.col_count = cols
+        self._values: List[List[str]] = []
+
+    def load(self, values: List[List[Any]]) -> None:
+        """Preenche a aba diretamente, sem contar como chamada à API (para testes)"""
+        with self.backend._lock:
+            self._values = [[_cell_text(v) for v in row] for row in values]
+            self._fit(len(self._values), max((len(r) for r in self._values), default=0))
+
+    def get_all_values(self, **kwargs) -> List[List[str]]:
+        with self.backend._lock:
+            width = max((len(row) for row in self._values), default=0)
+            values = [row + [''] * (width - len(row)) for row in self._values]
+        self.backend.api_call('get_all_values', cells=len(values) * width)
+        return values
+
+    def update(self, *args, value_input_option: Optional[str] = None, **kwargs) -> Dict[str, Any]:
+        """Aceita ``update(values, range_name)`` e a ordem antiga ``update('A1', values)``"""
+        values = kwargs.get('values')
+        range_name = kwargs.get('range_name')
+        for arg in args:
+            if isinstance(arg, str):
+                range_name = arg
+            else:
+                values = arg
+        values = values or []
+
+        start_row, start_col = a1_to_rowcol(range_name.split('!')[-1].split(':')[0]) if range_name else (1, 1)
+        cells = sum(len(row) for row in values)
+        self.backend.api_call('update', cells=cells, payload=values)
+
+        with self.backend._lock:
+            last_row = start_row + len(values) - 1
+            last_col = start_col + max((len(row) for row in values), default=1) - 1
+            if self.backend.strict_grid and (last_row > self.row_count or last_col > self.col_count):
+                raise _api_error(400, f'Range ({self.title}!{range_name}) exceeds grid limits. '
+                                      f'Max rows: {self.row_count}, max columns: {self.col_count}',
+                                 'INVALID_ARGUMENT')
+            self._fit(last_row, last_col)
+            if not self.backend.store_values:
+                values = []
+            for r, row in enumerate(values):
+                for c, value in enumerate(row):
+                    self._set(start_row + r, start_col + c, value)
+
+        return {'updatedCells': cells, 'updatedRange': f"{self.title}!{range_name or 'A1'}"}
+
+    def update_cells(self, cell_list, value_input_option: str = 'RAW') -> Dict[str, Any]:
+        payload = [[cell.value] for cell in cell_list]
+        self.backend.api_call('update_cells', cells=len(cell_list), payload=payload)
+
+        with self.backend._lock:
+            for cell in cell_list:
+                self._fit(cell.row, cell.col)
+                if self.backend.store_values:
+                    self._set(cell.row, cell.col, cell.value)
+
+        return {'updatedCells': len(cell_list)}
+
+    def append_rows(self, values: List[List[Any]], value_input_option: str = 'RAW',
+                    **kwargs) -> Dict[str, Any]:
+        cells = sum(len(row) for row in values)
+        self.backend.api_call('append_rows', cells=cells, payload=values)
+
+        with self.backend._lock:
+            start_row = len(self._values) + 1
+            self._fit(start_row + len(values) - 1, max((len(row) for row in values), default=1))
+            if not self.backend.store_values:
+                values = []
+            for r, row in enumerate(values):
+                for c, value in enumerate(row):
+                    self._set(start_row + r, c + 1, value)
+
+        return {'updates': {'updatedRows': len(values), 'updatedCells': cells}}
+
+    def clear(self) -> Dict[str, Any]:
+        self.backend.api_call('clear')
+        with self.backend._lock:
+            self._values = []
+        return {'clearedRange': self.title}
+
+    def _fit(self, rows: int, cols: int) -> None:
+        """Garante que a grade comporta ``rows`` x ``cols`` (chamado com o lock)"""
+        new_rows = max(self.row_count, rows)
+        new_cols = max(self.col_count, cols)
+        growth = new_rows * new_cols - self.row_count * self.col_count
+        if growth > 0 and self.spreadsheet.total_cells() + growth > self.backend.max_cells:
+            raise _api_error(400, 'This action would increase the number of cells in the '
+                                  f'workbook above the limit of {self.backend.max_cells} cells.',
+                             'INVALID_ARGUMENT')
+        self.row_count, self.col_count = new_rows, new_cols
+
+    def _set(self, row: int, col: int, value: Any) -> None:
+        while len(self._values) < row:
+            self._values.append([])
+        target = self._values[row - 1]
+        if len(target) < col:
+            target.extend([''] * (col - len(target)))
+        target[col - 1] = _cell_text(value)
+
+
+_shared_backend: Optional[FakeSheetsBackend] = None
+_shared_lock = threading.Lock()
+
+
+def shared_backend(**options) -> FakeSheetsBackend:
+    """
+    Backend único do processo, compartilhado entre o serviço da aplicação e as
+    tasks locais. Opções só têm efeito na primeira chamada ou via ``configure``.
+    """
+    global _shared_backend
+    with _shared_lock:
+        if _shared_backend is None:
+            _shared_backend = FakeSheetsBackend(**options)
+        return _shared_backend
+
+
+def configure_shared_backend(**options) -> FakeSheetsBackend:
+    """Substitui o backend compartilhado por um novo com as opções dadas"""
+    global _shared_backend
+    with _shared_lock:
+        _shared_backend = FakeSheetsBackend(**options)
+        return _shared_backend
@@ -2,92 +2,190 @@
 Serviço de processamento de arquivos
 """
 import os
+import json
+import uuid
+import shutil
+import tempfile
 import logging
-from typing import Dict, Any, Optional
+from contextlib import nullcontext
+from typing import Dict, Any, Optional, Callable
 from werkzeug.datastructures import FileStorage
 
-from exceptions.errors import ProcessingError, GoogleSheetsError
+from exceptions.errors import ProcessingError, GoogleSheetsError, JobCancelledError, QueueFullError
 from utils.validators import FileValidator
-from .google_sheets_service import GoogleSheetsService
+from utils.progress import StageTracker, ProgressCallback
+from utils.change_log import ChangeLog
+from services.storage_manager import StorageManager
+from services.pipeline_store import LocalPipelineStore
 
 
 logger = logging.getLogger(__name__)
 
 
+def _json_scalar(value: Any) -> Any:
+    """Escalares do numpy/pandas vindos do DataFrame como valores do JSON"""
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
 class FileProcessingService:
     """Serviço responsável pelo processamento de arquivos"""
     
-    def __init__(self, upload_folder: str, credentials_file: str):
+    def __init__(self, upload_folder: str, credentials_file: str, job_store=None,
+                 sheets_backend: str = 'google', processing_mode: str = 'copy',
+                 dashboard: Optional[Dict[str, str]] = None,
+                 change_log_folder: str = 'change_logs', change_log_sample_size: int = 50,
+                 write_batch_size: int = 5000, governor=None,
+                 pipeline_folder: str = 'pipeline', storage: Optional[StorageManager] = None,
+                 change_log_max_age: Optional[float] = None, pipeline_store=None):
         self.upload_folder = upload_folder
         self.validator = FileValidator()
-        self.sheets_service = GoogleSheetsService(credentials_file)
+        self.credentials_file = credentials_file
+        self.sheets_backend = sheets_backend
+        self.write_batch_size = write_batch_size
+        self._sheets_service = None
+        self.job_store = job_store
+        self.processing_mode = processing_mode
+        # {'sheet': nome da planilha, 'tab': nome da aba} no modo 'dashboard'
+        self.dashboard = dashboard or {}
+        self.change_log_folder = change_log_folder
+        self.change_log_sample_size = change_log_sample_size
+        # Validade do detalhe das alterações (None: idade máxima dos workspaces)
+        self.change_log_max_age = change_log_max_age
+        # ProcessingGovernor opcional: limita parses simultâneos e memória
+        self.governor = governor
+        # Workspaces por job na pasta de upload (índice em memória se não informado)
+        self.storage = storage or StorageManager(upload_folder)
+        
+        # Resultados intermediários das etapas em tasks separadas (Redis com o
+        # Celery; sem store informado, ``pipeline_folder`` nesta máquina)
+        self.pipeline_store = pipeline_store or LocalPipelineStore(pipeline_folder, self.storage)
+    
+    @property
+    def sheets_service(self):
+        """
+        Serviço do Google Sheets (lazy loading)
         
-        # Criar pasta de upload se não existir
-        os.makedirs(upload_folder, exist_ok=True)
+        pandas, gspread e google-auth só são importados no primeiro uso, para
+        que a aplicação suba e responda ao /health sem carregá-los.
+        """
+        if self._sheets_service is None:
+            from .google_sheets_service import GoogleSheetsService
+            self._sheets_service = GoogleSheetsService(
+                self.credentials_file, backend=self.sheets_backend, batch_size=self.write_batch_size
+            )
+        return self._sheets_service
     
-    def process_file(self, file: FileStorage, metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    @sheets_service.setter
+    def sheets_service(self, service) -> None:
+        self._sheets_service = service
+    
+    def process_file(self, file: FileStorage, metadata: Optional[Dict[str, Any]] = None,
+                     progress: Optional[ProgressCallback] = None,
+                     cancel_check: Optional[Callable[[], bool]] = None,
+                     background: bool = False) -> Dict[str, Any]:
         """
         Processa um arquivo enviado
         
         Args:
             file: Arquivo enviado
             metadata: Metadados adicionais
+            progress: Callback notificado no início e no fim de cada etapa e a
+                cada marco ('validated', 'parsed', 'diff_computed', 'batch_written')
+            cancel_check: Consultado entre blocos, linhas e lotes; se devolver
+                True o processamento para em um limite de lote
+            background: Chamado por uma task (sem limite de fila no governor)
             
         Returns:
             Resultado do processamento
             
         Raises:
             ProcessingError: Erro durante o processamento
+            JobCancelledError: Job cancelado durante o processamento
+            QueueFullError: Sem vaga de processamento (fila cheia ou espera longa)
         """
+        tracker = StageTracker(progress, cancel_check)
+        job_id = (metadata or {}).get('job_id') or str(uuid.uuid4())
         try:
             # Validar arquivo
-            self.validator.validate_file(file)
+            with tracker.stage('validate'):
+                self.validator.validate_file(file)
+            tracker.notify('validated', filename=file.filename)
+            tracker.checkpoint()
             
-            # Salvar arquivo com nome seguro
+            # Salvar arquivo com nome seguro no workspace do job (removido ao final)
             filename = self.validator.secure_filename(file.filename)
-            filepath = os.path.join(self.upload_folder, filename)
-            
-            logger.info(f"Salvando arquivo: {filename}")
-            file.save(filepath)
-            
-            # Processar arquivo baseado na extensão
-            result = self._process_by_type(filepath, metadata or {})
-            
-            # Limpar arquivo após processamento
-            self._cleanup_file(filepath)
+            with self.storage.workspace(job_id) as workspace:
+                filepath = os.path.join(workspace, filename)
+                
+                logger.info(f"Salvando arquivo: {filename}")
+                with tracker.stage('save'):
+                    self.storage.reserve(job_id, self._file_size(file))
+                    file.save(filepath)
+                
+                # Processar arquivo baseado na extensão (com vaga no governor, se houver)
+                admission = nullcontext()
+                if self.governor is not None:
+                    admission = self.governor.slot(os.path.getsize(filepath), filename,
+                                                   bounded=not background)
+                with admission:
+                    result = self._process_by_type(filepath, metadata or {}, tracker)
             
             logger.info(f"Processamento concluído: {filename}")
             return {
                 'status': 'success',
                 'filename': filename,
                 'result': result,
+                'timings': tracker.timings,
                 'message': 'Arquivo processado com sucesso'
             }
             
+        except JobCancelledError as e:
+            logger.info(f"Processamento cancelado: {str(e)}")
+            raise
+        except QueueFullError as e:
+            logger.warning(f"Processamento recusado: {str(e)}")
+            raise
         except Exception as e:
             logger.error(f"Erro no processamento: {str(e)}")
-            if 'filepath' in locals():
-                self._cleanup_file(filepath)
             raise ProcessingError(f"Erro no processamento: {str(e)}")
     
-    def _process_by_type(self, filepath: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    @staticmethod
+    def _file_size(file: FileStorage) -> int:
+        position = file.stream.tell()
+        file.stream.seek(0, os.SEEK_END)
+        size = file.stream.tell()
+        file.stream.seek(position)
+        return size
+    
+    def _process_by_type(self, filepath: str, metadata: Dict[str, Any],
+                         tracker: StageTracker) -> Dict[str, Any]:
         """Processa arquivo baseado no tipo"""
         extension = os.path.splitext(filepath)[1].lower()
         
         if extension in ['.xlsx', '.xls', '.csv', '.ods']:
-            return self._process_spreadsheet(filepath, metadata)
+            if self.processing_mode == 'dashboard':
+                return self._sync_dashboard(filepath, metadata, tracker)
+            return self._process_spreadsheet(filepath, metadata, tracker)
         else:
             raise ProcessingError(f"Tipo de arquivo não suportado: {extension}")
     
-    def _process_spreadsheet(self, filepath: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+    def _process_spreadsheet(self, filepath: str, metadata: Dict[str, Any],
+                             tracker: StageTracker) -> Dict[str, Any]:
         """Processa planilhas"""
         try:
             # Aqui você pode integrar com o código do iniciar_processo.py
             # Por enquanto, vamos fazer uma simulação
             logger.info(f"Processando planilha: {filepath}")
             
-            # Simular upload para Google Sheets
-            result = self.sheets_service.upload_file(filepath, metadata)
+            df = self._read_base(filepath, tracker)
+            
+            with tracker.stage('write'):
+                result = self.sheets_service.write_dataframe(
+                    df, filepath, metadata, on_batch=self._batch_notifier(tracker),
+                    checkpoint=tracker.checkpoint
+                )
             
             return {
                 'type': 'spreadsheet',
@@ -95,10 +193,238 @@ class FileProcessingService:
                 'processed_rows': result.get('rows', 0)
             }
             
+        except JobCancelledError:
+            raise
         except Exception as e:
             logger.error(f"Erro ao processar planilha: {str(e)}")
             raise GoogleSheetsError(f"Erro no Google Sheets: {str(e)}")
     
+    def _sync_dashboard(self, filepath: str, metadata: Dict[str, Any],
+                        tracker: StageTracker) -> Dict[str, Any]:
+        """
+        Sincroniza a base com o dashboard
+        
+        O resultado leva só o resumo das alterações (contagens por coluna e uma
+        amostra); o detalhe completo fica em ``change_log_path(job_id)``.
+        """
+        from iniciar_processo import montar_payload
+        
+        job_id = metadata.get('job_id') or str(uuid.uuid4())
+        details_path = self._open_change_log(job_id)
+        try:
+            df_base = self._read_base(filepath, tracker)
+            
+            with ChangeLog(details_path, sample_size=self.change_log_sample_size) as change_log:
+                worksheet, alteracoes, novas_linhas = self._compute_changes(df_base, change_log, tracker)
+                
+                with tracker.stage('write'):
+                    self.sheets_service.write_changes(
+                        worksheet, montar_payload(alteracoes), novas_linhas,
+                        on_batch=self._batch_notifier(tracker),
+                        checkpoint=tracker.checkpoint
+                    )
+            
+            self._close_change_log(job_id)
+            logger.info(f"Dashboard sincronizado: {change_log.counts['update']} células, "
+                        f"{change_log.counts['new']} novas linhas")
+            return {
+                'type': 'dashboard_sync',
+                'changes': change_log.summary()
+            }
+            
+        except Exception as e:
+            # Alterações não aplicadas não devem ficar disponíveis para download
+            self.discard_change_log(job_id)
+            logger.error(f"Erro ao sincronizar dashboard: {str(e)}")
+            if isinstance(e, (GoogleSheetsError, JobCancelledError)):
+                raise
+            raise GoogleSheetsError(f"Erro na sincronização: {str(e)}")
+    
+    def _read_base(self, filepath: str, tracker: StageTracker):
+        """Etapa de parse (no modo 'dashboard', normalizada como no iniciar_processo)"""
+        from utils.dataframes import describe_report
+        
+        memory = {}
+        with tracker.stage('parse'):
+            if self.processing_mode == 'dashboard':
+                from iniciar_processo import ler_base, normalizar_base
+                df = normalizar_base(ler_base(filepath, checkpoint=tracker.checkpoint, memoria=memory))
+            else:
+                df = self.sheets_service.read_dataframe(filepath, checkpoint=tracker.checkpoint,
+                                                        memory_report=memory)
+        usage = describe_report(memory)
+        logger.info(f"Base lida: {len(df)} linhas, {usage['memory_before_mb']} MB -> "
+                    f"{usage['memory_mb']} MB em memória")
+        tracker.notify('parsed', rows=len(df), **usage)
+        return df
+    
+    def _compute_changes(self, df_base, change_log: ChangeLog, tracker: StageTracker):
+        """
+        Etapa de diff: compara a base com o dashboard
+        
+        Returns:
+            (aba do dashboard, alterações, novas linhas)
+        """
+        from iniciar_processo import indexar_cabecalhos, casar_registros, calcular_diferencas
+        
+        with tracker.stage('diff'):
+            worksheet = self.sheets_service.open_worksheet(
+                self.dashboard.get('sheet'), self.dashboard.get('tab')
+            )
+            valores = worksheet.get_all_values()
+            if not valores:
+                raise GoogleSheetsError("A planilha do Google Sheets está vazia.")
+            
+            cabecalhos, linhas = valores[0], valores[1:]
+            indices = indexar_cabecalhos(cabecalhos)
+            pares = casar_registros(df_base, linhas, indices, checkpoint=tracker.checkpoint)
+            alteracoes, novas_linhas = calcular_diferencas(
+                pares, df_base, linhas, cabecalhos, indices, change_log,
+                checkpoint=tracker.checkpoint
+            )
+        tracker.notify('diff_computed', updated_cells=len(alteracoes), new_rows=len(novas_linhas))
+        return worksheet, alteracoes, novas_linhas
+    
+    # --- Etapas em tasks separadas (parse -> diff -> write) --------------------
+    #
+    # Cada etapa lê o resultado da anterior do ``pipeline_store`` e devolve o
+    # nome do seu próprio resultado, de modo que as tasks trocam só referências
+    # e podem rodar em workers (e máquinas) diferentes. Os resultados são JSON
+    # (nunca pickle): quem consegue gravar no armazenamento não executa código
+    # nos workers. O job é descartado na escrita, numa falha ou no cancelamento.
+    
+    def stage_source(self, file: FileStorage, job_id: str) -> str:
+        """
+        Grava o arquivo enviado como primeiro resultado do job; devolve o nome
+        
+        Raises:
+            QueueFullError: Quota de armazenamento esgotada
+        """
+        name = self.validator.secure_filename(file.filename)
+        file.seek(0)
+        self.pipeline_store.put(job_id, name, file.read())
+        file.seek(0)
+        return name
+    
+    def parse_stage(self, source_name: str, job_id: str, tracker: StageTracker) -> str:
+        """Lê o arquivo e grava o DataFrame (JSON); devolve o nome do resultado"""
+        from utils.dataframes import dataframe_to_json
+        
+        # Os leitores do pandas escolhem o formato pela extensão do arquivo
+        with tempfile.TemporaryDirectory(prefix=f"pipeline-{job_id}-") as folder:
+            path = os.path.join(folder, source_name)
+            with open(path, 'wb') as f:
+                f.write(self.pipeline_store.get(job_id, source_name))
+            df = self._read_base(path, tracker)
+        
+        self.pipeline_store.put(job_id, 'parsed.json', dataframe_to_json(df))
+        self.pipeline_store.remove(job_id, source_name)
+        return 'parsed.json'
+    
+    def diff_stage(self, parsed_name: str, job_id: str, tracker: StageTracker) -> str:
+        """
+        Calcula as alterações do dashboard e grava o resultado; devolve o nome
+        
+        No modo 'copy' não há diff: o DataFrame segue direto para a escrita.
+        """
+        if self.processing_mode != 'dashboard':
+            return parsed_name
+        
+        from utils.dataframes import dataframe_from_json
+        df_base = dataframe_from_json(self.pipeline_store.get(job_id, parsed_name))
+        details_path = self._open_change_log(job_id)
+        try:
+            with ChangeLog(details_path, sample_size=self.change_log_sample_size) as change_log:
+                _, alteracoes, novas_linhas = self._compute_changes(df_base, change_log, tracker)
+        except Exception:
+            self.discard_change_log(job_id)
+            raise
+        self._close_change_log(job_id)
+        
+        diff = {'changes': alteracoes, 'new_rows': novas_linhas, 'summary': change_log.summary()}
+        self.pipeline_store.put(job_id, 'diff.json',
+                                json.dumps(diff, ensure_ascii=False, default=_json_scalar).encode('utf-8'))
+        self.pipeline_store.remove(job_id, parsed_name)
+        return 'diff.json'
+    
+    def write_stage(self, data_name: str, filename: str, metadata: Dict[str, Any],
+                    job_id: str, tracker: StageTracker) -> Dict[str, Any]:
+        """Aplica o resultado das etapas anteriores no Google Sheets"""
+        data = self.pipeline_store.get(job_id, data_name)
+        if self.processing_mode == 'dashboard':
+            from iniciar_processo import montar_payload
+            
+            diff = json.loads(data)
+            try:
+                with tracker.stage('write'):
+                    worksheet = self.sheets_service.open_worksheet(
+                        self.dashboard.get('sheet'), self.dashboard.get('tab')
+                    )
+                    self.sheets_service.write_changes(
+                        worksheet, montar_payload(diff['changes']), diff['new_rows'],
+                        on_batch=self._batch_notifier(tracker),
+                        checkpoint=tracker.checkpoint
+                    )
+            except Exception:
+                # Alterações não aplicadas não devem ficar disponíveis para download
+                self.discard_change_log(job_id)
+                raise
+            result = {'type': 'dashboard_sync', 'changes': diff['summary']}
+        else:
+            from utils.dataframes import dataframe_from_json
+            df = dataframe_from_json(data)
+            with tracker.stage('write'):
+                written = self.sheets_service.write_dataframe(
+                    df, filename, metadata, on_batch=self._batch_notifier(tracker),
+                    checkpoint=tracker.checkpoint
+                )
+            result = {
+                'type': 'spreadsheet',
+                'sheets_url': written.get('url'),
+                'processed_rows': written.get('rows', 0)
+            }
+        
+        self.discard_pipeline(job_id)
+        return result
+    
+    def discard_pipeline(self, job_id: str) -> None:
+        """Remove os resultados intermediários de um job"""
+        self.pipeline_store.discard(job_id)
+    
+    @staticmethod
+    def _batch_notifier(tracker: StageTracker):
+        def on_batch(batch: int, total: int) -> None:
+            tracker.notify('batch_written', batch=batch, total=total)
+        return on_batch
+    
+    def change_log_path(self, job_id: str) -> str:
+        """Arquivo NDJSON com o detalhe das alterações de um job"""
+        return os.path.join(self.change_log_folder, job_id, 'changes.ndjson')
+    
+    @staticmethod
+    def change_log_workspace(job_id: str) -> str:
+        """Chave do workspace do detalhe das alterações no StorageManager"""
+        return f"changes:{job_id}"
+    
+    def _open_change_log(self, job_id: str) -> str:
+        """Registra a pasta do detalhe (validade ``change_log_max_age``); devolve o arquivo"""
+        self.storage.acquire(self.change_log_workspace(job_id),
+                             folder=os.path.dirname(self.change_log_path(job_id)),
+                             ttl=self.change_log_max_age)
+        return self.change_log_path(job_id)
+    
+    def _close_change_log(self, job_id: str) -> None:
+        """Registra o tamanho do detalhe e o libera até vencer (ou sair pela quota)"""
+        key = self.change_log_workspace(job_id)
+        path = self.change_log_path(job_id)
+        self.storage.set_size(key, os.path.getsize(path) if os.path.exists(path) else 0)
+        self.storage.release(key)
+    
+    def discard_change_log(self, job_id: str) -> None:
+        """Remove o detalhe das alterações de um job e sua entrada no índice"""
+        self.storage.release(self.change_log_workspace(job_id), discard=True)
+        shutil.rmtree(os.path.dirname(self.change_log_path(job_id)), ignore_errors=True)
+    
     def _cleanup_file(self, filepath: str) -> None:
         """Remove arquivo após processamento"""
         try:
@@ -109,6 +435,11 @@ class FileProcessingService:
             logger.warning(f"Erro ao remover arquivo {filepath}: {str(e)}")
     
     def get_processing_status(self, task_id: str) -> Dict[str, Any]:
-        """Obtém status de processamento (para tasks assíncronas)"""
-        # Implementar quando adicionar Celery
-        return {'status': 'not_implemented'}
+        """Obtém status de processamento a partir do registro de jobs"""
+        if self.job_store is None:
+            return {'status': 'not_implemented'}
+        
+        job = self.job_store.get_job(task_id)
+        if job is None:
+            return {'status': 'not_found'}
+        return job
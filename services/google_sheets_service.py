@@ -2,24 +2,39 @@
 Serviço do Google Sheets
 """
 import os
+import math
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable, List, TYPE_CHECKING
 import gspread
-import pandas as pd
 from google.oauth2.service_account import Credentials
 
-from exceptions.errors import GoogleSheetsError
+if TYPE_CHECKING:
+    import pandas as pd
+
+from exceptions.errors import GoogleSheetsError, JobCancelledError
 
 
 logger = logging.getLogger(__name__)
 
+# Chamado após cada lote gravado com (lote atual, total de lotes)
+BatchCallback = Callable[[int, int], None]
+
+# Ponto de cancelamento: levanta JobCancelledError se o job foi cancelado
+Checkpoint = Callable[[], None]
+
+CSV_CHUNK_ROWS = 50000
+
 
 class GoogleSheetsService:
     """Serviço para integração com Google Sheets"""
     
-    def __init__(self, credentials_file: str):
+    def __init__(self, credentials_file: str, client=None, backend: str = 'google',
+                 batch_size: int = 5000):
         self.credentials_file = credentials_file
-        self._client = None
+        self.backend = backend
+        self._client = client
+        # Linhas (ou células, em update_cells) por chamada de escrita à API
+        self.batch_size = batch_size
     
     @property
     def client(self):
@@ -30,6 +45,11 @@ class GoogleSheetsService:
     
     def _create_client(self):
         """Cria cliente do Google Sheets"""
+        if self.backend == 'fake':
+            # Backend em memória (testes, benchmarks e desenvolvimento offline)
+            from services.fake_sheets import shared_backend
+            return shared_backend().client()
+        
         try:
             if not os.path.exists(self.credentials_file):
                 raise GoogleSheetsError(f"Arquivo de credenciais não encontrado: {self.credentials_file}")
@@ -66,19 +86,56 @@ class GoogleSheetsService:
         Raises:
             GoogleSheetsError: Erro durante o upload
         """
+        df = self.read_dataframe(filepath)
+        return self.write_dataframe(df, filepath, metadata)
+    
+    def read_dataframe(self, filepath: str, checkpoint: Optional[Checkpoint] = None,
+                       memory_report: Optional[Dict[str, int]] = None) -> 'pd.DataFrame':
+        """
+        Lê o arquivo em um DataFrame de acordo com a extensão (CSV em blocos)
+        
+        As colunas são compactadas logo após a leitura (de cada bloco, no CSV);
+        ``memory_report`` acumula o tamanho antes e depois (utils/dataframes.py).
+        """
+        import pandas as pd
+        from utils.dataframes import shrink_dataframe, concat_shrunk
+        
         try:
-            # Ler arquivo baseado na extensão
             extension = os.path.splitext(filepath)[1].lower()
             
             if extension in ['.xlsx', '.xls']:
-                df = pd.read_excel(filepath)
+                return shrink_dataframe(pd.read_excel(filepath), memory_report)
             elif extension == '.csv':
-                df = pd.read_csv(filepath)
+                chunks = []
+                with pd.read_csv(filepath, chunksize=CSV_CHUNK_ROWS) as reader:
+                    for chunk in reader:
+                        chunks.append(shrink_dataframe(chunk, memory_report))
+                        if checkpoint is not None:
+                            checkpoint()
+                return concat_shrunk(chunks)
             elif extension == '.ods':
-                df = pd.read_excel(filepath, engine='odf')
+                return shrink_dataframe(pd.read_excel(filepath, engine='odf'), memory_report)
             else:
                 raise GoogleSheetsError(f"Extensão não suportada: {extension}")
             
+        except (GoogleSheetsError, JobCancelledError):
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao ler arquivo {filepath}: {str(e)}")
+            raise GoogleSheetsError(f"Erro na leitura do arquivo: {str(e)}")
+    
+    def write_dataframe(self, df: 'pd.DataFrame', filepath: str, metadata: Dict[str, Any],
+                        on_batch: Optional[BatchCallback] = None,
+                        checkpoint: Optional[Checkpoint] = None) -> Dict[str, Any]:
+        """
+        Grava o DataFrame na planilha correspondente ao arquivo, em lotes de linhas
+        
+        ``checkpoint`` é chamado antes de cada lote: um cancelamento deixa a
+        planilha com um número inteiro de lotes gravados.
+        """
+        from utils.sheets_values import sheets_header, sheets_rows
+        
+        try:
             # Nome da planilha baseado no arquivo e timestamp
             sheet_name = metadata.get('sheet_name', os.path.splitext(os.path.basename(filepath))[0])
             
@@ -89,11 +146,21 @@ class GoogleSheetsService:
             worksheet = spreadsheet.sheet1
             worksheet.clear()  # Limpar dados existentes
             
-            # Converter DataFrame para lista de listas
-            data = [df.columns.tolist()] + df.values.tolist()
+            # Lista de listas com valores aceitos no JSON (NaN -> '', datas ISO,
+            # sem escalares do numpy), convertida por coluna
+            rows = sheets_rows(df)
+            batches = self._batches(rows) or [[]]
             
-            # Upload dos dados
-            worksheet.update('A1', data)
+            # Upload dos dados: o primeiro lote (com o cabeçalho) em A1; os
+            # demais com append_rows, que expande a grade da aba quando preciso
+            for k, batch in enumerate(batches, start=1):
+                self._checkpoint(checkpoint, k, len(batches))
+                if k == 1:
+                    worksheet.update('A1', [sheets_header(df)] + batch)
+                else:
+                    worksheet.append_rows(batch)
+                if on_batch is not None:
+                    on_batch(k, len(batches))
             
             logger.info(f"Upload concluído: {sheet_name}, {len(df)} linhas")
             
@@ -104,10 +171,67 @@ class GoogleSheetsService:
                 'columns': len(df.columns)
             }
             
+        except JobCancelledError:
+            raise
         except Exception as e:
             logger.error(f"Erro no upload para Google Sheets: {str(e)}")
             raise GoogleSheetsError(f"Erro no upload: {str(e)}")
     
+    def write_changes(self, worksheet, cells: List[gspread.Cell], new_rows: List[List[Any]],
+                      on_batch: Optional[BatchCallback] = None,
+                      checkpoint: Optional[Checkpoint] = None) -> int:
+        """
+        Aplica células alteradas e novas linhas em lotes de ``batch_size``
+        
+        ``checkpoint`` é chamado antes de cada lote, como em ``write_dataframe``.
+        
+        Returns:
+            Número de lotes gravados
+        """
+        batches = [('cells', batch) for batch in self._batches(cells)]
+        batches += [('rows', batch) for batch in self._batches(new_rows)]
+        
+        try:
+            for k, (kind, batch) in enumerate(batches, start=1):
+                self._checkpoint(checkpoint, k, len(batches))
+                if kind == 'cells':
+                    worksheet.update_cells(batch, value_input_option='USER_ENTERED')
+                else:
+                    worksheet.append_rows(batch, value_input_option='USER_ENTERED')
+                if on_batch is not None:
+                    on_batch(k, len(batches))
+        except JobCancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao gravar lote no Google Sheets: {str(e)}")
+            raise GoogleSheetsError(f"Erro na gravação: {str(e)}")
+        
+        return len(batches)
+    
+    @staticmethod
+    def _checkpoint(checkpoint: Optional[Checkpoint], batch: int, total: int) -> None:
+        if checkpoint is None:
+            return
+        try:
+            checkpoint()
+        except JobCancelledError:
+            logger.info(f"Gravação cancelada após {batch - 1} de {total} lotes")
+            raise JobCancelledError(f"Job cancelado após {batch - 1} de {total} lotes gravados")
+    
+    def _batches(self, items: List[Any]) -> List[List[Any]]:
+        size = max(1, self.batch_size)
+        return [items[i * size:(i + 1) * size] for i in range(math.ceil(len(items) / size))]
+    
+    def open_worksheet(self, spreadsheet_name: str, worksheet_name: str):
+        """Abre uma aba de uma planilha existente"""
+        try:
+            return self.client.open(spreadsheet_name).worksheet(worksheet_name)
+        except GoogleSheetsError:
+            raise
+        except Exception as e:
+            logger.error(f"Erro ao abrir aba {worksheet_name} de {spreadsheet_name}: {str(e)}")
+            raise GoogleSheetsError(f"Erro ao abrir planilha: {str(e)}")
+    
     def _get_or_create_spreadsheet(self, name: str):
         """Obtém ou cria uma planilha"""
         try:
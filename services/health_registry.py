@@ -0,0 +1,289 @@
+"""
+Registro de heartbeats e da saúde das dependências
+
+Workers publicam periodicamente um heartbeat e o resultado das verificações de
+dependências (ex.: conexão com o Google Sheets) num armazenamento comum. O
+``/health`` apenas lê esses registros: responde em milissegundos e não consome
+quota da API do Google.
+
+Com workers Celery (em outras máquinas ou serviços) os registros ficam no
+Redis do broker (``RedisHealthRegistry``); só com o executor local, em que a
+própria aplicação é o worker, numa tabela do banco do registro de jobs
+(``HealthRegistry``).
+"""
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS health_records (
+    name TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    details TEXT,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class HealthRegistry:
+    """Último estado publicado de cada worker e dependência"""
+
+    def __init__(self, db_path: str = 'jobs.db'):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        if self.db_path != ':memory:':
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def reopen(self) -> None:
+        """Nova conexão no processo atual (ver ``JobStore.reopen``)"""
+        if self.db_path == ':memory:':
+            return
+        with self._lock:
+            self._inherited_conn = self._conn
+            self._conn = self._connect()
+
+    def publish(self, name: str, status: str, kind: str = 'dependency',
+                details: Optional[Dict[str, Any]] = None) -> None:
+        """Grava o estado atual de ``name`` (substitui o anterior)"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO health_records (name, kind, status, details, updated_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (name, kind, status, json.dumps(details or {}, default=str), time.time())
+            )
+
+    def records(self, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Registros publicados, com a idade em segundos"""
+        sql = 'SELECT * FROM health_records'
+        params: tuple = ()
+        if kind is not None:
+            sql += ' WHERE kind = ?'
+            params = (kind,)
+        with self._lock:
+            rows = self._conn.execute(sql + ' ORDER BY name', params).fetchall()
+
+        now = time.time()
+        return [{
+            'name': row['name'],
+            'kind': row['kind'],
+            'status': row['status'],
+            'details': json.loads(row['details'] or '{}'),
+            'updated_at': row['updated_at'],
+            'age': round(now - row['updated_at'], 1),
+        } for row in rows]
+
+    def ping(self) -> None:
+        """Leitura mínima do banco (levanta exceção se estiver inacessível)"""
+        with self._lock:
+            self._conn.execute('SELECT 1 FROM health_records LIMIT 1').fetchall()
+
+    def remove(self, name: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM health_records WHERE name = ?', (name,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class RedisHealthRegistry:
+    """
+    Mesma interface do ``HealthRegistry`` com os registros num hash do Redis
+
+    A idade é calculada pelo relógio do servidor Redis, comum a todas as
+    máquinas. Registros sem atualização há mais de ``retention`` segundos
+    (workers desligados sem aviso) são removidos na leitura.
+    """
+
+    KEY = 'health:records'
+
+    def __init__(self, url: str, retention: float = 24 * 3600):
+        import redis
+        self._client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+        self.retention = retention
+
+    def _now(self) -> float:
+        seconds, microseconds = self._client.time()
+        return seconds + microseconds / 1e6
+
+    def reopen(self) -> None:
+        # O pool do redis-py descarta conexões herdadas ao detectar o fork
+        pass
+
+    def publish(self, name: str, status: str, kind: str = 'dependency',
+                details: Optional[Dict[str, Any]] = None) -> None:
+        """Grava o estado atual de ``name`` (substitui o anterior)"""
+        record = {'kind': kind, 'status': status, 'details': details or {}, 'updated_at': self._now()}
+        self._client.hset(self.KEY, name, json.dumps(record, default=str))
+
+    def records(self, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Registros publicados, com a idade em segundos"""
+        now = self._now()
+        records, expired = [], []
+        for name, raw in sorted(self._client.hgetall(self.KEY).items()):
+            name = name.decode('utf-8')
+            record = json.loads(raw)
+            if now - record['updated_at'] > self.retention:
+                expired.append(name)
+                continue
+            if kind is not None and record['kind'] != kind:
+                continue
+            records.append(dict(record, name=name, age=round(now - record['updated_at'], 1)))
+        if expired:
+            self._client.hdel(self.KEY, *expired)
+        return records
+
+    def ping(self) -> None:
+        self._client.ping()
+
+    def remove(self, name: str) -> None:
+        self._client.hdel(self.KEY, name)
+
+    def close(self) -> None:
+        self._client.close()
+
+
+def create_health_registry(config: Dict[str, Any], task_backend: Optional[str] = None):
+    """
+    Registro conforme ``HEALTH_STORAGE``
+
+    ``auto`` usa o Redis quando as tasks rodam no Celery (workers em outras
+    máquinas publicam nele) e, com o executor local, o banco de
+    ``JOB_STORE_PATH``; ``redis`` e ``local`` forçam um dos dois. Em ``auto``,
+    sem o Redis respondendo, a aplicação usa o SQLite (no caminho síncrono
+    não há workers a acompanhar).
+    """
+    mode = config.get('HEALTH_STORAGE', 'auto')
+    if mode == 'redis' or (mode == 'auto' and task_backend == 'celery'):
+        registry = RedisHealthRegistry(config.get('HEALTH_REDIS_URL', 'redis://localhost:6379/0'))
+        try:
+            registry.ping()
+            return registry
+        except Exception as e:
+            if mode == 'redis':
+                raise
+            logger.warning(f"Redis indisponível para o registro de saúde, usando SQLite: {str(e)}")
+    return HealthRegistry(config.get('JOB_STORE_PATH', 'jobs.db'))
+
+
+def run_probe(registry, name: str, probe: Callable[[], bool]) -> str:
+    """
+    Executa uma verificação de dependência e publica o resultado
+
+    Returns:
+        'healthy', 'unhealthy' (verificação retornou falso) ou 'error'
+    """
+    start = time.perf_counter()
+    details: Dict[str, Any] = {}
+    try:
+        status = 'healthy' if probe() else 'unhealthy'
+    except Exception as e:
+        status = 'error'
+        details['error'] = str(e)
+    details['duration_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    registry.publish(name, status, kind='dependency', details=details)
+    return status
+
+
+class HeartbeatPublisher:
+    """
+    Thread que publica o heartbeat do processo e, opcionalmente, verifica dependências
+
+    A cada ``interval`` segundos grava ``name`` como ``kind='worker'``; a cada
+    ``probe_interval`` executa ``probes`` (nome -> função que retorna bool).
+    ``ensure_started`` pode ser chamado a qualquer momento: a thread é
+    (re)criada no processo atual, o que cobre workers do gunicorn criados por
+    fork depois do carregamento da aplicação.
+    """
+
+    def __init__(self, registry, name: str, interval: float = 10,
+                 probes: Optional[Dict[str, Callable[[], bool]]] = None,
+                 probe_interval: float = 60, details: Optional[Dict[str, Any]] = None):
+        self.registry = registry
+        self.name = name
+        self.interval = interval
+        self.probes = probes or {}
+        self.probe_interval = probe_interval
+        self.details = details or {}
+        self._pid: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    def ensure_started(self) -> None:
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop = threading.Event()
+            self._thread = threading.Thread(target=self._run, name='health-heartbeat', daemon=True)
+            self._thread.start()
+
+    def stop(self, status: str = 'stopped') -> None:
+        self._stop.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=5)
+        try:
+            self.registry.publish(self.name, status, kind='worker', details=self._details())
+        except Exception as e:
+            logger.warning(f"Falha ao publicar parada de {self.name}: {str(e)}")
+
+    def _details(self) -> Dict[str, Any]:
+        return dict(self.details, pid=os.getpid())
+
+    def _run(self) -> None:
+        next_probe = 0.0
+        while not self._stop.is_set():
+            try:
+                self.registry.publish(self.name, 'alive', kind='worker', details=self._details())
+                if self.probes and time.monotonic() >= next_probe:
+                    next_probe = time.monotonic() + self.probe_interval
+                    for probe_name, probe in self.probes.items():
+                        run_probe(self.registry, probe_name, probe)
+            except Exception as e:
+                logger.warning(f"Falha ao publicar heartbeat de {self.name}: {str(e)}")
+            self._stop.wait(self.interval)
+
+
+def summarize(records: List[Dict[str, Any]], heartbeat_ttl: float,
+              dependency_ttl: float) -> Dict[str, Any]:
+    """
+    Visão do ``/health`` a partir dos registros publicados
+
+    Heartbeats mais antigos que ``heartbeat_ttl`` não contam como workers
+    ativos; verificações mais antigas que ``dependency_ttl`` aparecem como 'stale'.
+    """
+    workers = [r for r in records if r['kind'] == 'worker']
+    alive = [r for r in workers if r['status'] == 'alive' and r['age'] <= heartbeat_ttl]
+
+    dependencies = {}
+    for record in records:
+        if record['kind'] != 'dependency':
+            continue
+        status = record['status'] if record['age'] <= dependency_ttl else 'stale'
+        dependencies[record['name']] = dict(record['details'], status=status, age=record['age'])
+
+    return {
+        'workers': [{'name': r['name'], 'age': r['age'], **r['details']} for r in alive],
+        'dependencies': dependencies,
+    }
@@ -0,0 +1,314 @@
+"""
+Registro persistente de jobs de processamento (SQLite)
+"""
+import json
+import time
+import base64
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+
+from exceptions.errors import ValidationError
+
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    state TEXT NOT NULL,
+    filename TEXT,
+    content_hash TEXT,
+    size INTEGER,
+    backend TEXT,
+    stages TEXT NOT NULL DEFAULT '{}',
+    result TEXT,
+    error TEXT,
+    cancel_requested_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs (created_at, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_state_created ON jobs (state, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_hash_created ON jobs (content_hash, created_at, id);
+CREATE INDEX IF NOT EXISTS idx_jobs_filename_created ON jobs (filename, created_at, id);
+
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    key TEXT PRIMARY KEY,
+    job_id TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_expires ON idempotency_keys (expires_at);
+CREATE INDEX IF NOT EXISTS idx_idempotency_job ON idempotency_keys (job_id);
+"""
+
+# Filtros aceitos por ``list_jobs`` (coluna -> parâmetro)
+FILTER_COLUMNS = ('state', 'filename', 'content_hash')
+
+MAX_PAGE_SIZE = 200
+
+FINAL_STATES = ('SUCCESS', 'FAILURE', 'CANCELLED')
+
+# Colunas adicionadas depois da criação da tabela (bancos antigos são migrados)
+MIGRATIONS = {
+    'cancel_requested_at': 'ALTER TABLE jobs ADD COLUMN cancel_requested_at REAL',
+}
+
+
+class JobStore:
+    """
+    Registro de jobs com histórico consultável
+
+    Cada upload gera uma linha com estado, duração de cada etapa e um resumo do
+    resultado. A listagem usa paginação por chave (``created_at``, ``id``), de
+    modo que o custo de cada página não cresce com o tamanho da tabela.
+    """
+
+    def __init__(self, db_path: str = 'jobs.db'):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+            columns = {row['name'] for row in self._conn.execute('PRAGMA table_info(jobs)')}
+            for column, ddl in MIGRATIONS.items():
+                if column not in columns:
+                    self._conn.execute(ddl)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        if self.db_path != ':memory:':
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def reopen(self) -> None:
+        """
+        Abre uma nova conexão no processo atual (ex.: worker do gunicorn após o fork)
+
+        A conexão herdada não é usada nem fechada: ela pertence ao processo pai.
+        Bancos ``:memory:`` não são compartilháveis e ficam como estão.
+        """
+        if self.db_path == ':memory:':
+            return
+        with self._lock:
+            self._inherited_conn = self._conn
+            self._conn = self._connect()
+
+    def _execute(self, sql: str, params: tuple = ()) -> sqlite3.Cursor:
+        with self._lock, self._conn:
+            return self._conn.execute(sql, params)
+
+    def create_job(self, job_id: str, filename: Optional[str] = None,
+                   content_hash: Optional[str] = None, size: Optional[int] = None,
+                   backend: Optional[str] = None, state: str = 'PENDING',
+                   idempotency_key: Optional[str] = None, key_ttl: int = 86400) -> Optional[str]:
+        """
+        Registra um novo job
+
+        Com ``idempotency_key``, o job e a chave são gravados na mesma transação.
+        Se a chave já estiver em uso (e não expirada), nada é criado.
+
+        Returns:
+            None se o job foi criado, ou o ID do job que já detém a chave
+        """
+        now = time.time()
+        with self._lock:
+            try:
+                self._conn.execute('BEGIN IMMEDIATE')
+                if idempotency_key:
+                    self._conn.execute('DELETE FROM idempotency_keys WHERE expires_at < ?', (now,))
+                self._conn.execute(
+                    'INSERT INTO jobs (id, created_at, state, filename, content_hash, size, backend) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (job_id, now, state, filename, content_hash, size, backend)
+                )
+                if idempotency_key:
+                    self._conn.execute(
+                        'INSERT INTO idempotency_keys (key, job_id, created_at, expires_at) '
+                        'VALUES (?, ?, ?, ?)',
+                        (idempotency_key, job_id, now, now + key_ttl)
+                    )
+                self._conn.execute('COMMIT')
+                return None
+            except sqlite3.IntegrityError:
+                self._conn.execute('ROLLBACK')
+                if not idempotency_key:
+                    raise
+                row = self._conn.execute(
+                    'SELECT job_id FROM idempotency_keys WHERE key = ?', (idempotency_key,)
+                ).fetchone()
+                return row['job_id']
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def mark_started(self, job_id: str) -> None:
+        """Marca o início da execução (jobs já cancelados continuam cancelados)"""
+        self._execute(
+            "UPDATE jobs SET state = 'STARTED', started_at = ? WHERE id = ? AND state = 'PENDING'",
+            (time.time(), job_id)
+        )
+
+    def request_cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Pede o cancelamento de um job ainda não finalizado
+
+        Jobs na fila são finalizados como CANCELLED na hora; jobs em execução
+        só têm o pedido registrado e param no próximo ponto de cancelamento.
+
+        Returns:
+            O job atualizado, ou None se não existir
+        """
+        now = time.time()
+        placeholders = ', '.join('?' for _ in FINAL_STATES)
+        with self._lock, self._conn:
+            self._conn.execute(
+                f'UPDATE jobs SET cancel_requested_at = ? WHERE id = ? '
+                f'AND cancel_requested_at IS NULL AND state NOT IN ({placeholders})',
+                (now, job_id, *FINAL_STATES)
+            )
+            self._conn.execute(
+                "UPDATE jobs SET state = 'CANCELLED', finished_at = ?, error = ? "
+                "WHERE id = ? AND state = 'PENDING'",
+                (now, 'Job cancelado', job_id)
+            )
+            self._conn.execute('DELETE FROM idempotency_keys WHERE job_id = ? AND EXISTS '
+                               "(SELECT 1 FROM jobs WHERE id = ? AND state = 'CANCELLED')",
+                               (job_id, job_id))
+        return self.get_job(job_id)
+
+    def is_cancel_requested(self, job_id: str) -> bool:
+        """Indica se o cancelamento do job foi pedido"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT cancel_requested_at FROM jobs WHERE id = ?', (job_id,)
+            ).fetchone()
+        return row is not None and row['cancel_requested_at'] is not None
+
+    def record_stage(self, job_id: str, stage: str, duration: float) -> None:
+        """Registra a duração de uma etapa"""
+        with self._lock, self._conn:
+            row = self._conn.execute('SELECT stages FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            if row is None:
+                return
+            stages = json.loads(row['stages'])
+            stages[stage] = duration
+            self._conn.execute(
+                'UPDATE jobs SET stages = ? WHERE id = ?',
+                (json.dumps(stages), job_id)
+            )
+
+    def stage_recorder(self, job_id: str):
+        """Callback de progresso que grava a duração das etapas concluídas"""
+        def callback(event: str, data: Dict[str, Any]) -> None:
+            if event == 'stage_finished':
+                self.record_stage(job_id, data['stage'], data['duration'])
+        return callback
+
+    def finish_job(self, job_id: str, state: str, result: Optional[Dict[str, Any]] = None,
+                   error: Optional[str] = None) -> None:
+        """
+        Registra o término do job com o resumo do resultado
+
+        Jobs que falham liberam suas chaves de idempotência, para que o
+        cliente possa repetir a requisição.
+        """
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE jobs SET state = ?, finished_at = ?, result = ?, error = ? WHERE id = ?',
+                (state, time.time(), json.dumps(result, default=str) if result is not None else None,
+                 error, job_id)
+            )
+            if state != 'SUCCESS':
+                self._conn.execute('DELETE FROM idempotency_keys WHERE job_id = ?', (job_id,))
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Obtém um job pelo ID"""
+        row = self._execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return self._row_to_dict(row) if row else None
+
+    def list_jobs(self, limit: int = 50, cursor: Optional[str] = None,
+                  **filters) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Lista jobs do mais recente para o mais antigo
+
+        Args:
+            limit: Tamanho da página (máximo MAX_PAGE_SIZE)
+            cursor: Cursor devolvido pela página anterior
+            **filters: Igualdade em state, filename ou content_hash
+
+        Returns:
+            Lista de jobs e cursor da próxima página (None na última)
+        """
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        clauses, params = [], []
+
+        for column in FILTER_COLUMNS:
+            value = filters.get(column)
+            if value:
+                clauses.append(f'{column} = ?')
+                params.append(value)
+
+        if cursor:
+            created_at, job_id = self._decode_cursor(cursor)
+            clauses.append('(created_at < ? OR (created_at = ? AND id < ?))')
+            params.extend([created_at, created_at, job_id])
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        rows = self._execute(
+            f'SELECT * FROM jobs {where} ORDER BY created_at DESC, id DESC LIMIT ?',
+            tuple(params) + (limit + 1,)
+        ).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = self._encode_cursor(last['created_at'], last['id'])
+
+        return [self._row_to_dict(row) for row in rows], next_cursor
+
+    @staticmethod
+    def _encode_cursor(created_at: float, job_id: str) -> str:
+        raw = f"{created_at!r}|{job_id}".encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii')
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[float, str]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor.encode('ascii')).decode('utf-8')
+            created_at, job_id = raw.split('|', 1)
+            return float(created_at), job_id
+        except Exception:
+            raise ValidationError("Cursor de paginação inválido")
+
+    @staticmethod
+    def _row_to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job['stages'] = json.loads(job['stages'] or '{}')
+        job['result'] = json.loads(job['result']) if job['result'] else None
+
+        created_at, started_at, finished_at = job['created_at'], job['started_at'], job['finished_at']
+        job['duration'] = round(finished_at - created_at, 4) if finished_at else None
+        job['queue_time'] = round(started_at - created_at, 4) if started_at else None
+
+        for field in ('created_at', 'started_at', 'finished_at', 'cancel_requested_at'):
+            if job[field] is not None:
+                job[field] = datetime.fromtimestamp(job[field]).isoformat()
+        return job
+
+    def ping(self) -> None:
+        """Leitura mínima do banco (levanta exceção se estiver inacessível)"""
+        with self._lock:
+            self._conn.execute('SELECT 1 FROM jobs LIMIT 1').fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
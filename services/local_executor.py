@@ -0,0 +1,346 @@
+"""
+Executor local de tasks em background (alternativa ao Celery)
+
+Implementa o subconjunto da API do Celery usado pela aplicação
+(``task``, ``delay``, ``AsyncResult``, ``update_state``) sobre um pool de
+threads limitado, para que uploads assíncronos e ``/status/<task_id>``
+funcionem em deploys de uma única máquina, sem Redis.
+"""
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable
+
+from exceptions.errors import QueueFullError
+
+
+logger = logging.getLogger(__name__)
+
+
+# Estados compatíveis com os do Celery
+PENDING = 'PENDING'
+STARTED = 'STARTED'
+PROGRESS = 'PROGRESS'
+SUCCESS = 'SUCCESS'
+FAILURE = 'FAILURE'
+REVOKED = 'REVOKED'
+
+READY_STATES = frozenset({SUCCESS, FAILURE, REVOKED})
+
+
+class _TaskRecord:
+    """Estado de uma task mantido em memória"""
+
+    __slots__ = ('state', 'info', 'updated_at', 'done', 'revoke_requested')
+
+    def __init__(self):
+        self.state = PENDING
+        self.info = None
+        # Revogada durante a execução: o estado só muda quando a task parar
+        self.revoke_requested = False
+        self.updated_at = time.time()
+        self.done = threading.Event()
+
+
+class _TaskRequest:
+    """Equivalente mínimo de ``task.request`` do Celery"""
+
+    def __init__(self, task_id: str):
+        self.id = task_id
+
+
+class _BoundTaskContext:
+    """Objeto recebido como ``self`` por tasks com ``bind=True``"""
+
+    def __init__(self, executor: 'LocalExecutor', task: 'LocalTask', task_id: str):
+        self.executor = executor
+        self.name = task.name
+        self.request = _TaskRequest(task_id)
+
+    def update_state(self, task_id: Optional[str] = None, state: Optional[str] = None,
+                     meta: Optional[Dict[str, Any]] = None) -> None:
+        """Atualiza o estado da task (mesma assinatura do Celery)"""
+        self.executor._set_state(task_id or self.request.id, state or PROGRESS, meta)
+
+
+class LocalAsyncResult:
+    """Resultado de uma task local, com a interface de ``celery.result.AsyncResult``"""
+
+    def __init__(self, task_id: str, executor: 'LocalExecutor'):
+        self.id = task_id
+        self.task_id = task_id
+        self._executor = executor
+
+    @property
+    def _record(self) -> Optional[_TaskRecord]:
+        return self._executor._get_record(self.id)
+
+    @property
+    def state(self) -> str:
+        record = self._record
+        return record.state if record else PENDING
+
+    status = state
+
+    @property
+    def info(self) -> Any:
+        record = self._record
+        return record.info if record else None
+
+    @property
+    def result(self) -> Any:
+        return self.info
+
+    def ready(self) -> bool:
+        return self.state in READY_STATES
+
+    def successful(self) -> bool:
+        return self.state == SUCCESS
+
+    def failed(self) -> bool:
+        return self.state == FAILURE
+
+    def get(self, timeout: Optional[float] = None, propagate: bool = True) -> Any:
+        """Aguarda o término da task e devolve o resultado"""
+        record = self._record
+        if record is None:
+            raise KeyError(f"Task desconhecida: {self.id}")
+
+        if not record.done.wait(timeout):
+            raise TimeoutError(f"Task {self.id} não terminou em {timeout}s")
+
+        if propagate and record.state == FAILURE and isinstance(record.info, BaseException):
+            raise record.info
+        return record.info
+
+    def revoke(self, terminate: bool = False) -> None:
+        self._executor.revoke(self.id, terminate=terminate)
+
+
+class LocalTask:
+    """Task registrada no executor local"""
+
+    def __init__(self, executor: 'LocalExecutor', func: Callable, bind: bool, name: str):
+        self.executor = executor
+        self.func = func
+        self.bind = bind
+        self.name = name
+        self.__doc__ = func.__doc__
+        self.__name__ = func.__name__
+
+    def __call__(self, *args, **kwargs):
+        """Execução síncrona, como ``task(...)`` no Celery"""
+        if self.bind:
+            context = _BoundTaskContext(self.executor, self, str(uuid.uuid4()))
+            return self.func(context, *args, **kwargs)
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs) -> LocalAsyncResult:
+        return self.apply_async(args=args, kwargs=kwargs)
+
+    def apply_async(self, args=None, kwargs=None, task_id: Optional[str] = None,
+                    **options) -> LocalAsyncResult:
+        return self.executor.submit(self, tuple(args or ()), dict(kwargs or {}), task_id=task_id)
+
+    def run(self, task_id: str, args: tuple, kwargs: Dict[str, Any]) -> Any:
+        if self.bind:
+            context = _BoundTaskContext(self.executor, self, task_id)
+            return self.func(context, *args, **kwargs)
+        return self.func(*args, **kwargs)
+
+
+class LocalExecutor:
+    """
+    Backend de tasks em processo, baseado em um pool de threads limitado
+
+    O pool tem ``max_workers`` threads e aceita no máximo ``max_queue`` tasks
+    aguardando; acima disso ``submit`` levanta ``QueueFullError`` em vez de
+    acumular trabalho sem limite. Os estados ficam em memória e são
+    descartados após ``result_ttl`` segundos ou quando passam de ``max_results``.
+
+    Threads foram escolhidas em vez de processos porque ``update_state`` e
+    ``AsyncResult`` precisam compartilhar o registro de estados; o trabalho
+    pesado (pandas, chamadas HTTP ao Google) libera o GIL na maior parte do tempo.
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue: int = 16,
+                 result_ttl: int = 3600, max_results: int = 1000):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.result_ttl = result_ttl
+        self.max_results = max_results
+        self.conf: Dict[str, Any] = {}
+        self.tasks: Dict[str, LocalTask] = {}
+
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._records: 'OrderedDict[str, _TaskRecord]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._running = 0
+        self._queued = 0
+
+    @property
+    def pool(self) -> ThreadPoolExecutor:
+        """Pool de threads (criado sob demanda)"""
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers,
+                        thread_name_prefix='local-task'
+                    )
+        return self._pool
+
+    def task(self, *args, bind: bool = False, name: Optional[str] = None, **options):
+        """Decorator equivalente a ``@celery.task``"""
+        def decorator(func: Callable) -> LocalTask:
+            task_name = name or f"{func.__module__}.{func.__name__}"
+            task = LocalTask(self, func, bind=bind, name=task_name)
+            self.tasks[task_name] = task
+            return task
+
+        # Suporta uso como ``@executor.task`` sem parênteses
+        if len(args) == 1 and callable(args[0]):
+            return decorator(args[0])
+        return decorator
+
+    def submit(self, task: LocalTask, args: tuple, kwargs: Dict[str, Any],
+               task_id: Optional[str] = None) -> LocalAsyncResult:
+        """Enfileira uma task no pool"""
+        if not self._slots.acquire(blocking=False):
+            raise QueueFullError("Fila de processamento cheia, tente novamente em instantes")
+
+        task_id = task_id or str(uuid.uuid4())
+        with self._lock:
+            self._purge_expired()
+            self._records[task_id] = _TaskRecord()
+            self._queued += 1
+
+        try:
+            self.pool.submit(self._run, task, task_id, args, kwargs)
+        except Exception:
+            with self._lock:
+                self._queued -= 1
+                self._records.pop(task_id, None)
+            self._slots.release()
+            raise
+
+        return LocalAsyncResult(task_id, self)
+
+    def _run(self, task: LocalTask, task_id: str, args: tuple, kwargs: Dict[str, Any]) -> None:
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+
+        try:
+            # Verificação e início atômicos: uma revogação entre os dois não
+            # pode marcar como REVOKED uma task que vai executar
+            with self._lock:
+                record = self._records.get(task_id)
+                if record is not None and record.state == REVOKED:
+                    return
+                self._set_state_locked(task_id, STARTED, None)
+            try:
+                result = task.run(task_id, args, kwargs)
+            except Exception as e:
+                if self.is_revoked(task_id):
+                    logger.info(f"Task {task.name}[{task_id}] revogada: {str(e)}")
+                    self._finish(task_id, REVOKED, e)
+                else:
+                    logger.error(f"Task {task.name}[{task_id}] falhou: {str(e)}")
+                    self._finish(task_id, FAILURE, e)
+            else:
+                self._finish(task_id, SUCCESS, result)
+        finally:
+            with self._lock:
+                self._running -= 1
+            self._slots.release()
+
+    def AsyncResult(self, task_id: str) -> LocalAsyncResult:
+        return LocalAsyncResult(task_id, self)
+
+    def revoke(self, task_id: str, terminate: bool = False) -> None:
+        """
+        Revoga uma task
+
+        Tasks ainda na fila passam a REVOKED e não chegam a executar. Tasks em
+        execução mantêm o estado atual até pararem no próximo ponto de
+        cancelamento (``is_revoked``), como no Celery sem ``terminate``.
+        """
+        with self._lock:
+            record = self._records.get(task_id)
+            if record is None or record.state in READY_STATES:
+                return
+            record.revoke_requested = True
+            if record.state == PENDING:
+                record.state = REVOKED
+                record.updated_at = time.time()
+                record.done.set()
+
+    def is_revoked(self, task_id: str) -> bool:
+        """Indica se a task foi revogada (consultado pela própria task em execução)"""
+        record = self._get_record(task_id)
+        return record is not None and (record.revoke_requested or record.state == REVOKED)
+
+    def stats(self) -> Dict[str, Any]:
+        """Ocupação atual do executor"""
+        with self._lock:
+            return {
+                'backend': 'local',
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'running': self._running,
+                'queued': self._queued,
+                'tracked_results': len(self._records),
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
+
+    def _get_record(self, task_id: str) -> Optional[_TaskRecord]:
+        with self._lock:
+            return self._records.get(task_id)
+
+    def _set_state(self, task_id: str, state: str, meta: Any) -> None:
+        with self._lock:
+            self._set_state_locked(task_id, state, meta)
+
+    def _set_state_locked(self, task_id: str, state: str, meta: Any) -> None:
+        record = self._records.get(task_id)
+        if record is None:
+            record = self._records[task_id] = _TaskRecord()
+        # Não sobrescrever estados finais (ex.: revogada antes de parar)
+        if record.state in READY_STATES:
+            return
+        record.state = state
+        record.info = meta
+        record.updated_at = time.time()
+        self._records.move_to_end(task_id)
+
+    def _finish(self, task_id: str, state: str, info: Any) -> None:
+        with self._lock:
+            record = self._records.get(task_id)
+            if record is None:
+                return
+            if record.state != REVOKED:
+                record.state = state
+                record.info = info
+            record.updated_at = time.time()
+            record.done.set()
+            self._records.move_to_end(task_id)
+
+    def _purge_expired(self) -> None:
+        """Remove resultados antigos (chamado com o lock adquirido)"""
+        now = time.time()
+        while self._records:
+            task_id, record = next(iter(self._records.items()))
+            expired = now - record.updated_at > self.result_ttl
+            over_limit = len(self._records) >= self.max_results
+            if not (record.done.is_set() and (expired or over_limit)):
+                break
+            self._records.popitem(last=False)
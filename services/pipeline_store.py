@@ -0,0 +1,156 @@
+"""
+Resultados intermediários do pipeline em tasks (parse -> diff -> write)
+
+As etapas podem rodar em workers (e máquinas) diferentes: cada uma grava o seu
+resultado aqui e passa adiante só o nome dele. O conteúdo são bytes em
+formatos que não executam código ao serem lidos (JSON; DataFrames com
+``utils.dataframes.dataframe_to_json``), nunca pickle.
+
+- ``RedisPipelineStore``: um hash por job no Redis (o mesmo do broker do
+  Celery), com validade; cadeias perdidas expiram sozinhas. É o armazenamento
+  do Celery, em que aplicação e workers não compartilham disco.
+- ``LocalPipelineStore``: arquivos em ``PIPELINE_FOLDER/<job_id>/``, um
+  workspace do StorageManager (quota e limpeza). Só serve com todos os
+  processos na mesma máquina (executor local, testes).
+"""
+import os
+import shutil
+import logging
+from typing import Any, Dict, Optional
+
+from exceptions.errors import ProcessingError
+from services.storage_manager import StorageManager
+
+
+logger = logging.getLogger(__name__)
+
+
+def _missing(job_id: str, name: str) -> ProcessingError:
+    return ProcessingError(f"Resultado intermediário '{name}' do job {job_id} não encontrado (expirado?)")
+
+
+class RedisPipelineStore:
+    """
+    Resultados no Redis: hash ``pipeline:<job_id>`` com um campo por resultado
+
+    Cada gravação renova a validade (``ttl``) do job inteiro.
+    """
+
+    KEY_PREFIX = 'pipeline:'
+
+    def __init__(self, url: str, ttl: float = 6 * 3600):
+        import redis
+        self._client = redis.Redis.from_url(url, socket_timeout=30, socket_connect_timeout=2)
+        self.ttl = int(ttl)
+
+    def _key(self, job_id: str) -> str:
+        return self.KEY_PREFIX + job_id
+
+    def ping(self) -> None:
+        self._client.ping()
+
+    def reopen(self) -> None:
+        # O pool do redis-py descarta conexões herdadas ao detectar o fork
+        pass
+
+    def put(self, job_id: str, name: str, data: bytes) -> None:
+        key = self._key(job_id)
+        pipe = self._client.pipeline()
+        pipe.hset(key, name, data)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def get(self, job_id: str, name: str) -> bytes:
+        data = self._client.hget(self._key(job_id), name)
+        if data is None:
+            raise _missing(job_id, name)
+        return data
+
+    def remove(self, job_id: str, name: str) -> None:
+        self._client.hdel(self._key(job_id), name)
+
+    def discard(self, job_id: str) -> None:
+        self._client.delete(self._key(job_id))
+
+
+class LocalPipelineStore:
+    """
+    Resultados em ``<folder>/<job_id>/``, workspace ``pipeline:<job_id>`` do StorageManager
+
+    A primeira gravação de um job cria o workspace e o mantém referenciado
+    durante toda a cadeia; ``discard`` o libera e remove. Cada gravação é
+    reservada na quota antes de ir para o disco.
+    """
+
+    def __init__(self, folder: str, storage: StorageManager):
+        self.folder = folder
+        self.storage = storage
+
+    @staticmethod
+    def workspace(job_id: str) -> str:
+        """Chave do workspace dos resultados de um job"""
+        return f"pipeline:{job_id}"
+
+    def _folder(self, job_id: str) -> str:
+        return os.path.join(self.folder, job_id)
+
+    def reopen(self) -> None:
+        pass
+
+    def put(self, job_id: str, name: str, data: bytes) -> None:
+        """
+        Raises:
+            QueueFullError: Quota de armazenamento esgotada (o job é descartado)
+        """
+        key = self.workspace(job_id)
+        folder = self._folder(job_id)
+        if not os.path.isdir(folder):
+            self.storage.acquire(key, folder=folder)
+        try:
+            self.storage.reserve(key, len(data))
+            with open(os.path.join(folder, name), 'wb') as f:
+                f.write(data)
+        except Exception:
+            self.discard(job_id)
+            raise
+        self._track(job_id)
+
+    def get(self, job_id: str, name: str) -> bytes:
+        try:
+            with open(os.path.join(self._folder(job_id), name), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            raise _missing(job_id, name)
+
+    def remove(self, job_id: str, name: str) -> None:
+        try:
+            os.remove(os.path.join(self._folder(job_id), name))
+        except FileNotFoundError:
+            return
+        self._track(job_id)
+
+    def discard(self, job_id: str) -> None:
+        self.storage.release(self.workspace(job_id), discard=True)
+        shutil.rmtree(self._folder(job_id), ignore_errors=True)
+
+    def _track(self, job_id: str) -> None:
+        """Registra o tamanho atual da pasta do job (também renova o último uso)"""
+        folder = self._folder(job_id)
+        size = sum(entry.stat().st_size for entry in os.scandir(folder) if entry.is_file())
+        self.storage.set_size(self.workspace(job_id), size)
+
+
+def create_pipeline_store(config: Dict[str, Any], storage: StorageManager,
+                          task_backend: Optional[str] = None):
+    """
+    Armazenamento conforme ``PIPELINE_STORAGE``
+
+    ``auto`` usa o Redis quando as tasks rodam no Celery (o broker já é um
+    Redis) e, com o executor local, a pasta ``PIPELINE_FOLDER``; ``redis`` e
+    ``local`` forçam um dos dois.
+    """
+    mode = config.get('PIPELINE_STORAGE', 'auto')
+    if mode == 'redis' or (mode == 'auto' and task_backend == 'celery'):
+        return RedisPipelineStore(config.get('PIPELINE_REDIS_URL', 'redis://localhost:6379/0'),
+                                  ttl=config.get('PIPELINE_TTL', 6 * 3600))
+    return LocalPipelineStore(config.get('PIPELINE_FOLDER', 'pipeline'), storage)
@@ -0,0 +1,195 @@
+"""
+Controle de concorrência do processamento de arquivos
+
+O parse com pandas ocupa várias vezes o tamanho do arquivo em memória. Sem
+limite, dez uploads grandes simultâneos esgotam a memória da máquina em vez de
+esperar a vez. O ``ProcessingGovernor`` limita quantos arquivos são
+processados ao mesmo tempo (``slots``) e quanto de memória eles podem estimar
+juntos (``memory_budget_mb``); o restante espera numa fila FIFO limitada.
+"""
+import os
+import math
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from exceptions.errors import QueueFullError
+
+
+# Memória de pico estimada por byte do arquivo (DataFrame + cópias do parse)
+MEMORY_MULTIPLIERS = {'.csv': 6, '.xlsx': 12, '.xls': 12, '.ods': 12}
+DEFAULT_MEMORY_MULTIPLIER = 8
+
+# Janela usada para medir a vazão (arquivos concluídos por segundo)
+THROUGHPUT_WINDOW = 600
+
+# Duração assumida de um processamento antes da primeira medição (s)
+DEFAULT_DURATION = 30.0
+
+# Limites do Retry-After sugerido aos clientes (s)
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 600
+
+
+class ProcessingGovernor:
+    """
+    Vagas de processamento com orçamento de memória e fila de espera limitada
+
+    Um arquivo entra quando há vaga e a memória estimada cabe no orçamento; um
+    arquivo sozinho sempre entra, mesmo que sua estimativa passe do orçamento.
+    A fila é FIFO: um arquivo grande na frente não é ultrapassado pelos
+    menores. Com a fila cheia (``max_waiting``) ou após ``max_wait`` segundos
+    de espera, ``QueueFullError`` traz um ``retry_after`` calculado a partir
+    da vazão recente.
+    """
+
+    def __init__(self, slots: int = 2, memory_budget_mb: int = 1024,
+                 max_waiting: int = 8, max_wait: float = 120):
+        self.slots = max(1, slots)
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+
+        self._cond = threading.Condition()
+        self._running = 0
+        self._memory_in_use = 0
+        self._waiting: deque = deque()
+        self._completions: deque = deque()
+        self._avg_duration: Optional[float] = None
+        self._avg_wait = 0.0
+        self._last_wait = 0.0
+        self._max_wait_seen = 0.0
+        self._admitted = 0
+        self._completed = 0
+        self._rejected = 0
+
+    @staticmethod
+    def estimate_memory(size: int, filename: Optional[str] = None) -> int:
+        """Memória de pico estimada para processar um arquivo de ``size`` bytes"""
+        extension = os.path.splitext(filename or '')[1].lower()
+        return int(size * MEMORY_MULTIPLIERS.get(extension, DEFAULT_MEMORY_MULTIPLIER))
+
+    def _fits(self, memory: int) -> bool:
+        if self._running >= self.slots:
+            return False
+        return self._running == 0 or self._memory_in_use + memory <= self.memory_budget
+
+    def ensure_capacity(self) -> None:
+        """
+        Recusa de imediato quando a fila de espera já está cheia
+
+        Usado antes de registrar o job, para que uploads recusados não deixem
+        rastro nem comecem uma resposta em streaming.
+
+        Raises:
+            QueueFullError: Fila de espera cheia
+        """
+        with self._cond:
+            if len(self._waiting) >= self.max_waiting:
+                self._reject()
+
+    @contextmanager
+    def slot(self, size: int, filename: Optional[str] = None, bounded: bool = True):
+        """
+        Ocupa uma vaga enquanto o bloco executa
+
+        Args:
+            size: Tamanho do arquivo em bytes
+            filename: Nome do arquivo (a extensão define a estimativa de memória)
+            bounded: Sujeito ao limite da fila e a ``max_wait``. Tasks em
+                background já passaram pela fila do executor e esperam sem limite
+
+        Raises:
+            QueueFullError: Fila cheia ou espera acima de ``max_wait``
+        """
+        memory = self.estimate_memory(size, filename)
+        queued_at = time.monotonic()
+        with self._cond:
+            if not self._waiting and self._fits(memory):
+                self._admit(memory, 0.0)
+            else:
+                if bounded and len(self._waiting) >= self.max_waiting:
+                    self._reject()
+                ticket = object()
+                self._waiting.append(ticket)
+                try:
+                    while not (self._waiting[0] is ticket and self._fits(memory)):
+                        timeout = None
+                        if bounded:
+                            timeout = self.max_wait - (time.monotonic() - queued_at)
+                            if timeout <= 0:
+                                self._reject()
+                        self._cond.wait(timeout)
+                finally:
+                    self._waiting.remove(ticket)
+                    self._cond.notify_all()
+                self._admit(memory, time.monotonic() - queued_at)
+
+        started_at = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._running -= 1
+                self._memory_in_use -= memory
+                self._record_completion(time.monotonic() - started_at)
+                self._cond.notify_all()
+
+    def _admit(self, memory: int, waited: float) -> None:
+        self._admitted += 1
+        self._running += 1
+        self._memory_in_use += memory
+        self._last_wait = waited
+        self._max_wait_seen = max(self._max_wait_seen, waited)
+        self._avg_wait = waited if self._admitted == 1 else 0.8 * self._avg_wait + 0.2 * waited
+
+    def _reject(self) -> None:
+        self._rejected += 1
+        retry_after = self._retry_after()
+        raise QueueFullError(
+            f"Servidor ocupado processando outros arquivos. Tente novamente em {retry_after}s",
+            retry_after=retry_after
+        )
+
+    def _record_completion(self, duration: float) -> None:
+        self._completed += 1
+        self._completions.append(time.monotonic())
+        self._avg_duration = (duration if self._avg_duration is None
+                              else 0.8 * self._avg_duration + 0.2 * duration)
+
+    def _throughput(self) -> float:
+        """Arquivos concluídos por segundo na janela recente"""
+        while self._completions and self._completions[0] < time.monotonic() - THROUGHPUT_WINDOW:
+            self._completions.popleft()
+        return len(self._completions) / THROUGHPUT_WINDOW
+
+    def _retry_after(self) -> int:
+        # Só há recusa com todas as vagas ocupadas: a vazão nesse momento é
+        # ``slots`` arquivos a cada duração média recente
+        ahead = len(self._waiting) + 1
+        seconds = ahead * (self._avg_duration or DEFAULT_DURATION) / self.slots
+        return int(min(MAX_RETRY_AFTER, max(MIN_RETRY_AFTER, math.ceil(seconds))))
+
+    def stats(self) -> Dict[str, Any]:
+        """Ocupação, fila e tempos de espera (exportados em /metrics)"""
+        with self._cond:
+            return {
+                'slots': self.slots,
+                'running': self._running,
+                'queue_depth': len(self._waiting),
+                'max_waiting': self.max_waiting,
+                'memory_budget_mb': round(self.memory_budget / (1024 * 1024), 1),
+                'memory_in_use_mb': round(self._memory_in_use / (1024 * 1024), 1),
+                'wait_seconds': {
+                    'last': round(self._last_wait, 3),
+                    'avg': round(self._avg_wait, 3),
+                    'max': round(self._max_wait_seen, 3),
+                },
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'throughput_per_minute': round(self._throughput() * 60, 2),
+                'avg_duration_seconds': round(self._avg_duration or 0.0, 3),
+                'retry_after': self._retry_after(),
+            }
@@ -0,0 +1,299 @@
+"""
+Profiling sob demanda de uploads e tasks
+
+Um administrador arma o profiling para um alvo ('upload' ou 'task'): as
+próximas N execuções são perfiladas, ou todas são amostradas e só as mais
+lentas que um limite são guardadas. O estado fica numa tabela do banco do
+registro de jobs, visível para todos os processos (workers do gunicorn e do
+Celery); cada processo relê o estado no máximo a cada ``refresh`` segundos.
+
+Cada captura gera, na pasta de saída:
+
+- ``<nome>.pstats`` (modo 'cprofile', abrir com ``python -m pstats`` ou snakeviz)
+  ou ``<nome>.folded`` (modo 'sample', pilhas no formato do flamegraph.pl e do
+  speedscope);
+- ``<nome>.json`` com alvo, rótulo, duração total e tempos de cada etapa.
+
+Com ``PROFILING_ENABLED`` desligado nenhum ``Profiler`` é criado e os pontos
+de instrumentação devolvem um contexto vazio.
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import cProfile
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS profiling_switches (
+    target TEXT PRIMARY KEY,
+    remaining INTEGER NOT NULL DEFAULT 0,
+    threshold REAL,
+    mode TEXT NOT NULL,
+    armed_at REAL NOT NULL
+);
+"""
+
+TARGETS = ('upload', 'task')
+MODES = ('cprofile', 'sample')
+
+
+class _NoProfile:
+    """Contexto usado quando nada está armado"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def record(self, timings: Optional[Dict[str, float]]) -> None:
+        pass
+
+
+NO_PROFILE = _NoProfile()
+
+
+class StackSampler:
+    """Amostra periodicamente a pilha de uma thread (pilhas agregadas, formato 'folded')"""
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if names:
+                self.stacks[';'.join(reversed(names))] += 1
+
+    def dump(self, path: str) -> None:
+        with open(path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfiledRun:
+    """Uma execução perfilada; guardada ao sair se forçada ou acima do limite"""
+
+    def __init__(self, profiler: 'Profiler', target: str, label: str, mode: str,
+                 forced: bool, threshold: Optional[float]):
+        self.profiler = profiler
+        self.target = target
+        self.label = label
+        self.mode = mode
+        self.forced = forced
+        self.threshold = threshold
+        self.timings: Dict[str, float] = {}
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[StackSampler] = None
+
+    def record(self, timings: Optional[Dict[str, float]]) -> None:
+        """Tempos de cada etapa (``StageTracker.timings``) para o relatório"""
+        self.timings.update(timings or {})
+
+    def __enter__(self):
+        if self.mode == 'cprofile':
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._sampler = StackSampler(threading.get_ident(), self.profiler.sample_interval)
+            self._sampler.start()
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self._start
+        if self._profile is not None:
+            self._profile.disable()
+        if self._sampler is not None:
+            self._sampler.stop()
+
+        if self.forced or (self.threshold is not None and duration >= self.threshold):
+            try:
+                self._save(duration, exc)
+            except Exception as e:
+                logger.warning(f"Falha ao gravar profiling de {self.label}: {str(e)}")
+        return False
+
+    def _save(self, duration: float, exc: Optional[BaseException]) -> None:
+        os.makedirs(self.profiler.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        base = os.path.join(self.profiler.output_dir, f"{stamp}-{self.target}-{self.label}")
+        if self._profile is not None:
+            data_path = base + '.pstats'
+            self._profile.dump_stats(data_path)
+        else:
+            data_path = base + '.folded'
+            self._sampler.dump(data_path)
+
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump({
+                'target': self.target,
+                'label': self.label,
+                'mode': self.mode,
+                'duration': round(duration, 4),
+                'timings': self.timings,
+                'threshold': self.threshold,
+                'error': str(exc) if exc else None,
+                'data': os.path.basename(data_path),
+            }, f, ensure_ascii=False, indent=2)
+        logger.info(f"Profiling de {self.target} {self.label} gravado em {data_path} ({duration:.2f}s)")
+
+
+class Profiler:
+    """
+    Chave de profiling compartilhada e fábrica das execuções perfiladas
+
+    Args:
+        db_path: Banco SQLite do estado (o do registro de jobs)
+        output_dir: Pasta das capturas
+        refresh: Intervalo máximo entre releituras do estado por processo (s)
+        sample_interval: Intervalo entre amostras de pilha no modo 'sample' (s)
+    """
+
+    def __init__(self, db_path: str = ':memory:', output_dir: str = 'profiles',
+                 refresh: float = 2.0, sample_interval: float = 0.005):
+        self.db_path = db_path
+        self.output_dir = output_dir
+        self.refresh = refresh
+        self.sample_interval = sample_interval
+        self._switches: Dict[str, Dict[str, Any]] = {}
+        self._expires = 0.0
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False,
+                               isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        if self.db_path != ':memory:':
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def reopen(self) -> None:
+        """Nova conexão no processo atual (ver ``JobStore.reopen``)"""
+        if self.db_path == ':memory:':
+            return
+        with self._lock:
+            self._inherited_conn = self._conn
+            self._conn = self._connect()
+
+    def arm(self, target: str, count: int = 0, threshold: Optional[float] = None,
+            mode: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Arma o profiling de ``target``
+
+        Args:
+            count: Próximas execuções perfiladas e sempre guardadas
+            threshold: Depois delas (ou sem ``count``), todas as execuções são
+                perfiladas e guardadas as que levarem pelo menos isso (s)
+            mode: 'cprofile' ou 'sample' (padrão: 'sample' com limite, que
+                custa menos para execuções que serão descartadas)
+        """
+        if target not in TARGETS:
+            raise ValueError(f"Alvo inválido: {target}")
+        if count <= 0 and threshold is None:
+            raise ValueError("Informe count ou threshold")
+        mode = mode or ('sample' if threshold is not None else 'cprofile')
+        if mode not in MODES:
+            raise ValueError(f"Modo inválido: {mode}")
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO profiling_switches (target, remaining, threshold, mode, armed_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (target, max(count, 0), threshold, mode, time.time())
+            )
+            self._expires = 0.0
+        logger.warning(f"Profiling armado para {target}: {count} execuções, limite {threshold}, modo {mode}")
+        return self.state()[target]
+
+    def disarm(self, target: Optional[str] = None) -> None:
+        with self._lock:
+            if target is None:
+                self._conn.execute('DELETE FROM profiling_switches')
+            else:
+                self._conn.execute('DELETE FROM profiling_switches WHERE target = ?', (target,))
+            self._expires = 0.0
+
+    def state(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute('SELECT * FROM profiling_switches').fetchall()
+        return {row['target']: dict(row) for row in rows}
+
+    def captures(self) -> List[str]:
+        if not os.path.isdir(self.output_dir):
+            return []
+        return sorted(name for name in os.listdir(self.output_dir) if not name.endswith('.json'))
+
+    def _claim(self, target: str) -> Optional[Dict[str, Any]]:
+        now = time.monotonic()
+        if now >= self._expires:
+            self._switches = self.state()
+            self._expires = now + self.refresh
+        switch = self._switches.get(target)
+        if switch is None:
+            return None
+
+        if switch['remaining'] > 0:
+            with self._lock:
+                claimed = self._conn.execute(
+                    'UPDATE profiling_switches SET remaining = remaining - 1 '
+                    'WHERE target = ? AND remaining > 0', (target,)
+                ).rowcount
+                # Sem limite, a chave se desarma sozinha após a última execução
+                self._conn.execute(
+                    'DELETE FROM profiling_switches WHERE target = ? AND remaining = 0 '
+                    'AND threshold IS NULL', (target,)
+                )
+                self._expires = 0.0
+            if claimed:
+                return {'mode': switch['mode'], 'forced': True, 'threshold': switch['threshold']}
+        if switch['threshold'] is not None:
+            return {'mode': switch['mode'], 'forced': False, 'threshold': switch['threshold']}
+        return None
+
+    def run(self, target: str, label: str):
+        """Contexto da execução: perfilada se o alvo estiver armado, vazio se não"""
+        decision = self._claim(target)
+        if decision is None:
+            return NO_PROFILE
+        return ProfiledRun(self, target, label, **decision)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def profile_run(profiler: Optional[Profiler], target: str, label: str):
+    """Atalho para os pontos de instrumentação (``profiler`` é None se desativado)"""
+    if profiler is None:
+        return NO_PROFILE
+    return profiler.run(target, label)
@@ -0,0 +1,258 @@
+"""
+Admissão de uploads por token bucket com custo por tamanho e linhas
+
+Cada cliente tem um balde com ``capacity`` unidades que se recarrega a
+``refill_per_second``. Um upload consome unidades proporcionais aos bytes e às
+linhas estimadas, de modo que um cliente que envia poucos arquivos grandes é
+limitado como um que envia muitos pequenos: o que se protege é a capacidade de
+parse e de escrita no Sheets, não o número de requisições.
+
+O estado fica no Redis (script Lua atômico, compartilhado entre máquinas) ou,
+sem Redis, numa tabela do mesmo banco SQLite do registro de jobs, compartilhada
+entre os workers do gunicorn da mesma máquina.
+"""
+import time
+import sqlite3
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from exceptions.errors import RateLimitError
+
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+# Recarga e consumo numa única operação no servidor Redis (relógio do servidor,
+# para que máquinas com relógios diferentes não ganhem unidades extras).
+# Custos negativos devolvem unidades (reembolso).
+REDIS_TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = math.min(capacity, tokens - cost)
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+return {allowed, tostring(tokens), tostring(retry_after)}
+"""
+
+# Linhas por byte de .xlsx (zip): sem abrir o arquivo, uma média conservadora
+XLSX_BYTES_PER_ROW = 40
+
+# Amostra usada para estimar o tamanho médio das linhas de um CSV
+ROW_SAMPLE_SIZE = 64 * 1024
+
+
+def refill_and_take(tokens: float, updated_at: float, now: float, cost: float,
+                    capacity: float, rate: float) -> Tuple[bool, float, float]:
+    """
+    Recarrega o balde até ``now`` e tenta consumir ``cost`` unidades
+
+    Returns:
+        (permitido, unidades restantes, segundos até haver unidades suficientes)
+    """
+    tokens = min(capacity, tokens + max(0.0, now - updated_at) * rate)
+    if tokens >= cost:
+        return True, min(capacity, tokens - cost), 0.0
+    return False, tokens, (cost - tokens) / rate
+
+
+class SQLiteBucketStore:
+    """Baldes numa tabela SQLite (transação ``BEGIN IMMEDIATE`` por consumo)"""
+
+    def __init__(self, db_path: str = 'jobs.db'):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False,
+                               isolation_level=None)
+        if self.db_path != ':memory:':
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def reopen(self) -> None:
+        """Nova conexão no processo atual (ver ``JobStore.reopen``)"""
+        if self.db_path == ':memory:':
+            return
+        with self._lock:
+            self._inherited_conn = self._conn
+            self._conn = self._connect()
+
+    def take(self, key: str, cost: float, capacity: float, rate: float) -> Tuple[bool, float, float]:
+        now = time.time()
+        with self._lock:
+            # A trava de escrita serializa o consumo entre processos
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = self._conn.execute(
+                    'SELECT tokens, updated_at FROM rate_buckets WHERE key = ?', (key,)
+                ).fetchone()
+                tokens, updated_at = row if row else (capacity, now)
+                result = refill_and_take(tokens, updated_at, now, cost, capacity, rate)
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO rate_buckets (key, tokens, updated_at) VALUES (?, ?, ?)',
+                    (key, result[1], now)
+                )
+                # Baldes cheios há tempo suficiente equivalem a baldes novos
+                self._conn.execute(
+                    'DELETE FROM rate_buckets WHERE updated_at < ?', (now - capacity / rate - 1,)
+                )
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return result
+
+
+class RedisBucketStore:
+    """Baldes no Redis (hash por cliente, expira quando o balde enche)"""
+
+    KEY_PREFIX = 'upload-bucket:'
+
+    def __init__(self, url: str):
+        import redis
+        self._client = redis.Redis.from_url(url, socket_timeout=2, socket_connect_timeout=2)
+        self._take = self._client.register_script(REDIS_TAKE_SCRIPT)
+
+    def ping(self) -> None:
+        self._client.ping()
+
+    def reopen(self) -> None:
+        # O pool do redis-py descarta conexões herdadas ao detectar o fork
+        pass
+
+    def take(self, key: str, cost: float, capacity: float, rate: float) -> Tuple[bool, float, float]:
+        allowed, tokens, retry_after = self._take(
+            keys=[self.KEY_PREFIX + key], args=[capacity, rate, cost]
+        )
+        return bool(allowed), float(tokens), float(retry_after)
+
+
+class UploadRateLimiter:
+    """
+    Token bucket por cliente para admissão de uploads
+
+    O custo de um upload é ``bytes / bytes_per_unit + linhas / rows_per_unit``,
+    com mínimo de 1 e limitado à capacidade (um arquivo no tamanho máximo ainda
+    pode ser enviado com o balde cheio).
+    """
+
+    def __init__(self, store, capacity: float = 200, refill_per_minute: float = 100,
+                 bytes_per_unit: int = 1024 * 1024, rows_per_unit: int = 10000):
+        self.store = store
+        self.capacity = float(capacity)
+        self.rate = refill_per_minute / 60.0
+        self.bytes_per_unit = bytes_per_unit
+        self.rows_per_unit = rows_per_unit
+
+    def cost(self, size: int, rows: int = 0) -> float:
+        units = size / self.bytes_per_unit + rows / self.rows_per_unit
+        return min(self.capacity, max(1.0, round(units, 2)))
+
+    def acquire(self, key: str, cost: float) -> float:
+        """
+        Consome ``cost`` unidades do balde de ``key``
+
+        Returns:
+            Unidades restantes
+
+        Raises:
+            RateLimitError: Balde sem unidades suficientes (``retry_after`` em segundos)
+        """
+        allowed, remaining, retry_after = self.store.take(key, cost, self.capacity, self.rate)
+        if not allowed:
+            logger.info(f"Upload de {key} limitado: custo {cost:.2f}, disponível {remaining:.2f}")
+            wait = int(retry_after) + 1
+            raise RateLimitError(f"Limite de envio excedido. Tente novamente em {wait}s",
+                                 retry_after=wait)
+        return remaining
+
+    def refund(self, key: str, cost: float) -> None:
+        """Devolve unidades de um upload que não gerou processamento"""
+        try:
+            self.store.take(key, -cost, self.capacity, self.rate)
+        except Exception as e:
+            logger.warning(f"Falha ao devolver unidades de {key}: {str(e)}")
+
+    def reopen(self) -> None:
+        self.store.reopen()
+
+
+def estimate_rows(file, size: int) -> int:
+    """
+    Linhas estimadas de um arquivo enviado, sem fazer o parse
+
+    CSV: quebras de linha numa amostra do início extrapoladas para o tamanho
+    total. Excel: média de bytes por linha (o conteúdo é comprimido).
+    """
+    filename = (file.filename or '').lower()
+    if filename.endswith(('.xlsx', '.xls')):
+        return size // XLSX_BYTES_PER_ROW
+
+    sample = file.read(ROW_SAMPLE_SIZE)
+    file.seek(0)
+    if not sample:
+        return 0
+    return int(sample.count(b'\n') * size / len(sample))
+
+
+def create_upload_limiter(config: Dict[str, Any]) -> Optional[UploadRateLimiter]:
+    """
+    Limiter conforme ``UPLOAD_RATE_LIMIT_STORAGE``
+
+    ``auto`` usa o Redis se ele responder e, senão, o SQLite; ``redis`` e
+    ``local`` forçam um dos dois. Com ``UPLOAD_RATE_LIMIT_ENABLED`` falso,
+    retorna None.
+    """
+    if not config.get('UPLOAD_RATE_LIMIT_ENABLED', True):
+        return None
+
+    storage = config.get('UPLOAD_RATE_LIMIT_STORAGE', 'auto')
+    store = None
+    if storage in ('auto', 'redis'):
+        try:
+            store = RedisBucketStore(config.get('UPLOAD_RATE_LIMIT_REDIS_URL', 'redis://localhost:6379/0'))
+            store.ping()
+            logger.info("Limite de uploads com estado no Redis")
+        except Exception as e:
+            if storage == 'redis':
+                raise
+            logger.warning(f"Redis indisponível para o limite de uploads, usando SQLite: {str(e)}")
+            store = None
+
+    if store is None:
+        store = SQLiteBucketStore(config.get('JOB_STORE_PATH', 'jobs.db'))
+
+    return UploadRateLimiter(
+        store,
+        capacity=config.get('UPLOAD_RATE_CAPACITY', 200),
+        refill_per_minute=config.get('UPLOAD_RATE_REFILL_PER_MINUTE', 100),
+        bytes_per_unit=config.get('UPLOAD_COST_BYTES_PER_UNIT', 1024 * 1024),
+        rows_per_unit=config.get('UPLOAD_COST_ROWS_PER_UNIT', 10000)
+    )
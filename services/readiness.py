@@ -0,0 +1,145 @@
+"""
+Verificações de prontidão (readiness) executadas em segundo plano
+
+Uma thread executa periodicamente as verificações registradas, cada uma com
+seu próprio timeout, e guarda o último veredito. O ``/readyz`` (e o
+``/health``) apenas leem esse cache: a resposta não depende da latência das
+dependências e não cresce com o número de requisições.
+"""
+import os
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Probe:
+    """
+    Verificação registrada
+
+    ``check`` retorna um dicionário de detalhes (opcionalmente com ``status``;
+    sem ele, 'healthy') ou levanta exceção ('error'). Verificações não
+    críticas aparecem no veredito mas não tiram a instância de serviço.
+    """
+    check: Callable[[], Optional[Dict[str, Any]]]
+    timeout: float = 5.0
+    critical: bool = True
+
+
+class ReadinessMonitor:
+    """
+    Executa as verificações a cada ``interval`` segundos e mantém o último resultado
+
+    Uma verificação que estoura o timeout é registrada como 'timeout'; enquanto
+    a execução anterior não terminar ela não é disparada de novo, de modo que
+    uma dependência travada não acumula threads. Resultados mais velhos que
+    ``max_age`` aparecem como 'stale'.
+    """
+
+    def __init__(self, interval: float = 10, max_age: Optional[float] = None):
+        self.interval = interval
+        self.max_age = max_age if max_age is not None else 3 * interval
+        self._probes: Dict[str, Probe] = {}
+        self._results: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+        self._stop = threading.Event()
+
+    def add_probe(self, name: str, check: Callable[[], Optional[Dict[str, Any]]],
+                  timeout: float = 5.0, critical: bool = True) -> None:
+        self._probes[name] = Probe(check, timeout, critical)
+
+    def ensure_started(self) -> None:
+        """Inicia a thread no processo atual (workers do gunicorn nascem por fork)"""
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop = threading.Event()
+            self._executor = None
+            self._pending = {}
+            threading.Thread(target=self._run, name='readiness-monitor', daemon=True).start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                logger.warning(f"Falha nas verificações de prontidão: {str(e)}")
+            self._stop.wait(self.interval)
+
+    def run_once(self) -> None:
+        """Executa todas as verificações em paralelo, respeitando o timeout de cada uma"""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=max(len(self._probes), 1),
+                                                thread_name_prefix='readiness-probe')
+        started = time.monotonic()
+        submitted = {}
+        for name, probe in self._probes.items():
+            previous = self._pending.get(name)
+            if previous is not None and not previous.done():
+                # Execução anterior ainda travada: mantém o timeout registrado
+                self._record(name, 'timeout', {'error': 'verificação anterior ainda em execução'}, 0.0)
+                continue
+            self._pending[name] = self._executor.submit(probe.check)
+            submitted[name] = self._pending[name]
+
+        for name, future in submitted.items():
+            probe = self._probes[name]
+            remaining = max(probe.timeout - (time.monotonic() - started), 0)
+            try:
+                details = dict(future.result(timeout=remaining) or {})
+                status = details.pop('status', 'healthy')
+            except FutureTimeout:
+                status, details = 'timeout', {'error': f'sem resposta em {probe.timeout}s'}
+            except Exception as e:
+                status, details = 'error', {'error': str(e)}
+            self._record(name, status, details, time.monotonic() - started)
+
+    def _record(self, name: str, status: str, details: Dict[str, Any], duration: float) -> None:
+        with self._lock:
+            self._results[name] = dict(details, status=status, checked_at=time.time(),
+                                       duration_ms=round(duration * 1000, 1))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Último veredito com a idade de cada verificação
+
+        ``ready`` é falso enquanto alguma verificação crítica não tiver
+        resultado, estiver vencida ou não estiver 'healthy'.
+        """
+        now = time.time()
+        with self._lock:
+            results = {name: dict(result) for name, result in self._results.items()}
+
+        checks = {}
+        ready = True
+        for name, probe in self._probes.items():
+            result = results.get(name)
+            if result is None:
+                check = {'status': 'unknown', 'age': None}
+            else:
+                check = result
+                check['age'] = round(now - check.pop('checked_at'), 1)
+                if check['age'] > self.max_age:
+                    check['status'] = 'stale'
+            check['critical'] = probe.critical
+            if probe.critical and check['status'] != 'healthy':
+                ready = False
+            checks[name] = check
+
+        return {'ready': ready, 'checks': checks}
@@ -0,0 +1,268 @@
+"""
+Armazenamento temporário dos uploads em workspaces por job
+
+Cada job grava seus arquivos em ``<pasta de uploads>/<job_id>/``, de modo que
+dois uploads com o mesmo nome nunca se sobrescrevem. Um índice SQLite (no
+mesmo banco do registro de jobs, compartilhado pelos processos da máquina)
+guarda o tamanho, o número de referências e o último uso de cada workspace:
+
+- workspaces em uso (``refcount > 0``) nunca são removidos;
+- a quota de disco é verificada a cada reserva e, se excedida, os workspaces
+  livres usados há mais tempo são removidos na hora;
+- a limpeza periódica consulta o índice por último uso, sem listar a pasta.
+
+Um workspace pode ficar fora da pasta de uploads (``folder``): os arquivos
+intermediários do pipeline em tasks (``PIPELINE_FOLDER/<job_id>``) entram na
+mesma quota e na mesma limpeza. Um workspace também pode ter validade própria
+(``ttl``), em vez da idade máxima geral: é o caso do detalhe das alterações
+(``CHANGE_LOG_FOLDER/<job_id>``), mantido para download por mais tempo.
+"""
+import os
+import time
+import shutil
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from exceptions.errors import QueueFullError
+
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workspaces (
+    job_id TEXT PRIMARY KEY,
+    folder TEXT,
+    size INTEGER NOT NULL DEFAULT 0,
+    refcount INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_workspaces_evictable ON workspaces (refcount, last_used);
+"""
+
+# Colunas adicionadas depois da criação da tabela (bancos antigos são migrados)
+MIGRATIONS = {
+    'folder': 'ALTER TABLE workspaces ADD COLUMN folder TEXT',
+    'expires_at': 'ALTER TABLE workspaces ADD COLUMN expires_at REAL',
+}
+
+# Sugestão de espera quando a quota não pode ser liberada (s)
+STORAGE_RETRY_AFTER = 60
+
+
+class StorageManager:
+    """
+    Workspaces por job com contagem de referências, quota e remoção LRU
+
+    Args:
+        root: Pasta dos workspaces (``UPLOAD_FOLDER``)
+        db_path: Banco SQLite do índice
+        quota_bytes: Espaço máximo somado dos workspaces (None: sem quota)
+        max_age: Workspaces livres há mais tempo que isso são removidos pela
+            limpeza periódica (s)
+        stale_after: Referências mais antigas que isso são consideradas
+            abandonadas (processo que morreu sem liberar o workspace) (s)
+    """
+
+    def __init__(self, root: str, db_path: str = ':memory:', quota_bytes: Optional[int] = None,
+                 max_age: float = 3600, stale_after: float = 6 * 3600):
+        self.root = root
+        self.db_path = db_path
+        self.quota_bytes = quota_bytes
+        self.max_age = max_age
+        self.stale_after = stale_after
+        os.makedirs(root, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+            columns = {row['name'] for row in self._conn.execute('PRAGMA table_info(workspaces)')}
+            for column, ddl in MIGRATIONS.items():
+                if column not in columns:
+                    self._conn.execute(ddl)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False,
+                               isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        if self.db_path != ':memory:':
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def reopen(self) -> None:
+        """Nova conexão no processo atual (ver ``JobStore.reopen``)"""
+        if self.db_path == ':memory:':
+            return
+        with self._lock:
+            self._inherited_conn = self._conn
+            self._conn = self._connect()
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute('ROLLBACK')
+                raise
+            self._conn.execute('COMMIT')
+
+    def path(self, job_id: str) -> str:
+        return os.path.join(self.root, job_id)
+
+    def acquire(self, job_id: str, folder: Optional[str] = None, ttl: Optional[float] = None) -> str:
+        """
+        Cria (ou reutiliza) o workspace do job e adiciona uma referência
+
+        Args:
+            folder: Pasta do workspace, se não for ``<root>/<job_id>``
+            ttl: Validade a partir de agora (s), no lugar de ``max_age``
+        """
+        path = folder or self.path(job_id)
+        now = time.time()
+        expires_at = now + ttl if ttl is not None else None
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT INTO workspaces (job_id, folder, refcount, created_at, last_used, expires_at) '
+                'VALUES (?, ?, 1, ?, ?, ?) '
+                'ON CONFLICT (job_id) DO UPDATE SET refcount = refcount + 1, last_used = excluded.last_used, '
+                'expires_at = excluded.expires_at',
+                (job_id, path, now, now, expires_at)
+            )
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def release(self, job_id: str, discard: bool = False) -> None:
+        """
+        Remove uma referência ao workspace
+
+        Com ``discard``, o workspace é apagado assim que ninguém mais o usa;
+        sem, fica disponível até a limpeza por idade ou a remoção por quota.
+        """
+        with self._transaction() as conn:
+            conn.execute(
+                'UPDATE workspaces SET refcount = MAX(refcount - 1, 0), last_used = ? WHERE job_id = ?',
+                (time.time(), job_id)
+            )
+            row = conn.execute('SELECT job_id, folder, refcount FROM workspaces WHERE job_id = ?',
+                               (job_id,)).fetchone()
+            remove = discard and row is not None and row['refcount'] == 0
+            if remove:
+                conn.execute('DELETE FROM workspaces WHERE job_id = ?', (job_id,))
+        if remove:
+            self._remove([row])
+
+    @contextmanager
+    def workspace(self, job_id: str, discard: bool = True):
+        """Workspace do job durante o bloco (``acquire``/``release``)"""
+        path = self.acquire(job_id)
+        try:
+            yield path
+        finally:
+            self.release(job_id, discard=discard)
+
+    def reserve(self, job_id: str, size: int) -> None:
+        """
+        Registra ``size`` bytes a mais no workspace antes de gravá-los
+
+        Se a quota for excedida, workspaces livres são removidos do menos para
+        o mais recentemente usado até haver espaço.
+
+        Raises:
+            QueueFullError: Espaço insuficiente mesmo após remover os livres
+        """
+        victims: List[sqlite3.Row] = []
+        with self._transaction() as conn:
+            if self.quota_bytes is not None:
+                used = conn.execute('SELECT COALESCE(SUM(size), 0) FROM workspaces').fetchone()[0]
+                excess = used + size - self.quota_bytes
+                if excess > 0:
+                    for row in self._evictable(conn, time.time()):
+                        if excess <= 0:
+                            break
+                        victims.append(row)
+                        excess -= row['size']
+                    if excess > 0:
+                        raise QueueFullError(
+                            "Espaço temporário de uploads esgotado, tente novamente em instantes",
+                            retry_after=STORAGE_RETRY_AFTER
+                        )
+                    conn.executemany('DELETE FROM workspaces WHERE job_id = ?',
+                                     [(row['job_id'],) for row in victims])
+            conn.execute(
+                'UPDATE workspaces SET size = size + ?, last_used = ? WHERE job_id = ?',
+                (size, time.time(), job_id)
+            )
+        if victims:
+            logger.info(f"Quota de uploads excedida: {len(victims)} workspaces livres removidos")
+            self._remove(victims)
+
+    def _evictable(self, conn: sqlite3.Connection, now: float):
+        """Workspaces livres (ou com referências abandonadas), do mais antigo ao mais novo"""
+        return conn.execute(
+            'SELECT job_id, folder, size FROM workspaces '
+            'WHERE refcount = 0 OR last_used < ? ORDER BY last_used',
+            (now - self.stale_after,)
+        ).fetchall()
+
+    def evict_expired(self) -> int:
+        """
+        Remove workspaces livres há mais de ``max_age`` ou vencidos (``ttl``),
+        e referências abandonadas
+
+        Returns:
+            Número de workspaces removidos
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            victims = conn.execute(
+                'SELECT job_id, folder FROM workspaces WHERE (refcount = 0 AND '
+                'COALESCE(expires_at, last_used + ?) < ?) OR (refcount > 0 AND last_used < ?)',
+                (self.max_age, now, now - self.stale_after)
+            ).fetchall()
+            conn.executemany('DELETE FROM workspaces WHERE job_id = ?',
+                             [(row['job_id'],) for row in victims])
+        self._remove(victims)
+        return len(victims)
+
+    def set_size(self, job_id: str, size: int) -> None:
+        """
+        Atualiza o tamanho registrado do workspace, sem verificar a quota
+
+        Para conteúdo que substitui o já reservado (resultados das etapas do
+        pipeline); também renova o último uso, de modo que um job longo não
+        passa por abandonado.
+        """
+        with self._transaction() as conn:
+            conn.execute('UPDATE workspaces SET size = ?, last_used = ? WHERE job_id = ?',
+                         (size, time.time(), job_id))
+
+    def _remove(self, rows: List[sqlite3.Row]) -> None:
+        for row in rows:
+            shutil.rmtree(row['folder'] or self.path(row['job_id']), ignore_errors=True)
+
+    def usage(self) -> Dict[str, Any]:
+        """Espaço registrado e workspaces em uso"""
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT COUNT(*) AS total, COALESCE(SUM(size), 0) AS used, '
+                'COALESCE(SUM(refcount > 0), 0) AS in_use FROM workspaces'
+            ).fetchone()
+        return {
+            'workspaces': row['total'],
+            'in_use': row['in_use'],
+            'used_bytes': row['used'],
+            'quota_bytes': self.quota_bytes,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,338 @@
+"""
+Uploads retomáveis em blocos (sessões de upload)
+"""
+import os
+import math
+import errno
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Any, List, Optional, BinaryIO
+
+from exceptions.errors import ValidationError, NotFoundError, QueueFullError
+
+
+logger = logging.getLogger(__name__)
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    id TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    chunk_size INTEGER NOT NULL,
+    sha256 TEXT,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    job_id TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_upload_sessions_expires ON upload_sessions (expires_at);
+
+CREATE TABLE IF NOT EXISTS upload_chunks (
+    upload_id TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    PRIMARY KEY (upload_id, offset)
+);
+"""
+
+# Leitura do corpo da requisição em pedaços ao gravar um bloco
+COPY_BUFFER_SIZE = 64 * 1024
+
+# Sugestão de espera quando não há espaço para novas sessões (s)
+STAGING_RETRY_AFTER = 300
+
+
+class UploadSessionStore:
+    """
+    Sessões de upload retomável
+
+    O cliente cria a sessão informando nome e tamanho, envia blocos de
+    ``chunk_size`` bytes por offset (em qualquer ordem e em paralelo), consulta
+    quais offsets já chegaram e finaliza. Os blocos são gravados direto na
+    posição final de um arquivo de staging pré-alocado, sem remontagem.
+    Sessões e blocos recebidos ficam em SQLite, visíveis a todos os workers.
+
+    Args:
+        quota_bytes: Soma máxima dos tamanhos declarados das sessões ainda não
+            finalizadas (None: sem quota); o staging é pré-alocado na criação
+    """
+
+    def __init__(self, db_path: str, staging_folder: str, chunk_size: int = 8 * 1024 * 1024,
+                 max_chunk_size: int = 32 * 1024 * 1024, ttl: int = 24 * 3600,
+                 quota_bytes: Optional[int] = None):
+        self.db_path = db_path
+        self.staging_folder = staging_folder
+        self.chunk_size = chunk_size
+        self.max_chunk_size = max_chunk_size
+        self.ttl = ttl
+        self.quota_bytes = quota_bytes
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+        with self._lock:
+            self._conn.executescript(SCHEMA)
+        os.makedirs(staging_folder, exist_ok=True)
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        if self.db_path != ':memory:':
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def reopen(self) -> None:
+        """
+        Abre uma nova conexão no processo atual (ex.: worker do gunicorn após o fork)
+
+        A conexão herdada não é usada nem fechada: ela pertence ao processo pai.
+        Bancos ``:memory:`` não são compartilháveis e ficam como estão.
+        """
+        if self.db_path == ':memory:':
+            return
+        with self._lock:
+            self._inherited_conn = self._conn
+            self._conn = self._connect()
+
+    def staging_path(self, upload_id: str) -> str:
+        return os.path.join(self.staging_folder, f"{upload_id}.part")
+
+    def create(self, filename: str, size: int, chunk_size: Optional[int] = None,
+               sha256: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Cria uma sessão e pré-aloca o arquivo de staging
+
+        Raises:
+            ValidationError: Tamanho ou tamanho de bloco inválidos
+            QueueFullError: Quota de staging excedida ou disco sem espaço
+        """
+        chunk_size = chunk_size or self.chunk_size
+        if size <= 0:
+            raise ValidationError("Tamanho do arquivo deve ser maior que zero")
+        if chunk_size <= 0 or chunk_size > self.max_chunk_size:
+            raise ValidationError(f"Tamanho de bloco deve estar entre 1 e {self.max_chunk_size} bytes")
+
+        self.purge_expired()
+
+        upload_id = str(uuid.uuid4())
+        now = time.time()
+        with self._lock:
+            # A trava de escrita torna verificação da quota e registro atômicos entre processos
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                if self.quota_bytes is not None:
+                    staged = self._conn.execute(
+                        'SELECT COALESCE(SUM(size), 0) FROM upload_sessions '
+                        'WHERE job_id IS NULL AND expires_at >= ?', (now,)
+                    ).fetchone()[0]
+                    if staged + size > self.quota_bytes:
+                        raise QueueFullError(
+                            "Espaço para uploads em blocos esgotado, tente novamente mais tarde",
+                            retry_after=STAGING_RETRY_AFTER
+                        )
+                self._conn.execute(
+                    'INSERT INTO upload_sessions (id, filename, size, chunk_size, sha256, created_at, expires_at) '
+                    'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                    (upload_id, filename, size, chunk_size, sha256, now, now + self.ttl)
+                )
+                self._conn.commit()
+            except BaseException:
+                self._conn.rollback()
+                raise
+
+        try:
+            with open(self.staging_path(upload_id), 'wb') as f:
+                # Reserva o espaço já na criação: falta de disco aparece aqui, não no meio do upload
+                if hasattr(os, 'posix_fallocate'):
+                    os.posix_fallocate(f.fileno(), 0, size)
+                else:
+                    f.truncate(size)
+        except OSError as e:
+            self._discard(upload_id)
+            if e.errno == errno.ENOSPC:
+                logger.warning(f"Sem espaço para a sessão de upload {upload_id} ({size} bytes)")
+                raise QueueFullError("Sem espaço em disco para o upload, tente novamente mais tarde",
+                                     retry_after=STAGING_RETRY_AFTER) from e
+            raise
+
+        logger.info(f"Sessão de upload criada: {upload_id} ({filename}, {size} bytes)")
+        return self.get(upload_id)
+
+    def get(self, upload_id: str) -> Dict[str, Any]:
+        """
+        Estado da sessão com os offsets recebidos e os que faltam
+
+        Raises:
+            NotFoundError: Sessão inexistente ou expirada
+        """
+        session = self._get_session(upload_id)
+        with self._lock:
+            received = [row['offset'] for row in self._conn.execute(
+                'SELECT offset FROM upload_chunks WHERE upload_id = ? ORDER BY offset', (upload_id,)
+            )]
+
+        received_set = set(received)
+        missing = [offset for offset in self._offsets(session) if offset not in received_set]
+        return {
+            'upload_id': upload_id,
+            'filename': session['filename'],
+            'size': session['size'],
+            'chunk_size': session['chunk_size'],
+            'sha256': session['sha256'],
+            'total_chunks': math.ceil(session['size'] / session['chunk_size']),
+            'received': received,
+            'missing': missing,
+            'complete': not missing,
+            'job_id': session['job_id'],
+            'expires_at': datetime.fromtimestamp(session['expires_at']).isoformat(),
+        }
+
+    def write_chunk(self, upload_id: str, offset: int, stream: BinaryIO,
+                    length: Optional[int]) -> Dict[str, Any]:
+        """
+        Grava um bloco na sua posição do arquivo de staging
+
+        Reenviar um bloco já recebido é permitido (o conteúdo é sobrescrito).
+
+        Raises:
+            NotFoundError: Sessão inexistente ou expirada
+            ValidationError: Offset ou tamanho do bloco inválidos
+        """
+        session = self._get_session(upload_id)
+        if session['job_id']:
+            raise ValidationError("Upload já finalizado", status_code=409)
+        if offset < 0 or offset >= session['size'] or offset % session['chunk_size']:
+            raise ValidationError(f"Offset inválido: {offset}")
+
+        expected = min(session['chunk_size'], session['size'] - offset)
+        if length is not None and length != expected:
+            raise ValidationError(f"Bloco em {offset} deve ter {expected} bytes, recebidos {length}")
+
+        written = 0
+        with open(self.staging_path(upload_id), 'r+b') as f:
+            f.seek(offset)
+            while written < expected:
+                data = stream.read(min(COPY_BUFFER_SIZE, expected - written))
+                if not data:
+                    break
+                f.write(data)
+                written += len(data)
+
+        if written != expected or stream.read(1):
+            raise ValidationError(f"Bloco em {offset} deve ter {expected} bytes")
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO upload_chunks (upload_id, offset, length) VALUES (?, ?, ?)',
+                (upload_id, offset, written)
+            )
+        return {'upload_id': upload_id, 'offset': offset, 'length': written}
+
+    def open_completed(self, upload_id: str) -> BinaryIO:
+        """
+        Abre o arquivo montado de uma sessão completa
+
+        Raises:
+            NotFoundError: Sessão inexistente ou expirada
+            ValidationError: Ainda faltam blocos
+        """
+        state = self.get(upload_id)
+        if not state['complete']:
+            raise ValidationError(
+                f"Upload incompleto: faltam {len(state['missing'])} de {state['total_chunks']} blocos",
+                status_code=409
+            )
+        return open(self.staging_path(upload_id), 'rb')
+
+    def claim(self, upload_id: str, job_id: str) -> Optional[str]:
+        """
+        Reserva a sessão para um único job (finalizações concorrentes)
+
+        Returns:
+            None se a sessão foi reservada para ``job_id``; senão, o job que
+            já a tinha
+
+        Raises:
+            NotFoundError: Sessão inexistente ou expirada
+        """
+        self._get_session(upload_id)
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                'UPDATE upload_sessions SET job_id = ? WHERE id = ? AND job_id IS NULL', (job_id, upload_id)
+            )
+            if cursor.rowcount == 1:
+                return None
+            row = self._conn.execute('SELECT job_id FROM upload_sessions WHERE id = ?', (upload_id,)).fetchone()
+        return row['job_id'] if row else None
+
+    def unclaim(self, upload_id: str, job_id: str) -> None:
+        """Desfaz a reserva de ``claim`` quando o job não chegou a ser criado"""
+        with self._lock, self._conn:
+            self._conn.execute('UPDATE upload_sessions SET job_id = NULL WHERE id = ? AND job_id = ?',
+                               (upload_id, job_id))
+
+    def mark_finalized(self, upload_id: str, job_id: str) -> None:
+        """
+        Associa a sessão ao job criado e descarta o staging e os blocos
+
+        A sessão continua existindo até expirar, para que uma finalização
+        repetida devolva o mesmo job.
+        """
+        with self._lock, self._conn:
+            self._conn.execute('UPDATE upload_sessions SET job_id = ? WHERE id = ?', (job_id, upload_id))
+            self._conn.execute('DELETE FROM upload_chunks WHERE upload_id = ?', (upload_id,))
+        self._remove_staging(upload_id)
+
+    def delete(self, upload_id: str) -> None:
+        """Aborta a sessão"""
+        self._get_session(upload_id)
+        self._discard(upload_id)
+
+    def _discard(self, upload_id: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM upload_chunks WHERE upload_id = ?', (upload_id,))
+            self._conn.execute('DELETE FROM upload_sessions WHERE id = ?', (upload_id,))
+        self._remove_staging(upload_id)
+
+    def purge_expired(self) -> int:
+        """Remove sessões expiradas e seus arquivos de staging"""
+        now = time.time()
+        with self._lock, self._conn:
+            expired = [row['id'] for row in self._conn.execute(
+                'SELECT id FROM upload_sessions WHERE expires_at < ?', (now,)
+            )]
+            for upload_id in expired:
+                self._conn.execute('DELETE FROM upload_chunks WHERE upload_id = ?', (upload_id,))
+            self._conn.execute('DELETE FROM upload_sessions WHERE expires_at < ?', (now,))
+        for upload_id in expired:
+            self._remove_staging(upload_id)
+        return len(expired)
+
+    def _get_session(self, upload_id: str) -> sqlite3.Row:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT * FROM upload_sessions WHERE id = ? AND expires_at >= ?', (upload_id, time.time())
+            ).fetchone()
+        if row is None:
+            raise NotFoundError("Sessão de upload não encontrada")
+        return row
+
+    @staticmethod
+    def _offsets(session: sqlite3.Row) -> List[int]:
+        return list(range(0, session['size'], session['chunk_size']))
+
+    def _remove_staging(self, upload_id: str) -> None:
+        try:
+            os.remove(self.staging_path(upload_id))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            # Ex.: arquivo ainda aberto no Windows; sai na limpeza por expiração
+            logger.warning(f"Erro ao remover staging {upload_id}: {str(e)}")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,562 @@
+// Configuração global
+const APP_CONFIG = {
+    maxFileSize: 200 * 1024 * 1024, // 200MB
+    allowedExtensions: ['.xlsx', '.xls', '.csv', '.ods'],
+    healthCheckInterval: 30000, // 30 segundos
+    statusCheckInterval: 2000, // 2 segundos para tasks assíncronas
+    chunkedUploadThreshold: 16 * 1024 * 1024, // acima disso, upload em blocos
+    chunkUploadConcurrency: 4, // blocos enviados em paralelo
+    chunkUploadRetries: 3,
+};
+
+// Estado da aplicação
+let appState = {
+    isUploading: false,
+    currentTask: null,
+    selectedFile: null,
+    isHealthy: false
+};
+
+// Inicialização
+document.addEventListener('DOMContentLoaded', function() {
+    initializeApp();
+    checkApplicationHealth();
+    setInterval(checkApplicationHealth, APP_CONFIG.healthCheckInterval);
+});
+
+// Inicializar aplicação
+function initializeApp() {
+    const fileInput = document.getElementById('file-input');
+    const uploadForm = document.getElementById('upload-form');
+    const submitButton = document.getElementById('submit-button');
+    
+    // Event listeners
+    fileInput.addEventListener('change', handleFileSelection);
+    uploadForm.addEventListener('submit', handleFormSubmit);
+    document.getElementById('cancel-button').addEventListener('click', cancelOperation);
+    document.getElementById('clear-log').addEventListener('click', clearLog);
+    document.getElementById('download-log').addEventListener('click', downloadLog);
+    
+    addLogEntry('Sistema pronto para uso.', 'info');
+}
+
+// Verificar saúde da aplicação
+async function checkApplicationHealth() {
+    try {
+        const response = await fetch('/health');
+        const data = await response.json();
+        
+        const statusDot = document.getElementById('connection-status');
+        const statusText = document.getElementById('status-text');
+        
+        if (data.status === 'healthy') {
+            statusDot.className = 'status-dot status-healthy';
+            statusText.textContent = 'Sistema Online';
+            appState.isHealthy = true;
+        } else if (data.status === 'degraded') {
+            statusDot.className = 'status-dot status-warning';
+            statusText.textContent = 'Sistema com Problemas';
+            appState.isHealthy = false;
+            addLogEntry(`Serviços com problemas: ${data.issues?.join(', ')}`, 'warning');
+        } else {
+            throw new Error('Sistema não saudável');
+        }
+    } catch (error) {
+        const statusDot = document.getElementById('connection-status');
+        const statusText = document.getElementById('status-text');
+        statusDot.className = 'status-dot status-error';
+        statusText.textContent = 'Sistema Offline';
+        appState.isHealthy = false;
+        addLogEntry('Erro na comunicação com o servidor', 'error');
+    }
+}
+
+// Manipular seleção de arquivo
+function handleFileSelection(event) {
+    const file = event.target.files[0];
+    const submitButton = document.getElementById('submit-button');
+    const fileInfo = document.getElementById('file-info');
+    
+    if (!file) {
+        submitButton.disabled = true;
+        fileInfo.style.display = 'none';
+        appState.selectedFile = null;
+        document.getElementById('file-label-text').textContent = 'Clique para selecionar a planilha';
+        return;
+    }
+    
+    // Validar arquivo
+    const validation = validateFile(file);
+    if (!validation.valid) {
+        addLogEntry(`Erro na validação: ${validation.error}`, 'error');
+        submitButton.disabled = true;
+        fileInfo.style.display = 'none';
+        return;
+    }
+    
+    // Arquivo válido
+    appState.selectedFile = file;
+    submitButton.disabled = false;
+    document.getElementById('file-label-text').textContent = file.name;
+    
+    // Mostrar informações do arquivo
+    document.getElementById('file-name').textContent = file.name;
+    document.getElementById('file-size').textContent = formatFileSize(file.size);
+    document.getElementById('file-type').textContent = getFileExtension(file.name);
+    fileInfo.style.display = 'block';
+    
+    addLogEntry(`Arquivo selecionado: ${file.name} (${formatFileSize(file.size)})`, 'success');
+}
+
+// Validar arquivo
+function validateFile(file) {
+    // Verificar extensão
+    const extension = getFileExtension(file.name).toLowerCase();
+    if (!APP_CONFIG.allowedExtensions.includes(extension)) {
+        return {
+            valid: false,
+            error: `Extensão ${extension} não permitida. Use: ${APP_CONFIG.allowedExtensions.join(', ')}`
+        };
+    }
+    
+    // Verificar tamanho
+    if (file.size > APP_CONFIG.maxFileSize) {
+        return {
+            valid: false,
+            error: `Arquivo muito grande. Máximo: ${formatFileSize(APP_CONFIG.maxFileSize)}`
+        };
+    }
+    
+    // Verificar se não está vazio
+    if (file.size === 0) {
+        return {
+            valid: false,
+            error: 'Arquivo está vazio'
+        };
+    }
+    
+    return { valid: true };
+}
+
+// Manipular envio do formulário
+async function handleFormSubmit(event) {
+    event.preventDefault();
+    
+    if (!appState.selectedFile) {
+        addLogEntry('Nenhum arquivo selecionado', 'error');
+        return;
+    }
+    
+    if (!appState.isHealthy) {
+        if (!confirm('O sistema não está totalmente saudável. Deseja continuar mesmo assim?')) {
+            return;
+        }
+    }
+    
+    const asyncProcessing = document.getElementById('async-processing').checked;
+    
+    setUploadingState(true);
+    addLogEntry('Iniciando upload...', 'info');
+    
+    try {
+        let response;
+        if (appState.selectedFile.size > APP_CONFIG.chunkedUploadThreshold) {
+            response = await uploadInChunks(appState.selectedFile, asyncProcessing);
+        } else {
+            const formData = new FormData();
+            const upload = await compressForUpload(appState.selectedFile);
+            formData.append('file', upload.blob, upload.name);
+            if (asyncProcessing) {
+                formData.append('async', 'true');
+            } else {
+                // Síncrono: eventos NDJSON a cada etapa, sem depender de background tasks
+                formData.append('stream', 'true');
+            }
+            
+            response = await fetch('/upload', {
+                method: 'POST',
+                headers: withCsrf(),
+                body: formData
+            });
+        }
+        
+        if ((response.headers.get('Content-Type') || '').includes('application/x-ndjson')) {
+            await consumeUploadStream(response);
+            return;
+        }
+        
+        const data = await response.json();
+        
+        if (data.success) {
+            if (data.async && data.task_id) {
+                // Processamento assíncrono
+                appState.currentTask = data.task_id;
+                addLogEntry(`Arquivo enviado. ID da tarefa: ${data.task_id}`, 'success');
+                monitorAsyncTask(data.task_id);
+            } else {
+                // Processamento síncrono
+                addLogEntry('Arquivo processado com sucesso!', 'success');
+                showResult(data.result);
+                setUploadingState(false);
+            }
+        } else {
+            throw new Error(data.error || 'Erro desconhecido');
+        }
+        
+    } catch (error) {
+        addLogEntry(`Erro no upload: ${error.message}`, 'error');
+        setUploadingState(false);
+    }
+}
+
+// CSV comprime ~10:1; planilhas (xlsx/ods) já são ZIP
+function canCompress(file) {
+    return typeof CompressionStream !== 'undefined'
+        && getFileExtension(file.name).toLowerCase() === '.csv';
+}
+
+async function gzipBlob(blob) {
+    const stream = blob.stream().pipeThrough(new CompressionStream('gzip'));
+    return new Response(stream).blob();
+}
+
+// Arquivo a enviar no /upload: base.csv vira base.csv.gz quando possível
+async function compressForUpload(file) {
+    if (!canCompress(file)) {
+        return { blob: file, name: file.name };
+    }
+    const blob = await gzipBlob(file);
+    addLogEntry(`Arquivo comprimido: ${formatFileSize(file.size)} → ${formatFileSize(blob.size)}`, 'info');
+    return { blob: blob, name: `${file.name}.gz` };
+}
+
+// Cabeçalhos com o token CSRF da página (requisições que alteram estado)
+function withCsrf(headers = {}) {
+    const meta = document.querySelector('meta[name="csrf-token"]');
+    if (meta) {
+        headers['X-CSRFToken'] = meta.getAttribute('content');
+    }
+    return headers;
+}
+
+// Upload retomável em blocos paralelos; devolve a resposta da finalização
+async function uploadInChunks(file, asyncProcessing) {
+    const created = await fetch('/uploads', {
+        method: 'POST',
+        headers: withCsrf({ 'Content-Type': 'application/json' }),
+        body: JSON.stringify({ filename: file.name, size: file.size })
+    });
+    const session = await created.json();
+    if (!created.ok) {
+        throw new Error(session.error || 'Erro ao criar sessão de upload');
+    }
+    
+    addLogEntry(`Upload em ${session.total_chunks} blocos de ${formatFileSize(session.chunk_size)}`, 'info');
+    const pending = [...session.missing];
+    let sent = 0;
+    
+    async function sendChunk(offset) {
+        let blob = file.slice(offset, offset + session.chunk_size);
+        const headers = withCsrf({ 'Content-Type': 'application/octet-stream' });
+        if (canCompress(file)) {
+            blob = await gzipBlob(blob);
+            headers['Content-Encoding'] = 'gzip';
+        }
+        for (let attempt = 1; ; attempt++) {
+            try {
+                const response = await fetch(`/uploads/${session.upload_id}/chunks/${offset}`, {
+                    method: 'PUT',
+                    headers: headers,
+                    body: blob
+                });
+                if (response.ok) return;
+                if (response.status < 500) {
+                    const data = await response.json();
+                    throw Object.assign(new Error(data.error), { fatal: true });
+                }
+            } catch (error) {
+                if (error.fatal || attempt >= APP_CONFIG.chunkUploadRetries) throw error;
+            }
+            await new Promise(resolve => setTimeout(resolve, 500 * attempt));
+        }
+    }
+    
+    async function worker() {
+        while (pending.length) {
+            await sendChunk(pending.shift());
+            sent++;
+            updateProgress(Math.round(5 * sent / session.total_chunks));
+        }
+    }
+    
+    const workers = Array.from({ length: APP_CONFIG.chunkUploadConcurrency }, worker);
+    await Promise.all(workers);
+    
+    addLogEntry('Blocos enviados, finalizando upload...', 'info');
+    return fetch(`/uploads/${session.upload_id}/complete`, {
+        method: 'POST',
+        headers: withCsrf({ 'Content-Type': 'application/json' }),
+        body: JSON.stringify(asyncProcessing ? { async: 'true' } : { stream: 'true' })
+    });
+}
+
+// Ler eventos NDJSON do upload síncrono
+async function consumeUploadStream(response) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.filter(line => line.trim()).forEach(line => handleStreamEvent(JSON.parse(line)));
+    }
+    
+    if (appState.isUploading) {
+        addLogEntry('Conexão encerrada antes do fim do processamento', 'error');
+        setUploadingState(false);
+    }
+}
+
+// Atualizar log e progresso a partir de um evento do stream
+function handleStreamEvent(event) {
+    switch (event.event) {
+        case 'accepted':
+            appState.currentTask = event.job_id;
+            addLogEntry(`Arquivo recebido. Job: ${event.job_id}`, 'info');
+            updateProgress(5);
+            break;
+        case 'validated':
+            addLogEntry('Arquivo validado', 'info');
+            updateProgress(15);
+            break;
+        case 'parsed':
+            addLogEntry(`${event.rows} linhas lidas`, 'info');
+            updateProgress(40);
+            break;
+        case 'diff_computed':
+            addLogEntry(`Diferenças calculadas: ${event.updated_cells} células, ${event.new_rows} novas linhas`, 'info');
+            updateProgress(60);
+            break;
+        case 'batch_written':
+            addLogEntry(`Lote ${event.batch}/${event.total} gravado`, 'info');
+            updateProgress(60 + 39 * event.batch / event.total);
+            break;
+        case 'completed':
+            addLogEntry('Arquivo processado com sucesso!', 'success');
+            updateProgress(100);
+            showResult(event.result.result || {});
+            setUploadingState(false);
+            break;
+        case 'cancelled':
+            addLogEntry(`Processamento cancelado: ${event.error}`, 'warning');
+            appState.currentTask = null;
+            updateProgress(0);
+            setUploadingState(false);
+            break;
+        case 'failed':
+            addLogEntry(`Erro no processamento: ${event.error}`, 'error');
+            updateProgress(0);
+            setUploadingState(false);
+            break;
+    }
+}
+
+// Monitorar tarefa assíncrona
+async function monitorAsyncTask(taskId) {
+    const checkInterval = setInterval(async () => {
+        try {
+            const response = await fetch(`/status/${taskId}`);
+            const data = await response.json();
+            
+            if (data.state === 'PENDING') {
+                addLogEntry('Tarefa na fila...', 'info');
+            } else if (data.state === 'PROGRESS') {
+                addLogEntry(data.status || 'Processando...', 'info');
+                updateProgress(50); // Simular progresso
+            } else if (data.state === 'SUCCESS') {
+                addLogEntry('Processamento concluído!', 'success');
+                showResult(data.result);
+                setUploadingState(false);
+                clearInterval(checkInterval);
+                updateProgress(100);
+            } else if (data.state === 'REVOKED' || data.state === 'CANCELLED') {
+                addLogEntry('Processamento cancelado', 'warning');
+                appState.currentTask = null;
+                setUploadingState(false);
+                clearInterval(checkInterval);
+                updateProgress(0);
+            } else if (data.state === 'FAILURE') {
+                addLogEntry(`Erro no processamento: ${data.error}`, 'error');
+                setUploadingState(false);
+                clearInterval(checkInterval);
+                updateProgress(0);
+            }
+        } catch (error) {
+            addLogEntry(`Erro ao verificar status: ${error.message}`, 'error');
+            clearInterval(checkInterval);
+            setUploadingState(false);
+        }
+    }, APP_CONFIG.statusCheckInterval);
+}
+
+// Definir estado de upload
+function setUploadingState(isUploading) {
+    appState.isUploading = isUploading;
+    const submitButton = document.getElementById('submit-button');
+    const cancelButton = document.getElementById('cancel-button');
+    const fileInput = document.getElementById('file-input');
+    const progressContainer = document.getElementById('progress-container');
+    
+    if (isUploading) {
+        submitButton.disabled = true;
+        submitButton.classList.add('loading');
+        cancelButton.style.display = 'inline-block';
+        fileInput.disabled = true;
+        progressContainer.style.display = 'block';
+        updateProgress(0);
+    } else {
+        submitButton.disabled = !appState.selectedFile;
+        submitButton.classList.remove('loading');
+        cancelButton.style.display = 'none';
+        fileInput.disabled = false;
+        setTimeout(() => {
+            progressContainer.style.display = 'none';
+        }, 2000);
+    }
+}
+
+// Atualizar progresso
+function updateProgress(percent) {
+    const progressFill = document.getElementById('progress-fill');
+    const progressText = document.getElementById('progress-text');
+    
+    progressFill.style.width = `${percent}%`;
+    progressText.textContent = `${Math.round(percent)}%`;
+}
+
+// Cancelar operação
+async function cancelOperation() {
+    if (!appState.currentTask) {
+        setUploadingState(false);
+        return;
+    }
+    
+    // O servidor para no próximo lote; o fim chega pelo stream ou por /status
+    addLogEntry('Cancelamento solicitado...', 'warning');
+    try {
+        const response = await fetch(`/jobs/${appState.currentTask}/cancel`, {
+            method: 'POST',
+            headers: withCsrf()
+        });
+        const data = await response.json();
+        if (!data.success) {
+            addLogEntry(`Não foi possível cancelar: ${data.error}`, 'error');
+        }
+    } catch (error) {
+        addLogEntry(`Erro ao cancelar: ${error.message}`, 'error');
+    }
+}
+
+// Mostrar resultado
+function showResult(result) {
+    const resultContainer = document.getElementById('result-container');
+    const resultContent = document.getElementById('result-content');
+    
+    let html = '<div class="result-success"><h4>✅ Processamento Concluído</h4>';
+    
+    if (result.sheets_url) {
+        html += `<p><strong>Planilha criada:</strong> <a href="${result.sheets_url}" target="_blank">Abrir no Google Sheets</a></p>`;
+    }
+    
+    if (result.processed_rows) {
+        html += `<p><strong>Linhas processadas:</strong> ${result.processed_rows}</p>`;
+    }
+    
+    if (result.changes) {
+        html += `<p><strong>Células atualizadas:</strong> ${result.changes.updated_cells}</p>`;
+        html += `<p><strong>Novas imobiliárias:</strong> ${result.changes.new_rows}</p>`;
+    }
+    
+    html += '</div>';
+    
+    resultContent.innerHTML = html;
+    resultContainer.style.display = 'block';
+}
+
+// Adicionar entrada no log
+function addLogEntry(message, type = 'info') {
+    const logOutput = document.getElementById('log-output');
+    const timestamp = new Date().toLocaleTimeString('pt-BR');
+    
+    const iconMap = {
+        'info': '<circle cx="12" cy="12" r="10"></circle><line x1="12" y1="16" x2="12" y2="12"></line><line x1="12" y1="8" x2="12.01" y2="8"></line>',
+        'success': '<path d="M22 11.08V12a10 10 0 1 1-5.93-9.14"></path><polyline points="22 4 12 14.01 9 11.01"></polyline>',
+        'warning': '<path d="m21.73 18-8-14a2 2 0 0 0-3.48 0l-8 14A2 2 0 0 0 4 21h16a2 2 0 0 0 1.73-3Z"></path><line x1="12" y1="9" x2="12" y2="13"></line><line x1="12" y1="17" x2="12.01" y2="17"></line>',
+        'error': '<circle cx="12" cy="12" r="10"></circle><line x1="15" y1="9" x2="9" y2="15"></line><line x1="9" y1="9" x2="15" y2="15"></line>'
+    };
+    
+    const entry = document.createElement('div');
+    entry.className = `log-entry log-${type}`;
+    entry.innerHTML = `
+        <svg class="log-icon" xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+            ${iconMap[type]}
+        </svg>
+        <span class="log-timestamp">[${timestamp}]</span>
+        <span class="log-message">${message}</span>
+    `;
+    
+    logOutput.appendChild(entry);
+    logOutput.scrollTop = logOutput.scrollHeight;
+}
+
+// Limpar log
+function clearLog() {
+    const logOutput = document.getElementById('log-output');
+    logOutput.innerHTML = '';
+    addLogEntry('Log limpo pelo usuário', 'info');
+}
+
+// Baixar log
+function downloadLog() {
+    const logEntries = document.querySelectorAll('.log-entry');
+    let logText = 'Log do Atualizador Dashboard VCA\n';
+    logText += '=====================================\n\n';
+    
+    logEntries.forEach(entry => {
+        const timestamp = entry.querySelector('.log-timestamp').textContent;
+        const message = entry.querySelector('.log-message').textContent;
+        const type = entry.className.includes('log-error') ? 'ERROR' : 
+                   entry.className.includes('log-warning') ? 'WARNING' :
+                   entry.className.includes('log-success') ? 'SUCCESS' : 'INFO';
+        
+        logText += `${timestamp} [${type}] ${message}\n`;
+    });
+    
+    const blob = new Blob([logText], { type: 'text/plain' });
+    const url = URL.createObjectURL(blob);
+    const a = document.createElement('a');
+    a.href = url;
+    a.download = `log_dashboard_${new Date().toISOString().slice(0, 19).replace(/:/g, '-')}.txt`;
+    document.body.appendChild(a);
+    a.click();
+    document.body.removeChild(a);
+    URL.revokeObjectURL(url);
+}
+
+// Funções utilitárias
+function formatFileSize(bytes) {
+    if (bytes === 0) return '0 Bytes';
+    const k = 1024;
+    const sizes = ['Bytes', 'KB', 'MB', 'GB'];
+    const i = Math.floor(Math.log(bytes) / Math.log(k));
+    return parseFloat((bytes / Math.pow(k, i)).toFixed(2)) + ' ' + sizes[i];
+}
+
+function getFileExtension(filename) {
+    return filename.slice(filename.lastIndexOf('.'));
+}
@@ -7,7 +7,7 @@ import os
 import json
 from io import BytesIO
 
-from app_new import create_app
+from app import create_app
 from config.config import TestingConfig
 
 
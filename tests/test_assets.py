@@ -0,0 +1,78 @@
+"""
+Testes para os estáticos com hash e pré-comprimidos
+"""
+import os
+import gzip
+import shutil
+import tempfile
+import unittest
+
+from utils.assets import build_assets, AssetManifest
+from app import create_app
+
+
+class TestAssets(unittest.TestCase):
+    """Testes para build, manifest e rotas de estáticos"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.static_folder = tempfile.mkdtemp()
+        with open(os.path.join(self.static_folder, 'app.js'), 'w') as f:
+            f.write('console.log("dashboard");\n' * 200)
+        with open(os.path.join(self.static_folder, 'LOGO.png'), 'wb') as f:
+            f.write(b'\x89PNG' + os.urandom(512))
+
+        self.manifest = build_assets(self.static_folder)
+        self.app = create_app('testing')
+        self.app.assets = AssetManifest(self.static_folder)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        shutil.rmtree(self.static_folder, ignore_errors=True)
+
+    def test_build_manifest(self):
+        """Testa nomes com hash e compressão apenas de tipos textuais"""
+        assets = self.manifest['assets']
+        self.assertRegex(assets['app.js']['file'], r'^app\.[0-9a-f]{12}\.js$')
+        self.assertIn('gzip', assets['app.js']['encodings'])
+        self.assertEqual(assets['LOGO.png']['encodings'], [])
+
+        hashed = os.path.join(self.static_folder, 'dist', assets['app.js']['file'])
+        with gzip.open(hashed + '.gz') as f, open(hashed, 'rb') as original:
+            self.assertEqual(f.read(), original.read())
+
+    def test_asset_route(self):
+        """Testa variante comprimida, cache imutável e 304"""
+        with self.app.test_request_context():
+            url = self.app.jinja_env.globals['asset_url']('app.js')
+        self.assertTrue(url.startswith('/assets/app.'))
+
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip, deflate'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        etag = response.headers['ETag']
+        response.close()
+
+        response = self.client.get(url, headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(url)
+        self.assertNotIn('Content-Encoding', response.headers)
+        response.close()
+        self.assertEqual(self.client.get('/assets/app.000000000000.js').status_code, 404)
+
+    def test_index_cached_with_etag(self):
+        """Testa página principal em cache com revalidação por ETag"""
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(self.manifest['assets']['app.js']['file'], response.get_data(as_text=True))
+
+        response = self.client.get('/', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+"""
+Testes para o registro estruturado de alterações
+"""
+import os
+import json
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+from utils.change_log import ChangeLog
+
+
+class TestChangeLog(unittest.TestCase):
+    """Testes para ChangeLog"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_summary_is_bounded(self):
+        """Testa contagens por coluna e amostra limitada"""
+        change_log = ChangeLog(sample_size=2)
+        for i in range(5):
+            change_log.record_update(i + 2, f'Imob {i}', 'Estado', 'PE', 'PB')
+        change_log.record_new('Imob N', {'Estado': 'PE'})
+
+        summary = change_log.summary()
+        self.assertEqual(summary['updated_cells'], 5)
+        self.assertEqual(summary['new_rows'], 1)
+        self.assertEqual(summary['by_column'], {'Estado': 5})
+        self.assertEqual(len(summary['sample']), 2)
+        self.assertTrue(summary['truncated'])
+        self.assertFalse(summary['has_details'])
+
+    def test_details_file(self):
+        """Testa gravação do detalhe completo em NDJSON"""
+        path = os.path.join(self.temp_dir, 'detalhes', 'job.ndjson')
+        with ChangeLog(path, sample_size=1) as change_log:
+            change_log.record_update(2, 'Imob A', 'Quantidade de Corretores', '5', '7')
+            change_log.record_new('Imob B', {'Quantidade de Corretores': np.int64(3)})
+
+        with open(path, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+
+        self.assertEqual([record['type'] for record in records], ['update', 'new'])
+        self.assertEqual(records[1]['values'], {'Quantidade de Corretores': '3'})
+        self.assertTrue(change_log.summary()['has_details'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Testes para a compactação de DataFrames (utils/dataframes.py)
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from iniciar_processo import ler_base
+from utils.dataframes import (
+    concat_shrunk, dataframe_from_json, dataframe_to_json, describe_report, fill_missing, shrink_dataframe
+)
+
+
+class TestShrinkDataframe(unittest.TestCase):
+    """Testes para shrink_dataframe e concat_shrunk"""
+
+    def _frame(self, start, rows):
+        return pd.DataFrame({
+            'Nome fantasia': [f'IMOB {i}' for i in range(start, start + rows)],
+            'Estado': pd.Series(['PE', 'PB'] * (rows // 2), dtype=object),
+            'Corretores': np.arange(rows, dtype='int64') % 100,
+            'Valor': np.full(rows, 0.1),
+            'Inteiro': np.full(rows, 2.0),
+            'Unnamed: 5': np.nan,
+        })
+
+    def test_types_and_values(self):
+        """Testa categorias, tipos menores e valores inalterados"""
+        df = self._frame(0, 2000)
+        report = {}
+        lean = shrink_dataframe(df, report)
+
+        self.assertEqual(str(lean['Estado'].dtype), 'category')
+        self.assertNotEqual(str(lean['Nome fantasia'].dtype), 'category')
+        self.assertEqual(lean['Corretores'].dtype, np.int8)
+        self.assertEqual(lean['Valor'].dtype, np.float64)
+        self.assertEqual(lean['Inteiro'].dtype, np.float32)
+        self.assertNotIn('Unnamed: 5', lean.columns)
+        self.assertEqual(lean.values.tolist()[1], ['IMOB 1', 'PB', 1, 0.1, 2.0])
+        self.assertLess(report['after_bytes'], report['before_bytes'])
+        self.assertGreater(describe_report(report)['memory_ratio'], 1)
+
+    def test_concat_keeps_categories(self):
+        """Testa blocos com categorias diferentes unidos sem voltar a object"""
+        first = shrink_dataframe(self._frame(0, 2000))
+        second = self._frame(2000, 2000)
+        second['Estado'] = pd.Series(['AL', 'PE'] * 1000, dtype=object)
+        second = shrink_dataframe(second)
+
+        df = concat_shrunk([first, second])
+        self.assertEqual(str(df['Estado'].dtype), 'category')
+        self.assertEqual(list(df['Estado'].iloc[[0, 2000]]), ['PE', 'AL'])
+        self.assertEqual(len(df), 4000)
+
+    def test_fill_missing_categories(self):
+        """Testa fillna('') em coluna categórica com vazios"""
+        df = pd.DataFrame({'Estado': pd.Categorical(['PE', None, 'PE', 'PE'])})
+        self.assertEqual(fill_missing(df)['Estado'].tolist(), ['PE', '', 'PE', 'PE'])
+
+
+    def test_json_round_trip(self):
+        """Testa DataFrame em JSON (etapas do pipeline) com índice, dtypes e vazios"""
+        df = shrink_dataframe(self._frame(0, 10)).set_index('Nome fantasia')
+        df['Data'] = pd.to_datetime('2025-06-03')
+        df.loc['IMOB 1', 'Valor'] = np.nan
+
+        restored = dataframe_from_json(dataframe_to_json(df))
+        pd.testing.assert_frame_equal(restored, df)
+
+
+class TestLerBase(unittest.TestCase):
+    """ler_base compacta cada bloco e mantém os valores comparados no diff"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_csv_in_chunks(self):
+        """Testa leitura em blocos com relatório de memória"""
+        path = os.path.join(self.temp_dir, 'base.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('Nome fantasia;Corretores;Estado;Cidade;Ativa no painel;Extra\n')
+            for i in range(3000):
+                f.write(f'IMOB {i} (CARUARU);{i % 7};PE;CARUARU;{"ATIVO" if i % 2 else ""};x\n')
+
+        memory = {}
+        with mock.patch('iniciar_processo.LINHAS_POR_BLOCO', 1000):
+            df = ler_base(path, memoria=memory)
+
+        self.assertEqual(list(df.columns), ['Nome fantasia', 'Corretores', 'Estado', 'Cidade', 'Ativa no painel'])
+        self.assertEqual(str(df['Cidade'].dtype), 'category')
+        self.assertEqual(df.iloc[2]['Ativa no painel'], '')
+        self.assertEqual(str(df.iloc[2]['Corretores']), '2')
+        self.assertIn('before_bytes', memory)
+
+
+if __name__ == '__main__':
+    unittest.main()
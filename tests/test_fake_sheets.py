@@ -0,0 +1,292 @@
+"""
+Testes para o backend falso do Google Sheets
+"""
+import os
+import hashlib
+import shutil
+import tempfile
+import json
+import unittest
+from io import BytesIO
+from unittest import mock
+
+import gspread
+import numpy as np
+from gspread.exceptions import APIError, SpreadsheetNotFound
+from werkzeug.datastructures import FileStorage
+
+from exceptions.errors import JobCancelledError
+
+from services.fake_sheets import FakeSheetsBackend
+from services.google_sheets_service import GoogleSheetsService
+from services.file_processing_service import FileProcessingService
+from iniciar_processo import iniciar_processo_de_atualizacao
+from app import create_app
+
+
+DASHBOARD_HEADER = ['Imobiliária', 'Quantidade de Corretores', 'Estado', 'Cidade',
+                    'Ativa em sistema', 'Contrato assinado']
+
+
+class TestFakeSheetsBackend(unittest.TestCase):
+    """Testes para FakeSheetsBackend"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.backend = FakeSheetsBackend()
+        self.client = self.backend.client()
+
+    def test_create_update_and_read(self):
+        """Testa escrita e leitura de valores"""
+        worksheet = self.client.create('Dashboard').sheet1
+        worksheet.update('A1', [['a', 'b'], [1, 2.0]])
+        worksheet.append_rows([['x']])
+        worksheet.update_cells([gspread.Cell(2, 2, 'novo')])
+
+        self.assertEqual(worksheet.get_all_values(), [['a', 'b'], ['1', 'novo'], ['x', '']])
+        self.assertEqual(self.client.open('Dashboard').sheet1, worksheet)
+
+    def test_open_unknown_spreadsheet(self):
+        """Testa abertura de planilha inexistente"""
+        with self.assertRaises(SpreadsheetNotFound):
+            self.client.open('Não existe')
+
+    def test_requests_per_minute_quota(self):
+        """Testa erro 429 ao exceder a cota por minuto"""
+        self.backend.requests_per_minute = 2
+        worksheet = self.client.create('Dashboard').sheet1
+        worksheet.clear()
+
+        with self.assertRaises(APIError) as ctx:
+            worksheet.clear()
+        self.assertEqual(ctx.exception.code, 429)
+        self.assertEqual(self.backend.stats()['errors'], {'429': 1})
+
+    def test_payload_limit(self):
+        """Testa limite de tamanho do payload"""
+        self.backend.max_payload_bytes = 50
+        worksheet = self.client.create('Dashboard').sheet1
+
+        with self.assertRaises(APIError) as ctx:
+            worksheet.update('A1', [['x' * 100]])
+        self.assertEqual(ctx.exception.code, 400)
+
+    def test_non_json_values_rejected(self):
+        """Testa que NaN e escalares do numpy falham como no gspread real"""
+        worksheet = self.client.create('Dashboard').sheet1
+
+        with self.assertRaises(ValueError):
+            worksheet.update('A1', [[float('nan')]])
+        with self.assertRaises(TypeError):
+            worksheet.append_rows([[np.int64(1)]])
+
+    def test_service_uses_injected_client(self):
+        """Testa GoogleSheetsService com cliente falso"""
+        service = GoogleSheetsService('inexistente.json', client=self.client)
+        self.assertTrue(service.test_connection())
+
+
+class TestIniciarProcessoWithFakeSheets(unittest.TestCase):
+    """Testa a sincronização completa contra o backend falso"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.client = FakeSheetsBackend().client()
+        spreadsheet = self.client.create('IMOBILIARIAS CARUARU 03.06.2025')
+        self.worksheet = spreadsheet.add_worksheet('BaseDeDados')
+        self.worksheet.load([
+            DASHBOARD_HEADER,
+            ['Imob A (CARUARU)', '5', 'PE', 'CARUARU', 'ATIVO', 'Assinado'],
+            ['Imob B (CARUARU)', '3', 'PE', 'CARUARU', 'ATIVO', 'Assinado'],
+        ])
+
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_sync(self):
+        """Testa atualização de células e inclusão de novas linhas"""
+        base_path = os.path.join(self.temp_dir, 'base.csv')
+        with open(base_path, 'w', encoding='utf-8') as f:
+            f.write('Nome fantasia;Corretores;Estado;Cidade;Ativa no painel\n')
+            f.write('Imob A (CARUARU);7;PE;CARUARU;ATIVO\n')
+            f.write('Imob B (CARUARU);3;PE;CARUARU;INATIVO\n')
+            f.write('Imob C (CARUARU);1;PE;CARUARU;ATIVO\n')
+            f.write('Imob D (RECIFE);1;PE;RECIFE;ATIVO\n')
+
+        log = iniciar_processo_de_atualizacao(base_path, client=self.client)
+
+        self.assertNotIn('ERRO', log)
+        self.assertEqual(self.worksheet.get_all_values(), [
+            DASHBOARD_HEADER,
+            ['Imob A (CARUARU)', '7', 'PE', 'CARUARU', 'ATIVO', 'Assinado'],
+            ['Imob B (CARUARU)', '3', 'PE', 'CARUARU', 'INATIVO', 'Não Assinado'],
+            ['Imob C (CARUARU)', '1', 'PE', 'CARUARU', 'ATIVO', 'Assinado'],
+        ])
+
+
+class TestCancellation(unittest.TestCase):
+    """Testa cancelamento cooperativo durante a gravação"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.fake_client = FakeSheetsBackend().client()
+        self.service = FileProcessingService(upload_folder=self.temp_dir, credentials_file='inexistente.json')
+        self.service.sheets_service = GoogleSheetsService('inexistente.json', client=self.fake_client,
+                                                          batch_size=2)
+
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_cancel_stops_at_batch_boundary(self):
+        """Testa que a planilha fica com um número inteiro de lotes"""
+        content = 'a,b\n' + ''.join(f'{i},{i}\n' for i in range(7))
+        written = []
+
+        def progress(event, data):
+            if event == 'batch_written':
+                written.append(data['batch'])
+
+        file = FileStorage(stream=BytesIO(content.encode('utf-8')), filename='base.csv')
+        with self.assertRaises(JobCancelledError) as ctx:
+            self.service.process_file(file, {'sheet_name': 'Copia'}, progress=progress,
+                                      cancel_check=lambda: len(written) == 2)
+
+        self.assertIn('após 2 de 4 lotes', str(ctx.exception))
+        values = self.fake_client.open('Copia').sheet1.get_all_values()
+        self.assertEqual(len(values), 1 + 2 * 2)
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+
+class TestDashboardSyncUpload(unittest.TestCase):
+    """Testa o modo 'dashboard' do upload e o download das alterações"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.temp_dir = tempfile.mkdtemp()
+        fake_client = FakeSheetsBackend().client()
+        worksheet = fake_client.create('Dashboard').add_worksheet('BaseDeDados')
+        worksheet.load([DASHBOARD_HEADER, ['Imob A (CARUARU)', '5', 'PE', 'CARUARU', 'ATIVO', 'Assinado']])
+
+        self.app = create_app('testing')
+        self.app.file_service = FileProcessingService(
+            upload_folder=self.temp_dir,
+            credentials_file='inexistente.json',
+            job_store=self.app.job_store,
+            processing_mode='dashboard',
+            dashboard={'sheet': 'Dashboard', 'tab': 'BaseDeDados'},
+            change_log_folder=os.path.join(self.temp_dir, 'change_logs'),
+            change_log_sample_size=1,
+            change_log_max_age=3600
+        )
+        self.app.file_service.sheets_service = GoogleSheetsService('inexistente.json', client=fake_client)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_summary_and_details(self):
+        """Testa resumo na resposta e detalhe completo em /jobs/<id>/changes"""
+        csv_content = ('Nome fantasia;Corretores;Estado;Cidade;Ativa no painel\n'
+                       'Imob A (CARUARU);7;PE;CARUARU;INATIVO\n').encode('utf-8')
+        response = self.client.post('/upload', data={'file': (BytesIO(csv_content), 'base.csv')})
+        self.assertEqual(response.status_code, 200)
+
+        data = json.loads(response.data)
+        changes = data['result']['result']['changes']
+        self.assertEqual(changes['updated_cells'], 3)
+        self.assertEqual(len(changes['sample']), 1)
+        self.assertTrue(changes['truncated'])
+
+        response = self.client.get(f"/jobs/{data['job_id']}/changes")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assertEqual(len(response.get_data(as_text=True).splitlines()), 3)
+        response.close()
+
+        self.assertEqual(self.client.get('/jobs/nao-existe/changes').status_code, 404)
+
+        # O detalhe fica no índice de workspaces, com validade própria
+        storage = self.app.file_service.storage
+        self.assertEqual(storage.usage()['workspaces'], 1)
+        storage.max_age = 0
+        self.assertEqual(storage.evict_expired(), 0)
+        self.app.file_service.discard_change_log(data['job_id'])
+        self.assertEqual(storage.usage()['workspaces'], 0)
+        self.assertEqual(self.client.get(f"/jobs/{data['job_id']}/changes").status_code, 404)
+
+    def test_streamed_upload(self):
+        """Testa eventos NDJSON do upload síncrono com stream=true"""
+        self.app.file_service.sheets_service.batch_size = 2
+        csv_content = ('Nome fantasia;Corretores;Estado;Cidade;Ativa no painel\n'
+                       'Imob A (CARUARU);7;PE;CARUARU;INATIVO\n'
+                       'Imob B (CARUARU);1;PE;CARUARU;ATIVO\n').encode('utf-8')
+        response = self.client.post('/upload', data={
+            'file': (BytesIO(csv_content), 'base.csv'), 'stream': 'true'
+        })
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+
+        events = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        names = [event['event'] for event in events]
+        self.assertEqual(names[0], 'accepted')
+        self.assertEqual(names[-1], 'completed')
+        self.assertIn('validated', names)
+        self.assertEqual([e['rows'] for e in events if e['event'] == 'parsed'], [2])
+        self.assertEqual([(e['batch'], e['total']) for e in events if e['event'] == 'batch_written'],
+                         [(1, 3), (2, 3), (3, 3)])
+
+        job = self.app.job_store.get_job(events[0]['job_id'])
+        self.assertEqual(job['state'], 'SUCCESS')
+
+    def test_idempotency_key(self):
+        """Testa repetição com Idempotency-Key: resultado gravado, job em andamento e outro arquivo"""
+        csv_content = ('Nome fantasia;Corretores;Estado;Cidade;Ativa no painel\n'
+                       'Imob A (CARUARU);7;PE;CARUARU;INATIVO\n').encode('utf-8')
+
+        def upload(content, key):
+            return self.client.post('/upload', data={'file': (BytesIO(content), 'base.csv')},
+                                    headers={'Idempotency-Key': key})
+
+        first = json.loads(upload(csv_content, 'chave-1').data)
+        with mock.patch.object(self.app.file_service, 'process_file') as process_file:
+            response = upload(csv_content, 'chave-1')
+        process_file.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertTrue(data['replayed'])
+        self.assertEqual(data['job_id'], first['job_id'])
+        self.assertEqual(data['result'], first['result'])
+
+        # Mesmo arquivo de um job ainda em execução: o cliente acompanha o mesmo job
+        self.app.job_store.create_job('em-andamento', filename='base.csv', backend='sync',
+                                      content_hash=hashlib.sha256(csv_content).hexdigest(),
+                                      idempotency_key='chave-2')
+        self.app.job_store.mark_started('em-andamento')
+        response = upload(csv_content, 'chave-2')
+        self.assertEqual(response.status_code, 202)
+        data = json.loads(response.data)
+        self.assertEqual((data['task_id'], data['replayed']), ('em-andamento', True))
+
+        response = upload(csv_content + b'Imob B (CARUARU);1;PE;CARUARU;ATIVO\n', 'chave-1')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(json.loads(response.data)['error_type'], 'idempotency_conflict')
+
+    def test_cancel_endpoint(self):
+        """Testa /jobs/<id>/cancel para jobs inexistentes, na fila e finalizados"""
+        self.assertEqual(self.client.post('/jobs/nao-existe/cancel').status_code, 404)
+
+        self.app.job_store.create_job('na-fila', backend='sync')
+        response = self.client.post('/jobs/na-fila/cancel')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(json.loads(response.data)['state'], 'CANCELLED')
+
+        response = self.client.post('/jobs/na-fila/cancel')
+        self.assertEqual(response.status_code, 409)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+"""
+Testes para a configuração do gunicorn
+"""
+import os
+import importlib
+import unittest
+from unittest import mock
+
+from config import gunicorn_config
+from config.gunicorn_config import worker_count
+
+
+class TestGunicornConfig(unittest.TestCase):
+    """Testes para o cálculo de workers e overrides por ambiente"""
+
+    def test_worker_count(self):
+        """Testa workers por núcleos, limitados pela memória"""
+        self.assertEqual(worker_count(4, 8192), 9)
+        self.assertEqual(worker_count(4, 1024, worker_memory_mb=400), 2)
+        self.assertEqual(worker_count(4, None, worker_class='gevent'), 4)
+        self.assertEqual(worker_count(1, 100), 1)
+
+    def test_environment_overrides(self):
+        """Testa WEB_CONCURRENCY, threads e reciclagem configuráveis"""
+        env = {'WEB_CONCURRENCY': '3', 'GUNICORN_THREADS': '8', 'GUNICORN_MAX_REQUESTS': '200',
+               'GUNICORN_WORKER_CLASS': 'gthread', 'PORT': '8080'}
+        with mock.patch.dict(os.environ, env):
+            config = importlib.reload(gunicorn_config)
+            self.assertEqual(config.workers, 3)
+            self.assertEqual(config.threads, 8)
+            self.assertEqual(config.max_requests_jitter, 20)
+            self.assertEqual(config.bind, '0.0.0.0:8080')
+            self.assertTrue(config.preload_app)
+        importlib.reload(gunicorn_config)
+
+    def test_gevent_fallback_logged(self):
+        """Testa gthread sem gevent instalado, com aviso no log do gunicorn"""
+        server = mock.Mock()
+        with mock.patch.dict(os.environ, {'GUNICORN_WORKER_CLASS': 'gevent'}), \
+                mock.patch('importlib.util.find_spec', return_value=None):
+            config = importlib.reload(gunicorn_config)
+            self.assertEqual(config.worker_class, 'gthread')
+            config.when_ready(server)
+        server.log.warning.assert_called_once()
+        importlib.reload(gunicorn_config)
+
+
+if __name__ == '__main__':
+    unittest.main()
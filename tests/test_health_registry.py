@@ -0,0 +1,151 @@
+"""
+Testes para o registro de heartbeats e saúde das dependências
+"""
+import json
+import time
+import unittest
+from unittest import mock
+
+from app import create_app
+from services.health_registry import (
+    HealthRegistry, HeartbeatPublisher, RedisHealthRegistry, create_health_registry, run_probe, summarize
+)
+
+
+class TestHealthRegistry(unittest.TestCase):
+    """Testes para o HealthRegistry"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.registry = HealthRegistry(':memory:')
+
+    def test_probe_results(self):
+        """Testa publicação do resultado, da falha e da exceção da verificação"""
+        self.assertEqual(run_probe(self.registry, 'google_sheets', lambda: True), 'healthy')
+        self.assertEqual(run_probe(self.registry, 'other', lambda: False), 'unhealthy')
+
+        def broken():
+            raise RuntimeError('sem credenciais')
+        self.assertEqual(run_probe(self.registry, 'google_sheets', broken), 'error')
+
+        records = {r['name']: r for r in self.registry.records('dependency')}
+        self.assertEqual(set(records), {'google_sheets', 'other'})
+        self.assertEqual(records['google_sheets']['details']['error'], 'sem credenciais')
+
+    def test_summarize_ttl(self):
+        """Testa heartbeats vencidos e verificações antigas marcadas como 'stale'"""
+        self.registry.publish('worker:a', 'alive', kind='worker', details={'queues': ['cpu']})
+        self.registry.publish('worker:b', 'stopped', kind='worker')
+        self.registry.publish('google_sheets', 'healthy')
+
+        view = summarize(self.registry.records(), heartbeat_ttl=30, dependency_ttl=60)
+        self.assertEqual([w['name'] for w in view['workers']], ['worker:a'])
+        self.assertEqual(view['workers'][0]['queues'], ['cpu'])
+        self.assertEqual(view['dependencies']['google_sheets']['status'], 'healthy')
+
+        later = time.time() + 120
+        with mock.patch('services.health_registry.time.time', return_value=later):
+            view = summarize(self.registry.records(), heartbeat_ttl=30, dependency_ttl=60)
+        self.assertEqual(view['workers'], [])
+        self.assertEqual(view['dependencies']['google_sheets']['status'], 'stale')
+
+    def test_publisher_heartbeat_and_probe(self):
+        """Testa a thread de heartbeat executando as verificações"""
+        calls = []
+        publisher = HeartbeatPublisher(self.registry, 'executor:test', interval=0.01,
+                                       probes={'google_sheets': lambda: calls.append(1) or True},
+                                       probe_interval=3600)
+        publisher.ensure_started()
+        publisher.ensure_started()
+        deadline = time.time() + 2
+        while not calls and time.time() < deadline:
+            time.sleep(0.01)
+        publisher.stop()
+
+        records = {r['name']: r for r in self.registry.records()}
+        self.assertEqual(records['executor:test']['status'], 'stopped')
+        self.assertEqual(records['google_sheets']['status'], 'healthy')
+        self.assertEqual(len(calls), 1)
+
+
+class FakeRedis:
+    """Subconjunto do cliente redis-py usado pelo RedisHealthRegistry"""
+
+    def __init__(self):
+        self.hashes = {}
+        self.clock = 1000.0
+
+    def time(self):
+        return int(self.clock), int((self.clock % 1) * 1e6)
+
+    def ping(self):
+        return True
+
+    def hset(self, key, name, value):
+        self.hashes.setdefault(key, {})[name.encode('utf-8')] = value.encode('utf-8')
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def hdel(self, key, *names):
+        for name in names:
+            self.hashes.get(key, {}).pop(name.encode('utf-8'), None)
+
+
+class TestRedisHealthRegistry(unittest.TestCase):
+    """Workers em outras máquinas publicam no Redis que a aplicação lê"""
+
+    def _registry(self, client):
+        registry = RedisHealthRegistry('redis://localhost:6379/0', retention=3600)
+        registry._client = client
+        return registry
+
+    def test_shared_between_hosts(self):
+        """Testa heartbeat de outro processo visto pela aplicação, idade pelo relógio do Redis"""
+        client = FakeRedis()
+        worker, web = self._registry(client), self._registry(client)
+        worker.publish('worker:cpu-1', 'alive', kind='worker', details={'queues': ['cpu']})
+        run_probe(worker, 'google_sheets', lambda: True)
+
+        client.clock += 5
+        view = summarize(web.records(), heartbeat_ttl=30, dependency_ttl=60)
+        self.assertEqual([(w['name'], w['age']) for w in view['workers']], [('worker:cpu-1', 5.0)])
+        self.assertEqual(view['dependencies']['google_sheets']['status'], 'healthy')
+
+        # Worker desligado sem aviso: o registro sai depois da retenção
+        client.clock += 4000
+        self.assertEqual(web.records(), [])
+        self.assertEqual(client.hashes[RedisHealthRegistry.KEY], {})
+
+    def test_factory(self):
+        """Testa SQLite com o executor local e fallback sem Redis no modo auto"""
+        config = {'JOB_STORE_PATH': ':memory:', 'HEALTH_REDIS_URL': 'redis://127.0.0.1:1/0'}
+        self.assertIsInstance(create_health_registry(config, 'local'), HealthRegistry)
+        self.assertIsInstance(create_health_registry(config, 'celery'), HealthRegistry)
+        with self.assertRaises(Exception):
+            create_health_registry(dict(config, HEALTH_STORAGE='redis'), 'celery')
+
+
+class TestHealthEndpoint(unittest.TestCase):
+    """O /health serve o veredito em cache, montado com os registros publicados"""
+
+    def test_reads_published_records(self):
+        """Testa que o endpoint não chama o Google Sheets"""
+        app = create_app('testing')
+        app.health_registry.publish('google_sheets', 'unhealthy')
+        if 'broker' in app.readiness._probes:
+            app.readiness.add_probe('broker', lambda: None)
+        app.readiness.run_once()
+
+        with mock.patch.object(type(app.file_service), 'sheets_service',
+                               new_callable=mock.PropertyMock) as sheets:
+            response = app.test_client().get('/health')
+        sheets.assert_not_called()
+
+        data = json.loads(response.data)
+        self.assertEqual(data['services']['google_sheets'], 'unhealthy')
+        self.assertEqual(data['status'], 'degraded')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+Testes de tempo de importação (cold start)
+"""
+import os
+import sys
+import json
+import subprocess
+import unittest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Limite para ``import app`` (inclui create_app); ajustável em máquinas lentas
+IMPORT_TIME_LIMIT = float(os.environ.get('IMPORT_TIME_LIMIT', 2.0))
+
+HEAVY_MODULES = ['pandas', 'gspread', 'google.oauth2.service_account', 'iniciar_processo']
+
+SCRIPT = """
+import sys, json, time
+started = time.perf_counter()
+from app import create_app
+import app as app_module
+elapsed = time.perf_counter() - started
+loaded_on_import = [m for m in {heavy!r} if m in sys.modules]
+
+test_app = create_app('testing')
+client = test_app.test_client()
+statuses = [client.get('/').status_code]
+loaded_after_index = [m for m in {heavy!r} if m in sys.modules]
+statuses.append(client.get('/health').status_code)
+print(json.dumps({{
+    'elapsed': elapsed,
+    'loaded_on_import': loaded_on_import,
+    'loaded_after_index': loaded_after_index,
+    'pandas_after_health': 'pandas' in sys.modules,
+    'statuses': statuses,
+}}))
+"""
+
+
+class TestImportTime(unittest.TestCase):
+    """Importar a aplicação não deve carregar pandas/gspread nem passar do limite"""
+
+    def test_cold_start(self):
+        """Testa tempo de import e módulos carregados em um processo novo"""
+        completed = subprocess.run(
+            [sys.executable, '-c', SCRIPT.format(heavy=HEAVY_MODULES)],
+            cwd=ROOT, capture_output=True, text=True, timeout=120
+        )
+        self.assertEqual(completed.returncode, 0, completed.stderr)
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+
+        self.assertEqual(result['loaded_on_import'], [])
+        self.assertEqual(result['loaded_after_index'], [])
+        self.assertFalse(result['pandas_after_health'])
+        self.assertEqual(result['statuses'], [200, 200])
+        self.assertLess(result['elapsed'], IMPORT_TIME_LIMIT,
+                        f"import app levou {result['elapsed']:.2f}s (limite {IMPORT_TIME_LIMIT}s)")
+
+
+if __name__ == '__main__':
+    unittest.main()
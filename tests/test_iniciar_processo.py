@@ -0,0 +1,67 @@
+"""
+Testes para as etapas do diff em iniciar_processo.py
+"""
+import unittest
+
+import pandas as pd
+
+from utils.change_log import ChangeLog
+from iniciar_processo import (
+    normalizar_base, casar_registros, calcular_diferencas, montar_payload, contrato_para_status
+)
+
+
+CABECALHOS = ['Imobiliária', 'Quantidade de Corretores', 'Estado', 'Cidade',
+              'Ativa em sistema', 'Contrato assinado']
+INDICES = {nome: i for i, nome in enumerate(CABECALHOS)}
+
+
+class TestEtapasDoDiff(unittest.TestCase):
+    """Testes para normalização, casamento, diff e payload"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.df_raw = pd.DataFrame([
+            [' imob a (caruaru) ', 7, 'PE', 'CARUARU', 'ATIVO'],
+            ['IMOB A (CARUARU)', 1, 'PE', 'CARUARU', 'INATIVO'],
+            ['', 1, 'PE', 'CARUARU', 'ATIVO'],
+            ['Imob N (CARUARU)', 2, 'PE', 'CARUARU', 'PENDENTE'],
+        ], columns=['Nome fantasia', 'Corretores', 'Estado', 'Cidade', 'Ativa no painel'])
+        self.linhas = [['Imob A (CARUARU)', '5', 'PE', 'CARUARU', 'ATIVO', 'Assinado']]
+
+    def test_duplicate_key_uses_first_record(self):
+        """Testa que a primeira ocorrência da chave na base prevalece"""
+        df_base = normalizar_base(self.df_raw)
+        pares = casar_registros(df_base, self.linhas, INDICES)
+
+        self.assertEqual(len(df_base), 3)
+        self.assertEqual(len(pares), 1)
+        self.assertEqual(pares[0][2]['Corretores'], '7')
+
+    def test_diff_and_payload(self):
+        """Testa células alteradas, novas linhas e payload"""
+        df_base = normalizar_base(self.df_raw)
+        pares = casar_registros(df_base, self.linhas, INDICES)
+        change_log = ChangeLog()
+        alteracoes, novas_linhas = calcular_diferencas(pares, df_base, self.linhas, CABECALHOS, INDICES, change_log)
+
+        self.assertEqual(alteracoes, [(2, 2, '7')])
+        self.assertEqual(novas_linhas, [['Imob N (CARUARU)', '2', 'PE', 'CARUARU', 'PENDENTE', 'Pendente']])
+        self.assertEqual([(c.row, c.col, c.value) for c in montar_payload(alteracoes)], [(2, 2, '7')])
+        self.assertEqual(contrato_para_status('INATIVO'), 'Não Assinado')
+        self.assertEqual(change_log.summary()['by_column'], {'Quantidade de Corretores': 1})
+        self.assertEqual(change_log.summary()['new_rows'], 1)
+
+    def test_float_column_matches_sheet_text(self):
+        """Testa que Corretores lido como float (vazios na base) não gera diff para '5'"""
+        self.df_raw['Corretores'] = [5.0, 1.0, None, 2.5]
+        df_base = normalizar_base(self.df_raw, separador_decimal=',')
+        pares = casar_registros(df_base, self.linhas, INDICES)
+        alteracoes, novas_linhas = calcular_diferencas(pares, df_base, self.linhas, CABECALHOS, INDICES, ChangeLog())
+
+        self.assertEqual(alteracoes, [])
+        self.assertEqual(novas_linhas[0][1], '2,5')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+"""
+Testes para o registro de jobs
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from services.job_store import JobStore
+from exceptions.errors import ValidationError
+
+
+class TestJobStore(unittest.TestCase):
+    """Testes para JobStore"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.store = JobStore(':memory:')
+
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        self.store.close()
+
+    def test_job_lifecycle(self):
+        """Testa criação, etapas e término de um job"""
+        self.store.create_job('job-1', filename='base.csv', content_hash='abc', size=10)
+        self.store.mark_started('job-1')
+        self.store.record_stage('job-1', 'parse', 0.5)
+        self.store.finish_job('job-1', 'SUCCESS', result={'rows': 3})
+
+        job = self.store.get_job('job-1')
+        self.assertEqual(job['state'], 'SUCCESS')
+        self.assertEqual(job['stages'], {'parse': 0.5})
+        self.assertEqual(job['result'], {'rows': 3})
+        self.assertIsNotNone(job['duration'])
+
+    def test_get_unknown_job(self):
+        """Testa busca de job inexistente"""
+        self.assertIsNone(self.store.get_job('nao-existe'))
+
+    def test_keyset_pagination(self):
+        """Testa paginação por cursor sem repetir nem pular jobs"""
+        for i in range(7):
+            self.store.create_job(f'job-{i}', filename='base.csv')
+
+        seen = []
+        cursor = None
+        while True:
+            jobs, cursor = self.store.list_jobs(limit=3, cursor=cursor)
+            seen.extend(job['id'] for job in jobs)
+            if cursor is None:
+                break
+
+        self.assertEqual(len(seen), 7)
+        self.assertEqual(len(set(seen)), 7)
+
+    def test_filters(self):
+        """Testa filtros por estado e arquivo"""
+        self.store.create_job('a', filename='a.csv')
+        self.store.create_job('b', filename='b.csv')
+        self.store.finish_job('b', 'FAILURE', error='erro')
+
+        jobs, _ = self.store.list_jobs(state='FAILURE')
+        self.assertEqual([job['id'] for job in jobs], ['b'])
+
+        jobs, _ = self.store.list_jobs(filename='a.csv')
+        self.assertEqual([job['id'] for job in jobs], ['a'])
+
+    def test_invalid_cursor(self):
+        """Testa cursor malformado"""
+        with self.assertRaises(ValidationError):
+            self.store.list_jobs(cursor='%%%')
+
+    def test_idempotency_key_reuse(self):
+        """Testa que a mesma chave devolve o job original"""
+        self.assertIsNone(self.store.create_job('job-1', idempotency_key='chave'))
+        self.assertEqual(self.store.create_job('job-2', idempotency_key='chave'), 'job-1')
+        self.assertIsNone(self.store.get_job('job-2'))
+
+    def test_idempotency_key_released_on_failure(self):
+        """Testa liberação da chave quando o job falha"""
+        self.store.create_job('job-1', idempotency_key='chave')
+        self.store.finish_job('job-1', 'FAILURE', error='erro')
+
+        self.assertIsNone(self.store.create_job('job-2', idempotency_key='chave'))
+
+    def test_idempotency_key_expires(self):
+        """Testa expiração da chave pelo TTL"""
+        self.store.create_job('job-1', idempotency_key='chave', key_ttl=-1)
+
+        self.assertIsNone(self.store.create_job('job-2', idempotency_key='chave'))
+
+
+    def test_cancel_pending_job(self):
+        """Testa cancelamento imediato de job na fila"""
+        self.store.create_job('job-1', idempotency_key='chave')
+        job = self.store.request_cancel('job-1')
+
+        self.assertEqual(job['state'], 'CANCELLED')
+        self.assertIsNone(self.store.create_job('job-2', idempotency_key='chave'))
+
+    def test_cancel_running_job(self):
+        """Testa que job em execução só recebe o pedido de cancelamento"""
+        self.store.create_job('job-1')
+        self.store.mark_started('job-1')
+        self.assertFalse(self.store.is_cancel_requested('job-1'))
+
+        job = self.store.request_cancel('job-1')
+        self.assertEqual(job['state'], 'STARTED')
+        self.assertTrue(self.store.is_cancel_requested('job-1'))
+
+        # Task que começa depois do cancelamento não volta para STARTED
+        self.store.create_job('job-2')
+        self.store.request_cancel('job-2')
+        self.store.mark_started('job-2')
+        self.assertEqual(self.store.get_job('job-2')['state'], 'CANCELLED')
+
+    def test_migrates_old_database(self):
+        """Testa inclusão de colunas novas em bancos existentes"""
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        try:
+            conn = sqlite3.connect(path)
+            conn.execute('CREATE TABLE jobs (id TEXT PRIMARY KEY, created_at REAL NOT NULL, '
+                         'started_at REAL, finished_at REAL, state TEXT NOT NULL, filename TEXT, '
+                         "content_hash TEXT, size INTEGER, backend TEXT, stages TEXT NOT NULL DEFAULT '{}', "
+                         'result TEXT, error TEXT)')
+            conn.close()
+
+            store = JobStore(path)
+            store.create_job('job-1')
+            self.assertIsNotNone(store.request_cancel('job-1'))
+            store.close()
+        finally:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+    def test_reopen_after_fork(self):
+        """Testa que a conexão reaberta (ex.: após fork do gunicorn) vê os mesmos dados"""
+        fd, path = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        try:
+            store = JobStore(path)
+            store.create_job('job-1')
+            store.reopen()
+            store.finish_job('job-1', 'SUCCESS')
+            self.assertEqual(store.get_job('job-1')['state'], 'SUCCESS')
+            store.close()
+        finally:
+            for suffix in ('', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+
+if __name__ == '__main__':
+    unittest.main()
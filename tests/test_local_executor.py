@@ -0,0 +1,134 @@
+"""
+Testes para o executor local de tasks
+"""
+import threading
+import unittest
+
+from services.local_executor import LocalExecutor, SUCCESS, FAILURE, PROGRESS, REVOKED
+from exceptions.errors import QueueFullError
+
+
+class TestLocalExecutor(unittest.TestCase):
+    """Testes para LocalExecutor"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.executor = LocalExecutor(max_workers=1, max_queue=1)
+
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        self.executor.shutdown()
+
+    def test_delay_and_result(self):
+        """Testa execução assíncrona com resultado"""
+        @self.executor.task
+        def soma(a, b):
+            return a + b
+
+        task = soma.delay(2, 3)
+        self.assertEqual(task.get(timeout=5), 5)
+
+        result = self.executor.AsyncResult(task.id)
+        self.assertEqual(result.state, SUCCESS)
+        self.assertTrue(result.ready())
+        self.assertEqual(result.result, 5)
+
+    def test_bound_task_update_state(self):
+        """Testa update_state em task com bind=True"""
+        started = threading.Event()
+        release = threading.Event()
+
+        @self.executor.task(bind=True)
+        def longa(self):
+            self.update_state(state='PROGRESS', meta={'status': 'Processando...'})
+            started.set()
+            release.wait(5)
+            return self.request.id
+
+        task = longa.delay()
+        started.wait(5)
+
+        result = self.executor.AsyncResult(task.id)
+        self.assertEqual(result.state, PROGRESS)
+        self.assertEqual(result.info['status'], 'Processando...')
+
+        release.set()
+        self.assertEqual(task.get(timeout=5), task.id)
+
+    def test_failure_state(self):
+        """Testa task que levanta exceção"""
+        @self.executor.task
+        def falha():
+            raise ValueError('boom')
+
+        task = falha.delay()
+        with self.assertRaises(ValueError):
+            task.get(timeout=5)
+
+        self.assertEqual(task.state, FAILURE)
+        self.assertIn('boom', str(task.info))
+
+    def test_queue_full(self):
+        """Testa limite de tasks pendentes"""
+        release = threading.Event()
+
+        @self.executor.task
+        def bloqueia():
+            release.wait(5)
+
+        bloqueia.delay()
+        bloqueia.delay()
+
+        with self.assertRaises(QueueFullError):
+            bloqueia.delay()
+
+        release.set()
+
+    def test_revoke_queued_task(self):
+        """Testa revogação de task ainda na fila"""
+        release = threading.Event()
+        executed = []
+
+        @self.executor.task
+        def bloqueia():
+            release.wait(5)
+
+        @self.executor.task
+        def marca():
+            executed.append(True)
+
+        bloqueia.delay()
+        task = marca.delay()
+        task.revoke()
+        release.set()
+
+        task.get(timeout=5)
+        self.assertEqual(task.state, REVOKED)
+        self.assertEqual(executed, [])
+
+    def test_revoke_running_task(self):
+        """Testa que a task em execução só aparece como revogada quando para"""
+        started = threading.Event()
+        stop = threading.Event()
+
+        @self.executor.task(bind=True)
+        def longa(self):
+            started.set()
+            stop.wait(5)
+            if self.executor.is_revoked(self.request.id):
+                raise RuntimeError('cancelada')
+
+        task = longa.delay()
+        started.wait(5)
+        task.revoke()
+        self.assertTrue(self.executor.is_revoked(task.id))
+        self.assertNotEqual(task.state, REVOKED)
+        self.assertFalse(task.ready())
+
+        stop.set()
+        task.get(timeout=5, propagate=False)
+        self.assertEqual(task.state, REVOKED)
+
+
+if __name__ == '__main__':
+    unittest.main()
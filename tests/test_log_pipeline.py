@@ -0,0 +1,131 @@
+"""
+Testes para o pipeline de logging com fila
+"""
+import logging
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import unittest
+
+from utils.log_pipeline import EventRateLimiter, LogPipeline, NonBlockingQueueHandler
+
+
+class ThreadRecordingFormatter(logging.Formatter):
+    """Anota a thread em que cada registro foi formatado"""
+
+    def __init__(self):
+        super().__init__()
+        self.threads = set()
+
+    def format(self, record):
+        self.threads.add(threading.get_ident())
+        return super().format(record)
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+class TestLogPipeline(unittest.TestCase):
+    """Testes para o LogPipeline"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.logger = logging.getLogger('tests.log_pipeline')
+        self.logger.propagate = False
+        self.logger.setLevel(logging.INFO)
+
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        self.logger.handlers = []
+
+    def test_formats_in_background_and_limits_per_event(self):
+        """Testa formatação fora da thread de quem loga e descarte contado"""
+        formatter = ThreadRecordingFormatter()
+        output = ListHandler()
+        output.setFormatter(formatter)
+        pipeline = LogPipeline([output], rate=5, window=60)
+        self.logger.addHandler(pipeline.handler)
+        pipeline.start()
+
+        for i in range(20):
+            self.logger.info(f"Célula {i} atualizada")
+        self.logger.info("Outro evento")
+        self.logger.warning("Aviso nunca descartado")
+        pipeline.stop()
+
+        self.assertEqual(len(output.lines), 7)
+        self.assertEqual(output.lines[-1], "Aviso nunca descartado")
+        self.assertNotIn(threading.get_ident(), formatter.threads)
+        self.assertEqual(pipeline.stats()['dropped_rate_limited'], 15)
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'fork indisponível')
+    def test_restarts_after_fork(self):
+        """Testa que o filho (worker do gunicorn com preload_app) continua escrevendo"""
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+        path = os.path.join(temp_dir, 'child.log')
+        output = logging.FileHandler(path)
+        pipeline = LogPipeline([output])
+        self.logger.addHandler(pipeline.handler)
+        pipeline.start()
+
+        pid = os.fork()
+        if pid == 0:
+            code = 1
+            try:
+                pipeline.restart_after_fork()
+                self.logger.warning("Registro do worker")
+                pipeline.stop()
+                code = 0 if pipeline.stats()['queue_depth'] == 0 else 2
+            finally:
+                os._exit(code)
+        _, status = os.waitpid(pid, 0)
+        pipeline.stop()
+
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0)
+        with open(path) as f:
+            self.assertIn("Registro do worker", f.read())
+
+    def test_full_queue_drops_without_blocking(self):
+        """Testa descarte contado quando a fila está cheia"""
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=2))
+        self.logger.addHandler(handler)
+        for i in range(5):
+            self.logger.info("registro %d", i)
+        self.assertEqual(handler.queue.qsize(), 2)
+        self.assertEqual(handler.dropped, 3)
+
+    def test_import_time_formatter_renders_json(self):
+        """Testa que logs anteriores ao setup_logging (init_extensions) saem em JSON"""
+        import json
+        import structlog
+        from app import log_formatter
+
+        output = ListHandler()
+        output.setFormatter(log_formatter())
+        self.logger.addHandler(output)
+        structlog.get_logger('tests.log_pipeline').info("Rate limiting configurado")
+
+        self.assertEqual(json.loads(output.lines[0])['event'], "Rate limiting configurado")
+
+    def test_structlog_event_key(self):
+        """Testa que eventos do structlog contam pelo nome do evento"""
+        limiter = EventRateLimiter(rate=1, window=60)
+        first = logging.LogRecord('app', logging.INFO, 'a.py', 1, {'event': 'upload', 'size': 1}, None, None)
+        second = logging.LogRecord('app', logging.INFO, 'a.py', 1, {'event': 'upload', 'size': 2}, None, None)
+        other = logging.LogRecord('app', logging.INFO, 'a.py', 1, {'event': 'status'}, None, None)
+        self.assertTrue(limiter.filter(first))
+        self.assertFalse(limiter.filter(second))
+        self.assertTrue(limiter.filter(other))
+
+
+if __name__ == '__main__':
+    unittest.main()
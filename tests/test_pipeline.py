@@ -0,0 +1,230 @@
+"""
+Testes para o pipeline de tasks parse -> diff -> write
+"""
+import os
+import json
+import shutil
+import tempfile
+import unittest
+from io import BytesIO
+from unittest import mock
+
+from werkzeug.datastructures import FileStorage
+
+from config.config import Config
+from exceptions.errors import QueueFullError
+from services import celery_tasks
+from services.fake_sheets import configure_shared_backend
+from services.job_store import JobStore
+from services.pipeline_store import LocalPipelineStore, RedisPipelineStore
+from services.storage_manager import StorageManager
+
+
+DASHBOARD_HEADER = ['Imobiliária', 'Quantidade de Corretores', 'Estado', 'Cidade',
+                    'Ativa em sistema', 'Contrato assinado']
+
+CSV_CONTENT = ('Nome fantasia;Corretores;Estado;Cidade;Ativa no painel\n'
+               'Imob A (CARUARU);7;PE;CARUARU;INATIVO\n'
+               'Imob B (CARUARU);1;PE;CARUARU;ATIVO\n').encode('utf-8')
+
+
+@unittest.skipUnless(celery_tasks.CELERY_AVAILABLE, 'Celery não instalado')
+class TestCeleryPipeline(unittest.TestCase):
+    """Executa a cadeia de tasks em modo eager com o backend falso do Sheets"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.temp_dir = tempfile.mkdtemp()
+        backend = configure_shared_backend()
+        self.worksheet = backend.client().create('Dashboard').add_worksheet('BaseDeDados')
+        self.worksheet.load([DASHBOARD_HEADER,
+                             ['Imob A (CARUARU)', '5', 'PE', 'CARUARU', 'ATIVO', 'Assinado']])
+
+        self.job_store = JobStore(':memory:')
+        celery_tasks.set_job_store(self.job_store)
+        self.storage = StorageManager(os.path.join(self.temp_dir, 'uploads'))
+        celery_tasks.set_storage(self.storage)
+        celery_tasks.set_pipeline_store(LocalPipelineStore(os.path.join(self.temp_dir, 'pipeline'), self.storage))
+        self.patches = [
+            mock.patch.object(Config, 'SHEETS_BACKEND', 'fake'),
+            mock.patch.object(Config, 'PROCESSING_MODE', 'dashboard'),
+            mock.patch.object(Config, 'DASHBOARD_SHEET_NAME', 'Dashboard'),
+            mock.patch.object(Config, 'DASHBOARD_SHEET_TAB', 'BaseDeDados'),
+            mock.patch.object(Config, 'CHANGE_LOG_FOLDER', os.path.join(self.temp_dir, 'change_logs')),
+            mock.patch.object(Config, 'PIPELINE_FOLDER', os.path.join(self.temp_dir, 'pipeline')),
+            mock.patch.object(Config, 'UPLOAD_FOLDER', self.temp_dir),
+        ]
+        for patch in self.patches:
+            patch.start()
+        celery_tasks.celery.conf.task_always_eager = True
+        celery_tasks.celery.conf.task_eager_propagates = True
+
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        celery_tasks.celery.conf.task_always_eager = False
+        celery_tasks.celery.conf.task_eager_propagates = False
+        for patch in self.patches:
+            patch.stop()
+        celery_tasks.set_job_store(None)
+        celery_tasks.set_storage(None)
+        celery_tasks.set_pipeline_store(None)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_stages_pass_references(self):
+        """Testa a cadeia completa, filas de cada etapa e limpeza dos intermediários"""
+        routes = celery_tasks.celery.conf.task_routes
+        self.assertEqual(routes[celery_tasks.parse_stage_task.name]['queue'], Config.CELERY_CPU_QUEUE)
+        self.assertEqual(routes[celery_tasks.write_stage_task.name]['queue'], Config.CELERY_IO_QUEUE)
+
+        self.job_store.create_job('job-1', filename='base.csv', backend='celery')
+        service = celery_tasks._build_service(self.job_store)
+        source = service.stage_source(FileStorage(BytesIO(CSV_CONTENT), filename='base.csv'), 'job-1')
+
+        with mock.patch.object(celery_tasks.diff_stage_task, 'run',
+                               wraps=celery_tasks.diff_stage_task.run) as diff_run:
+            celery_tasks.start_pipeline('job-1', source, os.path.basename(source), {'job_id': 'job-1'})
+        ref = diff_run.call_args[0][0]
+        self.assertEqual(set(ref), {'job_id', 'filename', 'metadata', 'name', 'timings'})
+        self.assertEqual(ref['name'], 'parsed.json')
+
+        job = self.job_store.get_job('job-1')
+        self.assertEqual(job['state'], 'SUCCESS')
+        self.assertEqual(set(job['stages']), {'parse', 'diff', 'write'})
+        self.assertEqual(job['result']['result']['changes']['updated_cells'], 3)
+        self.assertEqual(self.worksheet.get_all_values()[2][0], 'Imob B (CARUARU)')
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, 'pipeline', 'job-1')))
+        # Resta só o detalhe das alterações, livre até vencer
+        usage = self.storage.usage()
+        self.assertEqual((usage['workspaces'], usage['in_use']), (1, 0))
+        self.assertTrue(os.path.exists(service.change_log_path('job-1')))
+
+    def test_pipeline_folder_is_managed_workspace(self):
+        """Testa quota, referência durante a cadeia e remoção de cadeias perdidas"""
+        service = celery_tasks._build_service(self.job_store)
+        service.stage_source(FileStorage(BytesIO(CSV_CONTENT), filename='base.csv'), 'job-1')
+        self.assertEqual(self.storage.usage(), {'workspaces': 1, 'in_use': 1,
+                                                'used_bytes': len(CSV_CONTENT), 'quota_bytes': None})
+
+        # Worker morreu no meio da cadeia: a referência fica abandonada
+        self.storage.stale_after = 0
+        self.assertEqual(self.storage.evict_expired(), 1)
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, 'pipeline', 'job-1')))
+
+        self.storage.quota_bytes = 10
+        with self.assertRaises(QueueFullError):
+            service.stage_source(FileStorage(BytesIO(CSV_CONTENT), filename='base.csv'), 'job-2')
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, 'pipeline', 'job-2')))
+        self.assertEqual(self.storage.usage()['workspaces'], 0)
+
+    def test_redis_store_without_shared_disk(self):
+        """Testa a cadeia com resultados em JSON num hash por job (Redis)"""
+        store = RedisPipelineStore('redis://localhost:6379/0', ttl=60)
+        store._client = FakeRedis()
+        celery_tasks.set_pipeline_store(store)
+        self.job_store.create_job('job-1', filename='base.csv', backend='celery')
+        service = celery_tasks._build_service(self.job_store)
+        source = service.stage_source(FileStorage(BytesIO(CSV_CONTENT), filename='base.csv'), 'job-1')
+
+        with mock.patch.object(celery_tasks.write_stage_task, 'run',
+                               wraps=celery_tasks.write_stage_task.run) as write_run:
+            celery_tasks.start_pipeline('job-1', source, source, {'job_id': 'job-1'})
+        self.assertEqual(write_run.call_args[0][0]['name'], 'diff.json')
+        diff = json.loads(store._client.seen['diff.json'])
+        self.assertEqual(len(diff['changes']), 3)
+        self.assertEqual(store._client.ttls['pipeline:job-1'], 60)
+
+        self.assertEqual(self.job_store.get_job('job-1')['state'], 'SUCCESS')
+        self.assertEqual(store._client.hashes, {})
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, 'pipeline')))
+
+
+class FakeResult:
+    """Estado de uma task no result backend"""
+
+    def __init__(self, state='PENDING', result=None):
+        self.state = state
+        self.result = self.info = result
+
+
+@unittest.skipUnless(celery_tasks.CELERY_AVAILABLE, 'Celery não instalado')
+class TestSyncPipelineJob(unittest.TestCase):
+    """A aplicação acompanha jobs finalizados no registro de outra máquina"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.job_store = JobStore(':memory:')
+        self.job_store.create_job('job-1', filename='base.csv', backend='celery')
+        self.results = {}
+        patch = mock.patch.object(celery_tasks.celery, 'AsyncResult',
+                                  side_effect=lambda task_id: self.results.get(task_id, FakeResult()))
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def sync(self):
+        return celery_tasks.sync_pipeline_job(self.job_store, self.job_store.get_job('job-1'))
+
+    def test_states_from_backend(self):
+        """Testa STARTED, SUCCESS com resultado e duração das etapas"""
+        self.assertEqual(self.sync()['state'], 'PENDING')
+
+        self.results['job-1'] = FakeResult('SUCCESS')
+        self.results['job-1:diff'] = FakeResult('STARTED')
+        self.assertEqual(self.sync()['state'], 'STARTED')
+
+        result = {'status': 'success', 'timings': {'parse': 1.0, 'diff': 2.0, 'write': 3.0}}
+        self.results['job-1:write'] = FakeResult('SUCCESS', result)
+        job = self.sync()
+        self.assertEqual(job['state'], 'SUCCESS')
+        self.assertEqual(job['result'], result)
+        self.assertEqual(job['stages'], result['timings'])
+
+    def test_failure_and_cancel(self):
+        """Testa falha de uma etapa e cancelamento (REVOKED)"""
+        self.results['job-1:diff'] = FakeResult('FAILURE', ValueError('planilha inválida'))
+        job = self.sync()
+        self.assertEqual((job['state'], job['error']), ('FAILURE', 'planilha inválida'))
+
+        self.job_store.create_job('job-2', backend='celery')
+        self.results['job-2'] = FakeResult('REVOKED', {'error': 'Job cancelado'})
+        job = celery_tasks.sync_pipeline_job(self.job_store, self.job_store.get_job('job-2'))
+        self.assertEqual((job['state'], job['error']), ('CANCELLED', 'Job cancelado'))
+
+    def test_backend_unavailable(self):
+        """Testa que o job fica como está sem acesso ao result backend"""
+        celery_tasks.celery.AsyncResult.side_effect = ConnectionError('redis fora do ar')
+        self.assertEqual(self.sync()['state'], 'PENDING')
+
+
+class FakeRedis:
+    """Subconjunto do cliente redis-py usado pelo RedisPipelineStore"""
+
+    def __init__(self):
+        self.hashes = {}
+        self.ttls = {}
+        self.seen = {}
+
+    def pipeline(self):
+        return self
+
+    def execute(self):
+        return []
+
+    def hset(self, key, name, data):
+        self.hashes.setdefault(key, {})[name] = data
+        self.seen[name] = data
+
+    def expire(self, key, ttl):
+        self.ttls[key] = ttl
+
+    def hget(self, key, name):
+        return self.hashes.get(key, {}).get(name)
+
+    def hdel(self, key, name):
+        self.hashes.get(key, {}).pop(name, None)
+
+    def delete(self, key):
+        self.hashes.pop(key, None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+Testes para as vagas de processamento (ProcessingGovernor)
+"""
+import json
+import time
+import threading
+import unittest
+from io import BytesIO
+
+from exceptions.errors import QueueFullError
+from services.processing_governor import ProcessingGovernor
+from app import create_app
+
+
+MB = 1024 * 1024
+
+
+class TestProcessingGovernor(unittest.TestCase):
+    """Testes para o ProcessingGovernor"""
+
+    def test_slots_and_memory_budget(self):
+        """Testa espera por vaga e por memória, em ordem de chegada"""
+        governor = ProcessingGovernor(slots=2, memory_budget_mb=100, max_waiting=4, max_wait=5)
+        order = []
+
+        def worker(name, size):
+            with governor.slot(size, 'base.csv'):
+                order.append(name)
+
+        # 10MB de CSV estimam 60MB: o segundo arquivo não cabe junto do primeiro
+        with governor.slot(10 * MB, 'base.csv'):
+            thread = threading.Thread(target=worker, args=('second', 10 * MB))
+            thread.start()
+            while governor.stats()['queue_depth'] == 0:
+                time.sleep(0.01)
+            time.sleep(0.05)
+            self.assertEqual(governor.stats()['running'], 1)
+        thread.join()
+
+        self.assertEqual(order, ['second'])
+        stats = governor.stats()
+        self.assertEqual(stats['completed'], 2)
+        self.assertEqual(stats['memory_in_use_mb'], 0)
+        self.assertGreater(stats['wait_seconds']['max'], 0)
+
+        # Um arquivo sozinho entra mesmo acima do orçamento
+        with governor.slot(1000 * MB, 'base.xlsx'):
+            self.assertEqual(governor.stats()['running'], 1)
+
+    def test_rejects_when_queue_full(self):
+        """Testa recusa com fila cheia e espera acima do limite"""
+        governor = ProcessingGovernor(slots=1, max_waiting=0, max_wait=0.05)
+        with governor.slot(MB):
+            with self.assertRaises(QueueFullError) as ctx:
+                governor.ensure_capacity()
+            self.assertGreaterEqual(ctx.exception.retry_after, 1)
+
+            with self.assertRaises(QueueFullError):
+                with governor.slot(MB):
+                    pass
+
+        governor.max_waiting = 1
+        with governor.slot(MB):
+            with self.assertRaises(QueueFullError):
+                with governor.slot(MB):
+                    pass
+        self.assertEqual(governor.stats()['rejected'], 3)
+        self.assertEqual(governor.stats()['queue_depth'], 0)
+
+
+class TestUploadBackpressure(unittest.TestCase):
+    """Testa a resposta 503 do /upload com a fila cheia"""
+
+    def test_503_with_retry_after(self):
+        """Testa upload síncrono recusado e métricas exportadas"""
+        app = create_app('testing')
+        app.processing_governor.max_waiting = 0
+        client = app.test_client()
+
+        with app.processing_governor.slot(MB), app.processing_governor.slot(MB):
+            response = client.post('/upload', data={'file': (BytesIO(b'a;b\n1;2\n'), 'base.csv')})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(json.loads(response.data)['error_type'], 'queue_full')
+        self.assertGreaterEqual(int(response.headers['Retry-After']), 1)
+
+        processing = json.loads(client.get('/metrics').data)['processing']
+        self.assertEqual(processing['rejected'], 1)
+        self.assertIn('queue_depth', processing)
+
+
+if __name__ == '__main__':
+    unittest.main()
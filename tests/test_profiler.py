@@ -0,0 +1,118 @@
+"""
+Testes para o profiling sob demanda
+"""
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from app import create_app
+from config.config import TestingConfig
+from services.profiler import NO_PROFILE, Profiler, profile_run
+
+
+def busy(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        sum(range(100))
+
+
+class TestProfiler(unittest.TestCase):
+    """Testes para o Profiler"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.output = os.path.join(self.temp_dir, 'profiles')
+        self.profiler = Profiler(os.path.join(self.temp_dir, 'jobs.db'), self.output, refresh=0)
+
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        self.profiler.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_disabled_is_noop(self):
+        """Testa que sem profiler ou sem alvo armado o contexto é vazio"""
+        self.assertIs(profile_run(None, 'upload', 'job'), NO_PROFILE)
+        self.assertIs(self.profiler.run('upload', 'job'), NO_PROFILE)
+
+    def test_next_n_runs(self):
+        """Testa captura das próximas N execuções e desarme automático"""
+        # Outro processo arma; este enxerga pelo banco compartilhado
+        other = Profiler(self.profiler.db_path, self.output, refresh=0)
+        other.arm('upload', count=1)
+
+        with self.profiler.run('upload', 'job-1') as profiled:
+            busy(0.01)
+            profiled.record({'parse': 0.01})
+        self.assertIs(self.profiler.run('upload', 'job-2'), NO_PROFILE)
+        self.assertEqual(self.profiler.state(), {})
+
+        self.assertEqual(len(self.profiler.captures()), 1)
+        self.assertTrue(self.profiler.captures()[0].endswith('-upload-job-1.pstats'))
+        report_name = self.profiler.captures()[0].replace('.pstats', '.json')
+        with open(os.path.join(self.output, report_name)) as f:
+            report = json.load(f)
+        self.assertEqual(report['timings'], {'parse': 0.01})
+        other.close()
+
+    def test_threshold_keeps_only_slow_runs(self):
+        """Testa amostragem de pilhas guardando só as execuções lentas"""
+        self.profiler.arm('task', threshold=0.05)
+        with self.profiler.run('task', 'fast'):
+            pass
+        with self.profiler.run('task', 'slow'):
+            busy(0.1)
+
+        captures = self.profiler.captures()
+        self.assertEqual(len(captures), 1)
+        self.assertTrue(captures[0].endswith('-task-slow.folded'))
+        with open(os.path.join(self.output, captures[0])) as f:
+            self.assertIn('busy (test_profiler.py', f.read())
+
+
+class TestProfilingEndpoint(unittest.TestCase):
+    """Testes para /admin/profiling"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.temp_dir = tempfile.mkdtemp()
+        patches = {'PROFILING_ENABLED': True, 'ADMIN_TOKEN': 'segredo',
+                   'PROFILING_FOLDER': self.temp_dir}
+        with mock.patch.multiple(TestingConfig, **patches):
+            self.app = create_app('testing')
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_requires_token(self):
+        """Testa o acesso restrito e o armar/desarmar"""
+        response = self.client.post('/admin/profiling', json={'target': 'upload', 'count': 2})
+        self.assertEqual(response.status_code, 403)
+
+        headers = {'X-Admin-Token': 'segredo'}
+        response = self.client.post('/admin/profiling', json={'target': 'upload', 'count': 2},
+                                    headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['switches']['upload']['remaining'], 2)
+
+        response = self.client.delete('/admin/profiling', headers=headers)
+        self.assertEqual(response.get_json()['switches'], {})
+
+        response = self.client.post('/admin/profiling', json={'target': 'outro', 'count': 1},
+                                    headers=headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_hidden_without_token(self):
+        """Testa que sem ADMIN_TOKEN configurado a rota não existe"""
+        app = create_app('testing')
+        self.assertEqual(app.test_client().get('/admin/profiling').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
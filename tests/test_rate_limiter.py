@@ -0,0 +1,143 @@
+"""
+Testes para o limite de envio por custo (token bucket)
+"""
+import os
+import json
+import shutil
+import tempfile
+import sqlite3
+import unittest
+from io import BytesIO
+from unittest import mock
+
+from exceptions.errors import RateLimitError
+from services.rate_limiter import (
+    SQLiteBucketStore, UploadRateLimiter, refill_and_take, estimate_rows
+)
+from app import create_app
+from config.config import TestingConfig
+
+
+class TestUploadRateLimiter(unittest.TestCase):
+    """Testes para o UploadRateLimiter"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'jobs.db')
+
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_refill_and_take(self):
+        """Testa recarga proporcional ao tempo, teto e tempo de espera"""
+        self.assertEqual(refill_and_take(10, 0, 5, 3, capacity=10, rate=1), (True, 7, 0.0))
+        self.assertEqual(refill_and_take(2, 0, 1, 5, capacity=10, rate=1), (False, 3, 2.0))
+        self.assertEqual(refill_and_take(9, 0, 1, -5, capacity=10, rate=1), (True, 10, 0.0))
+
+    def test_cost_and_shared_bucket(self):
+        """Testa custo por bytes/linhas e balde compartilhado entre processos"""
+        # Duas conexões ao mesmo banco, como dois workers do gunicorn
+        first = UploadRateLimiter(SQLiteBucketStore(self.db_path), capacity=10, refill_per_minute=0.6)
+        second = UploadRateLimiter(SQLiteBucketStore(self.db_path), capacity=10, refill_per_minute=0.6)
+
+        self.assertEqual(first.cost(100), 1.0)
+        self.assertEqual(first.cost(2 * 1024 * 1024, rows=30000), 5.0)
+        self.assertEqual(first.cost(100 * 1024 * 1024), 10.0)
+
+        first.acquire('1.2.3.4', 6)
+        with self.assertRaises(RateLimitError) as ctx:
+            second.acquire('1.2.3.4', 6)
+        self.assertGreaterEqual(ctx.exception.retry_after, 100)
+        second.acquire('5.6.7.8', 6)
+
+        second.refund('1.2.3.4', 6)
+        first.acquire('1.2.3.4', 6)
+
+    def test_estimate_rows(self):
+        """Testa extrapolação das linhas de um CSV pela amostra"""
+        class Upload(BytesIO):
+            filename = 'base.csv'
+
+        content = b'a;b\n' * 100000
+        upload = Upload(content)
+        self.assertEqual(estimate_rows(upload, len(content)), 100000)
+        self.assertEqual(upload.tell(), 0)
+
+
+class TestUploadAdmission(unittest.TestCase):
+    """Testa a resposta 429 do /upload"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.app = create_app('testing')
+        self.app.config['UPLOAD_RATE_LIMIT_ENABLED'] = True
+        self.app.config['UPLOAD_RATE_LIMIT_STORAGE'] = 'local'
+        self.app.config['UPLOAD_RATE_CAPACITY'] = 1
+        self.app.config['UPLOAD_RATE_REFILL_PER_MINUTE'] = 1
+
+        from services.rate_limiter import create_upload_limiter
+        self.app.upload_limiter = create_upload_limiter(self.app.config)
+        self.client = self.app.test_client()
+
+    def test_upload_session_is_charged(self):
+        """Testa cobrança na criação da sessão e devolução quando falta espaço"""
+        from services.upload_sessions import UploadSessionStore
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir, ignore_errors=True)
+
+        def create():
+            return self.client.post('/uploads', json={'filename': 'base.csv', 'size': 10})
+
+        self.app.upload_sessions = UploadSessionStore(':memory:', temp_dir, quota_bytes=5)
+        self.assertEqual(create().status_code, 503)
+
+        # Sessões criadas no diretório temporário, não em test_uploads/
+        self.app.upload_sessions = UploadSessionStore(':memory:', temp_dir)
+        self.assertEqual(create().status_code, 201)
+        self.assertEqual(create().status_code, 429)
+
+    def test_server_failure_is_refunded(self):
+        """Testa devolução do custo quando o job não é registrado por erro do servidor"""
+        def upload():
+            return self.client.post('/upload', data={'file': (BytesIO(b'a;b\n1;2\n'), 'base.csv')})
+
+        with mock.patch.object(self.app.job_store, 'create_job',
+                               side_effect=sqlite3.OperationalError('database is locked')):
+            self.assertEqual(upload().status_code, 500)
+        self.assertNotEqual(upload().status_code, 429)
+        self.assertEqual(upload().status_code, 429)
+
+    def test_bucket_per_forwarded_client(self):
+        """Testa um balde por cliente atrás do proxy (X-Forwarded-For)"""
+        with mock.patch.object(TestingConfig, 'PROXY_FIX_X_FOR', 1):
+            app = create_app('testing')
+        app.config.update(self.app.config)
+        app.upload_limiter = self.app.upload_limiter
+        client = app.test_client()
+
+        # O primeiro endereço é forjado pelo cliente: só o salto do proxy vale
+        def upload(client_ip):
+            return client.post('/upload', data={'file': (BytesIO(b'a;b\n1;2\n'), 'base.csv')},
+                               headers={'X-Forwarded-For': f'6.6.6.6, {client_ip}'},
+                               environ_base={'REMOTE_ADDR': '10.0.0.2'})
+
+        self.assertNotEqual(upload('1.2.3.4').status_code, 429)
+        self.assertEqual(upload('1.2.3.4').status_code, 429)
+        self.assertNotEqual(upload('5.6.7.8').status_code, 429)
+
+    def test_rejects_with_retry_after(self):
+        """Testa upload recusado quando o balde do cliente está vazio"""
+        def upload():
+            return self.client.post('/upload', data={'file': (BytesIO(b'a;b\n1;2\n'), 'base.csv')})
+
+        self.assertNotEqual(upload().status_code, 429)
+        response = upload()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(json.loads(response.data)['error_type'], 'rate_limited')
+        self.assertGreater(int(response.headers['Retry-After']), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+"""
+Testes para as verificações de prontidão e os endpoints /livez e /readyz
+"""
+import json
+import threading
+import time
+import unittest
+from unittest import mock
+
+from app import create_app
+from config.config import TestingConfig
+from services.readiness import ReadinessMonitor
+
+
+class TestReadinessMonitor(unittest.TestCase):
+    """Testes para o ReadinessMonitor"""
+
+    def test_verdicts(self):
+        """Testa veredito de verificações críticas e não críticas"""
+        monitor = ReadinessMonitor(interval=10)
+        monitor.add_probe('database', lambda: None)
+        monitor.add_probe('google_sheets', lambda: {'status': 'unhealthy'}, critical=False)
+        self.assertFalse(monitor.snapshot()['ready'])
+        self.assertEqual(monitor.snapshot()['checks']['database']['status'], 'unknown')
+
+        monitor.run_once()
+        snapshot = monitor.snapshot()
+        self.assertTrue(snapshot['ready'])
+        self.assertEqual(snapshot['checks']['google_sheets']['status'], 'unhealthy')
+        self.assertIsNotNone(snapshot['checks']['database']['age'])
+
+        def broken():
+            raise ConnectionError('recusada')
+        monitor.add_probe('broker', broken)
+        monitor.run_once()
+        snapshot = monitor.snapshot()
+        self.assertFalse(snapshot['ready'])
+        self.assertEqual(snapshot['checks']['broker'], {
+            'status': 'error', 'error': 'recusada', 'critical': True,
+            'age': snapshot['checks']['broker']['age'],
+            'duration_ms': snapshot['checks']['broker']['duration_ms'],
+        })
+
+        with mock.patch('services.readiness.time.time', return_value=time.time() + 60):
+            self.assertEqual(monitor.snapshot()['checks']['database']['status'], 'stale')
+
+    def test_timeout_does_not_pile_up(self):
+        """Testa que uma verificação travada estoura o timeout e não é redisparada"""
+        release = threading.Event()
+        calls = []
+
+        def hung():
+            calls.append(1)
+            release.wait(5)
+
+        monitor = ReadinessMonitor(interval=10)
+        monitor.add_probe('database', lambda: None)
+        monitor.add_probe('broker', hung, timeout=0.05)
+
+        start = time.monotonic()
+        monitor.run_once()
+        monitor.run_once()
+        self.assertLess(time.monotonic() - start, 2)
+        release.set()
+
+        checks = monitor.snapshot()['checks']
+        self.assertEqual(checks['broker']['status'], 'timeout')
+        self.assertEqual(checks['database']['status'], 'healthy')
+        self.assertEqual(len(calls), 1)
+
+
+class TestProbeEndpoints(unittest.TestCase):
+    """Testes para /livez e /readyz"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        # Sem broker nos testes
+        if 'broker' in self.app.readiness._probes:
+            self.app.readiness.add_probe('broker', lambda: None)
+
+    def test_livez_without_io(self):
+        """Testa que o /livez não consulta o cache nem as dependências"""
+        with mock.patch.object(self.app.readiness, 'snapshot') as snapshot:
+            response = self.client.get('/livez')
+        self.assertEqual(response.status_code, 200)
+        snapshot.assert_not_called()
+
+    def test_readyz_serves_cached_verdict(self):
+        """Testa 503 antes da primeira rodada e 200 com a idade depois"""
+        response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
+
+        self.app.readiness.run_once()
+        response = self.client.get('/readyz')
+        data = json.loads(response.data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(data['status'], 'ready')
+        self.assertIn('age', data['checks']['database'])
+        self.assertEqual(data['checks']['google_sheets']['status'], 'unknown')
+
+
+class TestReadinessSetup(unittest.TestCase):
+    """Verificações registradas e iniciadas pela aplicação"""
+
+    def test_broker_critical_only_when_required(self):
+        """Testa broker degradado no modo auto e crítico com TASK_BACKEND=celery"""
+        app = create_app('testing')
+        if 'broker' not in app.readiness._probes:
+            self.skipTest('Celery não instalado')
+        self.assertFalse(app.readiness._probes['broker'].critical)
+
+        with mock.patch.object(TestingConfig, 'TASK_BACKEND', 'celery'):
+            app = create_app('testing')
+        self.assertTrue(app.readiness._probes['broker'].critical)
+
+    def test_started_on_create(self):
+        """Testa início das verificações na criação, sem esperar a primeira requisição"""
+        with mock.patch.object(TestingConfig, 'READINESS_BACKGROUND', True), \
+                mock.patch.object(ReadinessMonitor, 'ensure_started') as ensure_started:
+            create_app('testing')
+            ensure_started.assert_called_once_with()
+
+            ensure_started.reset_mock()
+            with mock.patch.object(TestingConfig, 'BACKGROUND_CHECKS_ON_STARTUP', False):
+                create_app('testing')
+            ensure_started.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+Testes para a conversão de DataFrames em valores do Sheets (utils/sheets_values.py)
+"""
+import json
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from utils.sheets_values import sheets_header, sheets_rows, sheets_text
+
+
+class TestSheetsRows(unittest.TestCase):
+    """Testes para sheets_rows"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.df = pd.DataFrame({
+            'Nome': ['IMOB A', None, 'IMOB C'],
+            'Corretores': np.array([7, 2, 7], dtype='int8'),
+            'Valor': [1.5, np.nan, np.inf],
+            'Cadastro': pd.to_datetime(['2025-06-03', None, '2025-06-04']),
+            'Estado': pd.Categorical(['PE', None, 'PB']),
+            'Misto': pd.Series([np.int64(3), 'x', pd.Timestamp('2025-01-01 14:30')], dtype=object),
+        })
+
+    def test_json_safe_values(self):
+        """Testa vazios, datas ISO e ausência de escalares do numpy"""
+        rows = sheets_rows(self.df)
+
+        self.assertEqual(rows, [
+            ['IMOB A', 7, 1.5, '2025-06-03', 'PE', 3],
+            ['', 2, '', '', '', 'x'],
+            ['IMOB C', 7, '', '2025-06-04', 'PB', '2025-01-01 14:30:00'],
+        ])
+        self.assertEqual({type(value) for row in rows for value in row}, {str, int, float})
+        json.dumps([sheets_header(self.df)] + rows, allow_nan=False)
+
+    def test_empty_frame(self):
+        """Testa DataFrame sem linhas"""
+        self.assertEqual(sheets_rows(self.df.iloc[:0]), [])
+
+
+class TestSheetsText(unittest.TestCase):
+    """Testes para sheets_text"""
+
+    def test_numbers_as_displayed(self):
+        """Testa floats inteiros sem '.0' e o separador decimal"""
+        column = pd.Series([5.0, 2.5, None])
+        self.assertEqual(sheets_text(column).tolist(), ['5', '2.5', ''])
+        self.assertEqual(sheets_text(column, decimal_separator=',').tolist(), ['5', '2,5', ''])
+
+    def test_keeps_categories(self):
+        """Testa que colunas categóricas continuam categóricas"""
+        text = sheets_text(pd.Series(pd.Categorical(['ATIVO', None, 'INATIVO'])))
+        self.assertEqual(str(text.dtype), 'category')
+        self.assertEqual(text.tolist(), ['ATIVO', '', 'INATIVO'])
+
+
+if __name__ == '__main__':
+    unittest.main()
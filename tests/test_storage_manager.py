@@ -0,0 +1,137 @@
+"""
+Testes para os workspaces de upload (StorageManager)
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from io import BytesIO
+
+from werkzeug.datastructures import FileStorage
+
+from exceptions.errors import QueueFullError
+from services.storage_manager import StorageManager
+from services.file_processing_service import FileProcessingService
+
+
+class TestStorageManager(unittest.TestCase):
+    """Testes para o StorageManager"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.db_path = os.path.join(self.temp_dir, 'jobs.db')
+        self.root = os.path.join(self.temp_dir, 'uploads')
+
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def _fill(self, storage, job_id, size):
+        path = storage.acquire(job_id)
+        storage.reserve(job_id, size)
+        with open(os.path.join(path, 'base.csv'), 'wb') as f:
+            f.write(b'x' * size)
+        return path
+
+    def test_refcount_and_discard(self):
+        """Testa workspace compartilhado por duas referências"""
+        storage = StorageManager(self.root, self.db_path)
+        path = self._fill(storage, 'job-1', 10)
+        storage.acquire('job-1')
+
+        storage.release('job-1', discard=True)
+        self.assertTrue(os.path.exists(path))
+        storage.release('job-1', discard=True)
+        self.assertFalse(os.path.exists(path))
+        self.assertEqual(storage.usage()['workspaces'], 0)
+
+    def test_quota_evicts_least_recently_used(self):
+        """Testa remoção imediata dos livres mais antigos ao exceder a quota"""
+        storage = StorageManager(self.root, self.db_path, quota_bytes=100)
+        # Outro processo com o mesmo índice
+        other = StorageManager(self.root, self.db_path, quota_bytes=100)
+
+        old = self._fill(storage, 'old', 40)
+        storage.release('old')
+        recent = self._fill(other, 'recent', 40)
+        other.release('recent')
+        busy = self._fill(storage, 'busy', 10)
+
+        self._fill(other, 'new', 30)
+        self.assertFalse(os.path.exists(old))
+        self.assertTrue(os.path.exists(recent))
+        self.assertTrue(os.path.exists(busy))
+        self.assertEqual(storage.usage()['used_bytes'], 80)
+
+        # Workspaces em uso nunca são removidos: sem espaço, o upload é recusado
+        storage.acquire('recent')
+        with self.assertRaises(QueueFullError):
+            storage.reserve('busy', 50)
+
+    def test_evict_expired(self):
+        """Testa limpeza por idade sem tocar em workspaces em uso"""
+        storage = StorageManager(self.root, self.db_path, max_age=0)
+        idle = self._fill(storage, 'idle', 5)
+        storage.release('idle')
+        busy = self._fill(storage, 'busy', 5)
+
+        self.assertEqual(storage.evict_expired(), 1)
+        self.assertFalse(os.path.exists(idle))
+        self.assertTrue(os.path.exists(busy))
+
+    def test_workspace_outside_root(self):
+        """Testa workspace em outra pasta (pipeline) removido pela limpeza"""
+        import sqlite3
+        # Índice criado antes da coluna ``folder``
+        conn = sqlite3.connect(self.db_path)
+        conn.execute('CREATE TABLE workspaces (job_id TEXT PRIMARY KEY, size INTEGER NOT NULL DEFAULT 0, '
+                     'refcount INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, last_used REAL NOT NULL)')
+        conn.close()
+
+        storage = StorageManager(self.root, self.db_path, max_age=0)
+        folder = os.path.join(self.temp_dir, 'pipeline', 'job-1')
+        self.assertEqual(storage.acquire('pipeline:job-1', folder=folder), folder)
+        storage.release('pipeline:job-1')
+
+        self.assertEqual(storage.evict_expired(), 1)
+        self.assertFalse(os.path.exists(folder))
+
+    def test_workspace_ttl(self):
+        """Testa workspace com validade própria (detalhe das alterações)"""
+        storage = StorageManager(self.root, self.db_path, max_age=0)
+        folder = os.path.join(self.temp_dir, 'change_logs', 'job-1')
+        storage.acquire('changes:job-1', folder=folder, ttl=3600)
+        storage.release('changes:job-1')
+        self._fill(storage, 'idle', 5)
+        storage.release('idle')
+
+        self.assertEqual(storage.evict_expired(), 1)
+        self.assertTrue(os.path.exists(folder))
+
+        storage.acquire('changes:job-1', folder=folder, ttl=-1)
+        storage.release('changes:job-1')
+        self.assertEqual(storage.evict_expired(), 1)
+        self.assertFalse(os.path.exists(folder))
+
+    def test_same_filename_per_job(self):
+        """Testa uploads simultâneos com o mesmo nome em workspaces separados"""
+        storage = StorageManager(self.root, self.db_path)
+        service = FileProcessingService(self.root, 'inexistente.json', storage=storage)
+        seen = []
+
+        def fake_process(filepath, metadata, tracker):
+            seen.append(filepath)
+            return {}
+        service._process_by_type = fake_process
+
+        for job_id in ('job-a', 'job-b'):
+            service.process_file(FileStorage(BytesIO(b'a;b\n1;2\n'), filename='base.csv'),
+                                 {'job_id': job_id})
+
+        self.assertNotEqual(os.path.dirname(seen[0]), os.path.dirname(seen[1]))
+        self.assertEqual(os.listdir(self.root), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,206 @@
+"""
+Testes para uploads retomáveis em blocos
+"""
+import os
+import json
+import errno
+import shutil
+import hashlib
+import tempfile
+import unittest
+from io import BytesIO
+from unittest import mock
+
+from exceptions.errors import ValidationError, NotFoundError, QueueFullError
+from services.upload_sessions import UploadSessionStore
+from services.fake_sheets import FakeSheetsBackend
+from services.google_sheets_service import GoogleSheetsService
+from services.file_processing_service import FileProcessingService
+from app import create_app
+
+
+DASHBOARD_HEADER = ['Imobiliária', 'Quantidade de Corretores', 'Estado', 'Cidade',
+                    'Ativa em sistema', 'Contrato assinado']
+
+CSV_CONTENT = ('Nome fantasia;Corretores;Estado;Cidade;Ativa no painel\n'
+               'Imob A (CARUARU);7;PE;CARUARU;INATIVO\n'
+               'Imob B (CARUARU);1;PE;CARUARU;ATIVO\n').encode('utf-8')
+
+
+class TestUploadSessionStore(unittest.TestCase):
+    """Testes para o UploadSessionStore"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = UploadSessionStore(':memory:', self.temp_dir, max_chunk_size=64)
+
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        self.store.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_chunks_out_of_order(self):
+        """Testa blocos fora de ordem, pendências e arquivo montado"""
+        content = b'0123456789abcdefghij-'
+        session = self.store.create('base.csv', len(content), chunk_size=8)
+        upload_id = session['upload_id']
+        self.assertEqual(session['total_chunks'], 3)
+        self.assertEqual(os.path.getsize(self.store.staging_path(upload_id)), len(content))
+
+        self.store.write_chunk(upload_id, 16, BytesIO(content[16:]), 5)
+        self.store.write_chunk(upload_id, 0, BytesIO(content[:8]), 8)
+        self.assertEqual(self.store.get(upload_id)['missing'], [8])
+        with self.assertRaises(ValidationError) as ctx:
+            self.store.open_completed(upload_id)
+        self.assertEqual(ctx.exception.status_code, 409)
+
+        self.store.write_chunk(upload_id, 8, BytesIO(content[8:16]), None)
+        with self.store.open_completed(upload_id) as f:
+            self.assertEqual(f.read(), content)
+
+        self.store.mark_finalized(upload_id, 'job-1')
+        self.assertEqual(self.store.get(upload_id)['job_id'], 'job-1')
+        self.assertFalse(os.path.exists(self.store.staging_path(upload_id)))
+
+    def test_invalid_chunks(self):
+        """Testa offsets e tamanhos inválidos, limites e sessões inexistentes"""
+        upload_id = self.store.create('base.csv', 20, chunk_size=8)['upload_id']
+
+        with self.assertRaises(ValidationError):
+            self.store.write_chunk(upload_id, 4, BytesIO(b'x' * 8), 8)
+        with self.assertRaises(ValidationError):
+            self.store.write_chunk(upload_id, 0, BytesIO(b'x' * 5), 5)
+        with self.assertRaises(ValidationError):
+            self.store.write_chunk(upload_id, 0, BytesIO(b'x' * 9), None)
+        with self.assertRaises(ValidationError):
+            self.store.create('base.csv', 20, chunk_size=128)
+
+        self.store.delete(upload_id)
+        with self.assertRaises(NotFoundError):
+            self.store.get(upload_id)
+
+    def test_staging_quota_and_disk_full(self):
+        """Testa quota das sessões abertas e limpeza quando falta disco"""
+        store = UploadSessionStore(':memory:', os.path.join(self.temp_dir, 'quota'), quota_bytes=30)
+        first = store.create('base.csv', 20)['upload_id']
+        with self.assertRaises(QueueFullError):
+            store.create('base.csv', 20)
+
+        # Sessão finalizada deixa de ocupar a quota
+        store.mark_finalized(first, 'job-1')
+        store.create('base.csv', 20)
+
+        with mock.patch('os.posix_fallocate', side_effect=OSError(errno.ENOSPC, 'No space left'),
+                        create=True):
+            with self.assertRaises(QueueFullError):
+                self.store.create('base.csv', 20, chunk_size=8)
+        self.assertEqual(os.listdir(self.temp_dir), ['quota'])
+        store.close()
+
+
+class TestChunkedUploadEndpoints(unittest.TestCase):
+    """Testa o fluxo HTTP de criação, envio, consulta e finalização"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.temp_dir = tempfile.mkdtemp()
+        fake_client = FakeSheetsBackend().client()
+        worksheet = fake_client.create('Dashboard').add_worksheet('BaseDeDados')
+        worksheet.load([DASHBOARD_HEADER, ['Imob A (CARUARU)', '5', 'PE', 'CARUARU', 'ATIVO', 'Assinado']])
+
+        self.app = create_app('testing')
+        self.app.upload_sessions = UploadSessionStore(':memory:', os.path.join(self.temp_dir, 'sessions'))
+        self.app.file_service = FileProcessingService(
+            upload_folder=self.temp_dir,
+            credentials_file='inexistente.json',
+            job_store=self.app.job_store,
+            processing_mode='dashboard',
+            dashboard={'sheet': 'Dashboard', 'tab': 'BaseDeDados'},
+            change_log_folder=os.path.join(self.temp_dir, 'change_logs')
+        )
+        self.app.file_service.sheets_service = GoogleSheetsService('inexistente.json', client=fake_client)
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """Cleanup após cada teste"""
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_chunked_upload_and_complete(self):
+        """Testa upload em blocos, retomada e finalização repetida"""
+        response = self.client.post('/uploads', json={
+            'filename': 'base.csv', 'size': len(CSV_CONTENT), 'chunk_size': 32,
+            'sha256': hashlib.sha256(CSV_CONTENT).hexdigest()
+        })
+        self.assertEqual(response.status_code, 201)
+        session = json.loads(response.data)
+        upload_id = session['upload_id']
+
+        for offset in reversed(session['missing'][1:]):
+            response = self.client.put(f'/uploads/{upload_id}/chunks/{offset}',
+                                       data=CSV_CONTENT[offset:offset + 32])
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.client.post(f'/uploads/{upload_id}/complete').status_code, 409)
+        self.assertEqual(json.loads(self.client.get(f'/uploads/{upload_id}').data)['missing'], [0])
+
+        self.client.put(f'/uploads/{upload_id}/chunks/0', data=CSV_CONTENT[:32])
+        response = self.client.post(f'/uploads/{upload_id}/complete')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['result']['result']['changes']['updated_cells'], 3)
+
+        response = self.client.post(f'/uploads/{upload_id}/complete')
+        self.assertTrue(json.loads(response.data)['replayed'])
+        self.assertEqual(json.loads(response.data)['job_id'], data['job_id'])
+
+    def test_concurrent_complete(self):
+        """Testa que só a finalização que reserva a sessão cria o job"""
+        response = self.client.post('/uploads', json={'filename': 'base.csv', 'size': len(CSV_CONTENT),
+                                                       'sha256': '0' * 64})
+        upload_id = json.loads(response.data)['upload_id']
+        self.client.put(f'/uploads/{upload_id}/chunks/0', data=CSV_CONTENT)
+
+        # Outra finalização reservou a sessão e ainda não registrou o job
+        self.assertIsNone(self.app.upload_sessions.claim(upload_id, 'job-outro'))
+        self.assertEqual(self.app.upload_sessions.claim(upload_id, 'job-mais-um'), 'job-outro')
+        response = self.client.post(f'/uploads/{upload_id}/complete')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.app.job_store.list_jobs()[0], [])
+
+        # Ela desistiu (hash divergente aqui também): a sessão volta a aceitar finalização
+        self.app.upload_sessions.unclaim(upload_id, 'job-outro')
+        response = self.client.post(f'/uploads/{upload_id}/complete')
+        self.assertEqual(response.status_code, 422)
+        self.assertIsNone(self.app.upload_sessions.get(upload_id)['job_id'])
+
+    def test_rejects_invalid_declaration(self):
+        """Testa extensão não permitida e sessão inexistente"""
+        response = self.client.post('/uploads', json={'filename': 'base.exe', 'size': 10})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get('/uploads/nao-existe').status_code, 404)
+
+
+class TestChunkedUploadCsrf(unittest.TestCase):
+    """Com CSRF ativo (produção) as rotas aceitam o token no cabeçalho enviado pela interface"""
+
+    def test_token_header(self):
+        """Testa sessão recusada sem X-CSRFToken e criada com o token da página"""
+        import re
+        from config.config import TestingConfig
+
+        with mock.patch.object(TestingConfig, 'WTF_CSRF_ENABLED', True):
+            app = create_app('testing')
+        client = app.test_client()
+        page = client.get('/').get_data(as_text=True)
+        token = re.search(r'<meta name="csrf-token" content="([^"]+)"', page).group(1)
+
+        body = {'filename': 'base.csv', 'size': 10}
+        self.assertEqual(client.post('/uploads', json=body).status_code, 400)
+        response = client.post('/uploads', json=body, headers={'X-CSRFToken': token})
+        self.assertEqual(response.status_code, 201)
+        app.upload_sessions.delete(response.get_json()['upload_id'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+"""
+Testes para a validação de arquivos durante o upload
+"""
+import gzip
+import json
+import hashlib
+import unittest
+from io import BytesIO
+
+from exceptions.errors import FileSizeError, FileContentError
+from utils.compression import DecompressingStream, GzipDecoder
+from utils.upload_stream import ValidatingUploadStream
+from utils.validators import FileValidator
+from app import create_app
+
+
+class TestValidatingUploadStream(unittest.TestCase):
+    """Testes para o ValidatingUploadStream"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.validator = FileValidator()
+        self.validator.MAX_FILE_SIZE = 4096
+
+    def test_hash_and_small_file_header(self):
+        """Testa hash incremental e conferência do cabeçalho no fim da parte"""
+        stream = ValidatingUploadStream('base.csv', self.validator)
+        stream.write(b'a;b\n')
+        stream.write(b'1;2\n')
+        stream.seek(0)
+
+        self.assertEqual(stream.read(), b'a;b\n1;2\n')
+        self.assertEqual(stream.sha256, hashlib.sha256(b'a;b\n1;2\n').hexdigest())
+
+    def test_rejects_while_receiving(self):
+        """Testa assinatura inválida e tamanho máximo antes do fim do upload"""
+        stream = ValidatingUploadStream('base.xlsx', self.validator)
+        with self.assertRaises(FileContentError):
+            stream.write(b'nao e um zip' * 100)
+
+        stream = ValidatingUploadStream('base.csv', self.validator)
+        stream.write(b'a;b\n' * 1000)
+        with self.assertRaises(FileSizeError):
+            stream.write(b'a;b\n' * 100)
+
+
+class TestCompressedUploads(unittest.TestCase):
+    """Testes para descompressão em streaming"""
+
+    def test_gzip_decoder_multiple_members(self):
+        """Testa .gz com vários membros recebido em pedaços pequenos"""
+        content = gzip.compress(b'a;b\n' * 50000) + gzip.compress(b'1;2\n')
+        decoder = GzipDecoder()
+        output = b''.join(piece for i in range(0, len(content), 100)
+                          for piece in decoder.decode(content[i:i + 100]))
+        decoder.finish()
+        self.assertEqual(output, b'a;b\n' * 50000 + b'1;2\n')
+
+        decoder = GzipDecoder()
+        list(decoder.decode(content[:50]))
+        with self.assertRaises(FileContentError):
+            decoder.finish()
+
+    def test_decompression_ratio_limit(self):
+        """Testa interrupção de corpos com taxa de descompressão excessiva"""
+        bomb = gzip.compress(b'\0' * (20 * 1024 * 1024))
+        stream = DecompressingStream(BytesIO(bomb), 'gzip', max_ratio=100)
+        with self.assertRaises(FileSizeError):
+            while stream.read(64 * 1024):
+                pass
+        self.assertLess(stream.decompressed, 20 * 1024 * 1024)
+
+
+class TestUploadRequest(unittest.TestCase):
+    """Testa o parser de multipart da aplicação"""
+
+    def setUp(self):
+        """Setup para cada teste"""
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+
+    def test_rejects_extension_before_body(self):
+        """Testa extensão não permitida rejeitada pelo parser"""
+        response = self.client.post('/upload', data={'file': (BytesIO(b'a;b\n'), 'base.txt')})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.data)['error_type'], 'validation')
+
+    def test_compressed_body_and_file(self):
+        """Testa corpo com Content-Encoding gzip e arquivo .csv.gz"""
+        content = b'a;b\n1;2\n'
+        with self.app.test_request_context('/upload', method='POST', data={
+            'file': (BytesIO(gzip.compress(content)), 'base.csv.gz')
+        }):
+            from flask import request
+            file = request.files['file']
+            self.assertEqual(file.stream.filename, 'base.csv')
+            self.assertEqual(file.read(), content)
+
+        builder = self.app.test_request_context('/upload', method='POST', data={
+            'file': (BytesIO(content), 'base.csv'), 'stream': 'true'
+        })
+        body = builder.request.get_data()
+        with self.app.test_request_context('/upload', method='POST', data=gzip.compress(body), headers={
+            'Content-Type': builder.request.content_type, 'Content-Encoding': 'gzip'
+        }):
+            from flask import request
+            self.assertEqual(request.form['stream'], 'true')
+            self.assertEqual(request.files['file'].read(), content)
+
+        response = self.client.post('/upload', data=b'x', headers={'Content-Encoding': 'br'},
+                                    content_type='multipart/form-data; boundary=x')
+        self.assertEqual(response.status_code, 415)
+
+    def test_hash_reused(self):
+        """Testa que o arquivo recebido já traz o hash calculado"""
+        with self.app.test_request_context('/upload', method='POST', data={
+            'file': (BytesIO(b'a;b\n1;2\n'), 'base.csv')
+        }):
+            from flask import request
+            file = request.files['file']
+            self.assertIsInstance(file.stream, ValidatingUploadStream)
+            self.assertEqual(FileValidator.compute_file_hash(file),
+                             hashlib.sha256(b'a;b\n1;2\n').hexdigest())
+
+
+if __name__ == '__main__':
+    unittest.main()
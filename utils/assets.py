@@ -0,0 +1,187 @@
+"""
+Arquivos estáticos com hash no nome e versões pré-comprimidas
+
+O build (``python -m utils.assets``, chamado pelo ``build.sh``) copia cada
+arquivo de ``static/`` para ``static/dist/`` como ``nome.<hash>.ext`` e grava
+ao lado as versões ``.gz`` e ``.br`` (brotli, se instalado) quando compensam.
+O ``manifest.json`` liga o nome lógico ao nome com hash; sem ele a aplicação
+continua servindo ``/static`` normalmente.
+"""
+import os
+import sys
+import gzip
+import json
+import shutil
+import hashlib
+import argparse
+import mimetypes
+from typing import Dict, Any, List, Optional, Tuple
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+
+DIST_FOLDER = 'dist'
+MANIFEST_NAME = 'manifest.json'
+
+# Arquivos que não entram no build
+EXCLUDED_FILES = {'style_old.css'}
+
+# Tipos que valem a pena comprimir (PNG/JPEG já são comprimidos)
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.html', '.txt', '.map'}
+
+# Codificações na ordem de preferência do servidor
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def build_assets(static_folder: str) -> Dict[str, Any]:
+    """
+    Gera ``static/dist`` e o manifest
+
+    Returns:
+        Manifest: ``{'version': ..., 'assets': {nome: {'file', 'etag', 'encodings'}}}``
+    """
+    dist_folder = os.path.join(static_folder, DIST_FOLDER)
+    shutil.rmtree(dist_folder, ignore_errors=True)
+    os.makedirs(dist_folder)
+
+    assets = {}
+    for name in sorted(os.listdir(static_folder)):
+        source = os.path.join(static_folder, name)
+        if not os.path.isfile(source) or name in EXCLUDED_FILES or name.startswith('.'):
+            continue
+
+        content_hash = _file_hash(source)
+        stem, extension = os.path.splitext(name)
+        hashed_name = f"{stem}.{content_hash[:12]}{extension}"
+        target = os.path.join(dist_folder, hashed_name)
+        shutil.copyfile(source, target)
+
+        encodings = []
+        if extension.lower() in COMPRESSIBLE_EXTENSIONS:
+            with open(source, 'rb') as f:
+                data = f.read()
+            for encoding, suffix in ENCODINGS:
+                if encoding == 'br' and not BROTLI_AVAILABLE:
+                    continue
+                compressed = _compress(data, encoding)
+                # Só guarda a versão comprimida se ela for realmente menor
+                if len(compressed) < len(data) * 0.9:
+                    with open(target + suffix, 'wb') as f:
+                        f.write(compressed)
+                    encodings.append(encoding)
+
+        assets[name] = {'file': hashed_name, 'etag': content_hash[:32], 'encodings': encodings}
+
+    version = hashlib.sha256(
+        json.dumps(assets, sort_keys=True).encode('utf-8')
+    ).hexdigest()[:12]
+    manifest = {'version': version, 'assets': assets}
+    with open(os.path.join(dist_folder, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+class AssetManifest:
+    """
+    Manifest carregado na aplicação
+
+    ``resolve`` devolve o nome com hash de um arquivo e ``select`` escolhe a
+    variante pré-comprimida conforme o ``Accept-Encoding`` do cliente.
+    """
+
+    def __init__(self, static_folder: str):
+        self.dist_folder = os.path.join(static_folder, DIST_FOLDER)
+        self.version = None
+        self.assets: Dict[str, Dict[str, Any]] = {}
+        self._by_file: Dict[str, Dict[str, Any]] = {}
+        self.reload()
+
+    def reload(self) -> None:
+        path = os.path.join(self.dist_folder, MANIFEST_NAME)
+        try:
+            with open(path, encoding='utf-8') as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            manifest = {'version': None, 'assets': {}}
+        self.version = manifest['version']
+        self.assets = manifest['assets']
+        self._by_file = {entry['file']: entry for entry in self.assets.values()}
+
+    @property
+    def available(self) -> bool:
+        return bool(self.assets)
+
+    def resolve(self, name: str) -> Optional[str]:
+        entry = self.assets.get(name)
+        return entry['file'] if entry else None
+
+    def select(self, hashed_name: str, accept_encoding: str) -> Optional[Tuple[str, Optional[str], str, str]]:
+        """
+        Arquivo a enviar para um nome com hash
+
+        Returns:
+            (caminho, Content-Encoding ou None, mimetype, etag) ou None se o
+            arquivo não pertence ao build atual
+        """
+        entry = self._by_file.get(hashed_name)
+        if entry is None:
+            return None
+
+        accepted = _accepted_encodings(accept_encoding)
+        path = os.path.join(self.dist_folder, hashed_name)
+        mimetype = mimetypes.guess_type(hashed_name)[0] or 'application/octet-stream'
+        for encoding, suffix in ENCODINGS:
+            if encoding in entry['encodings'] and encoding in accepted:
+                return path + suffix, encoding, mimetype, f"{entry['etag']}-{encoding}"
+        return path, None, mimetype, entry['etag']
+
+
+def _accepted_encodings(header: str) -> List[str]:
+    accepted = []
+    for item in (header or '').split(','):
+        parts = [part.strip() for part in item.split(';')]
+        if not parts[0]:
+            continue
+        if any(part.replace(' ', '') in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000') for part in parts[1:]):
+            continue
+        accepted.append(parts[0].lower())
+    return accepted
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Gera arquivos estáticos com hash e pré-comprimidos')
+    parser.add_argument('--static-folder', default=os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'static'
+    ))
+    args = parser.parse_args(argv)
+
+    manifest = build_assets(args.static_folder)
+    for name, entry in manifest['assets'].items():
+        encodings = ', '.join(entry['encodings']) or 'sem compressão'
+        print(f"  {name} -> {entry['file']} ({encodings})")
+    if not BROTLI_AVAILABLE:
+        print("  brotli não instalado: apenas gzip")
+    print(f"Build {manifest['version']} gravado em {os.path.join(args.static_folder, DIST_FOLDER)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
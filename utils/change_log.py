@@ -0,0 +1,81 @@
+"""
+Registro estruturado das alterações feitas no dashboard
+"""
+import os
+import json
+from collections import Counter
+from typing import Dict, Any, List, Optional
+
+
+class ChangeLog:
+    """
+    Registra alterações como registros compactos
+
+    Em memória ficam apenas contagens por coluna e uma amostra limitada; o
+    detalhe completo vai, se ``path`` for informado, para um arquivo NDJSON
+    (um registro por linha) que pode ser baixado ou transmitido depois.
+    """
+
+    def __init__(self, path: Optional[str] = None, sample_size: int = 50):
+        self.path = path
+        self.sample_size = sample_size
+        self.sample: List[Dict[str, Any]] = []
+        self.counts: Counter = Counter()
+        self.column_counts: Counter = Counter()
+        self._file = None
+
+        if path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            self._file = open(path, 'w', encoding='utf-8')
+
+    def record_update(self, row: int, key: str, column: str, old: Any, new: Any) -> None:
+        """Registra a alteração de uma célula existente"""
+        self.column_counts[column] += 1
+        self._record({'type': 'update', 'row': row, 'key': key, 'column': column,
+                      'old': old, 'new': new})
+
+    def record_new(self, key: str, values: Dict[str, Any]) -> None:
+        """Registra uma linha nova no dashboard"""
+        self._record({'type': 'new', 'key': key, 'values': values})
+
+    def _record(self, record: Dict[str, Any]) -> None:
+        self.counts[record['type']] += 1
+        if len(self.sample) < self.sample_size:
+            self.sample.append(record)
+        if self._file is not None:
+            # default=str cobre escalares do numpy vindos do DataFrame
+            self._file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def summary(self) -> Dict[str, Any]:
+        """Resumo serializável: contagens, amostra e se ela foi truncada"""
+        return {
+            'updated_cells': self.counts['update'],
+            'new_rows': self.counts['new'],
+            'by_column': dict(self.column_counts),
+            'sample': json.loads(json.dumps(self.sample, default=str)),
+            'truncated': self.total > len(self.sample),
+            'has_details': self.path is not None,
+        }
+
+    def describe(self, record: Dict[str, Any]) -> str:
+        """Linha legível de um registro (formato do log de sincronização)"""
+        if record['type'] == 'update':
+            return (f"  [ATUALIZAÇÃO] '{record['key']}': Coluna '{record['column']}' "
+                    f"de '{record['old']}' para '{record['new']}'.")
+        return f"  [NOVO] Imobiliária a ser adicionada: {record['key']}"
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
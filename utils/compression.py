@@ -0,0 +1,153 @@
+"""
+Descompressão em streaming de uploads (Content-Encoding e arquivos .csv.gz)
+"""
+import gzip
+import zlib
+from typing import BinaryIO, Iterator
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+from exceptions.errors import ValidationError, FileSizeError, FileContentError
+
+
+# Saída máxima por chamada ao descompressor: limita a memória mesmo com
+# entradas maliciosas (poucos KB que expandem para GB)
+OUTPUT_CHUNK_SIZE = 64 * 1024
+
+# Abaixo deste volume descomprimido a taxa não é verificada (cabeçalhos,
+# arquivos pequenos muito repetitivos)
+MIN_RATIO_CHECK_SIZE = 1024 * 1024
+
+
+def supported_encodings() -> list:
+    """Valores de Content-Encoding aceitos no corpo das requisições"""
+    return ['gzip', 'zstd'] if ZSTD_AVAILABLE else ['gzip']
+
+
+def check_ratio(compressed: int, decompressed: int, max_ratio: float, max_size: int) -> None:
+    """
+    Interrompe descompressões desproporcionais (zip bombs) ou grandes demais
+
+    Raises:
+        FileSizeError: Taxa de descompressão ou tamanho descomprimido excedidos
+    """
+    if max_size and decompressed > max_size:
+        raise FileSizeError(f"Conteúdo descomprimido excede {max_size / (1024 * 1024):.1f}MB")
+    if (max_ratio and decompressed > MIN_RATIO_CHECK_SIZE
+            and decompressed > compressed * max_ratio):
+        raise FileSizeError(f"Taxa de descompressão acima do limite ({max_ratio:g}:1)")
+
+
+class _CountingReader:
+    """Conta os bytes comprimidos lidos do corpo da requisição"""
+
+    def __init__(self, raw: BinaryIO):
+        self._raw = raw
+        self.count = 0
+
+    def read(self, size: int = -1) -> bytes:
+        data = self._raw.read(size)
+        self.count += len(data)
+        return data
+
+
+class DecompressingStream:
+    """
+    Corpo de requisição descomprimido sob demanda (``Content-Encoding``)
+
+    Expõe apenas ``read``, que é o que o parser de multipart e a gravação de
+    blocos usam. Cada leitura devolve no máximo o tamanho pedido.
+    """
+
+    def __init__(self, raw: BinaryIO, encoding: str, max_ratio: float = 100,
+                 max_size: int = None):
+        if encoding not in supported_encodings():
+            raise ValidationError(f"Content-Encoding não suportado: {encoding}", status_code=415)
+
+        self.encoding = encoding
+        self.max_ratio = max_ratio
+        self.max_size = max_size
+        self.decompressed = 0
+        self._counter = _CountingReader(raw)
+        if encoding == 'gzip':
+            self._reader = gzip.GzipFile(fileobj=self._counter, mode='rb')
+        else:
+            self._reader = zstandard.ZstdDecompressor().stream_reader(self._counter)
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            return b''.join(iter(lambda: self.read(OUTPUT_CHUNK_SIZE), b''))
+
+        try:
+            data = self._reader.read(min(size, OUTPUT_CHUNK_SIZE))
+        except (OSError, EOFError, zlib.error) as e:
+            raise FileContentError(f"Corpo comprimido inválido ({self.encoding}): {str(e)}")
+        except Exception as e:
+            if ZSTD_AVAILABLE and isinstance(e, zstandard.ZstdError):
+                raise FileContentError(f"Corpo comprimido inválido ({self.encoding}): {str(e)}")
+            raise
+
+        self.decompressed += len(data)
+        check_ratio(self._counter.count, self.decompressed, self.max_ratio, self.max_size)
+        return data
+
+    def close(self) -> None:
+        self._reader.close()
+
+
+class GzipDecoder:
+    """
+    Descompressão incremental de um arquivo .gz recebido em pedaços
+
+    Usado quando o próprio arquivo enviado é comprimido (ex.: ``base.csv.gz``):
+    ``decode`` recebe os bytes na ordem em que chegam e devolve o conteúdo
+    descomprimido em pedaços de até ``OUTPUT_CHUNK_SIZE``.
+    """
+
+    def __init__(self, max_ratio: float = 100, max_size: int = None):
+        self.max_ratio = max_ratio
+        self.max_size = max_size
+        self.compressed = 0
+        self.decompressed = 0
+        self._decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+        self._member_started = False
+
+    def decode(self, data: bytes) -> Iterator[bytes]:
+        self.compressed += len(data)
+        while True:
+            try:
+                output = self._decompressor.decompress(data, OUTPUT_CHUNK_SIZE)
+            except zlib.error as e:
+                raise FileContentError(f"Arquivo .gz inválido: {str(e)}")
+            self._member_started = True
+
+            if output:
+                self.decompressed += len(output)
+                check_ratio(self.compressed, self.decompressed, self.max_ratio, self.max_size)
+                yield output
+
+            if self._decompressor.eof:
+                # Arquivos .gz podem ter vários membros concatenados
+                data = self._decompressor.unused_data
+                self._decompressor = zlib.decompressobj(zlib.MAX_WBITS | 16)
+                self._member_started = False
+                if not data:
+                    return
+                continue
+
+            data = self._decompressor.unconsumed_tail
+            # Saída cheia sem entrada restante: ainda pode haver saída pendente
+            if not data and len(output) < OUTPUT_CHUNK_SIZE:
+                return
+
+    def finish(self) -> None:
+        """
+        Raises:
+            FileContentError: Arquivo .gz truncado
+        """
+        if self._member_started and not self._decompressor.eof:
+            raise FileContentError("Arquivo .gz incompleto")
@@ -0,0 +1,156 @@
+"""
+DataFrames enxutos: categorias para texto repetido e números no menor tipo
+
+Planilhas da base trazem colunas como Estado, Cidade e Ativa no painel com
+poucos valores distintos repetidos em milhões de linhas; como ``object`` cada
+célula é um objeto Python (ou uma string do dtype ``str``). Depois da leitura (em CSV, a cada bloco):
+
+- texto com poucos valores distintos vira ``category``;
+- inteiros vão para o menor tipo que os comporta; floats só para ``float32``
+  quando a conversão não altera nenhum valor;
+- colunas sem nome e totalmente vazias (separadores sobrando no fim da linha)
+  são descartadas.
+
+Os valores lidos de volta (``str()``, ``tolist()``) não mudam.
+"""
+import re
+import json
+from typing import Dict, Iterable, Optional
+
+import pandas as pd
+from pandas.api.types import (
+    infer_dtype, is_float_dtype, is_integer_dtype, is_object_dtype, union_categoricals
+)
+
+
+# Proporção máxima de valores distintos para converter texto em categoria
+CATEGORY_MAX_RATIO = 0.5
+CATEGORY_SAMPLE_ROWS = 1000
+
+UNNAMED_COLUMN = re.compile(r'^Unnamed: \d+$')
+
+
+def memory_bytes(df: pd.DataFrame) -> int:
+    """Memória ocupada pelo DataFrame, incluindo as strings"""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def shrink_dataframe(df: pd.DataFrame, report: Optional[Dict[str, int]] = None,
+                     max_category_ratio: float = CATEGORY_MAX_RATIO) -> pd.DataFrame:
+    """
+    Converte as colunas do DataFrame para tipos mais compactos
+
+    Args:
+        report: Se informado, acumula ``before_bytes`` e ``after_bytes``
+        max_category_ratio: Texto vira categoria com até essa proporção de
+            valores distintos por linha
+    """
+    if report is not None:
+        report['before_bytes'] = report.get('before_bytes', 0) + memory_bytes(df)
+
+    unused = [name for name in df.columns
+              if UNNAMED_COLUMN.match(str(name)) and df[name].isna().all()]
+    if unused:
+        df = df.drop(columns=unused)
+
+    columns = {}
+    for name in df.columns:
+        column = df[name]
+        if is_object_dtype(column.dtype) or isinstance(column.dtype, pd.StringDtype):
+            if _low_cardinality_text(column, max_category_ratio):
+                columns[name] = column.astype('category')
+        elif is_integer_dtype(column.dtype):
+            columns[name] = pd.to_numeric(column, downcast='integer')
+        elif is_float_dtype(column.dtype) and column.dtype != 'float32':
+            narrow = column.astype('float32')
+            if narrow.astype(column.dtype).equals(column):
+                columns[name] = narrow
+    if columns:
+        df = df.copy(deep=False)
+        for name, values in columns.items():
+            df[name] = values
+
+    if report is not None:
+        report['after_bytes'] = report.get('after_bytes', 0) + memory_bytes(df)
+    return df
+
+
+def _low_cardinality_text(column: pd.Series, max_ratio: float) -> bool:
+    if not len(column):
+        return False
+    # Amostra primeiro: colunas quase únicas (nomes) são descartadas sem
+    # percorrer o bloco inteiro
+    sample = column.iloc[:CATEGORY_SAMPLE_ROWS]
+    if len(column) > len(sample) and sample.nunique(dropna=False) > max_ratio * len(sample):
+        return False
+    if is_object_dtype(column.dtype) and infer_dtype(column, skipna=True) not in ('string', 'empty'):
+        return False
+    return column.nunique(dropna=False) <= max_ratio * len(column)
+
+
+def concat_shrunk(chunks: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatena blocos já convertidos mantendo as categorias
+
+    ``pd.concat`` transforma categorias diferentes entre blocos em ``object``;
+    aqui colunas categóricas em todos os blocos são unidas com
+    ``union_categoricals``.
+    """
+    chunks = list(chunks)
+    if len(chunks) == 1:
+        return chunks[0]
+
+    columns = list(dict.fromkeys(name for chunk in chunks for name in chunk.columns))
+    categorical = [
+        name for name in columns
+        if all(name in chunk and isinstance(chunk[name].dtype, pd.CategoricalDtype) for chunk in chunks)
+    ]
+    # Sem passar as categorias por object: cada coluna é unida diretamente
+    df = pd.concat([chunk.drop(columns=categorical) for chunk in chunks], ignore_index=True)
+    for name in categorical:
+        df[name] = union_categoricals([chunk[name] for chunk in chunks])
+    return df[columns]
+
+
+def fill_missing(df: pd.DataFrame, value: str = '') -> pd.DataFrame:
+    """``fillna(value)`` que também funciona em colunas categóricas"""
+    for name in df.columns:
+        column = df[name]
+        if (isinstance(column.dtype, pd.CategoricalDtype) and value not in column.cat.categories
+                and column.isna().any()):
+            df[name] = column.cat.add_categories([value])
+    return df.fillna(value)
+
+
+def describe_report(report: Dict[str, int]) -> Dict[str, float]:
+    """Memória antes/depois em MB e a redução obtida"""
+    before = report.get('before_bytes', 0)
+    after = report.get('after_bytes', 0)
+    return {
+        'memory_before_mb': round(before / (1024 * 1024), 2),
+        'memory_mb': round(after / (1024 * 1024), 2),
+        'memory_ratio': round(before / after, 1) if after else None,
+    }
+
+
+
+def dataframe_to_json(df: pd.DataFrame) -> bytes:
+    """
+    Serializa o DataFrame (com o índice) em JSON com os dtypes de cada coluna
+
+    Formato de troca entre processos e máquinas (etapas do pipeline): ao
+    contrário de pickle, ler o conteúdo não executa código.
+    """
+    body = json.loads(df.to_json(orient='split', date_format='iso', date_unit='ns'))
+    body['dtypes'] = [str(dtype) for dtype in df.dtypes]
+    body['index_name'] = df.index.name
+    body['index_dtype'] = str(df.index.dtype)
+    return json.dumps(body, ensure_ascii=False).encode('utf-8')
+
+
+def dataframe_from_json(data: bytes) -> pd.DataFrame:
+    """DataFrame gravado por ``dataframe_to_json``, com o mesmo índice e dtypes"""
+    body = json.loads(data)
+    index = pd.Index(body['index'], name=body['index_name']).astype(body['index_dtype'])
+    df = pd.DataFrame(body['data'], columns=body['columns'], index=index)
+    return df.astype(dict(zip(body['columns'], body['dtypes'])))
@@ -0,0 +1,201 @@
+"""
+Pipeline de logging não bloqueante
+
+Quem loga apenas enfileira o registro (``QueueHandler``); formatação e escrita
+(stdout e arquivo rotativo) acontecem numa thread de fundo (``QueueListener``).
+Antes de enfileirar, registros abaixo de WARNING passam por um limite por
+evento: cada ponto de log (ou evento do structlog) pode emitir até ``rate``
+registros a cada ``window`` segundos; o excedente é descartado e contado.
+Com a fila cheia, o registro também é descartado e contado, em vez de
+bloquear a requisição.
+
+A thread de escrita não sobrevive a ``fork`` (gunicorn com ``preload_app``,
+workers prefork do Celery): no processo filho o pipeline recomeça com fila e
+listener novos (``os.register_at_fork``).
+"""
+import os
+import sys
+import time
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Any, Dict, Hashable, List, Optional
+
+
+class EventRateLimiter(logging.Filter):
+    """
+    Limite de registros por evento numa janela fixa
+
+    WARNING e acima sempre passam. O evento é o ``event`` do structlog ou,
+    para loggers comuns, o ponto do código que logou (arquivo e linha), de
+    modo que mensagens formatadas com valores diferentes contam juntas.
+    """
+
+    def __init__(self, rate: int = 50, window: float = 10.0):
+        super().__init__()
+        self.rate = rate
+        self.window = window
+        self.dropped = 0
+        self._windows: Dict[Hashable, List[float]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def event_key(record: logging.LogRecord) -> Hashable:
+        if isinstance(record.msg, dict):
+            return record.name, record.msg.get('event')
+        return record.pathname, record.lineno
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.rate <= 0 or record.levelno >= logging.WARNING:
+            return True
+        key = self.event_key(record)
+        now = time.monotonic()
+        with self._lock:
+            state = self._windows.get(key)
+            if state is None or now - state[0] >= self.window:
+                self._windows[key] = [now, 1]
+                return True
+            if state[1] < self.rate:
+                state[1] += 1
+                return True
+            self.dropped += 1
+            return False
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    ``QueueHandler`` que não formata na thread de quem loga e não bloqueia
+
+    O listener roda no mesmo processo, então o registro pode ir para a fila
+    sem ser convertido em texto; se a fila estiver cheia, é descartado.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """Fila, listener e contadores do logging do processo"""
+
+    def __init__(self, handlers: List[logging.Handler], queue_size: int = 10000,
+                 rate: int = 50, window: float = 10.0):
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.limiter = EventRateLimiter(rate, window)
+        self.handler = NonBlockingQueueHandler(self.queue)
+        self.handler.addFilter(self.limiter)
+        self.handlers = handlers
+        self.listener = QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self.pid = os.getpid()
+
+    def start(self) -> None:
+        self.listener.start()
+
+    def restart_after_fork(self) -> None:
+        """
+        Recria fila e listener no processo filho
+
+        A thread herdada não existe no filho e a fila copiada pode estar com o
+        lock preso; os registros que ela continha são escritos pelo pai. O
+        handler anexado ao logger raiz é mantido, só passa a usar a fila nova.
+        """
+        if self.pid == os.getpid():
+            return
+        self.pid = os.getpid()
+        self.queue = queue.Queue(maxsize=self.queue.maxsize)
+        self.handler.queue = self.queue
+        self.listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self) -> None:
+        """Esvazia a fila e encerra a thread de escrita"""
+        thread = self.listener._thread
+        if thread is not None and self.pid == os.getpid():
+            # Sentinela com put bloqueante: a fila pode estar cheia
+            self.queue.put(self.listener._sentinel)
+            thread.join()
+            self.listener._thread = None
+        for handler in self.handlers:
+            handler.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'queue_depth': self.queue.qsize(),
+            'queue_size': self.queue.maxsize,
+            'dropped_rate_limited': self.limiter.dropped,
+            'dropped_queue_full': self.handler.dropped,
+            'dropped': self.limiter.dropped + self.handler.dropped,
+        }
+
+
+_pipeline: Optional[LogPipeline] = None
+
+
+def install_log_pipeline(level: str = 'INFO', log_file: Optional[str] = None,
+                         formatter: Optional[logging.Formatter] = None,
+                         queue_size: int = 10000, rate: int = 50,
+                         window: float = 10.0) -> LogPipeline:
+    """
+    Substitui os handlers do logger raiz pela fila e inicia a thread de escrita
+
+    Pode ser chamado de novo (ex.: uma aplicação por teste): o pipeline
+    anterior é esvaziado e encerrado antes.
+
+    Args:
+        level: Nível do logger raiz
+        log_file: Arquivo rotativo (10MB x 10) além do stdout
+        formatter: Formatador aplicado na thread de escrita
+        queue_size: Registros aguardando escrita antes de começar a descartar
+        rate: Registros por evento a cada ``window`` segundos (0 desativa)
+    """
+    global _pipeline
+
+    formatter = formatter or logging.Formatter(
+        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+    handlers: List[logging.Handler] = [logging.StreamHandler(sys.stdout)]
+    if log_file:
+        handlers.append(RotatingFileHandler(log_file, maxBytes=10485760, backupCount=10))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    if _pipeline is not None:
+        root.removeHandler(_pipeline.handler)
+        _pipeline.stop()
+
+    pipeline = LogPipeline(handlers, queue_size=queue_size, rate=rate, window=window)
+    root.addHandler(pipeline.handler)
+    root.setLevel(level)
+    pipeline.start()
+    _pipeline = pipeline
+    return pipeline
+
+
+def get_log_pipeline() -> Optional[LogPipeline]:
+    return _pipeline
+
+
+@atexit.register
+def _flush_on_exit() -> None:
+    if _pipeline is not None:
+        _pipeline.stop()
+
+
+def _restart_in_child() -> None:
+    if _pipeline is not None:
+        _pipeline.restart_after_fork()
+
+
+os.register_at_fork(after_in_child=_restart_in_child)
@@ -0,0 +1,49 @@
+"""
+Acompanhamento de etapas do processamento
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, Optional
+
+from exceptions.errors import JobCancelledError
+
+
+# Callback recebe o nome do evento e um dicionário com os dados
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+
+
+class StageTracker:
+    """
+    Mede a duração de cada etapa e notifica um callback de progresso
+
+    Com ``cancel_check``, ``checkpoint()`` serve de ponto de cancelamento
+    cooperativo: as etapas o chamam entre blocos e lotes, e ele levanta
+    ``JobCancelledError`` quando o job foi cancelado.
+    """
+
+    def __init__(self, progress: Optional[ProgressCallback] = None,
+                 cancel_check: Optional[Callable[[], bool]] = None):
+        self.progress = progress
+        self.cancel_check = cancel_check
+        self.timings: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str):
+        """Delimita uma etapa; a duração fica em ``timings[name]``"""
+        self.notify('stage_started', stage=name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] = round(time.perf_counter() - start, 4)
+        self.notify('stage_finished', stage=name, duration=self.timings[name])
+
+    def checkpoint(self) -> None:
+        """Ponto de cancelamento entre blocos, linhas ou lotes"""
+        if self.cancel_check is not None and self.cancel_check():
+            raise JobCancelledError("Job cancelado")
+
+    def notify(self, event: str, **data) -> None:
+        """Envia um evento ao callback, se houver"""
+        if self.progress is not None:
+            self.progress(event, data)
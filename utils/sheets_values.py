@@ -0,0 +1,174 @@
+"""
+Conversão de DataFrames nos valores enviados ao Google Sheets
+
+A API recebe JSON: NaN, infinitos, escalares do numpy e Timestamps quebram a
+codificação do gspread (ou chegam como texto estranho). A conversão é feita
+por coluna, de forma vetorizada, e as linhas saem de uma única matriz
+``object`` (``tolist``), em vez de um objeto por célula criado em Python:
+
+- vazios (NaN, None, NaT, infinitos) viram '';
+- inteiros e floats viram ``int``/``float`` do Python (números no JSON, sem
+  depender da localidade da planilha);
+- datas viram texto ISO ('2025-06-03' ou '2025-06-03 14:30:00');
+- categorias são convertidas uma vez por categoria.
+
+``sheets_text`` produz o texto de cada valor, para comparar com o que o
+Sheets devolve em ``get_all_values`` e para escrita com ``USER_ENTERED``:
+floats inteiros sem '.0' e separador decimal configurável.
+"""
+import math
+import datetime
+from decimal import Decimal
+from typing import Any, Callable, List
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import (
+    is_bool_dtype, is_datetime64_any_dtype, is_float_dtype, is_integer_dtype,
+    is_object_dtype, is_timedelta64_dtype, infer_dtype
+)
+
+
+def _cell(value: Any) -> Any:
+    """Conversão de um valor isolado (colunas ``object`` com tipos misturados)"""
+    if value is None or value is pd.NaT or value is pd.NA:
+        return ''
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating, Decimal)):
+        value = float(value)
+        return value if math.isfinite(value) else ''
+    if isinstance(value, (pd.Timestamp, datetime.datetime)):
+        if value.hour == value.minute == value.second == value.microsecond == 0 and value.tzinfo is None:
+            return value.strftime('%Y-%m-%d')
+        return value.isoformat(sep=' ')
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return str(value)
+
+
+_cells = np.frompyfunc(_cell, 1, 1)
+
+
+def _datetimes(column: pd.Series) -> np.ndarray:
+    if column.dt.tz is None and (column.dropna().dt.normalize() == column.dropna()).all():
+        text = column.dt.strftime('%Y-%m-%d')
+    else:
+        text = column.map(lambda value: value.isoformat(sep=' ') if not pd.isna(value) else '')
+    return text.fillna('').to_numpy(dtype=object)
+
+
+def _by_unique(column: pd.Series, convert: Callable[[pd.Series], np.ndarray]) -> np.ndarray:
+    """
+    Converte cada valor distinto uma vez e repete os objetos por célula
+
+    Colunas como Corretores têm poucos valores distintos: as células passam a
+    compartilhar o mesmo ``int``/``str`` em vez de um objeto novo cada.
+    """
+    codes, uniques = pd.factorize(column)
+    lookup = np.append(convert(pd.Series(uniques, dtype=column.dtype)), np.array([''], dtype=object))
+    return lookup[codes]
+
+
+def column_values(column: pd.Series) -> np.ndarray:
+    """Valores de uma coluna prontos para JSON, como matriz ``object``"""
+    dtype = column.dtype
+    if len(column) and (is_integer_dtype(dtype) or is_float_dtype(dtype)
+                        or is_datetime64_any_dtype(dtype)):
+        return _by_unique(column, _plain_values)
+    return _plain_values(column)
+
+
+def _plain_values(column: pd.Series) -> np.ndarray:
+    dtype = column.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        categories = column_values(pd.Series(dtype.categories))
+        # Código -1 (vazio) aponta para o '' acrescentado no fim
+        lookup = np.append(categories, np.array([''], dtype=object))
+        return lookup[column.cat.codes.to_numpy()]
+    if is_bool_dtype(dtype) and not is_object_dtype(dtype):
+        if column.hasnans:
+            return _cells(column.to_numpy(dtype=object))
+        return np.array(column.to_numpy(dtype=bool).tolist(), dtype=object)
+    if is_integer_dtype(dtype):
+        if column.hasnans:
+            return _cells(column.to_numpy(dtype=object))
+        out = np.empty(len(column), dtype=object)
+        out[:] = column.to_numpy(dtype=np.int64).tolist()
+        return out
+    if is_float_dtype(dtype):
+        values = column.to_numpy(dtype=np.float64, na_value=np.nan)
+        out = np.empty(len(values), dtype=object)
+        out[:] = values.tolist()
+        out[~np.isfinite(values)] = ''
+        return out
+    if is_datetime64_any_dtype(dtype):
+        return _datetimes(column)
+    if is_timedelta64_dtype(dtype):
+        return column.astype(str).where(column.notna(), '').to_numpy(dtype=object)
+
+    values = column.to_numpy(dtype=object)
+    if isinstance(dtype, pd.StringDtype) or infer_dtype(values, skipna=True) in ('string', 'empty'):
+        out = values.copy()
+        out[pd.isna(values)] = ''
+        return out
+    return _cells(values)
+
+
+def sheets_rows(df: pd.DataFrame) -> List[List[Any]]:
+    """Linhas do DataFrame (sem o cabeçalho) com valores aceitos pela API"""
+    out = np.empty((len(df), len(df.columns)), dtype=object)
+    for j in range(len(df.columns)):
+        out[:, j] = column_values(df.iloc[:, j])
+    return out.tolist()
+
+
+def sheets_header(df: pd.DataFrame) -> List[str]:
+    return [str(name) for name in df.columns]
+
+
+def _text(value: Any, decimal_separator: str) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, float):
+        if value.is_integer():
+            return str(int(value))
+        return repr(value).replace('.', decimal_separator)
+    return str(value)
+
+
+_texts = np.frompyfunc(_text, 2, 1)
+
+
+def sheets_text(column: pd.Series, decimal_separator: str = '.') -> pd.Series:
+    """
+    Texto de cada valor da coluna como o Sheets o exibe (mantém categorias)
+
+    Colunas categóricas continuam categóricas quando os textos das categorias
+    são distintos entre si.
+    """
+    dtype = column.dtype
+    if isinstance(dtype, pd.CategoricalDtype):
+        labels = sheets_text(pd.Series(dtype.categories), decimal_separator)
+        if labels.is_unique:
+            if column.hasnans:
+                if '' not in dtype.categories:
+                    column = column.cat.add_categories([''])
+                column = column.fillna('')
+                labels = sheets_text(pd.Series(column.cat.categories), decimal_separator)
+            return column.cat.rename_categories(list(labels))
+        column = column.astype(object)
+        dtype = column.dtype
+
+    if (isinstance(dtype, pd.StringDtype) or is_object_dtype(dtype)) and \
+            infer_dtype(column, skipna=True) in ('string', 'empty'):
+        return column.fillna('') if column.hasnans else column
+
+    values = _by_unique(column, lambda uniques: _texts(_plain_values(uniques), decimal_separator))
+    return pd.Series(values, index=column.index, dtype=object)
@@ -0,0 +1,132 @@
+"""
+Recebimento de arquivos do multipart com validação durante o upload
+"""
+import hashlib
+from tempfile import SpooledTemporaryFile
+
+from flask import Request, current_app
+from werkzeug.utils import cached_property
+
+from exceptions.errors import FileSizeError
+from utils.compression import DecompressingStream, GzipDecoder
+
+# Arquivos enviados já comprimidos; o restante da aplicação vê o conteúdo original
+COMPRESSED_SUFFIXES = ('.gz',)
+
+
+class ValidatingUploadStream:
+    """
+    Destino dos bytes de um arquivo enviado via multipart
+
+    Enquanto o Werkzeug grava o corpo da requisição, confere extensão e
+    assinatura (primeiros ``HEADER_SIZE`` bytes), interrompe o upload ao passar
+    de ``MAX_FILE_SIZE`` e calcula o SHA-256 do conteúdo. Com ``decoder``
+    (arquivos .gz), tudo isso vale para o conteúdo já descomprimido. Os demais
+    métodos são delegados ao arquivo temporário (memória até ``spool_size``,
+    depois disco).
+    """
+
+    HEADER_SIZE = 1024
+
+    def __init__(self, filename: str, validator, spool_size: int = 500 * 1024,
+                 decoder: GzipDecoder = None):
+        self.filename = filename
+        self.validator = validator
+        self.decoder = decoder
+        self.size = 0
+        self._file = SpooledTemporaryFile(max_size=spool_size, mode='w+b')
+        self._digest = hashlib.sha256()
+        self._header = b''
+        self._header_checked = False
+
+    def write(self, data: bytes) -> int:
+        if self.decoder is None:
+            return self._write(data)
+        for piece in self.decoder.decode(data):
+            self._write(piece)
+        return len(data)
+
+    def _write(self, data: bytes) -> int:
+        self.size += len(data)
+        if self.size > self.validator.MAX_FILE_SIZE:
+            size_mb = self.validator.MAX_FILE_SIZE / (1024 * 1024)
+            raise FileSizeError(f"Arquivo muito grande. Máximo permitido: {size_mb:.1f}MB")
+
+        if not self._header_checked:
+            self._header += data[:self.HEADER_SIZE - len(self._header)]
+            if len(self._header) >= self.HEADER_SIZE:
+                self._check_header()
+
+        self._digest.update(data)
+        return self._file.write(data)
+
+    def seek(self, *args) -> int:
+        # O parser volta ao início ao terminar a parte: arquivos menores que o
+        # cabeçalho são conferidos aqui (vazios ficam para o FileValidator)
+        if self.decoder is not None:
+            self.decoder.finish()
+        if not self._header_checked and self.size:
+            self._check_header()
+        return self._file.seek(*args)
+
+    def _check_header(self) -> None:
+        self._header_checked = True
+        self.validator.validate_header(self.filename, self._header)
+
+    @property
+    def sha256(self) -> str:
+        """SHA-256 do conteúdo recebido"""
+        return self._digest.hexdigest()
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+
+def decoded_filename(filename: str) -> str:
+    """Nome do arquivo sem o sufixo de compressão (``base.csv.gz`` -> ``base.csv``)"""
+    if filename and filename.lower().endswith(COMPRESSED_SUFFIXES):
+        return filename.rsplit('.', 1)[0]
+    return filename
+
+
+class UploadRequest(Request):
+    """
+    Request que valida arquivos do multipart enquanto eles chegam
+
+    Corpos com ``Content-Encoding: gzip`` (ou ``zstd``, se o ``zstandard``
+    estiver instalado) são descomprimidos em streaming antes do parser.
+    """
+
+    @property
+    def content_encoding(self):
+        encoding = self.headers.get('Content-Encoding', '').strip().lower()
+        return None if encoding in ('', 'identity') else encoding
+
+    @cached_property
+    def stream(self):
+        stream = super().stream
+        if self.content_encoding is None:
+            return stream
+        return DecompressingStream(
+            stream, self.content_encoding,
+            max_ratio=current_app.config.get('MAX_DECOMPRESSION_RATIO', 100),
+            max_size=self.max_content_length
+        )
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None,
+                         content_length=None):
+        validator = getattr(current_app, 'file_validator', None)
+        if validator is None or not filename:
+            return super()._get_file_stream(total_content_length, content_type,
+                                            filename, content_length)
+
+        # Nome e extensão são conferidos antes do primeiro byte do arquivo
+        name = decoded_filename(filename)
+        decoder = None
+        if name != filename:
+            decoder = GzipDecoder(max_ratio=current_app.config.get('MAX_DECOMPRESSION_RATIO', 100))
+        validator.validate_declared(name, content_length if decoder is None else 0)
+        return ValidatingUploadStream(name, validator, decoder=decoder)
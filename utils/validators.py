@@ -83,6 +83,23 @@ class FileValidator:
         
         return True
     
+    def validate_declared(self, filename: str, size: int) -> bool:
+        """
+        Valida nome e tamanho declarados antes de o conteúdo chegar
+        (sessões de upload em blocos). O conteúdo é validado na finalização.
+        
+        Raises:
+            FileValidationError: Erro específico de validação
+        """
+        safe_filename = self._validate_filename(filename)
+        self._validate_extension(safe_filename)
+        
+        if size > self.MAX_FILE_SIZE:
+            size_mb = self.MAX_FILE_SIZE / (1024 * 1024)
+            raise FileSizeError(f"Arquivo muito grande. Máximo permitido: {size_mb:.1f}MB")
+        
+        return True
+    
     def _validate_filename(self, filename: str) -> str:
         """Valida e sanitiza nome do arquivo"""
         if not filename or filename.strip() == '':
@@ -168,13 +185,21 @@ class FileValidator:
             
             raise FileContentError(f"Tipo de arquivo não permitido: {mime_type}")
         
-        # Verificações específicas por extensão
-        extension = os.path.splitext(file.filename)[1].lower()
+        self.validate_header(file.filename, file_header)
+    
+    def validate_header(self, filename: str, header: bytes) -> None:
+        """
+        Verificações específicas por extensão nos primeiros bytes do arquivo
+        
+        Raises:
+            FileContentError: Conteúdo não condiz com a extensão
+        """
+        extension = os.path.splitext(filename)[1].lower()
         
         if extension == '.csv':
-            self._validate_csv_content(file_header)
+            self._validate_csv_content(header)
         elif extension in ['.xlsx', '.xls']:
-            self._validate_excel_content(file_header)
+            self._validate_excel_content(header)
     
     def _validate_csv_content(self, header: bytes) -> None:
         """Validação específica para arquivos CSV"""
@@ -233,6 +258,22 @@ class FileValidator:
         
         return f"{name}_{timestamp}{ext}"
     
+    @staticmethod
+    def compute_file_hash(file: FileStorage, chunk_size: int = 1024 * 1024) -> str:
+        """Calcula o SHA-256 do conteúdo do arquivo"""
+        # Recebido via UploadRequest: hash já calculado durante o upload
+        precomputed = getattr(file.stream, 'sha256', None)
+        if isinstance(precomputed, str):
+            return precomputed
+        
+        import hashlib
+        digest = hashlib.sha256()
+        file.seek(0)
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+        file.seek(0)
+        return digest.hexdigest()
+    
     @staticmethod
     def get_file_info(file: FileStorage) -> dict:
         """Obtém informações detalhadas do arquivo"""
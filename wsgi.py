@@ -0,0 +1,38 @@
+"""
+Ponto de entrada WSGI para produção
+
+    gunicorn -c python:config.gunicorn_config wsgi:app
+"""
+import os
+
+# Sem FLASK_ENV explícito, o servidor de produção usa a configuração de produção
+os.environ.setdefault('FLASK_ENV', 'production')
+# Threads de verificação nascem em cada worker (after_fork), nunca no master
+# que ainda vai fazer fork
+os.environ.setdefault('BACKGROUND_CHECKS_ON_STARTUP', 'false')
+
+from app import app, start_background_checks  # noqa: E402
+from utils.log_pipeline import get_log_pipeline  # noqa: E402
+
+
+def after_fork():
+    """
+    Reabre recursos que não podem ser herdados de outro processo
+
+    Chamado pelo gunicorn em cada worker quando a aplicação foi carregada no
+    master (``preload_app``).
+    """
+    app.job_store.reopen()
+    app.upload_sessions.reopen()
+    app.storage.reopen()
+    app.pipeline_store.reopen()
+    app.health_registry.reopen()
+    if app.upload_limiter is not None:
+        app.upload_limiter.reopen()
+    if app.profiler is not None:
+        app.profiler.reopen()
+    start_background_checks(app)
+    # Já refeito por os.register_at_fork; repetido aqui sem efeito
+    pipeline = get_log_pipeline()
+    if pipeline is not None:
+        pipeline.restart_after_fork()